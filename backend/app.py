@@ -9,7 +9,7 @@ if os.path.exists(site_packages_path) and site_packages_path not in sys.path:
     sys.path.append(site_packages_path)
 
 try:
-    from flask import Flask, request, jsonify
+    from flask import Flask, Response, request, jsonify
     from flask_cors import CORS
     from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity
     import json
@@ -18,11 +18,77 @@ try:
     import pathlib
     from dotenv import load_dotenv
     import re
-    from sqlalchemy import create_engine, extract, text
+    from sqlalchemy import create_engine, extract, func, text
     from sqlalchemy.orm import sessionmaker
-    from models import Base, User, Transaction, Budget, SavedImpulse
+    from models import (
+        Base,
+        User,
+        Transaction,
+        Budget,
+        SavedImpulse,
+        Goal,
+        Income,
+        MonthlySummary,
+        UserCategory,
+        RecurringSeries,
+        SpendingStats,
+    )
+    from projections import (
+        DEFAULT_ANNUAL_RETURN,
+        project_curves,
+    )
+    from simulations import DEFAULT_VOLATILITY, simulate_goal, simulation_cache
     from routes.auth_routes import auth_bp, setup_auth_routes
     from services.gemini_service import GeminiService, GENAI_AVAILABLE
+    from services.model_backends import get_backend
+    from services.response_catalog import get_response_catalog
+    from services.local_router import LocalIntentRouter
+    from services.currency_service import get_rate_table
+    from services.activity_feed import get_activity_page
+    from services.goal_service import compute_goal_progress, track_goal_progress
+    from services.cashflow_service import (
+        get_savings_overview,
+        rebuild_monthly_summaries,
+        track_monthly_summaries,
+    )
+    from services.category_service import (
+        category_index,
+        rebuild_user_categories,
+        track_category_usage,
+    )
+    from services.categorizer import get_categorizer, track_categorizer_updates
+    from services.recurring_service import (
+        get_recurring_payments,
+        rebuild_recurring_series,
+        track_recurring_series,
+    )
+    from services.anomaly_service import (
+        dismiss_alert,
+        get_alerts,
+        rebuild_spending_stats,
+        track_spending_anomalies,
+    )
+    from services.dashboard_service import (
+        RESOURCE_BUILDERS,
+        DashboardContext,
+        build_dashboard,
+        build_goals,
+        build_insights,
+        build_portfolio,
+        build_resources,
+    )
+    from services.budget_service import next_month, roll_forward_budgets, upsert_budget
+    from services.maintenance_service import cleanup_demo_users, refresh_derived_data
+    from services.sync_service import get_changes, purge_tombstones, track_changes
+    from services.event_service import (
+        StreamTickets,
+        event_broker,
+        stream_events,
+        track_change_events,
+    )
+    from jobs import JobQueue
+    from rate_limit import RateLimiter, SQLiteBucketStore
+    from single_flight import flight_key, single_flight
     import logging
 except ImportError as e:
     print(f"Error importing modules: {e}")
@@ -40,7 +106,11 @@ load_dotenv()
 app = Flask(__name__)
 # Enable CORS for all routes with support for credentials
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
-CORS(app, resources={r"/*": {"origins": CORS_ORIGINS, "supports_credentials": True}})
+CORS(
+    app,
+    resources={r"/*": {"origins": CORS_ORIGINS, "supports_credentials": True}},
+    expose_headers=["X-Next-Cursor"],
+)
 
 # JWT Configuration
 app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "dev-secret-key")
@@ -48,14 +118,90 @@ app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=1)
 app.config["JWT_REFRESH_TOKEN_EXPIRES"] = timedelta(days=30)
 jwt = JWTManager(app)
 
+# Tickets opening the event streams, see services.event_service
+stream_tickets = StreamTickets(app.config["JWT_SECRET_KEY"])
+
 # Database setup
 DB_PATH = pathlib.Path(__file__).parent / "mindfulwealth.db"
 DATABASE_URL = f"sqlite:///{DB_PATH}"
 engine = create_engine(DATABASE_URL)
 Base.metadata.create_all(engine)
 Session = sessionmaker(bind=engine)
+track_goal_progress(Session)
+track_monthly_summaries(Session)
+track_category_usage(Session)
+track_categorizer_updates(Session)
+track_recurring_series(Session)
+track_spending_anomalies(Session)
+track_changes(Session)
+track_change_events(Session)
 db_session = Session()
 
+# Background jobs, run by worker threads off the request path
+job_queue = JobQueue(Session)
+job_queue.register("refresh_derived_data", refresh_derived_data)
+job_queue.register("cleanup_demo_users", cleanup_demo_users)
+job_queue.register("purge_jobs", job_queue.purge)
+job_queue.register("purge_tombstones", purge_tombstones)
+job_queue.schedule("refresh_derived_data", os.getenv("REFRESH_SCHEDULE", "0 3 * * *"))
+job_queue.schedule("cleanup_demo_users", "15 * * * *")
+job_queue.schedule("purge_jobs", "30 4 * * *")
+job_queue.schedule("purge_tombstones", "45 4 * * *")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+
+
+def build_missing_derived_data():
+    """
+    Build the monthly rollup, the per-user category dictionary, recurring
+    payments and spending statistics of databases created before they existed
+    """
+    session = Session()
+    try:
+        if not session.query(MonthlySummary.id).first():
+            rebuild_monthly_summaries(session)
+        if not session.query(UserCategory.id).first():
+            rebuild_user_categories(session)
+        if not session.query(RecurringSeries.id).first():
+            rebuild_recurring_series(session)
+        if not session.query(SpendingStats.id).first():
+            rebuild_spending_stats(session)
+    finally:
+        session.close()
+
+
+def start_background_services(workers=JOB_WORKERS):
+    """
+    Build missing derived data and start the job workers and scheduler
+
+    Called by the entry points serving the app rather than on import, so
+    tests and scripts importing this module start no threads.
+    """
+    build_missing_derived_data()
+    if workers > 0:
+        job_queue.start(workers)
+
+
+def create_app():
+    """App factory for gunicorn, with the background services started"""
+    start_background_services()
+    return app
+
+
+# Request rate limits per user and for all users together, an empty rate
+# disables the limit. Buckets are shared through RATE_LIMIT_DB when set.
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB")
+rate_limiter = RateLimiter(SQLiteBucketStore(RATE_LIMIT_DB) if RATE_LIMIT_DB else None)
+rate_limiter.configure(
+    "chat",
+    os.getenv("CHAT_RATE_LIMIT", "20/minute"),
+    os.getenv("CHAT_GLOBAL_RATE_LIMIT", "600/minute"),
+)
+rate_limiter.configure(
+    "writes",
+    os.getenv("WRITE_RATE_LIMIT", "120/minute"),
+    os.getenv("WRITE_GLOBAL_RATE_LIMIT", ""),
+)
+
 
 # Health check endpoint
 @app.route("/api/health", methods=["GET"])
@@ -71,6 +217,7 @@ def health_check():
 
     # Check Gemini API if available
     gemini_status = "available" if GENAI_AVAILABLE else "unavailable"
+    jobs_status = "running" if job_queue.running else "stopped"
 
     status_code = 200 if db_status == "healthy" else 500
 
@@ -79,15 +226,58 @@ def health_check():
             "status": "healthy" if status_code == 200 else "unhealthy",
             "timestamp": datetime.now().isoformat(),
             "version": "1.0.0",
-            "services": {"database": db_status, "gemini_api": gemini_status},
+            "services": {
+                "database": db_status,
+                "gemini_api": gemini_status,
+                "jobs": jobs_status,
+            },
         }
     ), status_code
 
 
+# Background job queue metrics
+@app.route("/api/jobs/metrics", methods=["GET"])
+def job_metrics():
+    """Queue depth and latency of background jobs"""
+    try:
+        return jsonify({"success": True, "metrics": job_queue.metrics()})
+    except Exception as e:
+        logger.error(f"Error getting job metrics: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# Rate limiter counters
+@app.route("/api/rate-limits/metrics", methods=["GET"])
+def rate_limit_metrics():
+    """Allowed and throttled requests of each rate limit rule"""
+    try:
+        return jsonify({"success": True, "metrics": rate_limiter.metrics()})
+    except Exception as e:
+        logger.error(f"Error getting rate limit metrics: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# Duplicate request coalescing counters
+@app.route("/api/single-flight/metrics", methods=["GET"])
+def single_flight_metrics():
+    """How often identical concurrent dashboard builds and Gemini calls were shared"""
+    try:
+        return jsonify({"success": True, "metrics": single_flight.metrics()})
+    except Exception as e:
+        logger.error(f"Error getting single-flight metrics: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# Largest batch accepted by /api/transactions/categorize
+MAX_CATEGORIZE_BATCH = 1000
+
 # Global variables
 preferred_currency = "EUR"  # Default currency is EUR
 personality_mode = "nice"  # Default personality mode is now 'nice'
 
+# Canned responses used when the AI service is unavailable
+response_catalog = get_response_catalog()
+
 # Category translations
 category_translations = {
     "fr": {
@@ -145,9 +335,11 @@ def translate_category(category, language="fr"):
 # Initialize Gemini service if available
 gemini_service = None
 gemini_api_key = os.getenv("GEMINI_API_KEY")
-if GENAI_AVAILABLE and gemini_api_key:
+# Fake or self-hosted stand-in for the Gemini SDK, for load tests
+gemini_backend = get_backend()
+if (GENAI_AVAILABLE and gemini_api_key) or gemini_backend is not None:
     try:
-        gemini_service = GeminiService(gemini_api_key)
+        gemini_service = GeminiService(gemini_api_key, backend=gemini_backend)
         gemini_service.set_personality_mode(personality_mode)
         gemini_service.set_preferred_currency(preferred_currency)
         print("Gemini service initialized successfully.")
@@ -157,6 +349,9 @@ if GENAI_AVAILABLE and gemini_api_key:
 else:
     print("Gemini service disabled. Using mock responses.")
 
+# Answers questions about the user's own data without calling the AI service
+local_router = LocalIntentRouter(db_session, category_translations)
+
 # Register auth routes
 auth_routes = setup_auth_routes(db_session)
 app.register_blueprint(auth_routes, url_prefix="/api/auth")
@@ -174,16 +369,23 @@ def get_current_user():
 
 def convert_currency(amount, from_currency, to_currency="EUR"):
     """
-    Convert amount from one currency to another
-    For simplicity, using fixed conversion rates
+    Convert amount from one currency to another with the latest rate snapshot
+    """
+    return get_rate_table().convert(amount, from_currency, to_currency)
+
+
+def get_request_currency(data):
     """
-    # Simplified conversion rates (in real app, would use an API)
-    rates = {"USD": 1.0, "EUR": 0.85, "GBP": 0.75, "JPY": 110.0}
+    Get the currency of the amounts in a request body
 
-    # Convert to USD first (as base currency)
-    amount_usd = amount / rates[from_currency]
-    # Then convert to target currency
-    return amount_usd * rates[to_currency]
+    Returns:
+        str: The currency code, the preferred currency if none was given, or
+             None if the currency is not supported
+    """
+    currency = str(data.get("currency") or preferred_currency).upper()
+    if currency not in get_rate_table().index:
+        return None
+    return currency
 
 
 def extract_currency_amount(message):
@@ -218,6 +420,7 @@ def extract_currency_amount(message):
 
 @app.route("/api/chat", methods=["POST"])
 @jwt_required(optional=True)
+@rate_limiter.limit("chat")
 def chat():
     """
     Process chat messages and return AI responses
@@ -260,6 +463,13 @@ def chat():
         else:
             financial_data = None
 
+        # Answer questions about the user's own data locally
+        local_response = local_router.answer(
+            user_id, message, language_preference, preferred_currency
+        )
+        if local_response:
+            return jsonify({"response": local_response, "financial_data": financial_data})
+
         # Use Gemini service if available
         if gemini_service:
             try:
@@ -271,16 +481,15 @@ def chat():
                         {"role": role, "content": msg.get("text", "")}
                     )
 
-                # Add personality context and language preference
-                system_prompt = f"You are a financial advisor with a {personality_mode} approach to finances. Please respond in {language_preference} language."
-
-                # Get response from Gemini
+                # Get response from Gemini, with the prompt compiled for the
+                # language and personality
                 response = gemini_service.get_response(
                     message,
-                    system_prompt=system_prompt,
                     conversation_history=formatted_history,
                     context_data=context_data,
                     language=language_preference,
+                    user_id=user_id,
+                    personality=personality_mode,
                 )
 
                 # Ensure we have a valid response
@@ -313,9 +522,9 @@ def chat():
         # Return a generic response in case of unexpected errors
         return jsonify(
             {
-                "response": "Désolé, une erreur s'est produite. Veuillez réessayer."
-                if request.json.get("language", "fr") == "fr"
-                else "Sorry, an error occurred. Please try again.",
+                "response": response_catalog.get(
+                    "chat_error", request.json.get("language", "fr")
+                ),
                 "financial_data": None,
             }
         )
@@ -383,8 +592,7 @@ def set_currency():
         currency = data.get("currency", "EUR")
 
         # Validate currency
-        valid_currencies = ["USD", "EUR", "GBP", "JPY"]
-        if currency not in valid_currencies:
+        if currency not in get_rate_table().currencies:
             return jsonify({"success": False, "error": "Invalid currency"}), 400
 
         preferred_currency = currency
@@ -402,99 +610,12 @@ def get_mock_response(
     message, conversation_history=None, context_data=None, language="fr"
 ):
     """Generate a mock response for development when AI service is unavailable"""
-    message_lower = message.lower()
-
-    # Extract category if present in the message
-    category_pattern = r"for\s+(\w+)"
-    category_match = re.search(category_pattern, message_lower)
-    category = category_match.group(1) if category_match else None
-
-    # If category is found, translate it
-    if category and language == "fr":
-        translated_category = translate_category(category, language)
-        # Replace the category in the message for processing
-        message_lower = message_lower.replace(
-            f"for {category}", f"for {translated_category}"
-        )
-
-    # Basic responses based on message content, personality, and language
-    if (
-        "hello" in message_lower
-        or "hi" in message_lower
-        or "bonjour" in message_lower
-        or "salut" in message_lower
-    ):
-        if language == "fr":
-            if personality_mode == "nice":
-                return "Bonjour ! Je suis votre conseiller financier amical. Comment puis-je vous aider aujourd'hui ?"
-            elif personality_mode == "funny":
-                return "Salut ! Je suis votre conseiller financier, ici pour rendre les questions d'argent moins ennuyeuses et plus... eh bien, monétaires ! Qu'avez-vous en tête aujourd'hui ?"
-            elif personality_mode == "irony":
-                return "Oh, encore une personne qui veut des conseils financiers. Laissez-moi deviner, vous voulez savoir comment devenir millionnaire du jour au lendemain ? Je suis tout ouïe."
-        else:  # English
-            if personality_mode == "nice":
-                return "Hello! I'm your friendly financial advisor. How can I help you today?"
-            elif personality_mode == "funny":
-                return "Hey there! I'm your financial advisor, here to make money matters less boring and more... well, money-ey! What's on your financial mind today?"
-            elif personality_mode == "irony":
-                return "Oh look, another person wanting financial advice. Let me guess, you want to know how to become a millionaire overnight? I'm all ears."
-
-    if "budget" in message_lower:
-        if language == "fr":
-            if personality_mode == "nice":
-                return "D'après vos habitudes de dépenses actuelles, je vous recommande d'allouer 50% de vos revenus aux nécessités, 30% aux envies et 20% à l'épargne et au remboursement de dettes. Cette approche équilibrée vous aidera à atteindre vos objectifs financiers tout en profitant de la vie !"
-            elif personality_mode == "funny":
-                return "Ah, le budget ! L'art de dire à votre argent où aller au lieu de vous demander où il est passé ! Je suggère la règle 50/30/20 : 50% pour les besoins, 30% pour les envies et 20% pour l'épargne. Ou comme je l'appelle : le 'sandwich adulte' - du pain responsable avec une garniture amusante !"
-            elif personality_mode == "irony":
-                return "Le budget, parce qu'apparemment l'argent ne pousse pas sur les arbres. Concept révolutionnaire, je sais. Essayez l'approche 50/30/20 : 50% sur les nécessités, 30% sur les choses que vous voulez, et 20% sur l'épargne. Ou continuez simplement à dépenser au hasard et faites semblant d'être surpris quand votre compte atteint zéro. C'est votre choix."
-        else:  # English
-            if personality_mode == "nice":
-                return "Based on your current spending patterns, I recommend allocating 50% of your income to necessities, 30% to wants, and 20% to savings and debt repayment. This balanced approach will help you achieve your financial goals while still enjoying life!"
-            elif personality_mode == "funny":
-                return "Ah, budgeting! The art of telling your money where to go instead of wondering where it went! I suggest the 50/30/20 rule: 50% for needs, 30% for wants, and 20% for savings. Or as I call it: the 'adulting sandwich' - responsible bread with a fun filling!"
-            elif personality_mode == "irony":
-                return "Budgeting, because apparently money doesn't grow on trees. Revolutionary concept, I know. Try the 50/30/20 approach: 50% on necessities, 30% on things you want, and 20% on savings. Or just keep spending randomly and act surprised when your account hits zero. Your choice."
-
-    if (
-        "save" in message_lower
-        or "saving" in message_lower
-        or "économiser" in message_lower
-        or "épargne" in message_lower
-    ):
-        if language == "fr":
-            if personality_mode == "nice":
-                return "Économiser de l'argent est crucial pour la sécurité financière. Je vous recommande de mettre en place des virements automatiques vers un compte d'épargne à haut rendement juste après chaque jour de paie. De cette façon, vous constituerez votre épargne de manière constante sans avoir à y penser !"
-            elif personality_mode == "funny":
-                return "Économiser de l'argent, c'est comme essayer de ne pas manger le dernier biscuit du pot - difficile mais gratifiant ! Mettez en place des virements automatiques vers votre compte d'épargne le jour de paie. C'est comme si votre ancien vous rendait service à votre futur vous. Votre ancien vous est un si bon ami !"
-            elif personality_mode == "irony":
-                return "Économiser de l'argent, quel concept novateur. Au lieu d'acheter des choses dont vous n'avez pas besoin avec de l'argent que vous n'avez pas pour impressionner des gens que vous n'aimez pas, vous pourriez essayer des virements automatiques vers un compte d'épargne. Révolutionnaire, je sais."
-        else:  # English
-            if personality_mode == "nice":
-                return "Saving money is crucial for financial security. I recommend setting up automatic transfers to a high-yield savings account right after each payday. This way, you'll build your savings consistently without having to think about it!"
-            elif personality_mode == "funny":
-                return "Saving money is like trying not to eat the last cookie in the jar - difficult but rewarding! Set up automatic transfers to your savings account on payday. It's like your past self doing a favor for your future self. Past you is such a good friend!"
-            elif personality_mode == "irony":
-                return "Saving money, what a novel concept. Instead of buying things you don't need with money you don't have to impress people you don't like, you could try automatic transfers to a savings account. Revolutionary, I know."
-
-    # Default responses based on personality and language
-    if language == "fr":
-        if personality_mode == "nice":
-            return "C'est une question financière intéressante. Pour vous donner les meilleurs conseils, j'aurais besoin de comprendre davantage votre situation et vos objectifs spécifiques. Pourriez-vous fournir plus de détails sur votre situation financière ?"
-        elif personality_mode == "funny":
-            return "Hmm, c'est une énigme financière ! J'aimerais vous aider, mais j'ai besoin d'un peu plus d'informations - ma boule de cristal est en réparation ! Pourriez-vous partager plus de détails sur votre situation financière ? Plus vous me donnez de détails, moins je dois compter sur mes capacités douteuses de lecture de pensée !"
-        elif personality_mode == "irony":
-            return "Eh bien, c'est vague. J'adorerais vous donner des conseils financiers personnalisés basés sur pratiquement aucune information, mais mes pouvoirs psychiques sont un peu rouillés aujourd'hui. Souhaitez-vous partager des détails réels sur votre situation ? Juste une idée."
-    else:  # English
-        if personality_mode == "nice":
-            return "That's an interesting financial question. To give you the best advice, I'd need to understand more about your specific situation and goals. Could you provide more details about your financial circumstances?"
-        elif personality_mode == "funny":
-            return "Hmm, that's a financial head-scratcher! I'd love to help, but I need a bit more info - my crystal ball is in the shop for repairs! Could you share more about your money situation? The more details, the less I have to rely on my questionable mind-reading abilities!"
-        elif personality_mode == "irony":
-            return "Well, that's vague. I'd love to give you personalized financial advice based on practically no information, but my psychic powers are a bit rusty today. Care to share some actual details about your situation? Just a thought."
+    return response_catalog.respond(message, language, personality_mode)
 
 
 @app.route("/api/transactions", methods=["GET", "POST"])
 @jwt_required()
+@rate_limiter.limit("writes", methods=("POST",))
 def transactions():
     """
     Handle transaction operations
@@ -513,6 +634,10 @@ def transactions():
     elif request.method == "POST":
         data = request.json
 
+        currency = get_request_currency(data)
+        if currency is None:
+            return jsonify({"success": False, "error": "Invalid currency"}), 400
+
         # Create new transaction for the current user
         transaction = Transaction(
             user_id=current_user.id,
@@ -520,6 +645,7 @@ def transactions():
             category=data.get("category"),
             description=data.get("description"),
             is_impulse=data.get("is_impulse", False),
+            currency=currency,
         )
 
         if "date" in data:
@@ -533,6 +659,7 @@ def transactions():
 
 @app.route("/api/budget", methods=["GET", "POST"])
 @jwt_required()
+@rate_limiter.limit("writes", methods=("POST",))
 def budget():
     """
     Handle budget operations
@@ -552,36 +679,15 @@ def budget():
                         {"success": False, "error": f"Missing required field: {field}"}
                     ), 400
 
-            # Check if budget already exists for this category/month/year
-            existing_budget = (
-                db_session.query(Budget)
-                .filter_by(
-                    user_id=current_user.id,
-                    category=data["category"],
-                    month=data["month"],
-                    year=data["year"],
-                )
-                .first()
+            budget, _ = upsert_budget(
+                db_session,
+                current_user.id,
+                data["category"],
+                float(data["planned_amount"]),
+                int(data["month"]),
+                int(data["year"]),
             )
-
-            if existing_budget:
-                # Update existing budget
-                existing_budget.planned_amount = data["planned_amount"]
-                db_session.commit()
-                return jsonify({"success": True, "budget": existing_budget.to_dict()})
-            else:
-                # Create new budget
-                new_budget = Budget(
-                    user_id=current_user.id,
-                    category=data["category"],
-                    planned_amount=data["planned_amount"],
-                    actual_amount=0,  # Initialize with zero
-                    month=data["month"],
-                    year=data["year"],
-                )
-                db_session.add(new_budget)
-                db_session.commit()
-                return jsonify({"success": True, "budget": new_budget.to_dict()})
+            return jsonify({"success": True, "budget": budget})
         else:
             # Get current month's budget
             current_month = datetime.now().month
@@ -596,18 +702,33 @@ def budget():
                 .all()
             )
 
+            # Get spending by category for the month, in the preferred currency
+            spent = get_rate_table().convert_totals(
+                db_session.query(
+                    Transaction.category,
+                    Transaction.currency,
+                    func.sum(Transaction.amount),
+                )
+                .filter(
+                    Transaction.user_id == current_user.id,
+                    extract("month", Transaction.date) == current_month,
+                    extract("year", Transaction.date) == current_year,
+                )
+                .group_by(Transaction.category, Transaction.currency),
+                preferred_currency,
+            )
+
             # Calculate total budget and spent
             total_planned = sum(b.planned_amount for b in budgets)
-            total_actual = sum(b.actual_amount for b in budgets)
+            total_actual = sum(spent.get(b.category, 0) for b in budgets)
 
-            # Get spending by category
             categories = []
             for budget in budgets:
                 categories.append(
                     {
                         "name": budget.category,
                         "planned": budget.planned_amount,
-                        "actual": budget.actual_amount,
+                        "actual": spent.get(budget.category, 0),
                     }
                 )
 
@@ -629,6 +750,7 @@ def budget():
 
 @app.route("/api/saved-impulses", methods=["GET", "POST"])
 @jwt_required()
+@rate_limiter.limit("writes", methods=("POST",))
 def saved_impulses():
     """
     Handle saved impulse operations
@@ -662,23 +784,17 @@ def saved_impulses():
                     {"success": False, "error": "Missing required field: category"}
                 ), 400
 
-            # Calculate projected values (simple calculation for demo)
-            projected_1yr = data.get(
-                "projected_value_1yr", data.get("potential_value", amount * 1.07)
-            )  # 7% annual return
-            projected_5yr = data.get(
-                "projected_value_5yr", amount * (1.07**5)
-            )  # Compound over 5 years
+            currency = get_request_currency(data)
+            if currency is None:
+                return jsonify({"success": False, "error": "Invalid currency"}), 400
 
-            # Create new saved impulse
+            # Create new saved impulse, projected values are computed by the model
             new_impulse = SavedImpulse(
                 user_id=current_user.id,
                 description=description,
                 amount=amount,
                 category=category,
-                date=datetime.now(),
-                projected_value_1yr=projected_1yr,
-                projected_value_5yr=projected_5yr,
+                currency=currency,
             )
 
             db_session.add(new_impulse)
@@ -713,376 +829,30 @@ def dashboard():
     Get comprehensive dashboard data for the current user
     Includes budget tracking, spending analysis, investment projections,
     and impulse purchase redirection metrics
+
+    Query parameters:
+        sections: Comma separated sections to build (default all), e.g.
+                  "summary,categories" for the summary cards. The build
+                  time of each section is returned in meta.timings_ms
     """
     current_user = get_current_user()
 
     try:
-        # Get current month and year
-        current_month = datetime.now().month
-        current_year = datetime.now().year
-
-        # Get transactions for current month
-        current_transactions = (
-            db_session.query(Transaction)
-            .filter(
-                Transaction.user_id == current_user.id,
-                extract("month", Transaction.date) == current_month,
-                extract("year", Transaction.date) == current_year,
-            )
-            .all()
-        )
-
-        # Get transactions for previous month for comparison
-        prev_month = current_month - 1 if current_month > 1 else 12
-        prev_year = current_year if current_month > 1 else current_year - 1
-        prev_transactions = (
-            db_session.query(Transaction)
-            .filter(
-                Transaction.user_id == current_user.id,
-                extract("month", Transaction.date) == prev_month,
-                extract("year", Transaction.date) == prev_year,
-            )
-            .all()
-        )
-
-        # Get all transactions for trend analysis (last 6 months)
-        six_months_ago = datetime.now() - timedelta(days=180)
-        all_transactions = (
-            db_session.query(Transaction)
-            .filter(
-                Transaction.user_id == current_user.id,
-                Transaction.date >= six_months_ago,
-            )
-            .order_by(Transaction.date)
-            .all()
-        )
-
-        # Get budget for current month
-        budgets = (
-            db_session.query(Budget)
-            .filter_by(user_id=current_user.id, month=current_month, year=current_year)
-            .all()
-        )
-
-        # Get saved impulses
-        impulses = (
-            db_session.query(SavedImpulse).filter_by(user_id=current_user.id).all()
-        )
-
-        # Calculate total spent this month
-        total_spent = sum(t.amount for t in current_transactions)
-
-        # Calculate total spent last month for comparison
-        prev_total_spent = sum(t.amount for t in prev_transactions)
-
-        # Calculate spending change percentage
-        spending_change_pct = 0
-        if prev_total_spent > 0:
-            spending_change_pct = round(
-                ((total_spent - prev_total_spent) / prev_total_spent) * 100, 1
-            )
-
-        # Calculate total budget
-        total_budget = sum(b.planned_amount for b in budgets)
-
-        # Calculate budget remaining
-        budget_remaining = total_budget - total_spent
-        budget_remaining_pct = 0
-        if total_budget > 0:
-            budget_remaining_pct = round((budget_remaining / total_budget) * 100, 1)
-
-        # Calculate total saved from impulses
-        total_saved = sum(i.amount for i in impulses)
-
-        # Calculate potential growth
-        potential_growth_1yr = sum(i.projected_value_1yr for i in impulses)
-        potential_growth_5yr = sum(i.projected_value_5yr for i in impulses)
-
-        # Calculate investment growth
-        investment_growth_1yr = round(total_saved * 0.08, 2)
-        investment_growth_5yr = round(total_saved * (1.08**5 - 1), 2)
-
-        # Group transactions by category
-        spending_by_category = {}
-        for transaction in current_transactions:
-            category = transaction.category
-            if category not in spending_by_category:
-                spending_by_category[category] = 0
-            spending_by_category[category] += transaction.amount
-
-        # Format for frontend
-        categories = []
-        for category, amount in spending_by_category.items():
-            # Find budget for this category if it exists
-            budget_item = next((b for b in budgets if b.category == category), None)
-            planned = budget_item.planned_amount if budget_item else 0
-
-            # Calculate percentage of budget used
-            budget_used_pct = 0
-            if planned > 0:
-                budget_used_pct = round((amount / planned) * 100, 1)
-
-            categories.append(
-                {
-                    "name": category,
-                    "spent": amount,
-                    "budget": planned,
-                    "remaining": max(0, planned - amount),
-                    "percentage": budget_used_pct,
-                    "status": "over" if amount > planned and planned > 0 else "under",
-                }
-            )
-
-        # Sort categories by spending amount (descending)
-        categories.sort(key=lambda x: x["spent"], reverse=True)
-
-        # Generate monthly spending trend (last 6 months)
-        monthly_trends = {}
-        for transaction in all_transactions:
-            month_key = f"{transaction.date.year}-{transaction.date.month:02d}"
-            if month_key not in monthly_trends:
-                monthly_trends[month_key] = {
-                    "month": transaction.date.strftime("%b %Y"),
-                    "total": 0,
-                    "categories": {},
-                }
-
-            monthly_trends[month_key]["total"] += transaction.amount
-
-            # Track spending by category
-            category = transaction.category
-            if category not in monthly_trends[month_key]["categories"]:
-                monthly_trends[month_key]["categories"][category] = 0
-            monthly_trends[month_key]["categories"][category] += transaction.amount
-
-        # Convert to list and sort by date
-        trend_data = list(monthly_trends.values())
-
-        # Count impulse vs. reasonable transactions
-        impulse_count = len([t for t in current_transactions if t.is_impulse])
-        reasonable_count = len(current_transactions) - impulse_count
-
-        # Calculate impulse spending percentage
-        impulse_spending = sum(t.amount for t in current_transactions if t.is_impulse)
-        impulse_spending_pct = 0
-        if total_spent > 0:
-            impulse_spending_pct = round((impulse_spending / total_spent) * 100, 1)
-
-        # Recent transactions (last 5)
-        recent_transactions = sorted(
-            current_transactions, key=lambda t: t.date, reverse=True
-        )[:5]
-
-        # Recent saved impulses (last 5)
-        recent_impulses = sorted(impulses, key=lambda i: i.date, reverse=True)[:5]
-
-        # Financial health indicators
-        financial_health = {
-            "budget_adherence": "good" if total_spent <= total_budget else "warning",
-            "impulse_control": "good"
-            if impulse_spending_pct < 20
-            else ("warning" if impulse_spending_pct < 40 else "poor"),
-            "savings_rate": "good" if total_saved > 0 else "warning",
-            "budget_coverage": "good"
-            if len(categories) > 0 and all(c["budget"] > 0 for c in categories)
-            else "warning",
-        }
-
-        # Recommendations based on spending patterns
-        recommendations = []
-
-        # Check for over-budget categories
-        over_budget_categories = [c for c in categories if c["status"] == "over"]
-        if over_budget_categories:
-            top_over = over_budget_categories[0]["name"]
-            recommendations.append(
-                f"Your {top_over} spending is over budget. Consider adjusting your budget or reducing spending in this category."
-            )
-
-        # Check for high impulse spending
-        if impulse_spending_pct > 30:
-            recommendations.append(
-                f"Your impulse spending is {impulse_spending_pct}% of your total spending. Try using the 24-hour rule before making non-essential purchases."
-            )
-
-        # Check for missing budget categories
-        missing_budget = [c["name"] for c in categories if c["budget"] == 0]
-        if missing_budget:
-            recommendations.append(
-                f"Consider setting a budget for these categories: {', '.join(missing_budget[:3])}."
-            )
-
-        # Check for potential savings
-        if total_saved < 100:
-            recommendations.append(
-                "Try redirecting more impulse purchases to savings to build your investment portfolio."
-            )
-
-        # Generate portfolio data
-        # In a real app, this would come from actual investment accounts
-        # For demo purposes, we'll create mock data based on total_saved amount
-        total_balance = (
-            24563.00  # This would be fetched from actual accounts in production
-        )
-        portfolio = {
-            "total": total_balance,
-            "allocation": {"stocks": 45, "bonds": 30, "cash": 25},
-        }
-
-        # Generate financial goals
-        # In production, these would be fetched from a goals table
-        goals = [
-            {
-                "name": "Emergency Fund",
-                "current": min(7500, total_saved),
-                "target": 10000,
-                "progress": min(75, round((total_saved / 10000) * 100)),
-            },
-            {
-                "name": "Vacation Savings",
-                "current": max(0, min(1350, total_saved - 5000)),
-                "target": 3000,
-                "progress": max(0, min(45, round(((total_saved - 5000) / 3000) * 100))),
-            },
-            {
-                "name": "Home Down Payment",
-                "current": max(0, min(15000, (total_saved - 8000) * 2)),
-                "target": 50000,
-                "progress": max(
-                    0, min(30, round(((total_saved - 8000) * 2 / 50000) * 100))
-                ),
-            },
-        ]
-
-        # Generate financial insights based on spending and saving patterns
-        insights = []
-
-        # Savings rate insight
-        monthly_income = 8350.00  # This would be calculated from income transactions
-        monthly_expenses = total_spent
-
-        # Calculate savings rate
-        savings_rate = 0
-        if monthly_income > 0:
-            savings_rate = round(
-                ((monthly_income - monthly_expenses) / monthly_income) * 100, 1
-            )
-
-        # Determine if savings rate is improving
-        savings_rate_change = (
-            3.1  # In production, this would be calculated from historical data
-        )
-
-        if savings_rate_change > 0:
-            insights.append(
-                {
-                    "type": "positive",
-                    "title": "Positive Trend",
-                    "description": f"Your savings rate has increased by {savings_rate_change}% compared to last month. Keep up the good work!",
-                }
-            )
-
-        # Budget optimization insight
-        if over_budget_categories:
-            insights.append(
-                {
-                    "type": "suggestion",
-                    "title": "Budget Optimization",
-                    "description": f"Consider reallocating your {over_budget_categories[0]['name']} budget or finding ways to reduce spending in this category.",
-                }
-            )
-
-        # Subscription optimization
-        if any(
-            c["name"].lower() in ["subscriptions", "entertainment"] for c in categories
-        ):
-            insights.append(
-                {
-                    "type": "opportunity",
-                    "title": "Subscription Audit",
-                    "description": "Based on your spending patterns, you could save by reviewing your subscriptions and canceling unused services.",
-                }
-            )
-
-        # Investment insight
-        if total_saved > 0:
-            insights.append(
-                {
-                    "type": "suggestion",
-                    "title": "Investment Opportunity",
-                    "description": f"If you redirected just 10% more of your discretionary spending to investments, you could grow your portfolio by an additional €{round(monthly_expenses * 0.1 * 12 * 1.08, 2)} in one year.",
-                }
-            )
+        sections = request.args.get("sections")
+        if sections is not None:
+            sections = [name.strip() for name in sections.split(",") if name.strip()]
 
-        # Generate activity feed from transactions and saved impulses
-        activity = []
-
-        # Add transactions to activity
-        for t in recent_transactions:
-            activity.append(
-                {
-                    "id": t.id,
-                    "title": t.description or f"{t.category.capitalize()} purchase",
-                    "time": t.date.strftime("%b %d, %I:%M %p"),
-                    "amount": t.amount,
-                    "type": "withdrawal",
-                }
-            )
-
-        # Add saved impulses to activity
-        for i in recent_impulses:
-            activity.append(
-                {
-                    "id": f"impulse_{i.id}",
-                    "title": f"Saved {i.description}",
-                    "time": i.date.strftime("%b %d, %I:%M %p"),
-                    "amount": i.amount,
-                    "type": "savings",
-                }
+        # Identical requests arriving together share one build
+        context = DashboardContext(db_session, current_user.id, preferred_currency)
+        try:
+            dashboard_data = single_flight.do(
+                "dashboard",
+                flight_key(current_user.id, preferred_currency, sections),
+                lambda: build_dashboard(context, sections),
             )
-
-        # Sort by date (newest first)
-        activity.sort(
-            key=lambda x: datetime.strptime(x["time"], "%b %d, %I:%M %p"), reverse=True
-        )
-
-        return jsonify(
-            {
-                "summary": {
-                    "total_spent": total_spent,
-                    "total_budget": total_budget,
-                    "budget_remaining": budget_remaining,
-                    "budget_remaining_pct": budget_remaining_pct,
-                    "spending_change_pct": spending_change_pct,
-                    "total_saved": total_saved,
-                    "total_balance": total_balance,
-                    "monthly_income": monthly_income,
-                    "monthly_expenses": monthly_expenses,
-                    "savingsRate": savings_rate,
-                    "savingsRate_change_pct": savings_rate_change,
-                    "potential_growth_1yr": potential_growth_1yr,
-                    "potential_growth_5yr": potential_growth_5yr,
-                    "investment_growth_1yr": investment_growth_1yr,
-                    "investment_growth_5yr": investment_growth_5yr,
-                    "impulse_spending_pct": impulse_spending_pct,
-                },
-                "categories": categories,
-                "trends": trend_data,
-                "transaction_counts": {
-                    "impulse": impulse_count,
-                    "reasonable": reasonable_count,
-                    "total": len(current_transactions),
-                },
-                "portfolio": portfolio,
-                "activity": activity,
-                "goals": goals,
-                "insights": insights,
-                "financial_health": financial_health,
-                "recommendations": recommendations,
-                "recent_transactions": [t.to_dict() for t in recent_transactions],
-                "recent_impulses": [i.to_dict() for i in recent_impulses],
-            }
-        )
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        return jsonify(dashboard_data)
 
     except Exception as e:
         logger.error(f"Error generating dashboard data: {str(e)}", exc_info=True)
@@ -1094,6 +864,7 @@ def dashboard():
 
 @app.route("/api/impulses", methods=["POST"])
 @jwt_required()
+@rate_limiter.limit("writes")
 def save_impulse():
     """
     Save an impulse purchase that has been redirected to investment
@@ -1110,6 +881,10 @@ def save_impulse():
                     {"success": False, "error": f"Missing required field: {field}"}
                 ), 400
 
+        currency = get_request_currency(data)
+        if currency is None:
+            return jsonify({"success": False, "error": "Invalid currency"}), 400
+
         # Create new saved impulse
         impulse = SavedImpulse(
             user_id=current_user.id,
@@ -1117,6 +892,7 @@ def save_impulse():
             category=data["category"],
             amount=float(data["amount"]),
             notes=data.get("notes"),
+            currency=currency,
         )
 
         db_session.add(impulse)
@@ -1155,10 +931,11 @@ def get_impulses():
             .all()
         )
 
-        # Calculate totals
-        total_saved = sum(i.amount for i in impulses)
-        total_growth_1yr = sum(i.projected_value_1yr for i in impulses) - total_saved
-        total_growth_5yr = sum(i.projected_value_5yr for i in impulses) - total_saved
+        # Calculate totals in the preferred currency
+        context = DashboardContext(db_session, current_user.id, preferred_currency)
+        total_saved = context.total_saved
+        total_growth_1yr = context.projected_values[1] - total_saved
+        total_growth_5yr = context.projected_values[5] - total_saved
 
         return jsonify(
             {
@@ -1183,6 +960,7 @@ def get_impulses():
 
 @app.route("/api/impulses/<int:impulse_id>", methods=["DELETE"])
 @jwt_required()
+@rate_limiter.limit("writes")
 def delete_impulse(impulse_id):
     """
     Delete a saved impulse purchase
@@ -1203,6 +981,7 @@ def delete_impulse(impulse_id):
 
         db_session.delete(impulse)
         db_session.commit()
+        simulation_cache.invalidate_user(current_user.id)
 
         return jsonify(
             {"success": True, "message": "Impulse purchase deleted successfully"}
@@ -1217,8 +996,115 @@ def delete_impulse(impulse_id):
         db_session.close()
 
 
+@app.route("/api/projections", methods=["GET"])
+@jwt_required()
+def get_projections():
+    """
+    Get investment growth curves for the current user's saved impulses
+
+    Query parameters:
+        years: Projection horizon in years (default 10)
+        rate: Expected annual return (default 0.08)
+        monthly_contribution: Amount added to the portfolio every month
+        inflation: Expected annual inflation, values are in today's money if set
+        step: Months between curve points (default 12)
+    """
+    current_user = get_current_user()
+
+    try:
+        try:
+            years = int(request.args.get("years", 10))
+            rate = float(request.args.get("rate", DEFAULT_ANNUAL_RETURN))
+            monthly_contribution = float(request.args.get("monthly_contribution", 0))
+            inflation = float(request.args.get("inflation", 0))
+            step = int(request.args.get("step", 12))
+        except ValueError:
+            return jsonify({"success": False, "error": "Invalid parameter"}), 400
+
+        if not 1 <= years <= 50 or not 1 <= step <= 12:
+            return jsonify(
+                {"success": False, "error": "years must be 1-50 and step 1-12"}
+            ), 400
+        if not -0.5 < rate < 1 or not -0.5 < inflation < 1:
+            return jsonify({"success": False, "error": "Invalid rate"}), 400
+
+        impulses = (
+            db_session.query(
+                SavedImpulse.id,
+                SavedImpulse.description,
+                SavedImpulse.amount,
+                SavedImpulse.date,
+            )
+            .filter(SavedImpulse.user_id == current_user.id)
+            .order_by(SavedImpulse.date)
+            .all()
+        )
+
+        # Each impulse has been growing since the day it was saved
+        now = datetime.now()
+        elapsed = [
+            max(0.0, (now - i.date).days / 30.4375) if i.date else 0.0
+            for i in impulses
+        ]
+
+        months, curves = project_curves(
+            [i.amount for i in impulses] or [0.0],
+            annual_rates=rate,
+            horizon_months=years * 12,
+            inflation=inflation,
+            step_months=step,
+            elapsed_months=elapsed or 0.0,
+        )
+        _, contributions = project_curves(
+            [0.0],
+            annual_rates=rate,
+            horizon_months=years * 12,
+            monthly_contributions=monthly_contribution,
+            inflation=inflation,
+            step_months=step,
+        )
+
+        total = contributions[0]
+        if impulses:
+            total = total + curves.sum(axis=0)
+
+        return jsonify(
+            {
+                "success": True,
+                "parameters": {
+                    "years": years,
+                    "rate": rate,
+                    "monthly_contribution": monthly_contribution,
+                    "inflation": inflation,
+                    "step": step,
+                },
+                "months": months.tolist(),
+                "total": total.round(2).tolist(),
+                "contributions": contributions[0].round(2).tolist(),
+                "impulses": [
+                    {
+                        "id": impulse.id,
+                        "description": impulse.description,
+                        "amount": impulse.amount,
+                        "date": impulse.date.isoformat() if impulse.date else None,
+                        "values": curve.round(2).tolist(),
+                    }
+                    for impulse, curve in zip(impulses, curves)
+                ],
+            }
+        )
+
+    except Exception as e:
+        logger.error(f"Error computing projections: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    finally:
+        db_session.close()
+
+
 @app.route("/api/transactions", methods=["POST"])
 @jwt_required()
+@rate_limiter.limit("writes")
 def add_transaction():
     """
     Add a new transaction for the current user
@@ -1243,6 +1129,10 @@ def add_transaction():
         except ValueError:
             return jsonify({"success": False, "error": "Invalid date format"}), 400
 
+        currency = get_request_currency(data)
+        if currency is None:
+            return jsonify({"success": False, "error": "Invalid currency"}), 400
+
         # Create new transaction
         transaction = Transaction(
             user_id=current_user.id,
@@ -1251,6 +1141,7 @@ def add_transaction():
             date=transaction_date,
             description=data.get("description", ""),
             is_impulse=data.get("is_impulse", False),
+            currency=currency,
         )
 
         db_session.add(transaction)
@@ -1273,37 +1164,109 @@ def add_transaction():
         db_session.close()
 
 
-@app.route("/api/transactions/<int:transaction_id>", methods=["PUT"])
+@app.route("/api/transactions/categorize", methods=["POST"])
 @jwt_required()
-def update_transaction(transaction_id):
+@rate_limiter.limit("writes")
+def categorize_transactions():
     """
-    Update an existing transaction
+    Suggest categories from transaction descriptions
+
+    Send {"description": "..."} for ranked suggestions for one transaction,
+    or {"descriptions": [...]} to label a batch (e.g. a statement import).
     """
     current_user = get_current_user()
-    data = request.get_json()
+    data = request.get_json() or {}
 
     try:
-        transaction = (
-            db_session.query(Transaction)
-            .filter_by(id=transaction_id, user_id=current_user.id)
-            .first()
-        )
+        model = get_categorizer(db_session)
 
-        if not transaction:
-            return jsonify({"success": False, "error": "Transaction not found"}), 404
+        if "descriptions" in data:
+            descriptions = data["descriptions"]
+            if not isinstance(descriptions, list) or not all(
+                isinstance(d, str) for d in descriptions
+            ):
+                return jsonify(
+                    {"success": False, "error": "descriptions must be a list of strings"}
+                ), 400
+            if len(descriptions) > MAX_CATEGORIZE_BATCH:
+                return jsonify(
+                    {
+                        "success": False,
+                        "error": f"At most {MAX_CATEGORIZE_BATCH} descriptions per request",
+                    }
+                ), 400
 
-        # Update fields if provided
-        if "amount" in data:
-            transaction.amount = float(data["amount"])
+            labels = model.predict_many(current_user.id, descriptions)
+            return jsonify(
+                {
+                    "success": True,
+                    "categories": [
+                        {
+                            "description": description,
+                            "category": category,
+                            "confidence": confidence,
+                        }
+                        for description, (category, confidence) in zip(
+                            descriptions, labels
+                        )
+                    ],
+                }
+            )
 
-        if "category" in data:
-            transaction.category = data["category"]
+        description = data.get("description")
+        if not isinstance(description, str) or not description.strip():
+            return jsonify(
+                {"success": False, "error": "Missing required field: description"}
+            ), 400
 
-        if "date" in data:
-            try:
-                transaction.date = datetime.fromisoformat(
-                    data["date"].replace("Z", "+00:00")
-                )
+        limit = max(1, min(int(data.get("limit", 3)), 10))
+        return jsonify(
+            {
+                "success": True,
+                "suggestions": model.suggest(current_user.id, description, limit),
+            }
+        )
+
+    except Exception as e:
+        logger.error(f"Error categorizing transactions: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    finally:
+        db_session.close()
+
+
+@app.route("/api/transactions/<int:transaction_id>", methods=["PUT"])
+@jwt_required()
+@rate_limiter.limit("writes")
+def update_transaction(transaction_id):
+    """
+    Update an existing transaction
+    """
+    current_user = get_current_user()
+    data = request.get_json()
+
+    try:
+        transaction = (
+            db_session.query(Transaction)
+            .filter_by(id=transaction_id, user_id=current_user.id)
+            .first()
+        )
+
+        if not transaction:
+            return jsonify({"success": False, "error": "Transaction not found"}), 404
+
+        # Update fields if provided
+        if "amount" in data:
+            transaction.amount = float(data["amount"])
+
+        if "category" in data:
+            transaction.category = data["category"]
+
+        if "date" in data:
+            try:
+                transaction.date = datetime.fromisoformat(
+                    data["date"].replace("Z", "+00:00")
+                )
             except ValueError:
                 return jsonify({"success": False, "error": "Invalid date format"}), 400
 
@@ -1313,6 +1276,12 @@ def update_transaction(transaction_id):
         if "is_impulse" in data:
             transaction.is_impulse = bool(data["is_impulse"])
 
+        if "currency" in data:
+            currency = get_request_currency(data)
+            if currency is None:
+                return jsonify({"success": False, "error": "Invalid currency"}), 400
+            transaction.currency = currency
+
         db_session.commit()
 
         return jsonify(
@@ -1334,6 +1303,7 @@ def update_transaction(transaction_id):
 
 @app.route("/api/transactions/convert/<int:transaction_id>", methods=["POST"])
 @jwt_required()
+@rate_limiter.limit("writes")
 def convert_to_saved_impulse(transaction_id):
     """
     Convert a transaction to a saved impulse (redirected to investment)
@@ -1358,6 +1328,7 @@ def convert_to_saved_impulse(transaction_id):
             category=transaction.category,
             amount=transaction.amount,
             notes=f"Converted from transaction on {transaction.date.strftime('%Y-%m-%d')}",
+            currency=transaction.currency,
         )
 
         # Delete the original transaction
@@ -1386,6 +1357,142 @@ def convert_to_saved_impulse(transaction_id):
         db_session.close()
 
 
+@app.route("/api/income", methods=["GET"])
+@jwt_required()
+def get_income():
+    """
+    Get the current user's income records and monthly savings rate
+
+    Query parameters:
+        limit: Maximum number of records to return (default 50)
+    """
+    current_user = get_current_user()
+
+    try:
+        limit = min(request.args.get("limit", 50, type=int), 500)
+        incomes = (
+            db_session.query(Income)
+            .filter(Income.user_id == current_user.id)
+            .order_by(Income.date.desc())
+            .limit(limit)
+            .all()
+        )
+
+        return jsonify(
+            {
+                "success": True,
+                "income": [i.to_dict() for i in incomes],
+                "summary": get_savings_overview(
+                    db_session, current_user.id, currency=preferred_currency
+                ),
+            }
+        )
+
+    except Exception as e:
+        logger.error(f"Error retrieving income: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    finally:
+        db_session.close()
+
+
+@app.route("/api/income", methods=["POST"])
+@jwt_required()
+@rate_limiter.limit("writes")
+def add_income():
+    """
+    Record income for the current user
+    """
+    current_user = get_current_user()
+    data = request.get_json() or {}
+
+    try:
+        # Validate required fields
+        for field in ["amount", "source"]:
+            if field not in data:
+                return jsonify(
+                    {"success": False, "error": f"Missing required field: {field}"}
+                ), 400
+
+        try:
+            amount = float(data["amount"])
+            income_date = None
+            if data.get("date"):
+                income_date = datetime.fromisoformat(data["date"].replace("Z", ""))
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "error": "Invalid amount or date"}), 400
+
+        if amount <= 0:
+            return jsonify(
+                {"success": False, "error": "Amount must be greater than zero"}
+            ), 400
+
+        currency = get_request_currency(data)
+        if currency is None:
+            return jsonify({"success": False, "error": "Invalid currency"}), 400
+
+        income = Income(
+            user_id=current_user.id,
+            amount=amount,
+            source=data["source"],
+            date=income_date,
+            description=data.get("description", ""),
+            currency=currency,
+        )
+
+        db_session.add(income)
+        db_session.commit()
+
+        return jsonify(
+            {
+                "success": True,
+                "message": "Income added successfully",
+                "income": income.to_dict(),
+            }
+        )
+
+    except Exception as e:
+        db_session.rollback()
+        logger.error(f"Error adding income: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    finally:
+        db_session.close()
+
+
+@app.route("/api/income/<int:income_id>", methods=["DELETE"])
+@jwt_required()
+@rate_limiter.limit("writes")
+def delete_income(income_id):
+    """
+    Delete an income record
+    """
+    current_user = get_current_user()
+
+    try:
+        income = (
+            db_session.query(Income)
+            .filter_by(id=income_id, user_id=current_user.id)
+            .first()
+        )
+
+        if not income:
+            return jsonify({"success": False, "error": "Income not found"}), 404
+
+        db_session.delete(income)
+        db_session.commit()
+
+        return jsonify({"success": True, "message": "Income deleted successfully"})
+
+    except Exception as e:
+        db_session.rollback()
+        logger.error(f"Error deleting income: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    finally:
+        db_session.close()
+
+
 @app.route("/api/budgets", methods=["GET"])
 @jwt_required()
 def get_budgets():
@@ -1413,25 +1520,22 @@ def get_budgets():
             .all()
         )
 
-        # Get transactions for current month
-        transactions = (
-            db_session.query(Transaction)
+        # Get spending by category for the month, in the preferred currency
+        spending_by_category = get_rate_table().convert_totals(
+            db_session.query(
+                Transaction.category,
+                Transaction.currency,
+                func.sum(Transaction.amount),
+            )
             .filter(
                 Transaction.user_id == current_user.id,
                 extract("month", Transaction.date) == current_month,
                 extract("year", Transaction.date) == current_year,
             )
-            .all()
+            .group_by(Transaction.category, Transaction.currency),
+            preferred_currency,
         )
 
-        # Calculate spending by category
-        spending_by_category = {}
-        for transaction in transactions:
-            category = transaction.category
-            if category not in spending_by_category:
-                spending_by_category[category] = 0
-            spending_by_category[category] += transaction.amount
-
         # Format response
         budget_data = []
         for budget in budgets:
@@ -1490,6 +1594,7 @@ def get_budgets():
 
 @app.route("/api/budgets", methods=["POST"])
 @jwt_required()
+@rate_limiter.limit("writes")
 def create_budget():
     """
     Create or update a budget for a category
@@ -1511,42 +1616,82 @@ def create_budget():
         planned_amount = float(data["planned_amount"])
         month = int(data["month"])
         year = int(data["year"])
+        if not 1 <= month <= 12:
+            return jsonify({"success": False, "error": "Month must be between 1 and 12"}), 400
 
-        # Check if budget already exists
-        existing_budget = (
-            db_session.query(Budget)
-            .filter_by(
-                user_id=current_user.id, category=category, month=month, year=year
-            )
-            .first()
+        budget, created = upsert_budget(
+            db_session, current_user.id, category, planned_amount, month, year
         )
+        message = "Budget created successfully" if created else "Budget updated successfully"
 
-        if existing_budget:
-            # Update existing budget
-            existing_budget.planned_amount = planned_amount
-            message = "Budget updated successfully"
-            budget = existing_budget
-        else:
-            # Create new budget
-            budget = Budget(
-                user_id=current_user.id,
-                category=category,
-                planned_amount=planned_amount,
-                month=month,
-                year=year,
-            )
-            db_session.add(budget)
-            message = "Budget created successfully"
+        return jsonify({"success": True, "message": message, "budget": budget})
 
-        db_session.commit()
+    except Exception as e:
+        db_session.rollback()
+        logger.error(f"Error creating/updating budget: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    finally:
+        db_session.close()
+
+
+@app.route("/api/budgets/roll-forward", methods=["POST"])
+@jwt_required()
+@rate_limiter.limit("writes")
+def roll_forward():
+    """
+    Copy a month's budgets into the next month
+
+    Body: month and year copied from, optional to_month and to_year
+    (default the following month), scale applied to the planned amounts
+    (default 1) and overwrite to replace budgets the target month already
+    has (default false, they are kept).
+    """
+    current_user = get_current_user()
+    data = request.get_json() or {}
+
+    try:
+        for field in ["month", "year"]:
+            if field not in data:
+                return jsonify(
+                    {"success": False, "error": f"Missing required field: {field}"}
+                ), 400
+
+        month, year = int(data["month"]), int(data["year"])
+        default_month, default_year = next_month(month, year)
+        to_month = int(data.get("to_month", default_month))
+        to_year = int(data.get("to_year", default_year))
+        scale = float(data.get("scale", 1.0))
+        if not (1 <= month <= 12 and 1 <= to_month <= 12):
+            return jsonify({"success": False, "error": "Month must be between 1 and 12"}), 400
+        if scale < 0:
+            return jsonify({"success": False, "error": "Scale cannot be negative"}), 400
+        if (to_month, to_year) == (month, year):
+            return jsonify({"success": False, "error": "Target month must differ from the source month"}), 400
+
+        budgets = roll_forward_budgets(
+            db_session,
+            current_user.id,
+            month,
+            year,
+            to_month,
+            to_year,
+            scale=scale,
+            overwrite=bool(data.get("overwrite", False)),
+        )
 
         return jsonify(
-            {"success": True, "message": message, "budget": budget.to_dict()}
+            {
+                "success": True,
+                "budgets": budgets,
+                "month": to_month,
+                "year": to_year,
+            }
         )
 
     except Exception as e:
         db_session.rollback()
-        logger.error(f"Error creating/updating budget: {str(e)}", exc_info=True)
+        logger.error(f"Error rolling budgets forward: {str(e)}", exc_info=True)
         return jsonify({"success": False, "error": str(e)}), 500
 
     finally:
@@ -1555,6 +1700,7 @@ def create_budget():
 
 @app.route("/api/budgets/<int:budget_id>", methods=["DELETE"])
 @jwt_required()
+@rate_limiter.limit("writes")
 def delete_budget(budget_id):
     """
     Delete a budget
@@ -1594,58 +1740,126 @@ def get_categories():
     current_user = get_current_user()
 
     try:
-        # Get all transactions for the user
-        transactions = (
-            db_session.query(Transaction.category)
-            .filter_by(user_id=current_user.id)
-            .distinct()
-            .all()
+        # Served from the per-user category index, defaults included
+        sorted_categories = category_index.names(db_session, current_user.id)
+
+        return jsonify({"success": True, "categories": sorted_categories})
+
+    except Exception as e:
+        logger.error(f"Error retrieving categories: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    finally:
+        db_session.close()
+
+
+@app.route("/api/categories/autocomplete", methods=["GET"])
+@jwt_required()
+def autocomplete_categories():
+    """
+    Suggest categories matching what the user has typed, most used first
+
+    Query parameters:
+        q: Prefix of the category name or of any of its words
+        limit: Maximum number of suggestions (default 10, max 50)
+    """
+    current_user = get_current_user()
+
+    try:
+        limit = max(1, min(request.args.get("limit", 10, type=int), 50))
+        suggestions = category_index.complete(
+            db_session, current_user.id, request.args.get("q", ""), limit
         )
 
-        # Get all budgets for the user
-        budgets = (
-            db_session.query(Budget.category)
-            .filter_by(user_id=current_user.id)
-            .distinct()
-            .all()
+        return jsonify({"success": True, "suggestions": suggestions})
+
+    except Exception as e:
+        logger.error(f"Error autocompleting categories: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    finally:
+        db_session.close()
+
+
+@app.route("/api/subscriptions", methods=["GET"])
+@jwt_required()
+def get_subscriptions():
+    """
+    Get the current user's detected recurring payments
+
+    Query parameters:
+        include_inactive: Also return payments that stopped (default false)
+    """
+    current_user = get_current_user()
+
+    try:
+        include_inactive = request.args.get("include_inactive", "false").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+        payments = get_recurring_payments(
+            db_session, current_user.id, include_inactive=include_inactive
         )
 
-        # Combine and deduplicate categories
-        categories = set(
-            [t.category for t in transactions] + [b.category for b in budgets]
+        return jsonify(payments)
+
+    except Exception as e:
+        logger.error(f"Error retrieving subscriptions: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    finally:
+        db_session.close()
+
+
+@app.route("/api/alerts", methods=["GET"])
+@jwt_required()
+def get_spending_alerts():
+    """
+    Get the current user's unusual spending alerts, newest first
+
+    Query parameters:
+        limit: Maximum number of alerts (default 20, max 100)
+        include_dismissed: Also return dismissed alerts (default false)
+    """
+    current_user = get_current_user()
+
+    try:
+        limit = max(1, min(request.args.get("limit", 20, type=int), 100))
+        include_dismissed = request.args.get(
+            "include_dismissed", "false"
+        ).lower() in ("1", "true", "yes")
+
+        return jsonify(
+            get_alerts(db_session, current_user.id, limit, include_dismissed)
         )
 
-        # Add default categories if not present
-        default_categories = [
-            "groceries",
-            "dining",
-            "entertainment",
-            "shopping",
-            "travel",
-            "utilities",
-            "housing",
-            "transportation",
-            "healthcare",
-            "education",
-            "investments",
-            "clothing",
-            "electronics",
-            "subscriptions",
-            "gifts",
-            "personal care",
-            "savings",
-        ]
+    except Exception as e:
+        logger.error(f"Error retrieving alerts: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    finally:
+        db_session.close()
 
-        for category in default_categories:
-            categories.add(category)
 
-        # Sort alphabetically
-        sorted_categories = sorted(list(categories))
+@app.route("/api/alerts/<int:alert_id>/dismiss", methods=["POST"])
+@jwt_required()
+@rate_limiter.limit("writes")
+def dismiss_spending_alert(alert_id):
+    """
+    Dismiss one of the current user's spending alerts
+    """
+    current_user = get_current_user()
 
-        return jsonify({"success": True, "categories": sorted_categories})
+    try:
+        if not dismiss_alert(db_session, current_user.id, alert_id):
+            return jsonify({"success": False, "error": "Alert not found"}), 404
+
+        return jsonify({"success": True, "message": "Alert dismissed"})
 
     except Exception as e:
-        logger.error(f"Error retrieving categories: {str(e)}", exc_info=True)
+        db_session.rollback()
+        logger.error(f"Error dismissing alert: {str(e)}", exc_info=True)
         return jsonify({"success": False, "error": str(e)}), 500
 
     finally:
@@ -1661,143 +1875,300 @@ def get_financial_goals():
     current_user = get_current_user()
 
     try:
-        # Get the total saved amount from impulses
-        impulses = (
-            db_session.query(SavedImpulse).filter_by(user_id=current_user.id).all()
+        context = DashboardContext(db_session, current_user.id, preferred_currency)
+        return jsonify(build_goals(context))
+
+    except Exception as e:
+        logger.error(f"Error retrieving financial goals: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    finally:
+        db_session.close()
+
+
+@app.route("/api/goals", methods=["POST"])
+@jwt_required()
+@rate_limiter.limit("writes")
+def create_financial_goal():
+    """
+    Create a financial goal for the current user
+
+    Request body:
+        name: Goal name (required)
+        target: Goal amount (required)
+        deadline: Goal date as ISO string
+        categories: Linked categories; saved impulses in these categories and
+            transactions such as transfers to savings count towards the goal.
+            Without categories every saved impulse counts.
+    """
+    current_user = get_current_user()
+    data = request.get_json() or {}
+
+    try:
+        # Validate required fields
+        for field in ["name", "target"]:
+            if field not in data:
+                return jsonify(
+                    {"success": False, "error": f"Missing required field: {field}"}
+                ), 400
+
+        try:
+            target = float(data["target"])
+            deadline = None
+            if data.get("deadline"):
+                deadline = datetime.fromisoformat(data["deadline"].replace("Z", ""))
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "error": "Invalid parameter"}), 400
+
+        if target <= 0:
+            return jsonify(
+                {"success": False, "error": "Target must be greater than zero"}
+            ), 400
+
+        categories = data.get("categories") or []
+        if isinstance(categories, str):
+            categories = categories.split(",")
+
+        goal = Goal(
+            user_id=current_user.id,
+            name=data["name"],
+            target_amount=target,
+            deadline=deadline,
+            categories=categories,
+        )
+        # Backfill once from history, later writes update progress incrementally
+        goal.current_amount = compute_goal_progress(
+            db_session, current_user.id, goal.category_list
         )
-        total_saved = sum(i.amount for i in impulses)
 
-        # In a production app, these would be fetched from a goals table
-        # For demo purposes, we'll generate mock goals based on total_saved
-        goals = [
-            {
-                "name": "Emergency Fund",
-                "current": min(7500, total_saved),
-                "target": 10000,
-                "progress": min(75, round((total_saved / 10000) * 100)),
-            },
-            {
-                "name": "Vacation Savings",
-                "current": max(0, min(1350, total_saved - 5000)),
-                "target": 3000,
-                "progress": max(0, min(45, round(((total_saved - 5000) / 3000) * 100))),
-            },
-            {
-                "name": "Home Down Payment",
-                "current": max(0, min(15000, (total_saved - 8000) * 2)),
-                "target": 50000,
-                "progress": max(
-                    0, min(30, round(((total_saved - 8000) * 2 / 50000) * 100))
-                ),
-            },
-        ]
+        db_session.add(goal)
+        db_session.commit()
 
-        return jsonify(goals)
+        return jsonify(
+            {
+                "success": True,
+                "message": "Goal created successfully",
+                "goal": goal.to_dict(),
+            }
+        ), 201
 
     except Exception as e:
-        logger.error(f"Error retrieving financial goals: {str(e)}", exc_info=True)
+        db_session.rollback()
+        logger.error(f"Error creating financial goal: {str(e)}", exc_info=True)
         return jsonify({"success": False, "error": str(e)}), 500
 
     finally:
         db_session.close()
 
 
-@app.route("/api/portfolio", methods=["GET"])
+@app.route("/api/goals/<int:goal_id>", methods=["DELETE"])
 @jwt_required()
-def get_portfolio_overview():
+@rate_limiter.limit("writes")
+def delete_financial_goal(goal_id):
     """
-    Get portfolio overview for the current user
+    Delete a financial goal
     """
     current_user = get_current_user()
 
     try:
-        # Get the total saved amount from impulses
-        impulses = (
-            db_session.query(SavedImpulse).filter_by(user_id=current_user.id).all()
+        goal = (
+            db_session.query(Goal).filter_by(id=goal_id, user_id=current_user.id).first()
         )
-        total_saved = sum(i.amount for i in impulses)
 
-        # In a production app, this would come from actual investment accounts
-        # For demo purposes, we'll create mock data based on total_saved
-        total_balance = max(24563.00, total_saved * 1.5)  # Base value plus savings
+        if not goal:
+            return jsonify({"success": False, "error": "Goal not found"}), 404
 
-        portfolio = {
-            "total": total_balance,
-            "allocation": {"stocks": 45, "bonds": 30, "cash": 25},
-            "performance": {"ytd": 5.2, "oneYear": 8.7, "threeYears": 24.3},
-        }
+        db_session.delete(goal)
+        db_session.commit()
 
-        return jsonify(portfolio)
+        return jsonify({"success": True, "message": "Goal deleted successfully"})
 
     except Exception as e:
-        logger.error(f"Error retrieving portfolio overview: {str(e)}", exc_info=True)
+        db_session.rollback()
+        logger.error(f"Error deleting financial goal: {str(e)}", exc_info=True)
         return jsonify({"success": False, "error": str(e)}), 500
 
     finally:
         db_session.close()
 
 
-@app.route("/api/activity", methods=["GET"])
+@app.route("/api/goals/simulate", methods=["POST"])
 @jwt_required()
-def get_recent_activity():
+def simulate_financial_goal():
     """
-    Get recent activity for the current user
+    Estimate the probability of reaching a savings target with Monte Carlo paths
+
+    Request body:
+        target: Goal amount (required)
+        deadline: Goal date as ISO string, or years: horizon in years
+        mean: Expected annual return (default 0.08)
+        volatility: Annual volatility of returns (default 0.15)
+        monthly_contribution: Amount saved every month, defaults to the
+            user's average monthly saved impulses
+        paths: Number of simulated paths (default 50000)
     """
     current_user = get_current_user()
+    data = request.get_json() or {}
 
     try:
-        # Get recent transactions
-        recent_transactions = (
-            db_session.query(Transaction)
-            .filter_by(user_id=current_user.id)
-            .order_by(Transaction.date.desc())
-            .limit(10)
-            .all()
-        )
+        if "target" not in data:
+            return jsonify(
+                {"success": False, "error": "Missing required field: target"}
+            ), 400
 
-        # Get recent saved impulses
-        recent_impulses = (
-            db_session.query(SavedImpulse)
-            .filter_by(user_id=current_user.id)
-            .order_by(SavedImpulse.date.desc())
-            .limit(10)
+        try:
+            target = float(data["target"])
+            mean = float(data.get("mean", DEFAULT_ANNUAL_RETURN))
+            volatility = float(data.get("volatility", DEFAULT_VOLATILITY))
+            paths = int(data.get("paths", 50000))
+            step = int(data.get("step", 12))
+
+            now = datetime.now()
+            if "deadline" in data:
+                deadline = datetime.fromisoformat(data["deadline"].replace("Z", ""))
+                months = (deadline.year - now.year) * 12 + deadline.month - now.month
+            else:
+                months = int(round(float(data.get("years", 5)) * 12))
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "error": "Invalid parameter"}), 400
+
+        if not 1 <= months <= 600:
+            return jsonify(
+                {"success": False, "error": "Deadline must be 1 month to 50 years away"}
+            ), 400
+        if not 1000 <= paths <= 200000 or not 0 <= volatility < 1 or not -0.5 < mean < 1:
+            return jsonify({"success": False, "error": "Invalid parameter"}), 400
+
+        impulses = (
+            db_session.query(SavedImpulse.id, SavedImpulse.amount, SavedImpulse.date)
+            .filter(SavedImpulse.user_id == current_user.id)
             .all()
         )
 
-        # Combine into activity feed
-        activity = []
+        # Current value of the impulse history, grown since each save date
+        start_value = 0.0
+        months_saving = 1.0
+        if impulses:
+            elapsed = [
+                max(0.0, (now - i.date).days / 30.4375) if i.date else 0.0
+                for i in impulses
+            ]
+            _, values = project_curves(
+                [i.amount for i in impulses],
+                annual_rates=mean,
+                horizon_months=0,
+                elapsed_months=elapsed,
+            )
+            start_value = float(values.sum())
+            months_saving = max(1.0, max(elapsed))
 
-        # Add transactions to activity
-        for t in recent_transactions:
-            activity.append(
-                {
-                    "id": t.id,
-                    "title": t.description or f"{t.category.capitalize()} purchase",
-                    "time": t.date.strftime("%b %d, %I:%M %p"),
-                    "amount": t.amount,
-                    "type": "withdrawal",
-                }
+        monthly_contribution = float(
+            data.get(
+                "monthly_contribution",
+                sum(i.amount for i in impulses) / months_saving,
             )
+        )
 
-        # Add saved impulses to activity
-        for i in recent_impulses:
-            activity.append(
-                {
-                    "id": f"impulse_{i.id}",
-                    "title": f"Saved {i.description}",
-                    "time": i.date.strftime("%b %d, %I:%M %p"),
-                    "amount": i.amount,
-                    "type": "savings",
-                }
+        # The history fingerprint makes new impulses miss the cache
+        history = (
+            len(impulses),
+            round(sum(i.amount for i in impulses), 2),
+            max((i.id for i in impulses), default=0),
+        )
+        cache_key = (
+            current_user.id,
+            history,
+            target,
+            months,
+            round(monthly_contribution, 2),
+            mean,
+            volatility,
+            paths,
+            step,
+        )
+
+        result = simulation_cache.get(cache_key)
+        cached = result is not None
+        if not cached:
+            result = simulate_goal(
+                start_value,
+                target,
+                months,
+                monthly_contribution=monthly_contribution,
+                mean=mean,
+                volatility=volatility,
+                paths=paths,
+                step=step,
             )
+            simulation_cache.set(cache_key, result)
 
-        # Sort by date (newest first)
-        activity.sort(
-            key=lambda x: datetime.strptime(x["time"], "%b %d, %I:%M %p"), reverse=True
+        return jsonify(
+            {
+                "success": True,
+                "cached": cached,
+                "target": target,
+                "start_value": round(start_value, 2),
+                "monthly_contribution": round(monthly_contribution, 2),
+                **result,
+            }
         )
 
-        # Return top 10
-        return jsonify(activity[:10])
+    except Exception as e:
+        logger.error(f"Error simulating financial goal: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    finally:
+        db_session.close()
+
+
+@app.route("/api/portfolio", methods=["GET"])
+@jwt_required()
+def get_portfolio_overview():
+    """
+    Get portfolio overview for the current user
+    """
+    current_user = get_current_user()
+
+    try:
+        context = DashboardContext(db_session, current_user.id, preferred_currency)
+        return jsonify(build_portfolio(context))
+
+    except Exception as e:
+        logger.error(f"Error retrieving portfolio overview: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    finally:
+        db_session.close()
+
+
+@app.route("/api/activity", methods=["GET"])
+@jwt_required()
+def get_recent_activity():
+    """
+    Get recent activity for the current user, newest first
+
+    Query parameters:
+        limit: Page size (default 10, max 100)
+        cursor: Value of the X-Next-Cursor header of the previous page
+    """
+    current_user = get_current_user()
+
+    try:
+        try:
+            activity, next_cursor = get_activity_page(
+                db_session,
+                current_user.id,
+                limit=request.args.get("limit", 10, type=int),
+                cursor=request.args.get("cursor"),
+            )
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        # The body stays a plain list, the next page is linked by a header
+        response = jsonify(activity)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return response
 
     except Exception as e:
         logger.error(f"Error retrieving recent activity: {str(e)}", exc_info=True)
@@ -1816,135 +2187,159 @@ def get_financial_insights():
     current_user = get_current_user()
 
     try:
-        # Get current month and year
-        current_month = datetime.now().month
-        current_year = datetime.now().year
+        context = DashboardContext(db_session, current_user.id, preferred_currency)
+        return jsonify(build_insights(context))
 
-        # Get transactions for current month
-        transactions = (
-            db_session.query(Transaction)
-            .filter(
-                Transaction.user_id == current_user.id,
-                extract("month", Transaction.date) == current_month,
-                extract("year", Transaction.date) == current_year,
+    except Exception as e:
+        logger.error(f"Error generating financial insights: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    finally:
+        db_session.close()
+
+
+@app.route("/api/bootstrap", methods=["GET"])
+@jwt_required()
+def bootstrap():
+    """
+    Get several dashboard resources in one response
+
+    Query parameters:
+        resources: Comma separated names among dashboard, goals, portfolio,
+                   activity and insights (default all of them)
+
+    The resources are built from one read transaction and share the rows
+    they query. Each value is the body its own endpoint would return.
+    """
+    current_user = get_current_user()
+
+    try:
+        names = [
+            name.strip()
+            for name in request.args.get("resources", ",".join(RESOURCE_BUILDERS)).split(",")
+            if name.strip()
+        ]
+        names = list(dict.fromkeys(names))
+        try:
+            resources = single_flight.do(
+                "bootstrap",
+                flight_key(current_user.id, preferred_currency, names),
+                lambda: build_resources(db_session, current_user.id, preferred_currency, names),
             )
-            .all()
-        )
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
 
-        # Get budgets for current month
-        budgets = (
-            db_session.query(Budget)
-            .filter_by(user_id=current_user.id, month=current_month, year=current_year)
-            .all()
-        )
+        return jsonify({"success": True, "resources": resources})
 
-        # Get saved impulses
-        impulses = (
-            db_session.query(SavedImpulse).filter_by(user_id=current_user.id).all()
-        )
+    except Exception as e:
+        logger.error(f"Error generating bootstrap data: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
 
-        # Calculate total spent this month
-        total_spent = sum(t.amount for t in transactions)
+    finally:
+        db_session.close()
 
-        # Calculate total budget
-        total_budget = sum(b.planned_amount for b in budgets)
 
-        # Calculate total saved from impulses
-        total_saved = sum(i.amount for i in impulses)
+@app.route("/api/sync", methods=["GET"])
+@jwt_required()
+def sync():
+    """
+    Get the transactions, budgets and saved impulses changed since a version
 
-        # Group transactions by category
-        spending_by_category = {}
-        for transaction in transactions:
-            category = transaction.category
-            if category not in spending_by_category:
-                spending_by_category[category] = 0
-            spending_by_category[category] += transaction.amount
+    Query parameters:
+        since: Version returned by the previous sync, 0 or absent for everything
 
-        # Find over-budget categories
-        over_budget_categories = []
-        for category, amount in spending_by_category.items():
-            budget_item = next((b for b in budgets if b.category == category), None)
-            if budget_item and amount > budget_item.planned_amount:
-                over_budget_categories.append(
-                    {
-                        "name": category,
-                        "amount": amount,
-                        "budget": budget_item.planned_amount,
-                        "overage": amount - budget_item.planned_amount,
-                    }
-                )
+    Clients keep the returned version and refresh their lists from the
+    changed rows and deleted ids instead of refetching them.
+    """
+    current_user = get_current_user()
 
-        # Sort by overage amount
-        over_budget_categories.sort(key=lambda x: x["overage"], reverse=True)
+    try:
+        try:
+            since = int(request.args.get("since", 0))
+        except ValueError:
+            return jsonify({"success": False, "error": "since must be an integer"}), 400
 
-        # Generate financial insights
-        insights = []
+        return jsonify({"success": True, **get_changes(db_session, current_user.id, since)})
 
-        # Monthly income (in a real app, this would be calculated from income transactions)
-        monthly_income = 8350.00
+    except Exception as e:
+        logger.error(f"Error syncing changes: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
 
-        # Calculate savings rate
-        savings_rate = 0
-        if monthly_income > 0:
-            savings_rate = round(
-                ((monthly_income - total_spent) / monthly_income) * 100, 1
-            )
+    finally:
+        db_session.close()
 
-        # Determine if savings rate is improving (in a real app, this would be calculated from historical data)
-        savings_rate_change = 3.1
 
-        # Savings rate insight
-        if savings_rate_change > 0:
-            insights.append(
-                {
-                    "type": "positive",
-                    "title": "Positive Trend",
-                    "description": f"Your savings rate has increased by {savings_rate_change}% compared to last month. Keep up the good work!",
-                }
-            )
+@app.route("/api/events/ticket", methods=["POST"])
+@jwt_required()
+def events_ticket():
+    """
+    Issue a ticket opening one event stream within TICKET_SECONDS
 
-        # Budget optimization insight
-        if over_budget_categories:
-            insights.append(
-                {
-                    "type": "suggestion",
-                    "title": "Budget Optimization",
-                    "description": f"Consider reallocating your {over_budget_categories[0]['name']} budget or finding ways to reduce spending in this category.",
-                }
-            )
+    Browsers' EventSource cannot send headers, so the stream URL carries
+    this ticket instead of the access token.
+    """
+    current_user = get_current_user()
+    return jsonify(
+        {
+            "success": True,
+            "ticket": stream_tickets.issue(current_user.id),
+            "expires_in": stream_tickets.ttl,
+        }
+    )
 
-        # Subscription optimization
-        if any(
-            c.lower() in ["subscriptions", "entertainment"]
-            for c in spending_by_category.keys()
-        ):
-            insights.append(
-                {
-                    "type": "opportunity",
-                    "title": "Subscription Audit",
-                    "description": "Based on your spending patterns, you could save by reviewing your subscriptions and canceling unused services.",
-                }
-            )
 
-        # Investment insight
-        if total_saved > 0:
-            insights.append(
-                {
-                    "type": "suggestion",
-                    "title": "Investment Opportunity",
-                    "description": f"If you redirected just 10% more of your discretionary spending to investments, you could grow your portfolio by an additional €{round(total_spent * 0.1 * 12 * 1.08, 2)} in one year.",
-                }
-            )
+@app.route("/api/events", methods=["GET"])
+def events():
+    """
+    Stream the user's changes as server-sent events
 
-        return jsonify(insights)
+    Query parameters:
+        ticket: Single-use ticket from POST /api/events/ticket
+        currency: Currency of the summary figures (default preferred currency)
+
+    Each event is a JSON object with a type: "connected" with the current
+    sync version, "transaction.created", "budget.updated",
+    "saved_impulse.deleted", ... with the record, "summary" with the
+    recomputed summary section of the dashboard after a write, and "resync"
+    when the client fell behind and should call /api/sync.
+    """
+    user_id = stream_tickets.redeem(request.args.get("ticket", ""))
+    if user_id is None:
+        return jsonify({"success": False, "error": "Invalid or expired stream ticket"}), 401
+    subscription = None
+
+    try:
+        currency = get_request_currency(request.args)
+        if currency is None:
+            return jsonify({"success": False, "error": "Invalid currency"}), 400
+
+        # Subscribed before reading the version, so no later write is missed
+        subscription = event_broker.subscribe(user_id, currency)
+        version = (
+            db_session.query(User.change_version)
+            .filter(User.id == user_id)
+            .scalar()
+        )
 
     except Exception as e:
-        logger.error(f"Error generating financial insights: {str(e)}", exc_info=True)
+        if subscription is not None:
+            event_broker.unsubscribe(subscription)
+        logger.error(f"Error opening event stream: {str(e)}", exc_info=True)
         return jsonify({"success": False, "error": str(e)}), 500
 
     finally:
         db_session.close()
 
+    response = Response(
+        stream_events(subscription, {"type": "connected", "version": version}),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # Also releases the stream when the client left before it started
+    response.call_on_close(lambda: event_broker.unsubscribe(subscription))
+    return response
+
 
 if __name__ == "__main__":
+    start_background_services()
     app.run(debug=True, host="0.0.0.0", port=5000)
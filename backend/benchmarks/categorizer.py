@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the transaction categorizer on a synthetic corpus
+
+Generates bank-statement style descriptions (merchant words, card and
+location noise, store numbers) for a set of categories and users, trains on
+most of them and reports training throughput, the latency of a single
+suggestion, batch labelling throughput and held-out accuracy.
+
+Usage:
+    python -m benchmarks.categorizer [--transactions 50000] [--users 50]
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+# Add the backend directory to the Python path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from services.categorizer import TransactionCategorizer
+
+# Merchant words typical of each category. Some appear under several
+# categories (Uber rides and Uber Eats, Amazon orders and Prime...) and only
+# the user's own history tells them apart
+MERCHANTS = {
+    "groceries": ["carrefour", "lidl", "aldi", "tesco", "monoprix", "market", "supermarket", "bio"],
+    "dining": ["restaurant", "pizzeria", "sushi", "bistro", "burger", "cafe", "uber", "deliveroo"],
+    "transportation": ["uber", "sncf", "ratp", "taxi", "carrefour", "shell", "total", "parking"],
+    "subscriptions": ["netflix", "spotify", "disney", "amazon", "icloud", "youtube", "orange", "membership"],
+    "utilities": ["edf", "engie", "water", "electricity", "internet", "orange", "bouygues", "bill"],
+    "housing": ["rent", "landlord", "agency", "insurance", "syndic", "mortgage", "lease", "home"],
+    "healthcare": ["pharmacy", "doctor", "dentist", "clinic", "optician", "hospital", "medical", "lab"],
+    "shopping": ["amazon", "zara", "fnac", "ikea", "decathlon", "store", "outlet", "boutique"],
+    "entertainment": ["cinema", "concert", "theatre", "steam", "playstation", "museum", "fnac", "booking"],
+    "travel": ["airbnb", "booking", "airfrance", "easyjet", "hotel", "hostel", "ryanair", "trip"],
+}
+
+# Words that show up in every category
+NOISE = ["card", "payment", "pos", "paris", "lyon", "online", "purchase", "debit", "fr", "eur"]
+
+
+def synthetic_corpus(transactions=50000, users=50, seed=7):
+    """
+    Labelled (user_id, description, category) rows
+
+    Each user prefers a few merchants per category, so the per-user overlay
+    has something to learn on top of the global model.
+    """
+    rng = np.random.default_rng(seed)
+    categories = list(MERCHANTS)
+    favourites = {
+        (user, category): rng.choice(MERCHANTS[category], size=3, replace=False)
+        for user in range(users)
+        for category in categories
+    }
+
+    rows = []
+    for _ in range(transactions):
+        user = int(rng.integers(users))
+        category = categories[int(rng.integers(len(categories)))]
+        pool = favourites[(user, category)] if rng.random() < 0.7 else MERCHANTS[category]
+        words = [str(rng.choice(pool))]
+        words += [str(w) for w in rng.choice(NOISE, size=int(rng.integers(1, 4)))]
+        words.append(str(int(rng.integers(100, 99999))))
+        rng.shuffle(words)
+        rows.append((user, " ".join(words).upper(), category))
+    return rows
+
+
+def run_benchmark(transactions=50000, users=50, holdout=0.1, repeat=200):
+    """
+    Train on a synthetic corpus and time suggestions
+
+    Returns:
+        dict: training rows per second, single suggestion time in
+              microseconds, batch labels per millisecond and held-out accuracy
+    """
+    rows = synthetic_corpus(transactions, users)
+    split = int(len(rows) * (1 - holdout))
+    train_rows, test_rows = rows[:split], rows[split:]
+
+    model = TransactionCategorizer()
+    start = time.perf_counter()
+    model.train(train_rows)
+    train_seconds = time.perf_counter() - start
+
+    user, description, _ = test_rows[0]
+    model.suggest(user, description)
+    best = float("inf")
+    for user, description, _ in test_rows[:repeat]:
+        start = time.perf_counter()
+        model.suggest(user, description)
+        best = min(best, time.perf_counter() - start)
+
+    # Bulk imports come from one user at a time
+    by_user = {}
+    for user, description, category in test_rows:
+        by_user.setdefault(user, []).append((description, category))
+
+    correct = 0
+    start = time.perf_counter()
+    for user, items in by_user.items():
+        labels = model.predict_many(user, [description for description, _ in items])
+        correct += sum(
+            label == category for (label, _), (_, category) in zip(labels, items)
+        )
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        "train_rows_per_s": round(len(train_rows) / train_seconds),
+        "suggest_us": round(best * 1e6, 1),
+        "batch_labels_per_ms": round(len(test_rows) / (batch_seconds * 1000), 1),
+        "accuracy": round(correct / len(test_rows), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--transactions", type=int, default=50000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--holdout", type=float, default=0.1)
+    args = parser.parse_args()
+
+    result = run_benchmark(args.transactions, args.users, args.holdout)
+    print(
+        f"train: {result['train_rows_per_s']} rows/s, "
+        f"suggest: {result['suggest_us']} us, "
+        f"batch: {result['batch_labels_per_ms']} labels/ms, "
+        f"accuracy: {result['accuracy']:.1%}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the chat pre-processing hot path
+
+Every chat message goes through currency extraction/conversion, category
+translation, the mock response fallback and the GeminiService helpers. This
+module times each of them over the labelled corpus in benchmarks/corpus.py,
+measures the memory they allocate per call and compares the results against
+the limits stored in benchmarks/thresholds.json.
+
+Usage:
+    python -m benchmarks.chat_hot_path                   # print results
+    python -m benchmarks.chat_hot_path --check           # exit 1 on regression
+    python -m benchmarks.chat_hot_path --update-baseline # rewrite thresholds
+
+The unit suite only checks timings against the thresholds when
+MW_RUN_BENCHMARKS=1 is set, as they vary with the machine running it.
+"""
+import os
+import sys
+import json
+import time
+import pathlib
+import argparse
+import tracemalloc
+from unittest.mock import patch
+
+# Add the backend directory to the Python path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from benchmarks.corpus import CHAT_CORPUS, CONVERSION_CASES, CATEGORY_CASES
+
+THRESHOLDS_PATH = pathlib.Path(__file__).parent / "thresholds.json"
+
+# Measured values may exceed the stored baseline by this factor before a
+# benchmark is reported as a regression (override with MW_BENCH_TOLERANCE)
+DEFAULT_TOLERANCE = float(os.getenv("MW_BENCH_TOLERANCE", "3.0"))
+
+# Headroom applied to measured values when writing a new baseline
+BASELINE_HEADROOM = 1.5
+
+
+def _load_targets():
+    """Import the functions under test without touching the network"""
+    with patch.dict(os.environ, {"GEMINI_API_KEY": ""}):
+        import app
+        from services.gemini_service import GeminiService
+
+        service = GeminiService(api_key=None)
+
+    return app, service
+
+
+def build_cases():
+    """
+    Build the benchmark cases
+
+    Returns:
+        dict: benchmark name -> (callable, list of argument tuples)
+    """
+    app, service = _load_targets()
+
+    messages = [(entry["text"],) for entry in CHAT_CORPUS]
+    messages_with_language = [
+        (entry["text"], entry["language"]) for entry in CHAT_CORPUS
+    ]
+    amounts = [
+        (entry["amount"], entry["language"])
+        for entry in CHAT_CORPUS
+        if entry["amount"] is not None
+    ]
+
+    return {
+        "extract_currency_amount": (app.extract_currency_amount, messages),
+        "convert_currency": (app.convert_currency, CONVERSION_CASES),
+        "translate_category": (
+            app.translate_category,
+            [(category, "fr") for category in CATEGORY_CASES],
+        ),
+        "get_mock_response": (
+            lambda message, language: app.get_mock_response(
+                message, None, None, language
+            ),
+            messages_with_language,
+        ),
+        "detect_impulse_purchase": (
+            service._detect_impulse_purchase,
+            messages_with_language,
+        ),
+        "extract_amount": (service._extract_amount, messages),
+        "format_investment_advice": (service._format_investment_advice, amounts),
+    }
+
+
+def measure_time(func, cases, repeat):
+    """
+    Measure the mean wall time of one call in microseconds
+
+    Args:
+        func (callable): Function under test
+        cases (list): Argument tuples, each is one call
+        repeat (int): Number of passes over the cases
+
+    Returns:
+        float: Mean time per call in microseconds
+    """
+    # Warm up caches (compiled regexes, lazy imports) before timing
+    for args in cases:
+        func(*args)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for args in cases:
+            func(*args)
+    elapsed = time.perf_counter() - start
+
+    return elapsed / (repeat * len(cases)) * 1e6
+
+
+def measure_allocations(func, cases):
+    """
+    Measure the memory allocated by one call in bytes
+
+    Uses tracemalloc peaks, so the value is the largest amount of memory
+    held at once during the call, including memory freed before it returns.
+
+    Args:
+        func (callable): Function under test
+        cases (list): Argument tuples, each is one call
+
+    Returns:
+        tuple: (mean bytes per call, max bytes for a single call)
+    """
+    for args in cases:
+        func(*args)
+
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+
+    try:
+        peaks = []
+        for args in cases:
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            func(*args)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(max(0, peak - baseline))
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    return sum(peaks) / len(peaks), max(peaks)
+
+
+def run_benchmarks(repeat=200, names=None):
+    """
+    Run the hot path benchmarks
+
+    Args:
+        repeat (int): Number of timed passes over each case list
+        names (list): Optional subset of benchmark names to run
+
+    Returns:
+        dict: benchmark name -> measurements
+    """
+    results = {}
+    for name, (func, cases) in build_cases().items():
+        if names and name not in names:
+            continue
+
+        mean_alloc, max_alloc = measure_allocations(func, cases)
+        results[name] = {
+            "calls": len(cases),
+            "time_us": round(measure_time(func, cases, repeat), 3),
+            "alloc_bytes": round(mean_alloc, 1),
+            "max_alloc_bytes": max_alloc,
+        }
+
+    return results
+
+
+def run_by_language(repeat=200):
+    """
+    Time the message-level functions separately for each corpus language
+
+    Returns:
+        dict: language -> benchmark name -> mean time per call in microseconds
+    """
+    app, service = _load_targets()
+    languages = sorted({entry["language"] for entry in CHAT_CORPUS})
+
+    breakdown = {}
+    for language in languages:
+        entries = [e for e in CHAT_CORPUS if e["language"] == language]
+        messages = [(e["text"],) for e in entries]
+        with_language = [(e["text"], language) for e in entries]
+
+        breakdown[language] = {
+            "extract_currency_amount": round(
+                measure_time(app.extract_currency_amount, messages, repeat), 3
+            ),
+            "get_mock_response": round(
+                measure_time(
+                    lambda message, lang: app.get_mock_response(
+                        message, None, None, lang
+                    ),
+                    with_language,
+                    repeat,
+                ),
+                3,
+            ),
+            "detect_impulse_purchase": round(
+                measure_time(service._detect_impulse_purchase, with_language, repeat),
+                3,
+            ),
+        }
+
+    return breakdown
+
+
+def load_thresholds(path=THRESHOLDS_PATH):
+    """Load stored per-benchmark limits"""
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_thresholds(results, path=THRESHOLDS_PATH):
+    """Write a new baseline from measured results, with some headroom"""
+    thresholds = {
+        name: {
+            "time_us": round(result["time_us"] * BASELINE_HEADROOM, 2),
+            "alloc_bytes": int(result["alloc_bytes"] * BASELINE_HEADROOM) + 1,
+        }
+        for name, result in sorted(results.items())
+    }
+    with open(path, "w") as f:
+        json.dump(thresholds, f, indent=2)
+        f.write("\n")
+    return thresholds
+
+
+def find_regressions(results, thresholds, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare results against the stored thresholds
+
+    Args:
+        results (dict): Output of run_benchmarks()
+        thresholds (dict): Output of load_thresholds()
+        tolerance (float): Allowed factor above each threshold
+
+    Returns:
+        list: Human readable descriptions of every regression found
+    """
+    regressions = []
+    for name, result in results.items():
+        limits = thresholds.get(name)
+        if not limits:
+            continue
+
+        for metric in ("time_us", "alloc_bytes"):
+            limit = limits[metric] * tolerance
+            if result[metric] > limit:
+                regressions.append(
+                    f"{name}: {metric} {result[metric]} exceeds {limit:.1f} "
+                    f"(baseline {limits[metric]} x {tolerance})"
+                )
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--check", action="store_true", help="exit 1 on regression")
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="rewrite thresholds.json"
+    )
+    parser.add_argument("--by-language", action="store_true")
+    args = parser.parse_args()
+
+    results = run_benchmarks(repeat=args.repeat)
+
+    print(f"{'benchmark':<28}{'calls':>7}{'us/call':>12}{'bytes/call':>12}{'max bytes':>11}")
+    for name, result in results.items():
+        print(
+            f"{name:<28}{result['calls']:>7}{result['time_us']:>12.3f}"
+            f"{result['alloc_bytes']:>12.1f}{result['max_alloc_bytes']:>11}"
+        )
+
+    if args.by_language:
+        print()
+        for language, timings in run_by_language(repeat=args.repeat).items():
+            for name, time_us in timings.items():
+                print(f"[{language}] {name:<28}{time_us:>12.3f} us/call")
+
+    if args.update_baseline:
+        save_thresholds(results)
+        print(f"\nBaseline written to {THRESHOLDS_PATH}")
+        return 0
+
+    if args.check:
+        regressions = find_regressions(results, load_thresholds())
+        if regressions:
+            print("\nRegressions detected:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nNo regressions detected")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Offline load test of the chat model path
+
+Sends the chat corpus through GeminiService.get_response from concurrent
+threads, the service backed by the in-process fake (or by the fake HTTP
+server with --http, or by a recorded cassette with --cassette), and reports
+the throughput, the latency percentiles and the share of answers that fell
+back to the response catalog because the backend failed twice in a row.
+
+Usage:
+    python -m benchmarks.chat_load                                  # 200 requests, 20 threads
+    python -m benchmarks.chat_load --concurrency 100 --requests 1000
+    python -m benchmarks.chat_load --error-rate 0.1 --latency exponential:0.5
+    python -m benchmarks.chat_load --http                           # over a local fake server
+    python -m benchmarks.chat_load --live --record chat.jsonl.gz    # record the Gemini API
+    python -m benchmarks.chat_load --cassette chat.jsonl.gz         # replay recorded calls
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the backend directory to the Python path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from benchmarks.corpus import CHAT_CORPUS
+from benchmarks.fake_gemini import create_server
+from services.gemini_service import GeminiService
+from services.cassette import Cassette, CassetteGenai
+from services.model_backends import DEFAULT_LATENCY, FakeGenai, HttpGenai
+
+
+def percentile(values, share):
+    """Value below which the given share of the sorted values fall"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+def run_load(backend, requests=200, concurrency=20, users=50):
+    """
+    Send the corpus messages through a service on the backend
+
+    Args:
+        backend: Backend of the service, see services.model_backends
+        requests (int): Number of messages to send
+        concurrency (int): Number of threads sending them
+        users (int): Number of distinct users the messages come from
+
+    Returns:
+        dict: Throughput, latency percentiles in milliseconds and fallbacks
+    """
+    service = GeminiService(backend=backend)
+    fallbacks = []
+    fallback_response = service._fallback_response
+
+    def count_fallback(*args):
+        fallbacks.append(args[-1])
+        return fallback_response(*args)
+
+    service._fallback_response = count_fallback
+    messages = [CHAT_CORPUS[i % len(CHAT_CORPUS)] for i in range(requests)]
+
+    def send(i):
+        entry = messages[i]
+        start = time.perf_counter()
+        answer = service.get_response(entry["text"], language=entry["language"], user_id=i % users)
+        return time.perf_counter() - start, answer
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(send, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(seconds * 1000 for seconds, _ in results)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+        "max_ms": round(latencies[-1], 1),
+        "fallback_pct": round(100 * len(fallbacks) / requests, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of the chat model path")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--latency", default=DEFAULT_LATENCY)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--http", action="store_true", help="Go through a local fake HTTP server")
+    parser.add_argument("--live", action="store_true", help="Call the Gemini API (GEMINI_API_KEY)")
+    parser.add_argument("--record", help="Record the calls to this cassette")
+    parser.add_argument("--cassette", help="Answer from this recorded cassette instead of the fake")
+    parser.add_argument("--speed", type=float, default=1.0, help="Factor of the recorded timings")
+    args = parser.parse_args()
+
+    logging.disable(logging.ERROR)
+    fake = FakeGenai(
+        latency=args.latency, error_rate=args.error_rate,
+        tokens_per_second=args.tokens_per_second, seed=args.seed,
+    )
+    server = None
+    backend = fake
+    if args.cassette:
+        backend = CassetteGenai(Cassette(args.cassette), speed=args.speed)
+    elif args.live:
+        backend = None
+    elif args.http:
+        server = create_server(fake, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        backend = HttpGenai(f"http://127.0.0.1:{server.server_port}")
+    if args.record:
+        backend = CassetteGenai(Cassette(args.record), backend, mode="record")
+
+    try:
+        results = run_load(backend, args.requests, args.concurrency, args.users)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    results["backend"] = backend.metrics() if args.cassette or args.record else fake.metrics()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Labelled multilingual chat corpus for MindfulWealth benchmarks
+
+Each entry is a chat message as typed by a user, labelled with its language,
+the intent it is meant to trigger and the purchase amount it mentions (if any).
+The labels let the benchmarks report timings per language and per intent.
+"""
+
+CHAT_CORPUS = [
+    # English
+    {"text": "Hello there!", "language": "en", "intent": "greeting", "amount": None},
+    {"text": "Hi, can you help me with my money?", "language": "en", "intent": "greeting", "amount": None},
+    {"text": "How should I set up a budget for next month?", "language": "en", "intent": "budget", "amount": None},
+    {"text": "I'm always over budget for dining, what can I do?", "language": "en", "intent": "budget", "amount": None},
+    {"text": "What is the best way to save for retirement?", "language": "en", "intent": "saving", "amount": None},
+    {"text": "I want to start saving 200 USD every month", "language": "en", "intent": "saving", "amount": 200.0},
+    {"text": "I just bought new shoes for $120", "language": "en", "intent": "impulse", "amount": 120.0},
+    {"text": "There is a flash sale on headphones, 89.99 EUR, should I buy them?", "language": "en", "intent": "impulse", "amount": 89.99},
+    {"text": "I'm tempted to buy a new phone for £799", "language": "en", "intent": "impulse", "amount": 799.0},
+    {"text": "I treated myself to a ¥15000 dinner", "language": "en", "intent": "impulse", "amount": 15000.0},
+    {"text": "I spent 45 dollars for groceries today", "language": "en", "intent": "spending", "amount": 45.0},
+    {"text": "Paid 950 for rent", "language": "en", "intent": "spending", "amount": 950.0},
+    {"text": "What do you think about index funds versus bonds?", "language": "en", "intent": "other", "amount": None},
+    {"text": "Can you explain compound interest over a long-term horizon?", "language": "en", "intent": "other", "amount": None},
+    {"text": "I saw an awesome limited time deal on a gaming laptop at $1499.50 and I really want it", "language": "en", "intent": "impulse", "amount": 1499.5},
+    # French
+    {"text": "Bonjour !", "language": "fr", "intent": "greeting", "amount": None},
+    {"text": "Salut, tu peux m'aider avec mes finances ?", "language": "fr", "intent": "greeting", "amount": None},
+    {"text": "Comment faire un budget pour le mois prochain ?", "language": "fr", "intent": "budget", "amount": None},
+    {"text": "Je dépasse toujours mon budget restaurants", "language": "fr", "intent": "budget", "amount": None},
+    {"text": "Comment économiser pour la retraite ?", "language": "fr", "intent": "saving", "amount": None},
+    {"text": "Je veux mettre 150€ d'épargne chaque mois", "language": "fr", "intent": "saving", "amount": 150.0},
+    {"text": "Je viens d'acheter des chaussures à 120€", "language": "fr", "intent": "impulse", "amount": 120.0},
+    {"text": "J'ai craqué pour un sac en solde à 250 EUR", "language": "fr", "intent": "impulse", "amount": 250.0},
+    {"text": "J'ai envie d'une nouvelle console à €499", "language": "fr", "intent": "impulse", "amount": 499.0},
+    {"text": "Je me suis offert un parfum à 89,90 euros", "language": "fr", "intent": "impulse", "amount": 89.9},
+    {"text": "J'ai payé 60 pour les courses", "language": "fr", "intent": "spending", "amount": 60.0},
+    {"text": "Loyer réglé : 1100 EUR", "language": "fr", "intent": "spending", "amount": 1100.0},
+    {"text": "Que penses-tu des ETF par rapport aux obligations ?", "language": "fr", "intent": "other", "amount": None},
+    {"text": "Peux-tu m'expliquer les intérêts composés sur le long terme ?", "language": "fr", "intent": "other", "amount": None},
+    {"text": "Je viens de voir une offre spéciale exclusive sur une montre à 349€, c'est tendance et je la veux vraiment", "language": "fr", "intent": "impulse", "amount": 349.0},
+]
+
+# Amounts exercised by the currency benchmarks, one per supported currency pair
+CONVERSION_CASES = [
+    (amount, from_currency, to_currency)
+    for amount in (1.0, 19.99, 250.0, 12500.0)
+    for from_currency in ("USD", "EUR", "GBP", "JPY")
+    for to_currency in ("USD", "EUR", "GBP", "JPY")
+]
+
+# Categories exercised by the translation benchmark: exact, partial and unknown names
+CATEGORY_CASES = [
+    "groceries",
+    "Dining",
+    "entertainment",
+    "subscriptions",
+    "home improvement",
+    "travel insurance",
+    "pets",
+    "crypto",
+]
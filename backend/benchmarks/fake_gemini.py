@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Gemini REST API
+
+Serves the endpoints GeminiService uses through HttpGenai, answering from a
+FakeGenai backend: the latency, error rate and token throughput of the
+answers are those given on the command line. Point the backend at it with
+GEMINI_BACKEND=http://127.0.0.1:8765 to load test the chat path offline.
+
+    GET  /v1beta/models
+    POST /v1beta/models/{model}:generateContent
+    POST /v1beta/models/{model}:streamGenerateContent?alt=sse
+    GET  /metrics
+
+Usage:
+    python -m benchmarks.fake_gemini                                 # port 8765
+    python -m benchmarks.fake_gemini --latency uniform:0.2,1.5 --error-rate 0.05
+    python -m benchmarks.fake_gemini --tokens-per-second 0           # no throttling
+"""
+import os
+import sys
+import json
+import argparse
+import itertools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# Add the backend directory to the Python path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from services.model_backends import DEFAULT_LATENCY, BackendError, FakeGenai
+
+
+def candidate(text):
+    """generateContent response body holding a text"""
+    return {
+        "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}],
+    }
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    """Answers requests from the server's FakeGenai backend"""
+
+    protocol_version = "HTTP/1.1"
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        backend = self.server.backend
+        path = urlparse(self.path).path
+        if path == "/v1beta/models":
+            self.send_json(200, {"models": [{"name": name} for name in backend.models]})
+        elif path == "/metrics":
+            self.send_json(200, backend.metrics())
+        else:
+            self.send_json(404, BackendError(404, "NOT_FOUND", f"{path} is not found").to_dict())
+
+    def do_POST(self):
+        backend = self.server.backend
+        path = urlparse(self.path).path
+        model, _, method = path[len("/v1beta/"):].partition(":")
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        if not path.startswith("/v1beta/models/") or method not in ("generateContent", "streamGenerateContent"):
+            self.send_json(404, BackendError(404, "NOT_FOUND", f"{path} is not found").to_dict())
+            return
+        if model not in backend.models:
+            self.send_json(404, BackendError(404, "NOT_FOUND", f"{model} is not found").to_dict())
+            return
+
+        chunks = backend.replay(backend.draw())
+        try:
+            first = next(chunks, "")
+        except BackendError as e:
+            self.send_json(e.code, e.to_dict())
+            return
+
+        if method == "generateContent":
+            self.send_json(200, candidate(first + "".join(chunks)))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for text in itertools.chain([first], chunks):
+            self.wfile.write(f"data: {json.dumps(candidate(text))}\r\n\r\n".encode())
+            self.wfile.flush()
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def create_server(backend, host="127.0.0.1", port=8765, quiet=True):
+    """
+    HTTP server answering from a fake backend, not started yet
+
+    Args:
+        backend (FakeGenai): Backend drawing the answers
+        host (str): Interface to listen on
+        port (int): Port to listen on, 0 for any free port
+
+    Returns:
+        ThreadingHTTPServer: Call serve_forever() to start it
+    """
+    server = ThreadingHTTPServer((host, port), FakeGeminiHandler)
+    server.daemon_threads = True
+    server.backend = backend
+    server.quiet = quiet
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini REST API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--latency", default=DEFAULT_LATENCY,
+        help="Time to first token: fixed:S, uniform:LOW,HIGH, normal:MEAN,STDDEV, "
+             "lognormal:MU,SIGMA or exponential:MEAN (seconds)",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing")
+    parser.add_argument("--tokens-per-second", type=float, default=60.0, help="0 for no throttling")
+    parser.add_argument("--min-tokens", type=int, default=40)
+    parser.add_argument("--max-tokens", type=int, default=160)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    backend = FakeGenai(
+        latency=args.latency, error_rate=args.error_rate, tokens_per_second=args.tokens_per_second,
+        min_tokens=args.min_tokens, max_tokens=args.max_tokens, seed=args.seed,
+    )
+    server = create_server(backend, args.host, args.port, quiet=not args.verbose)
+    print(f"Fake Gemini API on http://{args.host}:{server.server_port} (latency {args.latency})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(backend.metrics(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,9 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.append(current_dir)
 
+from migrate_db import MIGRATIONS
+from migrations import MigrationRunner
+
 def get_db_path():
     """Get the database path"""
     DB_PATH = pathlib.Path(__file__).parent / "mindfulwealth.db"
@@ -50,31 +53,24 @@ def fix_database():
             print("Database fix aborted.")
             return
     
-    # Connect to the database
+    # Apply the pending schema migrations, personality_preference included
     db_path = get_db_path()
+    runner = MigrationRunner(db_path, MIGRATIONS)
+    try:
+        applied = runner.run()
+        print("Database schema updated successfully" if applied else "Database schema already up to date")
+    except Exception as e:
+        print(f"Error migrating database: {e}")
+        print("Database fix failed. Run it again to resume the migration.")
+        return
+    finally:
+        runner.close()
+    
+    # Connect to the database
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
     try:
-        # Check if the personality_preference column exists
-        cursor.execute("PRAGMA table_info(users)")
-        columns = cursor.fetchall()
-        column_names = [column[1] for column in columns]
-        
-        # Add personality_preference column if it doesn't exist
-        if 'personality_preference' not in column_names:
-            print("Adding personality_preference column to users table")
-            cursor.execute("ALTER TABLE users ADD COLUMN personality_preference TEXT DEFAULT 'nice'")
-            
-            # Update existing users to use nice personality
-            cursor.execute("UPDATE users SET personality_preference = 'nice' WHERE personality_preference IS NULL OR personality_preference = ''")
-            
-            # Commit the changes
-            conn.commit()
-            print("Database schema updated successfully")
-        else:
-            print("personality_preference column already exists")
-        
         # Verify the users table structure
         print("\nVerifying users table structure...")
         cursor.execute("PRAGMA table_info(users)")
@@ -0,0 +1,479 @@
+"""
+Background jobs for MindfulWealth application
+
+Jobs are rows of the jobs table in the application database, so queued work
+survives restarts and is shared by every server process. Worker threads
+claim due jobs with a conditional UPDATE, run the registered handler and
+retry failures with exponential backoff. A scheduler thread enqueues
+cron-style schedules, each run under a dedupe key so that several processes
+never queue the same run twice.
+"""
+import json
+import os
+import time
+import atexit
+import socket
+import logging
+import threading
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from models import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("pending", "running", "done", "failed")
+
+# Attempts before a failing job is given up
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Delay before the first retry, doubled after every further failure
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+
+# Seconds idle workers and the scheduler wait before looking again
+POLL_SECONDS = 1.0
+
+# Running jobs older than this were left behind by a stopped process
+STALE_AFTER = timedelta(minutes=30)
+
+# Scheduler ticks between looks for stale jobs, so a worker process that
+# crashed and restarted does not leave its jobs running forever
+RECOVER_EVERY_TICKS = 60
+
+# Finished jobs are kept this long for inspection
+KEEP_FINISHED = timedelta(days=7)
+
+# Recent jobs the latency percentiles are computed over
+LATENCY_SAMPLES = 1000
+
+# (low, high) of the minute, hour, day of month, month and day of week fields
+CRON_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+
+def parse_cron_field(field, low, high):
+    """
+    Values matched by one cron field
+
+    Supports "*", single values, ranges ("1-5"), steps ("*/15", "0-30/10")
+    and comma separated lists of those.
+
+    Returns:
+        set: Matched values
+    """
+    values = set()
+    for part in field.split(","):
+        expression, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if expression == "*":
+            start, end = low, high
+        elif "-" in expression:
+            start, end = (int(v) for v in expression.split("-", 1))
+        else:
+            start = int(expression)
+            end = high if step > 1 else start
+        if step < 1 or not low <= start <= end <= high:
+            raise ValueError(f"Invalid cron field '{field}'")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Five-field cron expression (minute hour day month weekday), local time"""
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression '{expression}' needs 5 fields")
+        # Sunday may be written as 7
+        fields[4] = ",".join("0" if v == "7" else v for v in fields[4].split(","))
+
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            sorted(parse_cron_field(field, low, high))
+            for field, (low, high) in zip(fields, CRON_RANGES)
+        )
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def matches_day(self, date):
+        """Whether a date matches the day, month and weekday fields"""
+        if date.month not in self.months:
+            return False
+        day = date.day in self.days
+        weekday = (date.weekday() + 1) % 7 in self.weekdays
+        # As in cron, a restricted day of month and weekday match either
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, after):
+        """First matching minute strictly after a time"""
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Every day/month/weekday combination repeats within 28 years
+        for _ in range(366 * 28):
+            if self.matches_day(moment):
+                for hour in self.hours:
+                    if hour < moment.hour:
+                        continue
+                    first = moment.minute if hour == moment.hour else 0
+                    for minute in self.minutes:
+                        if minute >= first:
+                            return moment.replace(hour=hour, minute=minute)
+            moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
+
+
+def retry_delay(attempts):
+    """Seconds to wait before retrying a job that failed `attempts` times"""
+    return min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+def percentiles(samples):
+    """p50 and p95 of a list of seconds, None when empty"""
+    if not samples:
+        return {"p50": None, "p95": None}
+    ordered = sorted(samples)
+
+    def pick(share):
+        return round(ordered[min(len(ordered) - 1, int(share * len(ordered)))], 4)
+
+    return {"p50": pick(0.5), "p95": pick(0.95)}
+
+
+class JobQueue:
+    """
+    Durable job queue with in-process workers
+
+    Handlers are called as handler(db_session, **payload) with a fresh
+    session of the queue's session factory, and may commit.
+    """
+
+    def __init__(self, session_factory, poll_seconds=POLL_SECONDS):
+        self.session_factory = session_factory
+        self.poll_seconds = poll_seconds
+        self.handlers = {}
+        self.schedules = []
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._threads = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._wait_times = deque(maxlen=LATENCY_SAMPLES)
+        self._run_times = deque(maxlen=LATENCY_SAMPLES)
+        self._outcomes = defaultdict(int)
+
+    def register(self, name, handler):
+        """Register the handler of a job name"""
+        self.handlers[name] = handler
+        return handler
+
+    def schedule(self, name, expression, payload=None):
+        """Enqueue a job whenever a cron expression matches"""
+        if name not in self.handlers:
+            raise ValueError(f"No handler registered for job '{name}'")
+        self.schedules.append(
+            {"name": name, "cron": CronSchedule(expression), "payload": payload, "next_run": None}
+        )
+
+    def enqueue(self, name, payload=None, run_at=None, max_attempts=DEFAULT_MAX_ATTEMPTS, dedupe_key=None):
+        """
+        Add a job to the queue
+
+        Args:
+            name (str): Registered job name
+            payload (dict): Keyword arguments of the handler
+            run_at (datetime): Earliest start, defaults to now
+            max_attempts (int): Attempts before the job is given up
+            dedupe_key (str): Unique key, a job with the same key is not added twice
+
+        Returns:
+            int: ID of the job, or None if the dedupe key was already queued
+        """
+        if name not in self.handlers:
+            raise ValueError(f"No handler registered for job '{name}'")
+
+        session = self.session_factory()
+        try:
+            job = Job(
+                name,
+                payload=json.dumps(payload) if payload else None,
+                run_at=run_at,
+                max_attempts=max_attempts,
+                dedupe_key=dedupe_key,
+            )
+            session.add(job)
+            session.commit()
+            job_id = job.id
+        except IntegrityError:
+            session.rollback()
+            return None
+        finally:
+            session.close()
+
+        self._wake.set()
+        return job_id
+
+    def claim(self, session, worker, now=None):
+        """
+        Mark the next due job as running
+
+        The status check in the UPDATE makes the claim atomic, a job taken
+        by another worker in the meantime is skipped.
+
+        Returns:
+            Job: Claimed job, or None when nothing is due
+        """
+        now = now or datetime.now()
+        while True:
+            candidate = (
+                session.query(Job.id)
+                .filter(Job.status == "pending", Job.run_at <= now)
+                .order_by(Job.run_at, Job.id)
+                .first()
+            )
+            if candidate is None:
+                return None
+
+            claimed = (
+                session.query(Job)
+                .filter(Job.id == candidate.id, Job.status == "pending")
+                .update(
+                    {
+                        "status": "running",
+                        "attempts": Job.attempts + 1,
+                        "started_at": now,
+                        "worker": worker,
+                    },
+                    synchronize_session=False,
+                )
+            )
+            session.commit()
+            if claimed:
+                return session.get(Job, candidate.id)
+
+    def run_job(self, session, job):
+        """Run a claimed job and record its outcome"""
+        job_id, name = job.id, job.name
+        wait = max(0.0, (job.started_at - job.run_at).total_seconds())
+        start = time.perf_counter()
+        try:
+            handler = self.handlers.get(name)
+            if handler is None:
+                raise LookupError(f"No handler registered for job '{name}'")
+            handler(session, **(json.loads(job.payload) if job.payload else {}))
+        except Exception as e:
+            session.rollback()
+            job = session.get(Job, job_id)
+            job.last_error = f"{type(e).__name__}: {e}"
+            if job.attempts < job.max_attempts:
+                outcome = "retried"
+                job.status = "pending"
+                job.run_at = datetime.now() + timedelta(seconds=retry_delay(job.attempts))
+            else:
+                outcome = "failed"
+                job.status = "failed"
+                job.finished_at = datetime.now()
+            logger.warning(f"Job {job_id} ({name}) {outcome} after attempt {job.attempts}: {job.last_error}")
+        else:
+            outcome = "done"
+            job = session.get(Job, job_id)
+            job.status = "done"
+            job.last_error = None
+            job.finished_at = datetime.now()
+        session.commit()
+
+        with self._lock:
+            self._wait_times.append(wait)
+            self._run_times.append(time.perf_counter() - start)
+            self._outcomes[outcome] += 1
+        return outcome
+
+    def run_pending(self, worker=None, limit=None):
+        """
+        Run due jobs in the calling thread
+
+        Args:
+            worker (str): Name recorded on claimed jobs
+            limit (int): Maximum number of jobs, defaults to all that are due
+
+        Returns:
+            int: Number of jobs run
+        """
+        worker = worker or f"{self.worker_prefix}:inline"
+        processed = 0
+        session = self.session_factory()
+        try:
+            while limit is None or processed < limit:
+                job = self.claim(session, worker)
+                if job is None:
+                    break
+                self.run_job(session, job)
+                processed += 1
+        finally:
+            session.close()
+        return processed
+
+    def tick(self, now=None):
+        """Enqueue the schedules that are due"""
+        now = now or datetime.now()
+        for entry in self.schedules:
+            cron = entry["cron"]
+            if entry["next_run"] is None:
+                entry["next_run"] = cron.next_after(now)
+                continue
+            if now < entry["next_run"]:
+                continue
+
+            due = entry["next_run"]
+            self.enqueue(
+                entry["name"],
+                entry["payload"],
+                run_at=due,
+                dedupe_key=f"{entry['name']} {cron.expression} @ {due:%Y-%m-%dT%H:%M}",
+            )
+            # Runs missed while the process was busy or stopped are skipped
+            entry["next_run"] = cron.next_after(now)
+
+    def recover(self, now=None):
+        """
+        Requeue jobs left running by a process that stopped
+
+        Returns:
+            int: Number of jobs requeued or given up
+        """
+        now = now or datetime.now()
+        session = self.session_factory()
+        try:
+            stale = session.query(Job).filter(
+                Job.status == "running", Job.started_at < now - STALE_AFTER
+            )
+            recovered = stale.filter(Job.attempts < Job.max_attempts).update(
+                {"status": "pending", "run_at": now}, synchronize_session=False
+            )
+            recovered += stale.update(
+                {
+                    "status": "failed",
+                    "finished_at": now,
+                    "last_error": "Worker stopped while running the job",
+                },
+                synchronize_session=False,
+            )
+            session.commit()
+            return recovered
+        finally:
+            session.close()
+
+    def purge(self, db_session, older_than=KEEP_FINISHED, now=None):
+        """
+        Delete finished jobs
+
+        Returns:
+            int: Number of jobs deleted
+        """
+        now = now or datetime.now()
+        deleted = (
+            db_session.query(Job)
+            .filter(Job.status.in_(("done", "failed")), Job.finished_at < now - older_than)
+            .delete(synchronize_session=False)
+        )
+        db_session.commit()
+        return deleted
+
+    def metrics(self, now=None):
+        """
+        Queue depth and latency of recent jobs
+
+        Returns:
+            dict: Jobs per status, due jobs and the age of the oldest, job
+                  outcomes and p50/p95 of queue wait and run time in seconds
+                  since this process started
+        """
+        now = now or datetime.now()
+        session = self.session_factory()
+        try:
+            depth = dict(
+                session.query(Job.status, func.count(Job.id)).group_by(Job.status).all()
+            )
+            due, oldest = (
+                session.query(func.count(Job.id), func.min(Job.run_at))
+                .filter(Job.status == "pending", Job.run_at <= now)
+                .one()
+            )
+        finally:
+            session.close()
+
+        with self._lock:
+            wait_times, run_times = list(self._wait_times), list(self._run_times)
+            outcomes = dict(self._outcomes)
+
+        return {
+            "workers": sum(thread.is_alive() for thread in self._threads),
+            "queue": {status: depth.get(status, 0) for status in JOB_STATUSES},
+            "due": due,
+            "oldest_due_seconds": round((now - oldest).total_seconds(), 1) if oldest else None,
+            "outcomes": outcomes,
+            "wait_seconds": percentiles(wait_times),
+            "run_seconds": percentiles(run_times),
+        }
+
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self, workers=2):
+        """Start the worker threads and the scheduler"""
+        if self.running:
+            return
+        self._stop.clear()
+        self.recover()
+
+        self._threads = [
+            threading.Thread(
+                target=self._work,
+                args=(f"{self.worker_prefix}:{index}",),
+                name=f"job-worker-{index}",
+                daemon=True,
+            )
+            for index in range(workers)
+        ]
+        self._threads.append(
+            threading.Thread(target=self._schedule_loop, name="job-scheduler", daemon=True)
+        )
+        for thread in self._threads:
+            thread.start()
+        atexit.register(self.stop)
+        logger.info(f"Started {workers} job workers")
+
+    def stop(self, timeout=5):
+        """Stop the worker threads, letting running jobs finish"""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _work(self, worker):
+        while not self._stop.is_set():
+            try:
+                processed = self.run_pending(worker, limit=1)
+            except Exception as e:
+                logger.error(f"Job worker {worker} error: {str(e)}")
+                processed = 0
+            if not processed and self._wake.wait(self.poll_seconds):
+                self._wake.clear()
+
+    def _schedule_loop(self):
+        ticks = 0
+        while not self._stop.is_set():
+            try:
+                self.tick()
+                ticks += 1
+                if ticks % RECOVER_EVERY_TICKS == 0:
+                    self.recover()
+            except Exception as e:
+                logger.error(f"Job scheduler error: {str(e)}")
+            self._stop.wait(self.poll_seconds)
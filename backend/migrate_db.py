@@ -1,11 +1,21 @@
 #!/usr/bin/env python3
 """
 Database migration script for MindfulWealth application
+
+Schema changes are numbered migrations applied by migrations.MigrationRunner,
+which records the applied versions in the database. Tables are rebuilt by
+copying rows in batches that hold the write lock briefly, and a migration
+stopped halfway resumes where it was on the next run.
+
+Usage:
+    python migrate_db.py                      # back up, then apply pending migrations
+    python migrate_db.py --status             # list applied and pending migrations
+    python migrate_db.py --max-lock-ms 50     # shorter write locks, more batches
 """
 import os
 import sys
 import pathlib
-import sqlite3
+import argparse
 from sqlalchemy import create_engine, inspect
 from dotenv import load_dotenv
 
@@ -16,6 +26,7 @@ if current_dir not in sys.path:
 
 # Import models after adding current directory to path
 from models import Base, User, Transaction, Budget, SavedImpulse
+from migrations import DEFAULT_BATCH_SIZE, DEFAULT_MAX_LOCK_MS, Migration, MigrationRunner
 
 # Load environment variables
 load_dotenv()
@@ -50,201 +61,213 @@ def check_column_exists(conn, table_name, column_name):
     columns = cursor.fetchall()
     return any(column[1] == column_name for column in columns)
 
-def recreate_users_table(conn):
-    """Recreate the users table with the updated schema"""
+USERS_TABLE_SQL = '''
+CREATE TABLE {name} (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT UNIQUE,
+    password_hash TEXT,
+    is_demo BOOLEAN DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_login TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    theme_preference TEXT DEFAULT 'dark',
+    layout_preference TEXT DEFAULT 'gradient',
+    language_preference TEXT DEFAULT 'fr',
+    personality_preference TEXT DEFAULT 'nice'
+)
+'''
+
+SAVED_IMPULSES_TABLE_SQL = '''
+CREATE TABLE {name} (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER,
+    description TEXT NOT NULL,
+    amount FLOAT NOT NULL,
+    category TEXT,
+    date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    projected_value_1yr FLOAT NOT NULL,
+    projected_value_5yr FLOAT NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users (id)
+)
+'''
+
+def get_column_names(conn, table_name):
+    """Names of the columns of a table"""
+    return [column[1] for column in conn.execute(f"PRAGMA table_info({table_name});").fetchall()]
+
+def recreate_users_table(migrator):
+    """Recreate the users table with the updated schema, copying rows in batches"""
     print("Recreating users table...")
-    
-    # Create a temporary table with the new schema
-    conn.execute('''
-    CREATE TABLE users_new (
-        id INTEGER PRIMARY KEY,
-        name TEXT NOT NULL,
-        email TEXT UNIQUE,
-        password_hash TEXT,
-        is_demo BOOLEAN DEFAULT 0,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        last_login TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        theme_preference TEXT DEFAULT 'dark',
-        layout_preference TEXT DEFAULT 'gradient',
-        language_preference TEXT DEFAULT 'fr',
-        personality_preference TEXT DEFAULT 'nice'
-    )
-    ''')
-    
-    # Copy data from the old table to the new one
-    try:
-        # First check if the old table has all the columns
-        columns = conn.execute("PRAGMA table_info(users)").fetchall()
-        column_names = [column[1] for column in columns]
-        
-        # Build the column list for the INSERT statement
-        old_columns = []
-        new_columns = []
-        
-        # Always include these core columns
-        core_columns = ['id', 'name', 'email', 'password_hash', 'is_demo', 'created_at', 'last_login']
-        for col in core_columns:
-            if col in column_names:
-                old_columns.append(col)
-                new_columns.append(col)
-        
-        # Check for preference columns
-        preference_columns = {
-            'theme_preference': 'dark',
-            'layout_preference': 'gradient',
-            'language_preference': 'fr',
-            'personality_preference': 'nice'
-        }
-        
-        for col, default in preference_columns.items():
-            if col in column_names:
-                old_columns.append(col)
-                new_columns.append(col)
-            else:
-                # If the column doesn't exist in the old table, use a default value
-                new_columns.append(f"'{default}' AS {col}")
-        
-        # Build and execute the INSERT statement
-        insert_sql = f'''
-        INSERT INTO users_new ({', '.join(new_columns)})
-        SELECT {', '.join(old_columns if len(old_columns) == len(new_columns) else new_columns)}
-        FROM users
-        '''
-        
-        conn.execute(insert_sql)
-        print(f"Copied {conn.execute('SELECT COUNT(*) FROM users_new').fetchone()[0]} rows to new users table")
-        
-    except Exception as e:
-        print(f"Error copying data to new users table: {e}")
-        raise
-    
-    # Drop the old table and rename the new one
-    conn.execute("DROP TABLE users")
-    conn.execute("ALTER TABLE users_new RENAME TO users")
+    column_names = get_column_names(migrator.conn, 'users')
+
+    # Always include these core columns, missing ones take the column default
+    core_columns = ['id', 'name', 'email', 'password_hash', 'is_demo', 'created_at', 'last_login']
+    columns = {col: f"{{row}}.{col}" for col in core_columns if col in column_names}
+
+    # Preference columns missing from the old table get their default value
+    preference_columns = {
+        'theme_preference': 'dark',
+        'layout_preference': 'gradient',
+        'language_preference': 'fr',
+        'personality_preference': 'nice'
+    }
+    for col, default in preference_columns.items():
+        columns[col] = f"{{row}}.{col}" if col in column_names else f"'{default}'"
+
+    migrator.rebuild_table('users', USERS_TABLE_SQL, columns)
     print("Users table recreated successfully")
 
-def recreate_saved_impulses_table(conn):
-    """Recreate the saved_impulses table with the new schema"""
+def recreate_saved_impulses_table(migrator):
+    """Recreate the saved_impulses table with the new schema, copying rows in batches"""
     # Check if the table exists
-    if not check_table_exists(conn, 'saved_impulses'):
+    if not check_table_exists(migrator.conn, 'saved_impulses'):
         print("saved_impulses table doesn't exist, skipping recreation")
         return
-        
-    # Get existing data
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM saved_impulses;")
-    impulses_data = cursor.fetchall()
-    
-    # Get column names
-    cursor.execute("PRAGMA table_info(saved_impulses);")
-    columns = cursor.fetchall()
-    column_names = [column[1] for column in columns]
-    
-    # Create a temporary table with the new schema
-    cursor.execute("""
-    CREATE TABLE saved_impulses_new (
-        id INTEGER PRIMARY KEY,
-        user_id INTEGER,
-        description TEXT NOT NULL,
-        amount FLOAT NOT NULL,
-        category TEXT,
-        date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        projected_value_1yr FLOAT NOT NULL,
-        projected_value_5yr FLOAT NOT NULL,
-        FOREIGN KEY (user_id) REFERENCES users (id)
-    );
-    """)
-    
-    # Copy data from old table to new table
-    for impulse in impulses_data:
-        # Create a dictionary of column name to value
-        impulse_dict = {column_names[i]: impulse[i] for i in range(len(column_names))}
-        
-        # Handle column name differences
-        if 'item' in impulse_dict and 'description' not in impulse_dict:
-            impulse_dict['description'] = impulse_dict['item']
-        
-        if 'potential_value' in impulse_dict and 'projected_value_1yr' not in impulse_dict:
-            impulse_dict['projected_value_1yr'] = impulse_dict['potential_value']
-            # Set a default value for projected_value_5yr if it doesn't exist
-            if 'projected_value_5yr' not in impulse_dict:
-                impulse_dict['projected_value_5yr'] = float(impulse_dict['potential_value']) * (1.07 ** 5)
-        
-        # Determine which columns to insert
-        valid_columns = []
-        valid_values = []
-        
-        for col in ['id', 'user_id', 'description', 'amount', 'category', 'date', 'projected_value_1yr', 'projected_value_5yr']:
-            if col in impulse_dict:
-                valid_columns.append(col)
-                valid_values.append(impulse_dict[col])
-            elif col == 'description' and 'item' in impulse_dict:
-                valid_columns.append('description')
-                valid_values.append(impulse_dict['item'])
-            elif col == 'projected_value_1yr' and 'potential_value' in impulse_dict:
-                valid_columns.append('projected_value_1yr')
-                valid_values.append(impulse_dict['potential_value'])
-            elif col == 'projected_value_5yr' and 'potential_value' in impulse_dict:
-                valid_columns.append('projected_value_5yr')
-                valid_values.append(float(impulse_dict['potential_value']) * (1.07 ** 5))
-        
-        if valid_columns:
-            placeholders = ", ".join(["?" for _ in range(len(valid_columns))])
-            columns_str = ", ".join(valid_columns)
-            
-            cursor.execute(f"INSERT INTO saved_impulses_new ({columns_str}) VALUES ({placeholders});", valid_values)
-    
-    # Drop the old table
-    cursor.execute("DROP TABLE saved_impulses;")
-    
-    # Rename the new table to the original name
-    cursor.execute("ALTER TABLE saved_impulses_new RENAME TO saved_impulses;")
-    
+    column_names = get_column_names(migrator.conn, 'saved_impulses')
+
+    columns = {
+        col: f"{{row}}.{col}"
+        for col in ['id', 'user_id', 'description', 'amount', 'category', 'date',
+                    'projected_value_1yr', 'projected_value_5yr']
+        if col in column_names
+    }
+
+    # Handle column name differences
+    if 'description' not in columns and 'item' in column_names:
+        columns['description'] = "{row}.item"
+    if 'potential_value' in column_names:
+        columns.setdefault('projected_value_1yr', "{row}.potential_value")
+        columns.setdefault('projected_value_5yr', f"CAST({{row}}.potential_value AS REAL) * {1.07 ** 5!r}")
+
+    migrator.rebuild_table('saved_impulses', SAVED_IMPULSES_TABLE_SQL, columns)
     print("saved_impulses table recreated with new schema")
 
-def migrate_database():
-    """Migrate the database to the latest schema"""
+def migrate_users_table(migrator):
+    """Recreate the users table if columns of the current schema are missing"""
+    if not check_table_exists(migrator.conn, 'users'):
+        return
+    missing_columns = [
+        column_name
+        for column_name in ['email', 'password_hash', 'is_demo', 'created_at', 'last_login']
+        if not check_column_exists(migrator.conn, 'users', column_name)
+    ]
+    if missing_columns:
+        print(f"Missing columns in users table: {', '.join(missing_columns)}")
+        recreate_users_table(migrator)
+
+def migrate_saved_impulses_table(migrator):
+    """Recreate the saved_impulses table if it still uses the frontend column names"""
+    conn = migrator.conn
+    if not check_table_exists(conn, 'saved_impulses'):
+        return
+    has_description = check_column_exists(conn, 'saved_impulses', 'description')
+    has_item = check_column_exists(conn, 'saved_impulses', 'item')
+    has_projected_value_1yr = check_column_exists(conn, 'saved_impulses', 'projected_value_1yr')
+    has_potential_value = check_column_exists(conn, 'saved_impulses', 'potential_value')
+
+    if (has_item and not has_description) or (has_potential_value and not has_projected_value_1yr):
+        print("Column name discrepancies found in saved_impulses table")
+        recreate_saved_impulses_table(migrator)
+
+def add_personality_preference(migrator):
+    """Add the personality preference to users, existing users get the nice personality"""
+    if not check_table_exists(migrator.conn, 'users'):
+        return
+    if not check_column_exists(migrator.conn, 'users', 'personality_preference'):
+        print("Adding personality_preference column to users table")
+        with migrator.transaction() as conn:
+            conn.execute("ALTER TABLE users ADD COLUMN personality_preference TEXT DEFAULT 'nice'")
+    migrator.update_in_batches(
+        'users', "personality_preference = 'nice'",
+        "personality_preference IS NULL OR personality_preference = ''",
+    )
+
+def add_currency_columns(conn):
+    """Add the currency column to tables storing amounts, defaulting to EUR"""
+    for table_name in ['transactions', 'saved_impulses', 'incomes']:
+        if check_table_exists(conn, table_name) and not check_column_exists(conn, table_name, 'currency'):
+            print(f"Adding currency column to {table_name} table")
+            conn.execute(f"ALTER TABLE {table_name} ADD COLUMN currency VARCHAR(3) NOT NULL DEFAULT 'EUR'")
+
+def add_user_date_indexes(conn):
+    """Index tables listed in date order per user (activity feed, monthly totals)"""
+    for table_name in ['transactions', 'saved_impulses', 'incomes']:
+        if check_table_exists(conn, table_name):
+            conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{table_name}_user_date ON {table_name} (user_id, date)")
+
+def add_budget_unique_key(conn):
+    """Make budgets unique per category and month, keeping the latest duplicate"""
+    if not check_table_exists(conn, 'budgets'):
+        return
+    for column_name in ['created_at', 'updated_at']:
+        if not check_column_exists(conn, 'budgets', column_name):
+            print(f"Adding {column_name} column to budgets table")
+            conn.execute(f"ALTER TABLE budgets ADD COLUMN {column_name} DATETIME")
+    conn.execute('''
+    DELETE FROM budgets WHERE id NOT IN (
+        SELECT MAX(id) FROM budgets GROUP BY user_id, category, month, year
+    )
+    ''')
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_budgets_user_category_month "
+        "ON budgets (user_id, category, month, year)"
+    )
+
+def add_sync_columns(conn):
+    """Add the change versions used by delta sync, existing rows start at version 0"""
+    if check_table_exists(conn, 'users'):
+        for column_name in ['change_version', 'sync_floor']:
+            if not check_column_exists(conn, 'users', column_name):
+                print(f"Adding {column_name} column to users table")
+                conn.execute(f"ALTER TABLE users ADD COLUMN {column_name} INTEGER NOT NULL DEFAULT 0")
+    for table_name in ['transactions', 'budgets', 'saved_impulses']:
+        if not check_table_exists(conn, table_name):
+            continue
+        if not check_column_exists(conn, table_name, 'updated_at'):
+            print(f"Adding updated_at column to {table_name} table")
+            conn.execute(f"ALTER TABLE {table_name} ADD COLUMN updated_at DATETIME")
+        if not check_column_exists(conn, table_name, 'version'):
+            print(f"Adding version column to {table_name} table")
+            conn.execute(f"ALTER TABLE {table_name} ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{table_name}_user_version ON {table_name} (user_id, version)")
+
+# Applied in version order, each once per database. Earlier versions of this
+# script ran every step on each start, so all of them check whether they are
+# still needed.
+MIGRATIONS = [
+    Migration(1, "users_schema", migrate_users_table, online=True),
+    Migration(2, "saved_impulses_columns", migrate_saved_impulses_table, online=True),
+    Migration(3, "personality_preference", add_personality_preference, online=True),
+    # Amounts recorded before currencies were tracked are in EUR
+    Migration(4, "currency_columns", add_currency_columns),
+    Migration(5, "user_date_indexes", add_user_date_indexes),
+    Migration(6, "budget_unique_key", add_budget_unique_key),
+    Migration(7, "sync_columns", add_sync_columns),
+]
+
+def migrate_database(**options):
+    """
+    Migrate the database to the latest schema
+
+    Args:
+        **options: Batch size, lock bound and progress callback of the
+                   MigrationRunner
+    """
     db_path = get_db_path()
-    
-    # Create a SQLite connection
-    conn = sqlite3.connect(db_path)
-    
+
+    runner = MigrationRunner(db_path, MIGRATIONS, **options)
     try:
-        # Check if users table exists
-        if check_table_exists(conn, 'users'):
-            # Check if any of the new columns are missing
-            missing_columns = []
-            for column_name in ['email', 'password_hash', 'is_demo', 'created_at', 'last_login']:
-                if not check_column_exists(conn, 'users', column_name):
-                    missing_columns.append(column_name)
-            
-            # If any columns are missing, recreate the table
-            if missing_columns:
-                print(f"Missing columns in users table: {', '.join(missing_columns)}")
-                recreate_users_table(conn)
-        
-        # Check if saved_impulses table exists and migrate if needed
-        if check_table_exists(conn, 'saved_impulses'):
-            # Check for column name discrepancies
-            has_description = check_column_exists(conn, 'saved_impulses', 'description')
-            has_item = check_column_exists(conn, 'saved_impulses', 'item')
-            
-            has_projected_value_1yr = check_column_exists(conn, 'saved_impulses', 'projected_value_1yr')
-            has_potential_value = check_column_exists(conn, 'saved_impulses', 'potential_value')
-            
-            # If there's a mismatch between model and database column names, recreate the table
-            if (has_item and not has_description) or (has_potential_value and not has_projected_value_1yr):
-                print("Column name discrepancies found in saved_impulses table")
-                recreate_saved_impulses_table(conn)
-        
-        # Commit changes
-        conn.commit()
+        applied = runner.run()
     except Exception as e:
-        conn.rollback()
         print(f"Error during migration: {e}")
+        print("Run the migration again to resume it")
         raise
     finally:
-        conn.close()
+        runner.close()
+    if applied:
+        stats = runner.stats
+        print(f"Applied migrations {', '.join(map(str, applied))}: {stats['rows']} rows in "
+              f"{stats['batches']} batches, write lock held {stats['max_lock_ms']} ms at most")
     
     # Now use SQLAlchemy to ensure all tables are created
     DATABASE_URL = f"sqlite:///{db_path}"
@@ -267,13 +290,41 @@ def migrate_database():
     
     print("Database migration completed successfully")
 
+def print_status():
+    """List the applied and pending migrations"""
+    runner = MigrationRunner(get_db_path(), MIGRATIONS)
+    try:
+        applied = runner.applied()
+        for migration in runner.migrations:
+            state = "applied" if migration.version in applied else "pending"
+            print(f"{migration.version:>4}  {migration.name:<28} {state}")
+        for table, copied, total in runner.conn.execute(
+            "SELECT table_name, copied, total FROM migration_progress"
+        ):
+            print(f"Interrupted copy of {table}: {copied}/{total} rows")
+    finally:
+        runner.close()
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate the MindfulWealth database")
+    parser.add_argument("--status", action="store_true", help="List applied and pending migrations")
+    parser.add_argument("--no-backup", action="store_true", help="Skip the copy of the database file")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows of the first batch")
+    parser.add_argument("--max-lock-ms", type=float, default=DEFAULT_MAX_LOCK_MS,
+                        help="Longest time a batch should hold the write lock")
+    args = parser.parse_args()
+
+    if args.status:
+        print_status()
+        sys.exit(0)
+
     print("Starting database migration...")
     
     # Create a backup of the existing database
-    backup_database()
+    if not args.no_backup:
+        backup_database()
     
     # Migrate the database
-    migrate_database()
+    migrate_database(batch_size=args.batch_size, max_lock_ms=args.max_lock_ms)
     
     print("Migration completed successfully!") 
\ No newline at end of file
@@ -0,0 +1,285 @@
+"""
+Versioned schema migrations for MindfulWealth application
+
+Applied migrations are recorded in the schema_migrations table, so every
+migration runs once per database. Simple migrations run in one transaction
+together with their version row. Online migrations rebuild tables while the
+application keeps using them: the new table is created with triggers that
+mirror every write to the old one, existing rows are copied in short
+batches, each its own transaction, and the tables are swapped at the end.
+The id of the last copied row is kept in the migration_progress table, so a
+migration stopped halfway resumes where it was.
+
+Batches are sized so a transaction holds the write lock for at most about
+max_lock_ms: the size is halved after a slower batch and doubled after a
+much faster one, and the runner pauses between batches so that requests
+waiting for the lock get it. Statements that cannot be split, like building
+an index, still hold the lock for as long as they take.
+
+Migrations must be idempotent, one interrupted before its version was
+recorded runs again.
+"""
+import os
+import time
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+# Rows copied by the first batch, later ones adapt to the lock bound
+DEFAULT_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", 1000))
+MAX_BATCH_SIZE = 50000
+
+# Longest time a batch should hold the write lock, and the pause after it
+DEFAULT_MAX_LOCK_MS = float(os.getenv("MIGRATION_MAX_LOCK_MS", 200))
+DEFAULT_PAUSE_MS = float(os.getenv("MIGRATION_PAUSE_MS", 20))
+
+# Time waited for the application to release the lock before giving up
+BUSY_TIMEOUT_MS = int(os.getenv("MIGRATION_BUSY_TIMEOUT_MS", 5000))
+
+# Below every id, where copies start
+MIN_ID = -(2 ** 63)
+
+
+class Migration:
+    """
+    One schema change
+
+    Args:
+        version (int): Order of the migration, recorded once applied
+        name (str): Short description
+        apply (callable): Takes the connection, in a transaction, or the
+                          runner for online migrations
+        online (bool): Whether apply manages its own transactions, see
+                       MigrationRunner.rebuild_table
+    """
+
+    def __init__(self, version, name, apply, online=False):
+        self.version = version
+        self.name = name
+        self.apply = apply
+        self.online = online
+
+
+def print_progress(table, copied, total):
+    percent = 100 * copied / total if total else 100.0
+    print(f"  {table}: {copied}/{total} rows copied ({percent:.1f}%)")
+
+
+class MigrationRunner:
+    """Applies pending migrations to a SQLite database"""
+
+    def __init__(self, path, migrations, batch_size=DEFAULT_BATCH_SIZE, max_lock_ms=DEFAULT_MAX_LOCK_MS,
+                 pause_ms=DEFAULT_PAUSE_MS, progress=print_progress):
+        versions = [migration.version for migration in migrations]
+        if len(set(versions)) != len(versions):
+            raise ValueError("Migration versions must be unique")
+        self.migrations = sorted(migrations, key=lambda migration: migration.version)
+        self.batch_size = batch_size
+        self.max_lock_ms = max_lock_ms
+        self.pause_ms = pause_ms
+        self.progress = progress
+        self.stats = {"batches": 0, "rows": 0, "max_lock_ms": 0.0}
+        self.last_lock_ms = 0.0
+
+        # Transactions are opened explicitly, see transaction()
+        self.conn = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        self.conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, name TEXT NOT NULL, applied_at TIMESTAMP NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS migration_progress ("
+            "table_name TEXT PRIMARY KEY, last_id INTEGER NOT NULL, copied INTEGER NOT NULL, "
+            "total INTEGER NOT NULL, updated_at TIMESTAMP NOT NULL)"
+        )
+
+    def close(self):
+        self.conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction, its lock time counted in the stats"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        start = time.perf_counter()
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        lock_ms = (time.perf_counter() - start) * 1000
+        self.stats["max_lock_ms"] = max(self.stats["max_lock_ms"], round(lock_ms, 1))
+        self.last_lock_ms = lock_ms
+
+    def applied(self):
+        """Versions of the migrations applied so far"""
+        return {row[0] for row in self.conn.execute("SELECT version FROM schema_migrations")}
+
+    def pending(self):
+        applied = self.applied()
+        return [migration for migration in self.migrations if migration.version not in applied]
+
+    def record(self, conn, migration):
+        conn.execute(
+            "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+            (migration.version, migration.name, datetime.now().isoformat(sep=" ")),
+        )
+
+    def run(self):
+        """
+        Apply the pending migrations in version order
+
+        Returns:
+            list: Versions applied by this run
+        """
+        done = []
+        for migration in self.pending():
+            print(f"Applying migration {migration.version}: {migration.name}")
+            if migration.online:
+                migration.apply(self)
+                with self.transaction() as conn:
+                    self.record(conn, migration)
+            else:
+                with self.transaction() as conn:
+                    migration.apply(conn)
+                    self.record(conn, migration)
+            done.append(migration.version)
+        return done
+
+    def columns(self, table):
+        return [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+
+    def common_columns(self, table, new_table):
+        """Columns both tables have, copied unchanged"""
+        new_columns = set(self.columns(new_table))
+        return {column: f"{{row}}.{column}" for column in self.columns(table) if column in new_columns}
+
+    def next_batch_size(self, batch_size):
+        """Size of the next batch, from the lock time of the last one"""
+        if self.last_lock_ms > self.max_lock_ms:
+            return max(1, batch_size // 2)
+        if self.last_lock_ms < self.max_lock_ms / 4:
+            return min(MAX_BATCH_SIZE, batch_size * 2)
+        return batch_size
+
+    def rebuild_table(self, table, create_sql, columns=None, indexes=()):
+        """
+        Replace a table by one with a new schema, copying its rows in batches
+
+        Both tables must be keyed by an INTEGER PRIMARY KEY id. Writes made
+        to the old table during the copy reach the new one through triggers.
+
+        Args:
+            table (str): Table rebuilt
+            create_sql (str): CREATE TABLE statement with {name} in place of
+                              the table name
+            columns (dict): New column -> SQL expression over the old row,
+                            written {row}.column; defaults to the columns
+                            both tables have
+            indexes (list): CREATE INDEX statements run after the swap
+        """
+        new_table = f"{table}_new"
+        state = self.conn.execute(
+            "SELECT last_id, copied, total FROM migration_progress WHERE table_name = ?", (table,)
+        ).fetchone()
+
+        if state is None:
+            with self.transaction() as conn:
+                # A copy left by the one-statement migrations of old versions
+                conn.execute(f"DROP TABLE IF EXISTS {new_table}")
+                conn.execute(create_sql.format(name=new_table))
+                columns = columns or self.common_columns(table, new_table)
+                self.create_triggers(conn, table, new_table, columns)
+                total = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                conn.execute(
+                    "INSERT INTO migration_progress (table_name, last_id, copied, total, updated_at) "
+                    "VALUES (?, ?, 0, ?, ?)",
+                    (table, MIN_ID, total, datetime.now().isoformat(sep=" ")),
+                )
+            last_id, copied = MIN_ID, 0
+        else:
+            last_id, copied, total = state
+            print(f"  {table}: resuming after {copied} rows")
+            columns = columns or self.common_columns(table, new_table)
+
+        names = ", ".join(columns)
+        values = ", ".join(expression.replace("{row}", "src") for expression in columns.values())
+        batch_size = self.batch_size
+        while True:
+            with self.transaction() as conn:
+                upper = conn.execute(
+                    f"SELECT MAX(id) FROM (SELECT id FROM {table} WHERE id > ? ORDER BY id LIMIT ?)",
+                    (last_id, batch_size),
+                ).fetchone()[0]
+                if upper is None:
+                    break
+                # Rows already mirrored by the triggers are newer, keep them
+                cursor = conn.execute(
+                    f"INSERT OR IGNORE INTO {new_table} ({names}) "
+                    f"SELECT {values} FROM {table} AS src WHERE src.id > ? AND src.id <= ? ORDER BY src.id",
+                    (last_id, upper),
+                )
+                last_id, copied = upper, copied + cursor.rowcount
+                conn.execute(
+                    "UPDATE migration_progress SET last_id = ?, copied = ?, updated_at = ? WHERE table_name = ?",
+                    (last_id, copied, datetime.now().isoformat(sep=" "), table),
+                )
+            self.stats["batches"] += 1
+            self.stats["rows"] += cursor.rowcount
+            if self.progress:
+                self.progress(table, copied, max(total, copied))
+            batch_size = self.next_batch_size(batch_size)
+            time.sleep(self.pause_ms / 1000)
+
+        with self.transaction() as conn:
+            # Dropping the old table drops the triggers mirroring its writes
+            conn.execute(f"DROP TABLE {table}")
+            conn.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+            for statement in indexes:
+                conn.execute(statement)
+            conn.execute("DELETE FROM migration_progress WHERE table_name = ?", (table,))
+        print(f"  {table}: rebuilt, {copied} rows copied")
+
+    def create_triggers(self, conn, table, new_table, columns):
+        """Mirror inserts, updates and deletes of a table to its rebuilt copy"""
+        names = ", ".join(columns)
+        values = ", ".join(expression.replace("{row}", "NEW") for expression in columns.values())
+        conn.execute(
+            f"CREATE TRIGGER {table}_migrate_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT OR REPLACE INTO {new_table} ({names}) VALUES ({values}); END"
+        )
+        conn.execute(
+            f"CREATE TRIGGER {table}_migrate_update AFTER UPDATE ON {table} BEGIN "
+            f"DELETE FROM {new_table} WHERE id = OLD.id; "
+            f"INSERT OR REPLACE INTO {new_table} ({names}) VALUES ({values}); END"
+        )
+        conn.execute(
+            f"CREATE TRIGGER {table}_migrate_delete AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM {new_table} WHERE id = OLD.id; END"
+        )
+
+    def update_in_batches(self, table, assignments, condition, parameters=()):
+        """
+        Run an UPDATE over a large table in batches of bounded lock time
+
+        The condition must no longer hold for updated rows.
+
+        Returns:
+            int: Number of rows updated
+        """
+        updated, batch_size = 0, self.batch_size
+        while True:
+            with self.transaction() as conn:
+                cursor = conn.execute(
+                    f"UPDATE {table} SET {assignments} WHERE id IN "
+                    f"(SELECT id FROM {table} WHERE {condition} LIMIT ?)",
+                    (*parameters, batch_size),
+                )
+            if cursor.rowcount <= 0:
+                return updated
+            updated += cursor.rowcount
+            self.stats["batches"] += 1
+            self.stats["rows"] += cursor.rowcount
+            batch_size = self.next_batch_size(batch_size)
+            time.sleep(self.pause_ms / 1000)
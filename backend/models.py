@@ -1,15 +1,17 @@
 """
 Database models for MindfulWealth application
 """
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 import uuid
 from sqlalchemy.orm import relationship
+from projections import future_value
 
 Base = declarative_base()
 
+
 class User(Base):
     """User model representing application users"""
     __tablename__ = 'users'
@@ -25,11 +27,17 @@ class User(Base):
     layout_preference = Column(String, default='gradient')
     language_preference = Column(String, default='fr')
     personality_preference = Column(String, default='nice')
+    # Last version given to a change of the user's synced records
+    change_version = Column(Integer, nullable=False, default=0)
+    # Newest version whose tombstones were purged, older sync versions resync
+    sync_floor = Column(Integer, nullable=False, default=0)
     
     # Relationships
     transactions = relationship("Transaction", back_populates="user")
     saved_impulses = relationship("SavedImpulse", back_populates="user", cascade="all, delete-orphan")
     budgets = relationship("Budget", back_populates="user", cascade="all, delete-orphan")
+    goals = relationship("Goal", back_populates="user", cascade="all, delete-orphan")
+    incomes = relationship("Income", back_populates="user", cascade="all, delete-orphan")
     
     def set_password(self, password):
         """Set password hash from plain text password"""
@@ -72,9 +80,14 @@ class User(Base):
             'personality_preference': self.personality_preference
         }
 
+
 class Transaction(Base):
     """Transaction model for tracking user spending"""
     __tablename__ = 'transactions'
+    __table_args__ = (
+        Index('ix_transactions_user_date', 'user_id', 'date'),
+        Index('ix_transactions_user_version', 'user_id', 'version'),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -83,17 +96,21 @@ class Transaction(Base):
     date = Column(DateTime, default=datetime.utcnow)
     description = Column(String(255))
     is_impulse = Column(Boolean, default=False)
+    currency = Column(String(3), nullable=False, default='EUR')
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    version = Column(Integer, nullable=False, default=0)  # User's change version of the last write
     
     # Relationships
     user = relationship("User", back_populates="transactions")
     
-    def __init__(self, user_id, amount, category, date=None, description=None, is_impulse=False):
+    def __init__(self, user_id, amount, category, date=None, description=None, is_impulse=False, currency='EUR'):
         self.user_id = user_id
         self.amount = amount
         self.category = category
         self.date = date or datetime.utcnow()
         self.description = description
         self.is_impulse = is_impulse
+        self.currency = currency or 'EUR'
     
     def __repr__(self):
         return f"<Transaction(id={self.id}, category='{self.category}', amount={self.amount})>"
@@ -105,12 +122,19 @@ class Transaction(Base):
             'category': self.category,
             'date': self.date.isoformat() if self.date else None,
             'description': self.description,
-            'is_impulse': self.is_impulse
+            'is_impulse': self.is_impulse,
+            'currency': self.currency
         }
 
+
 class Budget(Base):
     """Budget model for tracking planned spending by category"""
     __tablename__ = 'budgets'
+    # One budget per category and month, written with INSERT ... ON CONFLICT
+    __table_args__ = (
+        UniqueConstraint('user_id', 'category', 'month', 'year', name='uq_budgets_user_category_month'),
+        Index('ix_budgets_user_version', 'user_id', 'version'),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -118,6 +142,9 @@ class Budget(Base):
     planned_amount = Column(Float, nullable=False)
     month = Column(Integer, nullable=False)
     year = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    version = Column(Integer, nullable=False, default=0)  # User's change version of the last write
     
     # Relationships
     user = relationship("User", back_populates="budgets")
@@ -141,9 +168,14 @@ class Budget(Base):
             'year': self.year
         }
 
+
 class SavedImpulse(Base):
     """Model for tracking redirected impulse purchases and their projected investment growth"""
     __tablename__ = 'saved_impulses'
+    __table_args__ = (
+        Index('ix_saved_impulses_user_date', 'user_id', 'date'),
+        Index('ix_saved_impulses_user_version', 'user_id', 'version'),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -154,20 +186,24 @@ class SavedImpulse(Base):
     projected_value_1yr = Column(Float, nullable=False)
     projected_value_5yr = Column(Float, nullable=False)
     notes = Column(Text)
+    currency = Column(String(3), nullable=False, default='EUR')
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    version = Column(Integer, nullable=False, default=0)  # User's change version of the last write
     
     # Relationships
     user = relationship("User", back_populates="saved_impulses")
     
-    def __init__(self, user_id, description, category, amount, notes=None):
+    def __init__(self, user_id, description, category, amount, notes=None, currency='EUR'):
         self.user_id = user_id
         self.description = description
         self.category = category
         self.amount = amount
         self.notes = notes
+        self.currency = currency or 'EUR'
         
-        # Calculate projected growth (8% annual return)
-        self.projected_value_1yr = round(amount * 1.08, 2)
-        self.projected_value_5yr = round(amount * (1.08 ** 5), 2)
+        # Calculate projected growth at the default annual return
+        self.projected_value_1yr = future_value(amount, 1)
+        self.projected_value_5yr = future_value(amount, 5)
     
     def to_dict(self):
         return {
@@ -178,5 +214,367 @@ class SavedImpulse(Base):
             'date': self.date.isoformat() if self.date else None,
             'projected_value_1yr': self.projected_value_1yr,
             'projected_value_5yr': self.projected_value_5yr,
-            'notes': self.notes
-        } 
\ No newline at end of file
+            'notes': self.notes,
+            'currency': self.currency
+        }
+
+
+class Goal(Base):
+    """Savings goal (in EUR) whose progress is updated as impulses and transactions are saved"""
+    __tablename__ = 'goals'
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    name = Column(String(100), nullable=False)
+    target_amount = Column(Float, nullable=False)
+    current_amount = Column(Float, nullable=False, default=0.0)
+    deadline = Column(DateTime, nullable=True)
+    # Comma-separated linked categories; empty means every saved impulse counts
+    categories = Column(Text)
+    created_at = Column(DateTime, default=datetime.now)
+    
+    # Relationships
+    user = relationship("User", back_populates="goals")
+    
+    def __init__(self, user_id, name, target_amount, deadline=None, categories=None, current_amount=0.0):
+        self.user_id = user_id
+        self.name = name
+        self.target_amount = target_amount
+        self.deadline = deadline
+        self.categories = ','.join(c.strip() for c in categories or [] if c.strip()) or None
+        self.current_amount = current_amount
+    
+    @property
+    def category_list(self):
+        """Linked categories, lowercased"""
+        if not self.categories:
+            return []
+        return [c.lower() for c in self.categories.split(',')]
+    
+    def __repr__(self):
+        return f"<Goal(id={self.id}, name='{self.name}', target_amount={self.target_amount})>"
+    
+    def to_dict(self):
+        current = round(self.current_amount or 0.0, 2)
+        progress = 0
+        if self.target_amount > 0:
+            progress = max(0, min(100, round(current / self.target_amount * 100)))
+        return {
+            'id': self.id,
+            'name': self.name,
+            'current': current,
+            'target': self.target_amount,
+            'progress': progress,
+            'deadline': self.deadline.isoformat() if self.deadline else None,
+            'categories': self.categories.split(',') if self.categories else [],
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class Income(Base):
+    """Income model for tracking money received (salary, freelance, refunds...)"""
+    __tablename__ = 'incomes'
+    __table_args__ = (Index('ix_incomes_user_date', 'user_id', 'date'),)
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    amount = Column(Float, nullable=False)
+    source = Column(String(100), nullable=False)
+    date = Column(DateTime, default=datetime.utcnow)
+    description = Column(String(255))
+    currency = Column(String(3), nullable=False, default='EUR')
+    
+    # Relationships
+    user = relationship("User", back_populates="incomes")
+    
+    def __init__(self, user_id, amount, source, date=None, description=None, currency='EUR'):
+        self.user_id = user_id
+        self.amount = amount
+        self.source = source
+        self.date = date or datetime.utcnow()
+        self.description = description
+        self.currency = currency or 'EUR'
+    
+    def __repr__(self):
+        return f"<Income(id={self.id}, source='{self.source}', amount={self.amount})>"
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'amount': self.amount,
+            'source': self.source,
+            'date': self.date.isoformat() if self.date else None,
+            'description': self.description,
+            'currency': self.currency
+        }
+
+
+class MonthlySummary(Base):
+    """Per-month income and spending totals in EUR, updated as records are written"""
+    __tablename__ = 'monthly_summaries'
+    __table_args__ = (UniqueConstraint('user_id', 'year', 'month'),)
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    income = Column(Float, nullable=False, default=0.0)
+    expenses = Column(Float, nullable=False, default=0.0)
+    
+    def __init__(self, user_id, year, month, income=0.0, expenses=0.0):
+        self.user_id = user_id
+        self.year = year
+        self.month = month
+        self.income = income
+        self.expenses = expenses
+    
+    @property
+    def savings_rate(self):
+        """Share of the month's income not spent, in percent, or None without income"""
+        if not self.income or self.income <= 0:
+            return None
+        return round((self.income - self.expenses) / self.income * 100, 1)
+    
+    def __repr__(self):
+        return f"<MonthlySummary(user_id={self.user_id}, year={self.year}, month={self.month})>"
+    
+    def to_dict(self):
+        return {
+            'year': self.year,
+            'month': self.month,
+            'income': round(self.income, 2),
+            'expenses': round(self.expenses, 2),
+            'savings_rate': self.savings_rate
+        }
+
+
+class UserCategory(Base):
+    """Category used by a user, with usage statistics maintained on writes"""
+    __tablename__ = 'user_categories'
+    __table_args__ = (UniqueConstraint('user_id', 'name'),)
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    name = Column(String(100), nullable=False)
+    usage_count = Column(Integer, nullable=False, default=0)
+    last_used = Column(DateTime, nullable=True)
+    
+    def __init__(self, user_id, name, usage_count=0, last_used=None):
+        self.user_id = user_id
+        self.name = name
+        self.usage_count = usage_count
+        self.last_used = last_used
+    
+    def __repr__(self):
+        return f"<UserCategory(user_id={self.user_id}, name='{self.name}', usage_count={self.usage_count})>"
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'usage_count': self.usage_count,
+            'last_used': self.last_used.isoformat() if self.last_used else None
+        }
+
+
+class RecurringSeries(Base):
+    """
+    Run of a user's transactions with the same description and amount,
+    maintained as transactions are written. Runs with a period are
+    recurring payments, the others are candidates waiting for a repeat.
+    """
+    __tablename__ = 'recurring_series'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'description_key', 'amount', 'currency'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    description_key = Column(String(255), nullable=False)
+    amount = Column(Float, nullable=False)
+    currency = Column(String(3), nullable=False, default='EUR')
+    description = Column(String(255), nullable=True)
+    period = Column(String(10), nullable=True)  # weekly, monthly, yearly
+    occurrences = Column(Integer, nullable=False, default=1)
+    first_date = Column(DateTime, nullable=False)
+    last_date = Column(DateTime, nullable=False)
+    
+    def __init__(self, user_id, description_key, amount, currency, first_date,
+                 description=None, period=None, occurrences=1, last_date=None):
+        self.user_id = user_id
+        self.description_key = description_key
+        self.amount = amount
+        self.currency = currency
+        self.description = description
+        self.period = period
+        self.occurrences = occurrences
+        self.first_date = first_date
+        self.last_date = last_date or first_date
+    
+    def __repr__(self):
+        return f"<RecurringSeries(user_id={self.user_id}, description_key='{self.description_key}', period={self.period})>"
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'description': self.description,
+            'amount': self.amount,
+            'currency': self.currency,
+            'period': self.period,
+            'occurrences': self.occurrences,
+            'first_date': self.first_date.isoformat() if self.first_date else None,
+            'last_date': self.last_date.isoformat() if self.last_date else None
+        }
+
+
+class SpendingStats(Base):
+    """
+    Running statistics of a user's transaction amounts in one category, in EUR,
+    updated in O(1) as transactions are written
+    """
+    __tablename__ = 'spending_stats'
+    __table_args__ = (UniqueConstraint('user_id', 'category'),)
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    category = Column(String(100), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    mean = Column(Float, nullable=False, default=0.0)
+    m2 = Column(Float, nullable=False, default=0.0)  # Sum of squared deviations (Welford)
+    ewma = Column(Float, nullable=True)
+    ewm_variance = Column(Float, nullable=True)
+    
+    def __init__(self, user_id, category, count=0, mean=0.0, m2=0.0, ewma=None, ewm_variance=None):
+        self.user_id = user_id
+        self.category = category
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.ewma = ewma
+        self.ewm_variance = ewm_variance
+    
+    @property
+    def variance(self):
+        """Sample variance of the amounts, 0 with fewer than two"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+    
+    def __repr__(self):
+        return f"<SpendingStats(user_id={self.user_id}, category='{self.category}', count={self.count})>"
+    
+    def to_dict(self):
+        return {
+            'category': self.category,
+            'count': self.count,
+            'mean': round(self.mean, 2),
+            'std': round(self.variance ** 0.5, 2),
+            'ewma': round(self.ewma, 2) if self.ewma is not None else None
+        }
+
+
+class SpendingAlert(Base):
+    """Transaction flagged as unusually large for its category when it was written"""
+    __tablename__ = 'spending_alerts'
+    __table_args__ = (Index('ix_spending_alerts_user_created', 'user_id', 'created_at'),)
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    transaction_id = Column(Integer, ForeignKey('transactions.id'), nullable=True)
+    category = Column(String(100), nullable=False)
+    amount = Column(Float, nullable=False)  # In EUR, like the statistics
+    expected = Column(Float, nullable=False)
+    score = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+    dismissed = Column(Boolean, default=False)
+    
+    transaction = relationship("Transaction")
+    
+    def __init__(self, user_id, category, amount, expected, score, transaction=None):
+        self.user_id = user_id
+        self.category = category
+        self.amount = amount
+        self.expected = expected
+        self.score = score
+        self.transaction = transaction
+        self.dismissed = False
+    
+    def __repr__(self):
+        return f"<SpendingAlert(user_id={self.user_id}, category='{self.category}', score={self.score})>"
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'transaction_id': self.transaction_id,
+            'category': self.category,
+            'amount': round(self.amount, 2),
+            'expected': round(self.expected, 2),
+            'score': round(self.score, 1),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'dismissed': self.dismissed
+        }
+
+
+class Job(Base):
+    """Background job in the durable queue, claimed and run by worker threads"""
+    __tablename__ = 'jobs'
+    __table_args__ = (Index('ix_jobs_status_run_at', 'status', 'run_at'),)
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False)
+    payload = Column(Text, nullable=True)  # JSON keyword arguments of the handler
+    status = Column(String(20), nullable=False, default='pending')  # pending, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_at = Column(DateTime, nullable=False, default=datetime.now)
+    dedupe_key = Column(String(200), unique=True, nullable=True)
+    worker = Column(String(100), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    def __init__(self, name, payload=None, run_at=None, max_attempts=3, dedupe_key=None):
+        self.name = name
+        self.payload = payload
+        self.status = 'pending'
+        self.attempts = 0
+        self.max_attempts = max_attempts
+        self.run_at = run_at or datetime.now()
+        self.dedupe_key = dedupe_key
+    
+    def __repr__(self):
+        return f"<Job(id={self.id}, name='{self.name}', status='{self.status}')>"
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class Tombstone(Base):
+    """Deleted synced record, reported to clients syncing from an older version"""
+    __tablename__ = 'tombstones'
+    __table_args__ = (Index('ix_tombstones_user_version', 'user_id', 'version'),)
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    record_type = Column(String(30), nullable=False)  # transactions, budgets, saved_impulses
+    record_id = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.now)
+    
+    def __init__(self, user_id, record_type, record_id, version):
+        self.user_id = user_id
+        self.record_type = record_type
+        self.record_id = record_id
+        self.version = version
+    
+    def __repr__(self):
+        return f"<Tombstone(user_id={self.user_id}, record_type='{self.record_type}', record_id={self.record_id})>"
@@ -0,0 +1,110 @@
+"""
+Investment projection engine for MindfulWealth application
+
+All growth figures shown to users (saved impulse projections, dashboard
+growth, chat advice) come from this module so they share the same return
+assumptions. Curves for many items are computed in one vectorized NumPy call.
+"""
+import numpy as np
+
+# Default expected annual return used for every projection
+DEFAULT_ANNUAL_RETURN = 0.08
+
+
+def monthly_rate(annual_rate):
+    """
+    Convert an annual return to the equivalent compounded monthly return
+
+    Works on scalars and NumPy arrays.
+    """
+    return np.power(1.0 + np.asarray(annual_rate, dtype=float), 1.0 / 12.0) - 1.0
+
+
+def future_value(amount, years, annual_rate=DEFAULT_ANNUAL_RETURN):
+    """
+    Project a single lump sum forward
+
+    Args:
+        amount (float): Amount invested today
+        years (float): Investment horizon in years
+        annual_rate (float): Expected annual return
+
+    Returns:
+        float: Projected value, rounded to cents
+    """
+    return round(amount * (1.0 + annual_rate) ** years, 2)
+
+
+def growth(amount, years, annual_rate=DEFAULT_ANNUAL_RETURN):
+    """Projected gain (value minus amount) of a lump sum, rounded to cents"""
+    return round(amount * ((1.0 + annual_rate) ** years - 1.0), 2)
+
+
+def project_curves(
+    amounts,
+    annual_rates=DEFAULT_ANNUAL_RETURN,
+    horizon_months=60,
+    monthly_contributions=0.0,
+    inflation=0.0,
+    step_months=1,
+    elapsed_months=0,
+):
+    """
+    Compute growth curves for many items at once
+
+    Every argument except horizon_months and step_months may be a scalar or
+    an array with one value per item. Contributions are added at the end of
+    each month. When inflation is non-zero, values are discounted back to
+    today's money.
+
+    Args:
+        amounts (array-like): Lump sum invested for each item
+        annual_rates (float or array-like): Expected annual return per item
+        horizon_months (int): Length of the curves in months
+        monthly_contributions (float or array-like): Amount added every month
+        inflation (float or array-like): Expected annual inflation
+        step_months (int): Spacing between curve points in months
+        elapsed_months (float or array-like): Months each item has already
+            been invested, shifting its curve forward in time
+
+    Returns:
+        tuple: (months, values) where months has shape (T,) and values has
+               shape (N, T)
+    """
+    amounts = np.atleast_1d(np.asarray(amounts, dtype=float))
+    n_items = amounts.shape[0]
+
+    months = np.arange(0, horizon_months + 1, step_months, dtype=float)
+    if months[-1] != horizon_months:
+        months = np.append(months, float(horizon_months))
+
+    def per_item(values):
+        # Scalars stay (1, 1) so that shared parameters are computed once per
+        # curve point instead of once per item and point
+        values = np.asarray(values, dtype=float)
+        if values.ndim == 0:
+            return values.reshape(1, 1)
+        return np.broadcast_to(values, (n_items,))[:, None]
+
+    rate = monthly_rate(per_item(annual_rates))
+    contribution = per_item(monthly_contributions)
+    elapsed = per_item(elapsed_months)
+
+    # Growth factor from today to each curve point, shared by the lump sums
+    # and the contributions. Items already invested for a while start from
+    # their grown value, which keeps the expensive power at (N or 1, T).
+    curve_growth = np.power(1.0 + rate, months[None, :])
+    start_values = amounts[:, None] * np.power(1.0 + rate, elapsed)
+
+    # Future value of the monthly contributions (annuity), with the
+    # zero-rate limit handled separately to avoid dividing by zero
+    safe_rate = np.where(rate == 0.0, 1.0, rate)
+    annuity = np.where(rate == 0.0, months[None, :], (curve_growth - 1.0) / safe_rate)
+
+    values = start_values * curve_growth + contribution * annuity
+
+    inflation = per_item(inflation)
+    if np.any(inflation != 0.0):
+        values = values / np.power(1.0 + inflation, months[None, :] / 12.0)
+
+    return months, values
@@ -0,0 +1,258 @@
+"""
+Request rate limiting for MindfulWealth application
+
+Routes are limited by token buckets: a bucket holds up to `capacity` tokens,
+refills at a constant rate and every request takes one token. A request
+passes only if both the caller's bucket and the route's global bucket have
+a token, otherwise it is answered 429 with the seconds until it would pass
+in Retry-After. Bursts up to the capacity go through, sustained traffic is
+held to the refill rate.
+
+Buckets are kept in memory, per process. Deployments running several
+worker processes share them through a SQLite file instead, so the limits
+apply to the deployment as a whole.
+"""
+import math
+import time
+import logging
+import sqlite3
+import threading
+from collections import defaultdict
+from functools import wraps
+
+from flask import jsonify, request
+from flask_jwt_extended import get_jwt_identity
+
+logger = logging.getLogger(__name__)
+
+# Seconds in each unit a rate can be written with
+RATE_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Bucket updates between removals of buckets idle long enough to be full
+PRUNE_EVERY = 1000
+
+
+def parse_rate(rate):
+    """
+    Parse a rate such as "10/minute" or "100/5 second"
+
+    Returns:
+        tuple: (capacity, tokens refilled per second), None for an empty rate
+
+    Raises:
+        ValueError: If the rate is malformed
+    """
+    if not rate:
+        return None
+    try:
+        count, period = rate.split("/")
+        amount, _, unit = period.strip().rpartition(" ")
+        seconds = RATE_UNITS[unit.rstrip("s")] * (float(amount) if amount else 1)
+        capacity = int(count)
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid rate '{rate}', expected e.g. '10/minute'")
+    if capacity <= 0 or seconds <= 0:
+        raise ValueError(f"Invalid rate '{rate}', expected e.g. '10/minute'")
+    return capacity, capacity / seconds
+
+
+def refill(tokens, updated, capacity, rate, now):
+    """Tokens of a bucket at a time, after refilling since its last update"""
+    if tokens is None:
+        return float(capacity)
+    return min(float(capacity), tokens + max(0.0, now - updated) * rate)
+
+
+def take_tokens(states, buckets, cost, now):
+    """
+    Take tokens from every bucket if all of them have enough
+
+    Args:
+        states (dict): (tokens, updated) of the known buckets by key
+        buckets (list): (key, capacity, rate) of the buckets to take from
+        cost (float): Tokens taken from each bucket
+        now (float): Current time in seconds
+
+    Returns:
+        tuple: (seconds to wait before retrying, 0 if the tokens were taken,
+                new (tokens, full_at) by key)
+    """
+    levels = {}
+    wait = 0.0
+    for key, capacity, rate in buckets:
+        tokens, updated = states.get(key, (None, None))
+        levels[key] = refill(tokens, updated, capacity, rate, now)
+        if levels[key] < cost:
+            wait = max(wait, (cost - levels[key]) / rate)
+    if wait:
+        return wait, {}
+
+    updates = {}
+    for key, capacity, rate in buckets:
+        tokens = levels[key] - cost
+        updates[key] = (tokens, now + (capacity - tokens) / rate)
+    return 0.0, updates
+
+
+class MemoryBucketStore:
+    """Buckets of one process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}  # key: (tokens, updated, full_at)
+        self.writes = 0
+
+    def take(self, buckets, cost, now):
+        with self.lock:
+            states = {key: self.buckets[key][:2] for key, _, _ in buckets if key in self.buckets}
+            wait, updates = take_tokens(states, buckets, cost, now)
+            for key, (tokens, full_at) in updates.items():
+                self.buckets[key] = (tokens, now, full_at)
+
+            self.writes += 1
+            if self.writes % PRUNE_EVERY == 0:
+                # A full bucket is the same as a missing one
+                self.buckets = {k: v for k, v in self.buckets.items() if v[2] > now}
+            return wait
+
+
+class SQLiteBucketStore:
+    """Buckets shared by the processes using the same SQLite file"""
+
+    def __init__(self, path, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self.local = threading.local()
+        self.writes = 0
+        self.connection().execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+            "updated REAL NOT NULL, full_at REAL NOT NULL)"
+        )
+
+    def connection(self):
+        """Connection of the calling thread, sqlite3 connections are not shared"""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None
+            )
+        return conn
+
+    def take(self, buckets, cost, now):
+        conn = self.connection()
+        keys = [key for key, _, _ in buckets]
+        # Taking the write lock first makes the read and update atomic
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT key, tokens, updated FROM rate_limit_buckets "
+                f"WHERE key IN ({','.join('?' * len(keys))})",
+                keys,
+            )
+            states = {key: (tokens, updated) for key, tokens, updated in rows}
+            wait, updates = take_tokens(states, buckets, cost, now)
+            conn.executemany(
+                "INSERT INTO rate_limit_buckets (key, tokens, updated, full_at) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                "tokens = excluded.tokens, updated = excluded.updated, full_at = excluded.full_at",
+                [(key, tokens, now, full_at) for key, (tokens, full_at) in updates.items()],
+            )
+            self.writes += 1
+            if self.writes % PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM rate_limit_buckets WHERE full_at <= ?", (now,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+
+class RateLimiter:
+    """
+    Token bucket limits of the routes, by rule name
+
+    A rule has a rate per caller and a rate shared by all callers, either
+    may be None. Callers are identified by their user id, or their address
+    when the request carries no token.
+    """
+
+    def __init__(self, store=None):
+        self.store = store or MemoryBucketStore()
+        self.rules = {}
+        self.lock = threading.Lock()
+        self.counters = defaultdict(lambda: {"allowed": 0, "throttled": 0})
+
+    def configure(self, name, per_user=None, global_rate=None):
+        """
+        Set the rates of a rule
+
+        Args:
+            name (str): Rule name used with limit()
+            per_user (str): Rate of each caller, e.g. "10/minute"
+            global_rate (str): Rate of all callers together
+        """
+        self.rules[name] = (parse_rate(per_user), parse_rate(global_rate))
+
+    def caller(self):
+        try:
+            user_id = get_jwt_identity()
+        except RuntimeError:
+            user_id = None
+        return f"user:{user_id}" if user_id is not None else f"ip:{request.remote_addr}"
+
+    def check(self, name, caller, cost=1, now=None):
+        """
+        Take a request's tokens from the caller's and the global bucket
+
+        Returns:
+            float: Seconds to wait before retrying, 0 if the request may run
+        """
+        per_user, global_rate = self.rules.get(name, (None, None))
+        buckets = []
+        if per_user:
+            buckets.append((f"{name}:{caller}", *per_user))
+        if global_rate:
+            buckets.append((f"{name}:*", *global_rate))
+        if not buckets:
+            return 0.0
+
+        try:
+            wait = self.store.take(buckets, cost, time.time() if now is None else now)
+        except Exception as e:
+            # An unavailable shared store lets requests through
+            logger.error(f"Error checking rate limit '{name}': {str(e)}")
+            wait = 0.0
+
+        with self.lock:
+            self.counters[name]["throttled" if wait else "allowed"] += 1
+        return wait
+
+    def limit(self, name, methods=None):
+        """
+        Decorator limiting a route, placed below @jwt_required
+
+        Args:
+            name (str): Rule applied
+            methods (tuple): Only limit these HTTP methods, defaults to all
+        """
+        def decorator(view):
+            @wraps(view)
+            def limited(*args, **kwargs):
+                if methods is None or request.method in methods:
+                    wait = self.check(name, self.caller())
+                    if wait:
+                        response = jsonify({
+                            "success": False,
+                            "error": "Too many requests, please retry later",
+                            "retry_after": math.ceil(wait),
+                        })
+                        return response, 429, {"Retry-After": str(math.ceil(wait))}
+                return view(*args, **kwargs)
+            return limited
+        return decorator
+
+    def metrics(self):
+        """Allowed and throttled requests of each rule since the start"""
+        with self.lock:
+            return {name: dict(counts) for name, counts in self.counters.items()}
@@ -43,7 +43,10 @@ if __name__ == '__main__':
     init_db()
     
     # Import app after initializing database
-    from app import app
+    from app import app, start_background_services
+
+    # Build missing derived data and start the background jobs
+    start_background_services()
     
     # Get port from environment variable or use default
     port = int(os.environ.get('PORT', 5001))
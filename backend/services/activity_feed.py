@@ -0,0 +1,149 @@
+"""
+Activity feed for MindfulWealth application
+
+Merges transactions, saved impulses and incomes into a single feed with one
+UNION ALL query ordered by date. Pages are fetched with keyset pagination:
+the cursor holds the (date, type, id) of the last item returned, so every
+page costs O(page size) no matter how far the user has scrolled.
+"""
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, literal, or_, select, union_all
+
+from models import Income, SavedImpulse, Transaction
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+# Feed item type of each source
+SOURCES = (
+    (Transaction, "withdrawal"),
+    (SavedImpulse, "savings"),
+    (Income, "deposit"),
+)
+
+# Prefix of item ids per type, transactions keep their plain id
+ID_PREFIXES = {"savings": "impulse", "deposit": "income"}
+
+# Display format of the legacy "time" field
+TIME_FORMAT = "%b %d, %I:%M %p"
+
+
+def encode_cursor(item):
+    """Encode the position of a feed item as an opaque cursor string"""
+    position = [item["timestamp"], item["type"], item["record_id"]]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        timestamp, kind, record_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.fromisoformat(timestamp), str(kind), int(record_id)
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _title(kind, description, category):
+    if kind == "withdrawal":
+        return description or f"{category.capitalize()} purchase"
+    if kind == "savings":
+        return f"Saved {description}"
+    return description or f"{category.capitalize()} income"
+
+
+def _source_query(model, kind, user_id, position, limit):
+    """
+    Newest `limit` records of one source after the cursor position
+
+    Each source is limited on its own so the union never reads more than
+    `limit` rows per source.
+    """
+    category = model.source if model is Income else model.category
+    query = select(
+        literal(kind).label("type"),
+        model.id.label("record_id"),
+        model.date.label("date"),
+        model.amount.label("amount"),
+        model.currency.label("currency"),
+        model.description.label("description"),
+        category.label("category"),
+    ).where(model.user_id == user_id)
+
+    if position is not None:
+        date, cursor_kind, record_id = position
+        # Ties on date are ordered by type then id, like the outer ORDER BY
+        if kind < cursor_kind:
+            after = model.date <= date
+        elif kind == cursor_kind:
+            after = or_(
+                model.date < date, and_(model.date == date, model.id < record_id)
+            )
+        else:
+            after = model.date < date
+        query = query.where(after)
+
+    subquery = (
+        query.order_by(model.date.desc(), model.id.desc()).limit(limit).subquery()
+    )
+    return select(subquery)
+
+
+def get_activity_page(db_session, user_id, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """
+    Get one page of the user's activity feed, newest first
+
+    Args:
+        db_session (Session): SQLAlchemy database session
+        user_id (int): ID of the user
+        limit (int): Page size, capped at MAX_PAGE_SIZE
+        cursor (str): Cursor returned with the previous page
+
+    Returns:
+        tuple: (items, next cursor or None when there are no more items)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    position = decode_cursor(cursor) if cursor else None
+
+    # One extra row tells whether another page exists
+    feed = union_all(
+        *(
+            _source_query(model, kind, user_id, position, limit + 1)
+            for model, kind in SOURCES
+        )
+    ).subquery()
+    rows = db_session.execute(
+        select(feed)
+        .order_by(feed.c.date.desc(), feed.c.type.desc(), feed.c.record_id.desc())
+        .limit(limit + 1)
+    ).all()
+
+    items = [
+        {
+            "id": (
+                f"{ID_PREFIXES[row.type]}_{row.record_id}"
+                if row.type in ID_PREFIXES
+                else row.record_id
+            ),
+            "record_id": row.record_id,
+            "title": _title(row.type, row.description, row.category),
+            "timestamp": row.date.isoformat(),
+            "time": row.date.strftime(TIME_FORMAT),
+            "amount": row.amount,
+            "currency": row.currency,
+            "type": row.type,
+        }
+        for row in rows[:limit]
+    ]
+
+    next_cursor = encode_cursor(items[-1]) if len(rows) > limit else None
+    return items, next_cursor
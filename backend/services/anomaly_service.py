@@ -0,0 +1,377 @@
+"""
+Spending anomaly detection for MindfulWealth application
+
+Running statistics of transaction amounts are kept per user and category in
+the spending_stats table: count, mean and sum of squared deviations
+(Welford's algorithm) plus an exponentially weighted moving average and
+variance of recent amounts. Every new transaction is scored against the
+statistics before it is added, in O(1), and unusually large ones are stored
+as alerts for the dashboard. Nothing ever re-reads the transaction history.
+The statistics are updated by SQL expressions over the stored row, so
+concurrent writers to the same category never overwrite each other.
+"""
+import math
+from datetime import datetime
+from sqlalchemy import case, func, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import joinedload
+
+from models import SpendingAlert, SpendingStats, Transaction
+from services.flush_tracking import begin_transaction, has_changes, listen_once, stored_values
+from services.currency_service import (
+    DEFAULT_CURRENCY,
+    get_rate_table,
+    to_default_currency,
+)
+from services.local_router import CURRENCY_SYMBOLS
+
+# Transactions needed in a category before any of them can be flagged
+MIN_SAMPLES = 5
+
+# Standard deviations above the category mean that make an amount unusual
+Z_THRESHOLD = 3.0
+
+# An unusual amount must also be this far above the recent (EWMA) level, so a
+# category whose spending rose steadily does not raise alerts
+EWMA_RATIO = 1.5
+
+# Weight of the newest amount in the moving average
+EWMA_ALPHA = 0.2
+
+# Floor of the standard deviation as a share of the mean, amounts that never
+# varied (rent, subscriptions) would otherwise flag every cent of change
+MIN_STD_SHARE = 0.1
+
+# Attributes that decide which statistics a transaction feeds and by how much
+TRACKED_ATTRIBUTES = ("user_id", "category", "amount", "currency", "date")
+
+# Columns of the running statistics, in SpendingStats constructor order
+STATS_COLUMNS = (
+    SpendingStats.count,
+    SpendingStats.mean,
+    SpendingStats.m2,
+    SpendingStats.ewma,
+    SpendingStats.ewm_variance,
+)
+
+
+def category_key(category):
+    """Key under which a category's statistics are kept"""
+    return (category or "").strip().lower()
+
+
+def add_amount(stats, amount):
+    """Add an amount to running statistics in O(1)"""
+    stats.count += 1
+    delta = amount - stats.mean
+    stats.mean += delta / stats.count
+    stats.m2 += delta * (amount - stats.mean)
+
+    if stats.ewma is None:
+        stats.ewma, stats.ewm_variance = amount, 0.0
+    else:
+        difference = amount - stats.ewma
+        increment = EWMA_ALPHA * difference
+        stats.ewma += increment
+        stats.ewm_variance = (1 - EWMA_ALPHA) * (
+            stats.ewm_variance + difference * increment
+        )
+
+
+def remove_amount(stats, amount):
+    """
+    Remove an amount from running statistics in O(1)
+
+    Count, mean and variance are restored exactly. The moving average
+    cannot be unwound and keeps the amount's influence until it decays.
+    """
+    if stats.count <= 1:
+        stats.count, stats.mean, stats.m2 = 0, 0.0, 0.0
+        return
+    stats.count -= 1
+    delta = amount - stats.mean
+    stats.mean -= delta / stats.count
+    stats.m2 = max(0.0, stats.m2 - delta * (amount - stats.mean))
+
+
+def add_amount_statement(user_id, category, amount):
+    """
+    INSERT ... ON CONFLICT adding an amount to a row's statistics, the
+    update of add_amount written as SQL expressions
+    """
+    statement = sqlite_insert(SpendingStats).values(
+        user_id=user_id, category=category, count=1, mean=amount, m2=0.0,
+        ewma=amount, ewm_variance=0.0,
+    )
+    count, mean, ewma = SpendingStats.count, SpendingStats.mean, SpendingStats.ewma
+    # Every expression reads the row as it was before the update
+    delta = amount - mean
+    difference = amount - ewma
+    return statement.on_conflict_do_update(
+        index_elements=[SpendingStats.user_id, SpendingStats.category],
+        set_={
+            "count": count + 1,
+            "mean": mean + delta / (count + 1),
+            "m2": SpendingStats.m2 + delta * delta * count / (count + 1),
+            "ewma": case((ewma.is_(None), amount), else_=ewma + EWMA_ALPHA * difference),
+            "ewm_variance": case(
+                (ewma.is_(None), 0.0),
+                else_=(1 - EWMA_ALPHA) * (
+                    SpendingStats.ewm_variance + difference * EWMA_ALPHA * difference
+                ),
+            ),
+        },
+    )
+
+
+def remove_amount_statement(user_id, category, amount):
+    """UPDATE removing an amount from a row's statistics, see remove_amount"""
+    count, mean = SpendingStats.count, SpendingStats.mean
+    delta = amount - mean
+    return (
+        update(SpendingStats)
+        .where(SpendingStats.user_id == user_id, SpendingStats.category == category)
+        .values(
+            count=case((count <= 1, 0), else_=count - 1),
+            mean=case((count <= 1, 0.0), else_=mean - delta / (count - 1)),
+            m2=case(
+                (count <= 1, 0.0),
+                else_=func.max(0.0, SpendingStats.m2 - delta * delta * count / (count - 1)),
+            ),
+        )
+    )
+
+
+def anomaly_score(stats, amount):
+    """
+    Standard deviations an amount lies above the category mean
+
+    Returns:
+        float: Score, or None when the category has too little history or
+               the amount is not above its recent level
+    """
+    if stats is None or stats.count < MIN_SAMPLES:
+        return None
+    if stats.ewma is not None and amount < EWMA_RATIO * stats.ewma:
+        return None
+    std = max(math.sqrt(stats.variance), MIN_STD_SHARE * abs(stats.mean))
+    if std == 0:
+        return None
+    return (amount - stats.mean) / std
+
+
+def _pending_changes(session):
+    """
+    Collect the statistics changes of a flush
+
+    Returns:
+        tuple: (removals, additions) lists of (user_id, category key, amount
+               in EUR, date, new transaction or None)
+    """
+    removals, additions = [], []
+
+    def entry(values, record=None):
+        user_id, category, amount, currency, date = values
+        return (
+            user_id,
+            category_key(category),
+            to_default_currency(amount, currency, date),
+            date or datetime.utcnow(),
+            record,
+        )
+
+    for record in session.new:
+        if isinstance(record, Transaction):
+            additions.append(entry([getattr(record, a) for a in TRACKED_ATTRIBUTES], record))
+
+    for record in session.deleted:
+        if isinstance(record, Transaction):
+            removals.append(entry(stored_values(session, record, TRACKED_ATTRIBUTES)))
+
+    for record in session.dirty:
+        if isinstance(record, Transaction) and has_changes(record, TRACKED_ATTRIBUTES):
+            removals.append(entry(stored_values(session, record, TRACKED_ATTRIBUTES)))
+            # Edits update the statistics but are not scored again
+            additions.append(entry([getattr(record, a) for a in TRACKED_ATTRIBUTES]))
+
+    # Transactions without a category have no statistics
+    return (
+        [change for change in removals if change[1]],
+        [change for change in additions if change[1]],
+    )
+
+
+def _update_spending_stats(session, flush_context, instances):
+    """before_flush hook scoring new transactions and updating spending_stats"""
+    removals, additions = _pending_changes(session)
+
+    deleted_ids = [
+        record.id
+        for record in session.deleted
+        if isinstance(record, Transaction) and record.id is not None
+    ]
+    if deleted_ids:
+        with session.no_autoflush:
+            for alert in session.query(SpendingAlert).filter(
+                SpendingAlert.transaction_id.in_(deleted_ids)
+            ):
+                session.delete(alert)
+
+    if not removals and not additions:
+        return
+
+    keys = {(user_id, category) for user_id, category, *_ in removals + additions}
+    with session.no_autoflush:
+        # Statistics the new transactions are scored against, later replaced
+        # by the values each statement returns
+        stats = {
+            (s.user_id, s.category): SpendingStats(s.user_id, s.category, *s[2:])
+            for s in session.query(SpendingStats.user_id, SpendingStats.category, *STATS_COLUMNS)
+            .filter(
+                SpendingStats.user_id.in_({user_id for user_id, _ in keys}),
+                SpendingStats.category.in_({category for _, category in keys}),
+            )
+        }
+
+        def apply(user_id, category, statement):
+            row = session.execute(
+                statement.returning(*STATS_COLUMNS),
+                execution_options={"synchronize_session": False},
+            ).one_or_none()
+            if row is not None:
+                stats[(user_id, category)] = SpendingStats(user_id, category, *row)
+
+        for user_id, category, amount, _, _ in removals:
+            apply(user_id, category, remove_amount_statement(user_id, category, amount))
+
+        for user_id, category, amount, _, record in sorted(additions, key=lambda c: c[3]):
+            row = stats.get((user_id, category))
+            score = anomaly_score(row, amount) if record is not None else None
+            if score is not None and score >= Z_THRESHOLD:
+                session.add(
+                    SpendingAlert(user_id, category, amount, row.mean, score, transaction=record)
+                )
+            apply(user_id, category, add_amount_statement(user_id, category, amount))
+
+
+def track_spending_anomalies(target):
+    """
+    Score new transactions and keep spending statistics up to date
+
+    Args:
+        target: sessionmaker, Session class or session instance
+    """
+    listen_once(target, ("before_flush", _update_spending_stats))
+
+
+def rebuild_spending_stats(db_session, user_id=None):
+    """
+    Recompute spending_stats from raw transactions in date order
+
+    Past transactions are not scored.
+
+    Args:
+        db_session (Session): SQLAlchemy database session
+        user_id (int): Only rebuild this user's statistics, defaults to everyone
+    """
+    begin_transaction(db_session, "IMMEDIATE")
+    query = db_session.query(
+        *(getattr(Transaction, a) for a in TRACKED_ATTRIBUTES)
+    ).order_by(Transaction.date, Transaction.id)
+    existing = db_session.query(SpendingStats)
+    if user_id is not None:
+        query = query.filter(Transaction.user_id == user_id)
+        existing = existing.filter(SpendingStats.user_id == user_id)
+
+    stats = {}
+    for row_user, category, amount, currency, date in query.yield_per(1000):
+        key = (row_user, category_key(category))
+        if not key[1]:
+            continue
+        if key not in stats:
+            stats[key] = SpendingStats(*key)
+        add_amount(stats[key], to_default_currency(amount, currency, date))
+
+    existing.delete(synchronize_session=False)
+    db_session.add_all(stats.values())
+    db_session.commit()
+
+
+def get_alerts(db_session, user_id, limit=20, include_dismissed=False):
+    """
+    Get a user's spending alerts, newest first
+
+    Args:
+        db_session (Session): SQLAlchemy database session
+        user_id (int): ID of the user
+        limit (int): Maximum number of alerts
+        include_dismissed (bool): Also return dismissed alerts
+
+    Returns:
+        list: Alert dicts with the flagged transaction's description and date
+    """
+    query = (
+        db_session.query(SpendingAlert)
+        .options(joinedload(SpendingAlert.transaction))
+        .filter(SpendingAlert.user_id == user_id)
+    )
+    if not include_dismissed:
+        query = query.filter(SpendingAlert.dismissed.is_(False))
+
+    alerts = []
+    query = query.order_by(SpendingAlert.created_at.desc(), SpendingAlert.id.desc())
+    for alert in query.limit(limit):
+        item = alert.to_dict()
+        transaction = alert.transaction
+        item["description"] = transaction.description if transaction else None
+        item["date"] = transaction.date.isoformat() if transaction and transaction.date else None
+        alerts.append(item)
+    return alerts
+
+
+def dismiss_alert(db_session, user_id, alert_id):
+    """
+    Mark one of a user's alerts as dismissed
+
+    Returns:
+        bool: False if the user has no such alert
+    """
+    alert = (
+        db_session.query(SpendingAlert)
+        .filter_by(id=alert_id, user_id=user_id)
+        .first()
+    )
+    if alert is None:
+        return False
+    alert.dismissed = True
+    db_session.commit()
+    return True
+
+
+def anomaly_insight(alerts, currency):
+    """
+    Insight about the most recent unusual transaction
+
+    Args:
+        alerts (list): Undismissed alerts from get_alerts
+        currency (str): Currency of the displayed amounts
+
+    Returns:
+        dict: Insight, or None without alerts
+    """
+    if not alerts:
+        return None
+
+    latest = alerts[0]
+    rates = get_rate_table()
+    symbol = CURRENCY_SYMBOLS.get(currency, currency)
+    amount = rates.convert(latest["amount"], DEFAULT_CURRENCY, currency)
+    expected = rates.convert(latest["expected"], DEFAULT_CURRENCY, currency)
+    return {
+        "type": "warning",
+        "title": "Unusual Spending",
+        "description": (
+            f"Your {symbol}{amount:.2f} {latest['category']} transaction is well above "
+            f"your usual {symbol}{expected:.2f}. Make sure it was planned."
+        ),
+    }
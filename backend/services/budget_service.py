@@ -0,0 +1,156 @@
+"""
+Budget writes for MindfulWealth application
+
+Budgets are unique per user, category and month. Setting one is a single
+INSERT ... ON CONFLICT DO UPDATE, so concurrent requests for the same
+category never create duplicates and no lookup precedes the write. A
+month's budgets are copied into another month with one INSERT ... SELECT.
+Both bypass the ORM hooks, so they take the user's change version for
+delta sync and queue the change events of open streams themselves.
+"""
+from datetime import datetime
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import Budget
+from services.category_service import record_category_usage
+from services.event_service import record_event
+from services.sync_service import next_change_version
+
+# Columns of the unique key budgets are upserted on
+BUDGET_KEY = [Budget.user_id, Budget.category, Budget.month, Budget.year]
+
+RETURNED_COLUMNS = (
+    Budget.id,
+    Budget.category,
+    Budget.planned_amount,
+    Budget.month,
+    Budget.year,
+    Budget.created_at,
+)
+
+
+def next_month(month, year):
+    """(month, year) following a month"""
+    return (1, year + 1) if month == 12 else (month + 1, year)
+
+
+def _budget_dict(row):
+    return {
+        "id": row.id,
+        "category": row.category,
+        "planned_amount": row.planned_amount,
+        "month": row.month,
+        "year": row.year,
+    }
+
+
+def _budget_event(db_session, user_id, budget, created):
+    action = "created" if created else "updated"
+    record_event(db_session, user_id, {"type": f"budget.{action}", "id": budget["id"], "record": budget})
+
+
+def upsert_budget(db_session, user_id, category, planned_amount, month, year):
+    """
+    Create a budget or replace its planned amount
+
+    Args:
+        db_session (Session): SQLAlchemy database session
+        user_id (int): ID of the user
+        category (str): Budget category
+        planned_amount (float): Amount planned for the month
+        month (int): Month, 1-12
+        year (int): Year
+
+    Returns:
+        tuple: (budget dict, True if the budget was created)
+    """
+    now = datetime.now()
+    statement = sqlite_insert(Budget).values(
+        user_id=user_id,
+        category=category,
+        planned_amount=planned_amount,
+        month=month,
+        year=year,
+        created_at=now,
+        updated_at=now,
+        version=next_change_version(db_session, user_id),
+    )
+    row = db_session.execute(
+        statement.on_conflict_do_update(
+            index_elements=BUDGET_KEY,
+            set_={
+                "planned_amount": statement.excluded.planned_amount,
+                "updated_at": statement.excluded.updated_at,
+                "version": statement.excluded.version,
+            },
+        ).returning(*RETURNED_COLUMNS)
+    ).one()
+
+    # Only an inserted row carries this statement's creation time
+    created = row.created_at == now
+    if created:
+        record_category_usage(db_session, user_id, {category: 1})
+    budget = _budget_dict(row)
+    _budget_event(db_session, user_id, budget, created)
+    db_session.commit()
+    return budget, created
+
+
+def roll_forward_budgets(db_session, user_id, month, year, to_month=None, to_year=None, scale=1.0, overwrite=False):
+    """
+    Copy all of a month's budgets into another month
+
+    Args:
+        db_session (Session): SQLAlchemy database session
+        user_id (int): ID of the user
+        month (int): Month copied from
+        year (int): Year copied from
+        to_month (int): Month copied to, defaults to the following month
+        to_year (int): Year copied to
+        scale (float): Factor applied to the planned amounts
+        overwrite (bool): Replace budgets the target month already has,
+                          otherwise they are kept
+
+    Returns:
+        list: Budget dicts written to the target month
+    """
+    if to_month is None or to_year is None:
+        to_month, to_year = next_month(month, year)
+
+    now = datetime.now()
+    columns = ["user_id", "category", "planned_amount", "month", "year", "created_at", "updated_at", "version"]
+    source = select(
+        Budget.user_id,
+        Budget.category,
+        func.round(Budget.planned_amount * scale, 2),
+        literal(to_month),
+        literal(to_year),
+        literal(now),
+        literal(now),
+        literal(next_change_version(db_session, user_id)),
+    ).where(Budget.user_id == user_id, Budget.month == month, Budget.year == year)
+
+    statement = sqlite_insert(Budget).from_select(columns, source)
+    if overwrite:
+        statement = statement.on_conflict_do_update(
+            index_elements=BUDGET_KEY,
+            set_={
+                "planned_amount": statement.excluded.planned_amount,
+                "updated_at": statement.excluded.updated_at,
+                "version": statement.excluded.version,
+            },
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=BUDGET_KEY)
+
+    rows = db_session.execute(statement.returning(*RETURNED_COLUMNS)).all()
+    record_category_usage(
+        db_session, user_id, {row.category: 1 for row in rows if row.created_at == now}
+    )
+    budgets = sorted((_budget_dict(row) for row in rows), key=lambda budget: budget["category"])
+    created = {row.id for row in rows if row.created_at == now}
+    for budget in budgets:
+        _budget_event(db_session, user_id, budget, budget["id"] in created)
+    db_session.commit()
+    return budgets
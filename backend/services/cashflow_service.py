@@ -0,0 +1,193 @@
+"""
+Monthly cash flow rollup for MindfulWealth application
+
+Income and spending totals are kept per user and month, in DEFAULT_CURRENCY,
+in the monthly_summaries table and updated whenever incomes or transactions
+are flushed. Savings rates and their trend are read from that rollup with a
+single indexed query instead of summing raw history on every request.
+"""
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import extract, func, or_, and_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import Income, MonthlySummary, Transaction
+from services.local_router import previous_month
+from services.flush_tracking import begin_transaction, has_changes, listen_once, stored_values
+from services.currency_service import (
+    DEFAULT_CURRENCY,
+    get_rate_table,
+    to_default_currency,
+)
+
+# Rollup column fed by each tracked model
+ROLLUP_FIELDS = {Income: "income", Transaction: "expenses"}
+
+# Attributes that decide which month a record is counted in and for how much
+TRACKED_ATTRIBUTES = ("user_id", "date", "amount", "currency")
+
+
+def _month_key(user_id, date):
+    date = date or datetime.utcnow()
+    return user_id, date.year, date.month
+
+
+def _pending_deltas(session):
+    """
+    Collect the rollup changes of a flush
+
+    Returns:
+        dict: (user_id, year, month) -> {field: signed amount}
+    """
+    deltas = defaultdict(lambda: defaultdict(float))
+
+    def add(field, values, sign):
+        user_id, date, amount, currency = values
+        amount = to_default_currency(amount, currency, date)
+        deltas[_month_key(user_id, date)][field] += sign * amount
+
+    for record in session.new:
+        field = ROLLUP_FIELDS.get(type(record))
+        if field:
+            add(field, [getattr(record, a) for a in TRACKED_ATTRIBUTES], 1)
+
+    for record in session.deleted:
+        field = ROLLUP_FIELDS.get(type(record))
+        if field:
+            add(field, stored_values(session, record, TRACKED_ATTRIBUTES), -1)
+
+    for record in session.dirty:
+        field = ROLLUP_FIELDS.get(type(record))
+        if field and has_changes(record, TRACKED_ATTRIBUTES):
+            add(field, stored_values(session, record, TRACKED_ATTRIBUTES), -1)
+            add(field, [getattr(record, a) for a in TRACKED_ATTRIBUTES], 1)
+
+    return deltas
+
+
+def _update_monthly_summaries(session, flush_context, instances):
+    """before_flush hook applying pending income/spending changes to the rollup"""
+    deltas = _pending_deltas(session)
+    if not deltas:
+        return
+
+    # One upsert per month: the first write of a month inserts its row, and
+    # a writer racing it adds to that row instead of failing on the key
+    statement = sqlite_insert(MonthlySummary)
+    statement = statement.on_conflict_do_update(
+        index_elements=[MonthlySummary.user_id, MonthlySummary.year, MonthlySummary.month],
+        set_={
+            field: getattr(MonthlySummary, field) + getattr(statement.excluded, field)
+            for field in ROLLUP_FIELDS.values()
+        },
+    )
+    with session.no_autoflush:
+        session.execute(
+            statement,
+            [
+                {
+                    "user_id": user_id, "year": year, "month": month,
+                    **{field: changes.get(field, 0.0) for field in ROLLUP_FIELDS.values()},
+                }
+                for (user_id, year, month), changes in deltas.items()
+            ],
+        )
+
+
+def track_monthly_summaries(target):
+    """
+    Keep the monthly rollup up to date on every flush of a session
+
+    Args:
+        target: sessionmaker, Session class or session instance
+    """
+    listen_once(target, ("before_flush", _update_monthly_summaries))
+
+
+def rebuild_monthly_summaries(db_session, user_id=None):
+    """
+    Recompute the rollup from raw incomes and transactions
+
+    Args:
+        db_session (Session): SQLAlchemy database session
+        user_id (int): Only rebuild this user's months, defaults to everyone
+    """
+    begin_transaction(db_session, "IMMEDIATE")
+    rates = get_rate_table()
+    totals = defaultdict(dict)
+    for model, field in ROLLUP_FIELDS.items():
+        year = extract("year", model.date).label("year")
+        month = extract("month", model.date).label("month")
+        snapshot = rates.snapshot_expression(model.date).label("snapshot")
+        query = db_session.query(
+            model.user_id, year, month, snapshot, model.currency, func.sum(model.amount)
+        ).group_by(model.user_id, year, month, snapshot, model.currency)
+        if user_id is not None:
+            query = query.filter(model.user_id == user_id)
+
+        converted = rates.convert_totals(query.all(), DEFAULT_CURRENCY, by_snapshot=True)
+        for (row_user, row_year, row_month), amount in converted.items():
+            key = (row_user, int(row_year), int(row_month))
+            totals[key][field] = totals[key].get(field, 0.0) + amount
+
+    existing = db_session.query(MonthlySummary)
+    if user_id is not None:
+        existing = existing.filter(MonthlySummary.user_id == user_id)
+    existing.delete(synchronize_session=False)
+
+    db_session.add_all(
+        MonthlySummary(*key, **fields) for key, fields in totals.items()
+    )
+    db_session.commit()
+
+
+def get_savings_overview(db_session, user_id, now=None, currency=DEFAULT_CURRENCY):
+    """
+    Get this month's income, spending and savings rate with last month's trend
+
+    Args:
+        db_session (Session): SQLAlchemy database session
+        user_id (int): ID of the user
+        now (datetime): Reference time, defaults to the current time
+        currency (str): Currency of the returned amounts
+
+    Returns:
+        dict: income, expenses, savings_rate, previous_savings_rate and
+              savings_rate_change (percentage points, 0 when either month
+              has no income)
+    """
+    now = now or datetime.now()
+    prev_year, prev_month = previous_month(now.year, now.month)
+
+    summaries = {
+        (s.year, s.month): s
+        for s in db_session.query(MonthlySummary).filter(
+            MonthlySummary.user_id == user_id,
+            or_(
+                and_(MonthlySummary.year == now.year, MonthlySummary.month == now.month),
+                and_(MonthlySummary.year == prev_year, MonthlySummary.month == prev_month),
+            ),
+        )
+    }
+
+    current = summaries.get((now.year, now.month)) or MonthlySummary(
+        user_id, now.year, now.month
+    )
+    previous = summaries.get((prev_year, prev_month)) or MonthlySummary(
+        user_id, prev_year, prev_month
+    )
+
+    change = 0.0
+    if current.savings_rate is not None and previous.savings_rate is not None:
+        change = round(current.savings_rate - previous.savings_rate, 1)
+
+    rates = get_rate_table()
+    return {
+        "income": round(rates.convert(current.income, DEFAULT_CURRENCY, currency), 2),
+        "expenses": round(
+            rates.convert(current.expenses, DEFAULT_CURRENCY, currency), 2
+        ),
+        "savings_rate": current.savings_rate or 0.0,
+        "previous_savings_rate": previous.savings_rate,
+        "savings_rate_change": change,
+    }
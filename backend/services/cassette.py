@@ -0,0 +1,246 @@
+"""
+Recorded Gemini exchanges for MindfulWealth application
+
+A cassette is a gzipped JSON lines file holding one entry per model call:
+the model, a digest of the system instruction, the prompt, whether the
+answer was streamed and the other parameters of the call, the text of every chunk with the milliseconds after
+which it arrived, and the error when the call failed. CassetteGenai wraps a
+backend (see model_backends) and either records the calls made through it
+or answers them from the cassette alone, waiting as long as the recorded
+call took, so chat runs are reproducible offline with realistic answer
+sizes and timings.
+
+Replayed calls are matched on the model, system instruction, prompt,
+stream flag and other generation parameters.
+Calls recorded several times are answered in recorded order, starting over
+once all were used. Cassettes hold the prompts sent, user data included.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from services.model_backends import BackendError, ModelInfo, StreamedResponse, TextChunk
+
+CASSETTE_VERSION = 1
+MODES = ("record", "replay")
+
+
+def system_digest(system_instruction):
+    """Short digest of a system instruction, None when there is none"""
+    if not system_instruction:
+        return None
+    return hashlib.sha256(system_instruction.encode()).hexdigest()[:16]
+
+
+def call_key(entry):
+    """Key matching a call to its recordings"""
+    return json.dumps(
+        [entry["model"], entry["system"], entry["prompt"], entry["stream"], entry.get("params", {})],
+        sort_keys=True, default=str,
+    )
+
+
+class Cassette:
+    """Entries of a cassette file, loaded once and appended as recorded"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = defaultdict(list)
+        self.positions = defaultdict(int)
+        self.models = []
+        self.counters = {"recorded": 0, "replayed": 0, "missed": 0}
+        if os.path.exists(path):
+            self.load()
+
+    def load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as file:
+            for line in file:
+                entry = json.loads(line)
+                if entry.get("version", CASSETTE_VERSION) != CASSETTE_VERSION:
+                    raise ValueError(f"Unsupported cassette version in {self.path}")
+                if "model" in entry:
+                    self.add(entry)
+
+    def add(self, entry):
+        self.entries[call_key(entry)].append(entry)
+        if entry["model"] not in self.models:
+            self.models.append(entry["model"])
+
+    def record(self, entry):
+        """Append an entry to the file and to the loaded ones"""
+        with self.lock:
+            new = not os.path.exists(self.path)
+            # Every append is a gzip member of its own, readers see one stream
+            with gzip.open(self.path, "at", encoding="utf-8") as file:
+                if new:
+                    file.write(json.dumps({"version": CASSETTE_VERSION}) + "\n")
+                file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self.add(entry)
+            self.counters["recorded"] += 1
+
+    def next(self, call):
+        """
+        Recorded entry answering a call
+
+        Args:
+            call (dict): Model, system digest, prompt, stream and params
+
+        Returns:
+            dict: The entry, or None when the call was never recorded
+        """
+        key = call_key(call)
+        with self.lock:
+            entries = self.entries.get(key)
+            if not entries:
+                self.counters["missed"] += 1
+                return None
+            position = self.positions[key]
+            self.positions[key] = position + 1
+            self.counters["replayed"] += 1
+            return entries[position % len(entries)]
+
+    def metrics(self):
+        """Calls recorded, answered from the cassette and missing from it"""
+        with self.lock:
+            return {**self.counters, "entries": sum(len(e) for e in self.entries.values())}
+
+
+def backend_error(error):
+    """Error of a failed call as stored in the cassette"""
+    code = getattr(error, "code", None)
+    try:
+        code = int(code() if callable(code) else code)
+    except (TypeError, ValueError):
+        code = 500
+    return {"code": code, "status": getattr(error, "status", "") or type(error).__name__,
+            "message": getattr(error, "message", None) or str(error)}
+
+
+class CassetteGenai:
+    """Backend recording the calls of another one, or replaying a cassette
+
+    Args:
+        cassette (Cassette): Cassette read and written
+        backend: Backend recorded, the google.generativeai SDK by default;
+                 unused when replaying
+        mode (str): "record" or "replay"
+        speed (float): Factor of the recorded timings when replaying, 0 to
+                       answer at once
+    """
+
+    def __init__(self, cassette, backend=None, mode="replay", speed=1.0, sleep=time.sleep):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if mode == "record" and backend is None:
+            import google.generativeai as backend
+        self.cassette = cassette
+        self.backend = backend
+        self.mode = mode
+        self.speed = speed
+        self.sleep = sleep
+
+    @classmethod
+    def from_env(cls, backend=None):
+        """Cassette backend configured by the GEMINI_CASSETTE* variables"""
+        return cls(
+            Cassette(os.environ["GEMINI_CASSETTE"]),
+            backend,
+            mode=os.getenv("GEMINI_CASSETTE_MODE", "replay"),
+            speed=float(os.getenv("GEMINI_CASSETTE_SPEED", 1.0)),
+        )
+
+    def configure(self, api_key=None, **kwargs):
+        if self.mode == "record":
+            self.backend.configure(api_key=api_key, **kwargs)
+
+    def list_models(self):
+        if self.mode == "record":
+            return self.backend.list_models()
+        return [ModelInfo(name) for name in self.cassette.models]
+
+    def GenerativeModel(self, model_name, system_instruction=None, **kwargs):
+        if not model_name.startswith("models/"):
+            model_name = f"models/{model_name}"
+        model = None
+        if self.mode == "record":
+            if system_instruction:
+                kwargs["system_instruction"] = system_instruction
+            model = self.backend.GenerativeModel(model_name, **kwargs)
+        elif model_name not in self.cassette.models:
+            raise BackendError(404, "NOT_FOUND", f"{model_name} is not in the cassette")
+        return CassetteModel(self, model_name, system_instruction, model)
+
+    def metrics(self):
+        return self.cassette.metrics()
+
+
+class CassetteModel:
+    """Model of a CassetteGenai backend"""
+
+    def __init__(self, backend, model_name, system_instruction=None, model=None):
+        self.backend = backend
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.model = model
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        entry = {
+            "model": self.model_name,
+            "system": system_digest(self.system_instruction),
+            "prompt": prompt,
+            "stream": bool(stream),
+            "params": json.loads(json.dumps(kwargs, default=str)),
+        }
+        if self.backend.mode == "replay":
+            chunks = self.replay(entry)
+        else:
+            chunks = self.record(entry, prompt, stream, kwargs)
+        if stream:
+            return StreamedResponse(TextChunk(text) for text in chunks)
+        return TextChunk("".join(chunks))
+
+    def record(self, entry, prompt, stream, kwargs):
+        """Call the recorded model, writing the entry once the answer is read"""
+        start = time.perf_counter()
+        entry.update(chunks=[], offsets_ms=[], error=None)
+        elapsed_ms = lambda: round((time.perf_counter() - start) * 1000, 1)
+        try:
+            if stream:
+                response = self.model.generate_content(prompt, stream=True, **kwargs)
+                for chunk in response:
+                    entry["chunks"].append(chunk.text)
+                    entry["offsets_ms"].append(elapsed_ms())
+                    yield chunk.text
+            else:
+                text = self.model.generate_content(prompt, **kwargs).text
+                entry["chunks"].append(text)
+                entry["offsets_ms"].append(elapsed_ms())
+                yield text
+        except Exception as e:
+            entry["error"] = backend_error(e)
+            raise
+        finally:
+            entry["latency_ms"] = elapsed_ms()
+            self.backend.cassette.record(entry)
+
+    def replay(self, entry):
+        """Recorded answer of a call, waiting as long as the call took"""
+        recorded = self.backend.cassette.next(entry)
+        if recorded is None:
+            raise BackendError(404, "NOT_FOUND", "Call not recorded in the cassette")
+
+        speed = self.backend.speed
+        waited = 0.0
+        for text, offset in zip(recorded["chunks"], recorded["offsets_ms"]):
+            self.backend.sleep(max(0.0, offset / 1000 - waited) * speed)
+            waited = offset / 1000
+            yield text
+        if recorded["error"]:
+            self.backend.sleep(max(0.0, recorded["latency_ms"] / 1000 - waited) * speed)
+            error = recorded["error"]
+            raise BackendError(error["code"], error["status"], error["message"])
@@ -0,0 +1,430 @@
+"""
+Transaction categorizer for MindfulWealth application
+
+Suggests a category for a transaction description with a multinomial Naive
+Bayes model over hashed tokens. The global model learns from every user's
+labelled transactions and each user gets a compact overlay of their own
+counts, weighted so personal habits win over the crowd. Models are trained
+once from the database and then updated as labelled transactions are
+committed, so suggestions never need a full retrain.
+"""
+import re
+import zlib
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+from models import Transaction
+from services.flush_tracking import has_changes, listen_once, stored_values
+
+# Number of hash buckets, must be a power of two
+DEFAULT_FEATURES = 2**15
+
+# Additive smoothing of token counts
+DEFAULT_ALPHA = 0.1
+
+# Weight of a user's own transactions relative to everyone's
+DEFAULT_USER_WEIGHT = 5.0
+
+# Attributes that decide what a transaction teaches the model
+TRACKED_ATTRIBUTES = ("user_id", "description", "category")
+
+# Session.info key of the training updates of a transaction
+PENDING_UPDATES_KEY = "categorizer_pending_updates"
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(description):
+    """
+    Split a description into model tokens
+
+    Words are lowercased, numbers and single characters are dropped and
+    adjacent word pairs are added so that "gas station" and "gas bill" can
+    be told apart.
+    """
+    words = [
+        word
+        for word in TOKEN_PATTERN.findall((description or "").lower())
+        if len(word) > 1 and not word.isdigit()
+    ]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def normalize_category(category):
+    """Key under which a category is learned"""
+    return (category or "").strip().lower()
+
+
+class _UserCounts:
+    """
+    One user's counts, overlaid on the global model
+
+    Token counts are a dense (classes, buckets) matrix over only the buckets
+    this user has used, so overlaying them is a single gather. Column 0 is
+    kept empty for buckets the user never used.
+    """
+
+    def __init__(self, classes):
+        self.documents = np.zeros(classes)
+        self.tokens = np.zeros(classes)
+        self.columns = {}
+        self.counts = np.zeros((classes, 16))
+
+    def grow_classes(self, classes):
+        """Make room for new classes"""
+        extra = classes - len(self.documents)
+        self.documents = np.concatenate([self.documents, np.zeros(extra)])
+        self.tokens = np.concatenate([self.tokens, np.zeros(extra)])
+        self.counts = np.vstack([self.counts, np.zeros((extra, self.counts.shape[1]))])
+
+    def column(self, bucket):
+        """Column of a bucket, adding it if the user never used it"""
+        column = self.columns.get(bucket)
+        if column is None:
+            column = len(self.columns) + 1
+            if column == self.counts.shape[1]:
+                self.counts = np.hstack([self.counts, np.zeros_like(self.counts)])
+            self.columns[bucket] = column
+        return column
+
+    def add(self, positions, buckets, weight):
+        """Count each bucket once under the class at the same index"""
+        columns = [self.column(bucket) for bucket in buckets]
+        np.add.at(self.counts, (positions, columns), weight)
+
+
+class TransactionCategorizer:
+    """Hashed-token multinomial Naive Bayes over transaction descriptions"""
+
+    def __init__(
+        self,
+        n_features=DEFAULT_FEATURES,
+        alpha=DEFAULT_ALPHA,
+        user_weight=DEFAULT_USER_WEIGHT,
+    ):
+        if n_features & (n_features - 1):
+            raise ValueError("n_features must be a power of two")
+        self.n_features = n_features
+        self.alpha = alpha
+        self.user_weight = user_weight
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything learned and mark the model as untrained"""
+        with self._lock:
+            self.classes = []
+            self._class_index = {}
+            self._counts = np.zeros((8, self.n_features))
+            self._documents = np.zeros(8)
+            self._tokens = np.zeros(8)
+            self._users = {}
+            self._terms = {}
+            self.trained = False
+
+    def features(self, description):
+        """Hash bucket of every token of a description"""
+        mask = self.n_features - 1
+        return [zlib.crc32(token.encode()) & mask for token in tokenize(description)]
+
+    def _class(self, category):
+        """Index of a category, adding it (and growing the arrays) if new"""
+        position = self._class_index.get(category)
+        if position is None:
+            position = len(self.classes)
+            if position == len(self._documents):
+                capacity = 2 * len(self._documents)
+                self._counts = np.vstack([self._counts, np.zeros_like(self._counts)])
+                self._documents = np.resize(self._documents, capacity)
+                self._documents[position:] = 0
+                self._tokens = np.resize(self._tokens, capacity)
+                self._tokens[position:] = 0
+                for user in self._users.values():
+                    user.grow_classes(capacity)
+            self.classes.append(category)
+            self._class_index[category] = position
+        return position
+
+    def _user(self, user_id):
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = _UserCounts(len(self._documents))
+        return user
+
+    def learn(self, user_id, description, category, weight=1.0):
+        """
+        Add one labelled description to the model
+
+        Args:
+            user_id (int): Owner of the transaction
+            description (str): Free-text description
+            category (str): Category chosen by the user
+            weight (float): Use -1 to unlearn a description
+        """
+        category = normalize_category(category)
+        features = self.features(description)
+        if not category or not features:
+            return
+
+        with self._lock:
+            position = self._class(category)
+            self._terms.clear()
+            np.add.at(self._counts[position], features, weight)
+            self._documents[position] += weight
+            self._tokens[position] += weight * len(features)
+
+            user = self._user(user_id)
+            user.documents[position] += weight
+            user.tokens[position] += weight * len(features)
+            user.add([position] * len(features), features, weight)
+
+    def train(self, rows):
+        """
+        Learn many labelled descriptions at once
+
+        Args:
+            rows (iterable): (user_id, description, category) tuples
+        """
+        with self._lock:
+            self._terms.clear()
+            positions, features = [], []
+            per_user = defaultdict(lambda: ([], []))
+            for user_id, description, category in rows:
+                category = normalize_category(category)
+                hashed = self.features(description)
+                if not category or not hashed:
+                    continue
+
+                position = self._class(category)
+                positions.extend([position] * len(hashed))
+                features.extend(hashed)
+                self._documents[position] += 1
+
+                user = self._user(user_id)
+                user.documents[position] += 1
+                user.tokens[position] += len(hashed)
+                user_positions, user_features = per_user[user_id]
+                user_positions.extend([position] * len(hashed))
+                user_features.extend(hashed)
+
+            if features:
+                positions = np.asarray(positions, dtype=np.intp)
+                np.add.at(self._counts, (positions, np.asarray(features)), 1.0)
+                np.add.at(self._tokens, positions, 1.0)
+            for user_id, (user_positions, user_features) in per_user.items():
+                self._users[user_id].add(user_positions, user_features, 1.0)
+            self.trained = True
+
+    def _class_terms(self, user_id):
+        """
+        Log-prior and log-denominator of every class for a user
+
+        Both only change when the model learns, so they are cached per user
+        and dropped on every update.
+
+        Returns:
+            tuple: (prior, denominator) arrays, prior is -inf for unused classes
+        """
+        terms = self._terms.get(user_id)
+        if terms is not None:
+            return terms
+
+        classes = len(self.classes)
+        documents = self._documents[:classes].copy()
+        tokens = self._tokens[:classes].copy()
+        user = self._users.get(user_id)
+        if user is not None:
+            documents += self.user_weight * user.documents[:classes]
+            tokens += self.user_weight * user.tokens[:classes]
+
+        active = documents > 0
+        prior = np.full(classes, -np.inf)
+        prior[active] = np.log(documents[active]) - np.log(documents[active].sum())
+        terms = prior, np.log(tokens + self.alpha * self.n_features)
+        self._terms[user_id] = terms
+        return terms
+
+    def _log_likelihoods(self, user_id, buckets):
+        """Smoothed log-likelihood of each bucket under every class, (classes, buckets)"""
+        classes = len(self.classes)
+        counts = self._counts[:classes, buckets]
+        user = self._users.get(user_id)
+        if user is not None:
+            columns = [user.columns.get(bucket, 0) for bucket in buckets]
+            counts += self.user_weight * user.counts[:classes, columns]
+        return np.log(np.maximum(counts, 0.0) + self.alpha)
+
+    def _score(self, user_id, features):
+        """Log-posterior of every class for one hashed document"""
+        prior, denominator = self._class_terms(user_id)
+        likelihood = self._log_likelihoods(user_id, features).sum(axis=1)
+        return prior + likelihood - len(features) * denominator
+
+    def _score_many(self, user_id, documents):
+        """
+        Log-posterior of every class for many hashed documents
+
+        The log-likelihoods of the distinct buckets of the batch are computed
+        once and summed per document.
+
+        Returns:
+            numpy.ndarray: (documents, classes) scores
+        """
+        prior, denominator = self._class_terms(user_id)
+        lengths = np.fromiter((len(d) for d in documents), dtype=np.intp)
+        flat = np.fromiter(
+            (f for document in documents for f in document),
+            dtype=np.intp,
+            count=int(lengths.sum()),
+        )
+        buckets, inverse = np.unique(flat, return_inverse=True)
+        likelihood = self._log_likelihoods(user_id, buckets.tolist())[:, inverse]
+
+        sums = np.zeros((len(prior), len(documents)))
+        filled = lengths > 0
+        if filled.any():
+            offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])[filled]
+            sums[:, filled] = np.add.reduceat(likelihood, offsets, axis=1)
+
+        scores = prior[:, None] + sums - lengths[None, :] * denominator[:, None]
+        return scores.T
+
+    @staticmethod
+    def _probabilities(scores):
+        shifted = np.exp(scores - scores.max(axis=-1, keepdims=True))
+        return shifted / shifted.sum(axis=-1, keepdims=True)
+
+    def suggest(self, user_id, description, limit=3):
+        """
+        Suggest categories for one description, most likely first
+
+        Args:
+            user_id (int): User the suggestion is for
+            description (str): Free-text description
+            limit (int): Maximum number of suggestions
+
+        Returns:
+            list: Dicts with name and confidence (0-1), empty when the
+                  description has no usable words or nothing was learned
+        """
+        features = self.features(description)
+        with self._lock:
+            if not features or not self._documents.any():
+                return []
+            probabilities = self._probabilities(self._score(user_id, features))
+            classes = list(self.classes)
+
+        best = np.argsort(-probabilities)[:limit]
+        return [
+            {"name": classes[i], "confidence": round(float(probabilities[i]), 4)}
+            for i in best
+            if probabilities[i] > 0
+        ]
+
+    def predict_many(self, user_id, descriptions):
+        """
+        Label a batch of descriptions, e.g. a bank statement import
+
+        Args:
+            user_id (int): User the labels are for
+            descriptions (list): Free-text descriptions
+
+        Returns:
+            list: (category or None, confidence) per description
+        """
+        documents = [self.features(d) for d in descriptions]
+        with self._lock:
+            if not documents or not self._documents.any():
+                return [(None, 0.0)] * len(documents)
+            probabilities = self._probabilities(self._score_many(user_id, documents))
+            classes = list(self.classes)
+
+        best = probabilities.argmax(axis=1)
+        return [
+            (classes[i], round(float(p[i]), 4)) if document else (None, 0.0)
+            for document, i, p in zip(documents, best.tolist(), probabilities)
+        ]
+
+
+def train_from_database(db_session, model=None):
+    """
+    Train a categorizer on every labelled transaction
+
+    Args:
+        db_session (Session): SQLAlchemy database session
+        model (TransactionCategorizer): Model to train, defaults to the shared one
+
+    Returns:
+        TransactionCategorizer: The trained model
+    """
+    model = model or categorizer
+    rows = db_session.query(
+        Transaction.user_id, Transaction.description, Transaction.category
+    ).filter(Transaction.description.isnot(None), Transaction.description != "")
+
+    with model._lock:
+        model.reset()
+        model.train(rows.yield_per(1000))
+    return model
+
+
+def get_categorizer(db_session):
+    """Get the shared categorizer, training it on first use"""
+    if not categorizer.trained:
+        with categorizer._lock:
+            if not categorizer.trained:
+                train_from_database(db_session)
+    return categorizer
+
+
+def _collect_updates(session, flush_context, instances):
+    """before_flush hook recording what pending transactions teach the model"""
+    updates = session.info.setdefault(PENDING_UPDATES_KEY, [])
+
+    for record in session.new:
+        if isinstance(record, Transaction):
+            updates.append((record.user_id, record.description, record.category, 1))
+
+    for record in session.deleted:
+        if isinstance(record, Transaction):
+            updates.append((*stored_values(session, record, TRACKED_ATTRIBUTES), -1))
+
+    for record in session.dirty:
+        if isinstance(record, Transaction) and has_changes(record, TRACKED_ATTRIBUTES):
+            updates.append((*stored_values(session, record, TRACKED_ATTRIBUTES), -1))
+            updates.append((record.user_id, record.description, record.category, 1))
+
+
+def _apply_updates(session):
+    """after_commit hook applying the recorded updates to the shared model"""
+    updates = session.info.pop(PENDING_UPDATES_KEY, ())
+    # An untrained model picks everything up from the database when first used
+    if not categorizer.trained:
+        return
+    for user_id, description, category, weight in updates:
+        categorizer.learn(user_id, description, category, weight)
+
+
+def _discard_updates(session, *args):
+    """after_rollback hook, nothing was written"""
+    session.info.pop(PENDING_UPDATES_KEY, None)
+
+
+def track_categorizer_updates(target):
+    """
+    Keep the shared categorizer in step with committed transactions
+
+    Args:
+        target: sessionmaker, Session class or session instance
+    """
+    listen_once(
+        target,
+        ("before_flush", _collect_updates),
+        ("after_commit", _apply_updates),
+        ("after_soft_rollback", _discard_updates),
+    )
+
+
+categorizer = TransactionCategorizer()
@@ -0,0 +1,321 @@
+"""
+Per-user category dictionary for MindfulWealth application
+
+Every category a user has spent in or budgeted for is stored in the
+user_categories table with a usage count and the date it was last used.
+The table is updated whenever transactions or budgets are flushed, and an
+in-memory prefix index built from it serves ranked autocomplete.
+"""
+import bisect
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import Budget, Transaction, UserCategory
+from services.flush_tracking import begin_transaction, has_changes, listen_once, stored_values
+
+# Categories offered to every user, even before they use them
+DEFAULT_CATEGORIES = [
+    "groceries",
+    "dining",
+    "entertainment",
+    "shopping",
+    "travel",
+    "utilities",
+    "housing",
+    "transportation",
+    "healthcare",
+    "education",
+    "investments",
+    "clothing",
+    "electronics",
+    "subscriptions",
+    "gifts",
+    "personal care",
+    "savings",
+]
+
+# Attributes that decide which category a record uses
+TRACKED_ATTRIBUTES = ("user_id", "category")
+
+# Session.info key of the users whose categories changed in a transaction
+CHANGED_USERS_KEY = "category_index_changed_users"
+
+
+def _pending_usage(session):
+    """
+    Collect the category usage changes of a flush
+
+    Returns:
+        dict: (user_id, category) -> [count delta, latest use or None]
+    """
+    usage = defaultdict(lambda: [0, None])
+
+    def add(values, sign, used_at=None):
+        user_id, category = values
+        entry = usage[(user_id, category)]
+        entry[0] += sign
+        if used_at is not None and (entry[1] is None or used_at > entry[1]):
+            entry[1] = used_at
+
+    def used_at(record):
+        if isinstance(record, Transaction):
+            return record.date or datetime.utcnow()
+        return datetime.utcnow()
+
+    tracked = (Transaction, Budget)
+    for record in session.new:
+        if isinstance(record, tracked):
+            add((record.user_id, record.category), 1, used_at(record))
+
+    for record in session.deleted:
+        if isinstance(record, tracked):
+            add(stored_values(session, record, TRACKED_ATTRIBUTES), -1)
+
+    for record in session.dirty:
+        if isinstance(record, tracked) and has_changes(record, TRACKED_ATTRIBUTES):
+            add(stored_values(session, record, TRACKED_ATTRIBUTES), -1)
+            add((record.user_id, record.category), 1, used_at(record))
+
+    return usage
+
+
+def _update_user_categories(session, flush_context, instances):
+    """before_flush hook applying pending category usage to user_categories"""
+    usage = _pending_usage(session)
+    usage = {key: value for key, value in usage.items() if value[0] or value[1]}
+    if not usage:
+        return
+
+    user_ids = {user_id for user_id, _ in usage}
+    with session.no_autoflush:
+        for (user_id, name), (delta, used_at) in usage.items():
+            session.execute(usage_statement(user_id, name, delta, used_at))
+
+    session.info.setdefault(CHANGED_USERS_KEY, set()).update(user_ids)
+
+
+def _invalidate_changed_users(session):
+    """after_commit hook dropping the cached index of users whose categories changed"""
+    for user_id in session.info.pop(CHANGED_USERS_KEY, ()):
+        category_index.invalidate(user_id)
+
+
+def _forget_changed_users(session, *args):
+    """after_rollback hook, nothing was written"""
+    session.info.pop(CHANGED_USERS_KEY, None)
+
+
+def usage_statement(user_id, name, delta, used_at=None):
+    """
+    INSERT ... ON CONFLICT adding uses of a category
+
+    A category used for the first time by two requests at once gets one row
+    with both uses, and last_used only ever moves forward.
+    """
+    statement = sqlite_insert(UserCategory).values(
+        user_id=user_id, name=name, usage_count=max(0, delta), last_used=used_at
+    )
+    last_used, new_last_used = UserCategory.last_used, statement.excluded.last_used
+    return statement.on_conflict_do_update(
+        index_elements=[UserCategory.user_id, UserCategory.name],
+        set_={
+            "usage_count": UserCategory.usage_count + delta,
+            # SQLite's max() is NULL when an argument is
+            "last_used": func.max(
+                func.coalesce(last_used, new_last_used),
+                func.coalesce(new_last_used, last_used),
+            ),
+        },
+    )
+
+
+def record_category_usage(db_session, user_id, counts, used_at=None):
+    """
+    Add usage of categories written with Core statements
+
+    Bulk inserts and upserts bypass the flush hooks, so their callers
+    report the rows they inserted here. The counts are added with
+    usage_statement in the caller's transaction.
+
+    Args:
+        db_session (Session): SQLAlchemy database session
+        user_id (int): ID of the user
+        counts (dict): Category name -> rows inserted
+        used_at (datetime): Time of the use, defaults to the current time
+    """
+    counts = {name: count for name, count in counts.items() if count}
+    if not counts:
+        return
+
+    used_at = used_at or datetime.utcnow()
+    for name, count in counts.items():
+        db_session.execute(usage_statement(user_id, name, count, used_at))
+    db_session.info.setdefault(CHANGED_USERS_KEY, set()).add(user_id)
+
+
+def track_category_usage(target):
+    """
+    Keep user_categories and the autocomplete index up to date
+
+    Args:
+        target: sessionmaker, Session class or session instance
+    """
+    listen_once(
+        target,
+        ("before_flush", _update_user_categories),
+        ("after_commit", _invalidate_changed_users),
+        ("after_soft_rollback", _forget_changed_users),
+    )
+
+
+def rebuild_user_categories(db_session, user_id=None):
+    """
+    Recompute user_categories from transactions and budgets
+
+    Args:
+        db_session (Session): SQLAlchemy database session
+        user_id (int): Only rebuild this user's categories, defaults to everyone
+    """
+    begin_transaction(db_session, "IMMEDIATE")
+    totals = defaultdict(lambda: [0, None])
+    # Budgets have no date, so only transactions decide when a category was last used
+    for model, last_used in (
+        (Transaction, func.max(Transaction.date)),
+        (Budget, func.max(None)),
+    ):
+        query = db_session.query(
+            model.user_id, model.category, func.count(model.id), last_used
+        ).group_by(model.user_id, model.category)
+        if user_id is not None:
+            query = query.filter(model.user_id == user_id)
+
+        for row_user, name, count, used_at in query:
+            entry = totals[(row_user, name)]
+            entry[0] += count
+            if used_at is not None and (entry[1] is None or used_at > entry[1]):
+                entry[1] = used_at
+
+    existing = db_session.query(UserCategory)
+    if user_id is not None:
+        existing = existing.filter(UserCategory.user_id == user_id)
+    existing.delete(synchronize_session=False)
+
+    db_session.add_all(
+        UserCategory(row_user, name, count, last_used)
+        for (row_user, name), (count, last_used) in totals.items()
+    )
+    db_session.commit()
+
+
+class CategoryIndex:
+    """
+    In-memory prefix index of each user's categories
+
+    Every category is indexed under its full lowercased name and under each
+    following word, so "ca" finds "personal care". Users are loaded lazily
+    from user_categories and dropped on writes or after ttl_seconds.
+    """
+
+    def __init__(self, ttl_seconds=300, max_users=1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        self._users = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, user_id=None):
+        """Drop the index of one user, or of every user"""
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+    def _build(self, db_session, user_id):
+        """Load a user's categories and build the sorted key list"""
+        stats = {
+            name: (0, None) for name in DEFAULT_CATEGORIES
+        }
+        for row in db_session.query(UserCategory).filter(
+            UserCategory.user_id == user_id, UserCategory.usage_count > 0
+        ):
+            stats[row.name] = (row.usage_count, row.last_used)
+
+        keys = []
+        for name in stats:
+            words = name.lower().split()
+            for position in range(len(words)):
+                keys.append((" ".join(words[position:]), position == 0, name))
+        keys.sort()
+
+        return {
+            "loaded_at": time.monotonic(),
+            "keys": keys,
+            "prefixes": [key[0] for key in keys],
+            "stats": stats,
+        }
+
+    def _entry(self, db_session, user_id):
+        entry = self._users.get(user_id)
+        if entry is None or time.monotonic() - entry["loaded_at"] > self.ttl_seconds:
+            entry = self._build(db_session, user_id)
+            with self._lock:
+                if len(self._users) >= self.max_users:
+                    self._users.clear()
+                self._users[user_id] = entry
+        return entry
+
+    def names(self, db_session, user_id):
+        """All of a user's categories plus the defaults, sorted alphabetically"""
+        return sorted(self._entry(db_session, user_id)["stats"])
+
+    def complete(self, db_session, user_id, prefix, limit=10):
+        """
+        Get the categories matching a prefix, best first
+
+        Categories whose name starts with the prefix rank before those
+        where a later word does, then by usage count and most recent use.
+
+        Args:
+            db_session (Session): SQLAlchemy database session
+            user_id (int): ID of the user
+            prefix (str): Text typed so far
+            limit (int): Maximum number of suggestions
+
+        Returns:
+            list: Dicts with name, usage_count and last_used
+        """
+        entry = self._entry(db_session, user_id)
+        prefix = " ".join(prefix.lower().split())
+
+        start = bisect.bisect_left(entry["prefixes"], prefix)
+        matches = {}
+        for key, is_start, name in entry["keys"][start:]:
+            if not key.startswith(prefix):
+                break
+            matches[name] = matches.get(name, False) or is_start
+
+        stats = entry["stats"]
+        ranked = sorted(
+            matches,
+            key=lambda name: (
+                not matches[name],
+                -stats[name][0],
+                -(stats[name][1].timestamp() if stats[name][1] else 0),
+                name,
+            ),
+        )
+        return [
+            {
+                "name": name,
+                "usage_count": stats[name][0],
+                "last_used": stats[name][1].isoformat() if stats[name][1] else None,
+            }
+            for name in ranked[:limit]
+        ]
+
+
+category_index = CategoryIndex()
@@ -0,0 +1,223 @@
+"""
+Currency rate service for MindfulWealth application
+
+Exchange rates are loaded once from a local JSON file of dated snapshots
+(data/currency_rates.json). Each snapshot lists the value of one unit of
+the base currency in every supported currency. Conversions use the latest
+snapshot on or before the requested date, and amounts can be converted in
+bulk with NumPy or as per-currency subtotals from grouped SQL queries.
+"""
+import os
+import json
+import bisect
+import pathlib
+import logging
+import threading
+from datetime import date as date_type, datetime, time
+from functools import lru_cache
+
+import numpy as np
+from sqlalchemy import case, literal
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATES_PATH = pathlib.Path(__file__).parent.parent / "data" / "currency_rates.json"
+
+# Currency of amounts stored without one, and of aggregates kept in the database
+DEFAULT_CURRENCY = "EUR"
+
+
+class RateTable:
+    """Dated exchange rate snapshots with an in-memory cache per day"""
+
+    def __init__(self, path=None):
+        """
+        Load the rate snapshots
+
+        Args:
+            path (str): Path to the JSON rates file, defaults to data/currency_rates.json
+        """
+        self.path = pathlib.Path(path or DEFAULT_RATES_PATH)
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        self.base = data.get("base", "USD")
+        snapshots = sorted(data["snapshots"], key=lambda s: s["date"])
+        self.dates = [date_type.fromisoformat(s["date"]) for s in snapshots]
+
+        # Snapshots are rows of a (snapshot, currency) matrix so that bulk
+        # conversions are a single fancy-indexing operation
+        self.currencies = sorted({c for s in snapshots for c in s["rates"]})
+        self.index = {currency: i for i, currency in enumerate(self.currencies)}
+        self._matrix = np.array(
+            [[s["rates"].get(c, np.nan) for c in self.currencies] for s in snapshots]
+        )
+
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def rates_on(self, on=None):
+        """
+        Get the rate vector in effect on a date
+
+        Args:
+            on (date or datetime): Reference date, defaults to the latest snapshot
+
+        Returns:
+            numpy.ndarray: Units of each currency per unit of the base currency,
+                           ordered like self.currencies
+        """
+        return self._matrix[self.snapshot_index(on)]
+
+    def snapshot_index(self, on=None):
+        """Index of the snapshot in effect on a date (the latest for None)"""
+        if on is None:
+            return len(self.dates) - 1
+        if isinstance(on, datetime):
+            on = on.date()
+
+        position = self._cache.get(on)
+        if position is None:
+            # Dates before the first snapshot use the oldest rates
+            position = max(0, bisect.bisect_right(self.dates, on) - 1)
+            with self._lock:
+                self._cache[on] = position
+        return position
+
+    def snapshot_expression(self, column):
+        """
+        SQL expression giving the snapshot index in effect at a date column
+
+        Lets grouped queries split subtotals by rate period so that they
+        convert exactly like rows converted one by one at their own date.
+        """
+        if len(self.dates) == 1:
+            return literal(0)
+        return case(
+            *(
+                (column < datetime.combine(day, time.min), i - 1)
+                for i, day in enumerate(self.dates)
+                if i > 0
+            ),
+            else_=len(self.dates) - 1,
+        )
+
+    def _position(self, currency):
+        try:
+            return self.index[currency or DEFAULT_CURRENCY]
+        except KeyError:
+            raise ValueError(f"Unsupported currency: {currency}")
+
+    def convert(self, amount, from_currency, to_currency=DEFAULT_CURRENCY, on=None):
+        """
+        Convert a single amount
+
+        Args:
+            amount (float): Amount to convert
+            from_currency (str): Currency code of the amount
+            to_currency (str): Target currency code
+            on (date or datetime): Date of the rates to use
+
+        Returns:
+            float: Converted amount
+        """
+        if from_currency == to_currency:
+            return amount
+        rates = self.rates_on(on)
+        return amount / rates[self._position(from_currency)] * rates[
+            self._position(to_currency)
+        ]
+
+    def convert_many(
+        self, amounts, currencies, to_currency=DEFAULT_CURRENCY, on=None, snapshots=None
+    ):
+        """
+        Convert many amounts in one vectorized operation
+
+        Args:
+            amounts (array-like): Amounts to convert
+            currencies (list): Currency code of each amount
+            to_currency (str): Target currency code
+            on (date or datetime): Date of the rates to use
+            snapshots (array-like): Snapshot index of each amount, overrides `on`
+
+        Returns:
+            numpy.ndarray: Converted amounts
+        """
+        positions = np.fromiter(
+            (self._position(c) for c in currencies), dtype=np.intp, count=len(currencies)
+        )
+        if snapshots is None:
+            rows = self.snapshot_index(on)
+        else:
+            rows = np.asarray(snapshots, dtype=np.intp)
+
+        factors = (
+            self._matrix[rows, self._position(to_currency)]
+            / self._matrix[rows, positions]
+        )
+        return np.asarray(amounts, dtype=float) * factors
+
+    def convert_totals(
+        self, rows, to_currency=DEFAULT_CURRENCY, on=None, by_snapshot=False
+    ):
+        """
+        Combine per-currency subtotals from a grouped query into one total per key
+
+        Args:
+            rows (iterable): (*key, currency, subtotal) rows, e.g. from
+                GROUP BY category, currency. With by_snapshot, rows are
+                (*key, snapshot, currency, subtotal) grouped on
+                snapshot_expression(date) as well.
+            to_currency (str): Target currency code
+            on (date or datetime): Date of the rates to use without by_snapshot
+            by_snapshot (bool): Convert each subtotal with its own snapshot
+
+        Returns:
+            dict: key -> converted total, where key is the single key value,
+                  a tuple for several key columns, or None for rows of
+                  (currency, subtotal)
+        """
+        rows = list(rows)
+        if not rows:
+            return {}
+
+        key_length = len(rows[0]) - (3 if by_snapshot else 2)
+        converted = self.convert_many(
+            [row[-1] or 0.0 for row in rows],
+            [row[-2] for row in rows],
+            to_currency,
+            on,
+            snapshots=[row[-3] for row in rows] if by_snapshot else None,
+        )
+
+        totals = {}
+        for row, amount in zip(rows, converted.tolist()):
+            key = row[:key_length]
+            key = key[0] if len(key) == 1 else (key or None)
+            totals[key] = totals.get(key, 0.0) + amount
+        return totals
+
+
+@lru_cache(maxsize=None)
+def get_rate_table(path=None):
+    """
+    Get the shared rate table, loading it on first use
+
+    The rates file can be overridden with the CURRENCY_RATES_PATH
+    environment variable.
+    """
+    path = path or os.getenv("CURRENCY_RATES_PATH") or DEFAULT_RATES_PATH
+    table = RateTable(path)
+    logger.info(
+        f"Loaded {len(table.dates)} currency rate snapshots from {table.path} "
+        f"(currencies: {', '.join(table.currencies)})"
+    )
+    return table
+
+
+def to_default_currency(amount, currency, on=None):
+    """Convert an amount to DEFAULT_CURRENCY with the rates of a date"""
+    if not currency or currency == DEFAULT_CURRENCY:
+        return amount or 0.0
+    return get_rate_table().convert(amount or 0.0, currency, DEFAULT_CURRENCY, on)
@@ -0,0 +1,610 @@
+"""
+Dashboard data for MindfulWealth application
+
+The dashboard, goals, portfolio, activity and insights endpoints build their
+responses from a DashboardContext: one user's data as seen by one request,
+where every query runs at most once, on first use. The bootstrap endpoint
+builds several of these resources from a single context inside one read
+transaction, so rows fetched for one resource are reused by the others and
+all of them describe the same snapshot of the database.
+
+The dashboard itself is made of sections registered with the sections they
+read. A request for some sections builds only those and their prerequisites,
+and only the data they use is queried.
+"""
+import time
+from datetime import datetime, timedelta
+from functools import cached_property
+from sqlalchemy import extract, func
+
+from models import Budget, Goal, SavedImpulse, Transaction
+from projections import future_value, growth
+from services.activity_feed import get_activity_page
+from services.anomaly_service import anomaly_insight, get_alerts
+from services.cashflow_service import get_savings_overview
+from services.currency_service import get_rate_table
+from services.flush_tracking import begin_transaction
+from services.recurring_service import get_recurring_payments, subscription_insight
+
+# Demo balance of the investment accounts, which are not connected yet
+DEMO_PORTFOLIO_BALANCE = 24563.00
+DEMO_ALLOCATION = {"stocks": 45, "bonds": 30, "cash": 25}
+
+
+class DashboardContext:
+    """Lazily loaded data of one user shared by the dashboard resources"""
+
+    def __init__(self, db_session, user_id, currency, now=None):
+        self.db_session = db_session
+        self.user_id = user_id
+        self.currency = currency
+        self.now = now or datetime.now()
+        self.month = self.now.month
+        self.year = self.now.year
+        self.prev_month = self.month - 1 if self.month > 1 else 12
+        self.prev_year = self.year if self.month > 1 else self.year - 1
+
+    @cached_property
+    def rates(self):
+        return get_rate_table()
+
+    @cached_property
+    def current_transactions(self):
+        """This month's transactions"""
+        return (
+            self.db_session.query(Transaction)
+            .filter(
+                Transaction.user_id == self.user_id,
+                extract("month", Transaction.date) == self.month,
+                extract("year", Transaction.date) == self.year,
+            )
+            .all()
+        )
+
+    @cached_property
+    def monthly_spending(self):
+        """
+        Spending of the last 6 months in the context's currency, from
+        per-currency subtotals grouped in SQL
+
+        Returns:
+            dict: (year, month, category, is_impulse) -> amount
+        """
+        six_months_ago = self.now - timedelta(days=180)
+        year_column = extract("year", Transaction.date).label("year")
+        month_column = extract("month", Transaction.date).label("month")
+        return self.rates.convert_totals(
+            self.db_session.query(
+                year_column,
+                month_column,
+                Transaction.category,
+                Transaction.is_impulse,
+                Transaction.currency,
+                func.sum(Transaction.amount),
+            )
+            .filter(
+                Transaction.user_id == self.user_id,
+                Transaction.date >= six_months_ago,
+            )
+            .group_by(
+                year_column,
+                month_column,
+                Transaction.category,
+                Transaction.is_impulse,
+                Transaction.currency,
+            ),
+            self.currency,
+        )
+
+    @cached_property
+    def spending_by_category(self):
+        """This month's spending per category"""
+        spending = {}
+        for (year, month, category, _), amount in self.monthly_spending.items():
+            if (year, month) == (self.year, self.month):
+                spending[category] = spending.get(category, 0) + amount
+        return spending
+
+    @cached_property
+    def total_spent(self):
+        return sum(self.spending_by_category.values())
+
+    @cached_property
+    def budgets(self):
+        """This month's budgets"""
+        return (
+            self.db_session.query(Budget)
+            .filter_by(user_id=self.user_id, month=self.month, year=self.year)
+            .all()
+        )
+
+    @cached_property
+    def total_budget(self):
+        return sum(b.planned_amount for b in self.budgets)
+
+    @cached_property
+    def impulses(self):
+        return self.db_session.query(SavedImpulse).filter_by(user_id=self.user_id).all()
+
+    @cached_property
+    def total_saved(self):
+        """Saved impulses in the context's currency"""
+        return self.rates.convert_totals(
+            self.db_session.query(SavedImpulse.currency, func.sum(SavedImpulse.amount))
+            .filter(SavedImpulse.user_id == self.user_id)
+            .group_by(SavedImpulse.currency),
+            self.currency,
+        ).get(None, 0)
+
+    @cached_property
+    def projected_values(self):
+        """Projected 1 and 5 year values of the saved impulses in the context's currency"""
+        rows = (
+            self.db_session.query(
+                SavedImpulse.currency,
+                func.sum(SavedImpulse.projected_value_1yr),
+                func.sum(SavedImpulse.projected_value_5yr),
+            )
+            .filter(SavedImpulse.user_id == self.user_id)
+            .group_by(SavedImpulse.currency)
+            .all()
+        )
+        totals = self.rates.convert_totals(
+            [(years, currency, subtotal) for currency, *subtotals in rows
+             for years, subtotal in zip((1, 5), subtotals)],
+            self.currency,
+        )
+        return {years: totals.get(years, 0) for years in (1, 5)}
+
+    @cached_property
+    def goals(self):
+        """Financial goals, with progress maintained as impulses are saved"""
+        return [
+            goal.to_dict()
+            for goal in self.db_session.query(Goal)
+            .filter(Goal.user_id == self.user_id)
+            .order_by(Goal.id)
+        ]
+
+    @cached_property
+    def savings(self):
+        """Savings rate and its trend from the monthly income/spending rollup"""
+        return get_savings_overview(self.db_session, self.user_id, currency=self.currency)
+
+    @cached_property
+    def alerts(self):
+        """Unusual transactions flagged when they were written"""
+        return get_alerts(self.db_session, self.user_id, limit=5)
+
+    @cached_property
+    def recurring_payments(self):
+        return get_recurring_payments(self.db_session, self.user_id)
+
+    @cached_property
+    def activity(self):
+        """First page of the activity feed and the cursor of the next one"""
+        return get_activity_page(self.db_session, self.user_id)
+
+
+def financial_insights(context, over_budget_category=None):
+    """
+    Insights shared by the dashboard and the insights endpoint
+
+    Args:
+        context (DashboardContext): Data of the user
+        over_budget_category (str): Over-budget category to suggest
+                                    reallocating, if any
+    """
+    insights = []
+
+    savings_rate_change = context.savings["savings_rate_change"]
+    if savings_rate_change > 0:
+        insights.append(
+            {
+                "type": "positive",
+                "title": "Positive Trend",
+                "description": f"Your savings rate has increased by {savings_rate_change}% compared to last month. Keep up the good work!",
+            }
+        )
+
+    # Budget optimization insight
+    if over_budget_category:
+        insights.append(
+            {
+                "type": "suggestion",
+                "title": "Budget Optimization",
+                "description": f"Consider reallocating your {over_budget_category} budget or finding ways to reduce spending in this category.",
+            }
+        )
+
+    unusual_spending = anomaly_insight(context.alerts, context.currency)
+    if unusual_spending:
+        insights.append(unusual_spending)
+
+    # Subscription optimization from detected recurring payments
+    subscription_audit = subscription_insight(context.recurring_payments, context.currency)
+    if subscription_audit:
+        insights.append(subscription_audit)
+
+    # Investment insight
+    if context.total_saved > 0:
+        insights.append(
+            {
+                "type": "suggestion",
+                "title": "Investment Opportunity",
+                "description": f"If you redirected just 10% more of your discretionary spending to investments, you could grow your portfolio by an additional €{future_value(context.total_spent * 0.1 * 12, 1)} in one year.",
+            }
+        )
+
+    return insights
+
+
+# Dashboard sections by name: (builder, names of the sections it reads).
+# Builders are called with the context followed by those sections' values
+SECTIONS = {}
+
+
+def dashboard_section(name, *requires):
+    """Register the builder of a dashboard section"""
+    def register(builder):
+        SECTIONS[name] = (builder, requires)
+        return builder
+    return register
+
+
+def resolve_sections(names):
+    """
+    Sections needed to build the requested ones, prerequisites first
+
+    Raises:
+        ValueError: If a section is unknown
+    """
+    order = []
+
+    def visit(name, path=()):
+        if name in order:
+            return
+        if name not in SECTIONS:
+            raise ValueError(f"Unknown dashboard section: {name}")
+        if name in path:
+            raise ValueError(f"Dashboard sections depend on each other: {name}")
+        for required in SECTIONS[name][1]:
+            visit(required, path + (name,))
+        order.append(name)
+
+    for name in names:
+        visit(name)
+    return order
+
+
+@dashboard_section("summary")
+def summary_section(context):
+    """Headline figures of the month"""
+    total_spent = context.total_spent
+    total_budget = context.total_budget
+    total_saved = context.total_saved
+
+    impulse_spending = 0
+    prev_total_spent = 0
+    for (year, month, _, is_impulse), amount in context.monthly_spending.items():
+        if (year, month) == (context.year, context.month):
+            if is_impulse:
+                impulse_spending += amount
+        elif (year, month) == (context.prev_year, context.prev_month):
+            prev_total_spent += amount
+
+    # Calculate spending change percentage
+    spending_change_pct = 0
+    if prev_total_spent > 0:
+        spending_change_pct = round(
+            ((total_spent - prev_total_spent) / prev_total_spent) * 100, 1
+        )
+
+    # Calculate budget remaining
+    budget_remaining = total_budget - total_spent
+    budget_remaining_pct = 0
+    if total_budget > 0:
+        budget_remaining_pct = round((budget_remaining / total_budget) * 100, 1)
+
+    # Calculate impulse spending percentage
+    impulse_spending_pct = 0
+    if total_spent > 0:
+        impulse_spending_pct = round((impulse_spending / total_spent) * 100, 1)
+
+    return {
+        "total_spent": total_spent,
+        "total_budget": total_budget,
+        "budget_remaining": budget_remaining,
+        "budget_remaining_pct": budget_remaining_pct,
+        "spending_change_pct": spending_change_pct,
+        "total_saved": total_saved,
+        "total_balance": DEMO_PORTFOLIO_BALANCE,
+        "monthly_income": context.savings["income"],
+        "monthly_expenses": total_spent,
+        "savingsRate": context.savings["savings_rate"],
+        "savingsRate_change_pct": context.savings["savings_rate_change"],
+        "potential_growth_1yr": context.projected_values[1],
+        "potential_growth_5yr": context.projected_values[5],
+        "investment_growth_1yr": growth(total_saved, 1),
+        "investment_growth_5yr": growth(total_saved, 5),
+        "impulse_spending_pct": impulse_spending_pct,
+    }
+
+
+@dashboard_section("categories")
+def categories_section(context):
+    """This month's spending per category against its budget, largest first"""
+    categories = []
+    for category, amount in context.spending_by_category.items():
+        # Find budget for this category if it exists
+        budget_item = next((b for b in context.budgets if b.category == category), None)
+        planned = budget_item.planned_amount if budget_item else 0
+
+        # Calculate percentage of budget used
+        budget_used_pct = 0
+        if planned > 0:
+            budget_used_pct = round((amount / planned) * 100, 1)
+
+        categories.append(
+            {
+                "name": category,
+                "spent": amount,
+                "budget": planned,
+                "remaining": max(0, planned - amount),
+                "percentage": budget_used_pct,
+                "status": "over" if amount > planned and planned > 0 else "under",
+            }
+        )
+
+    # Sort categories by spending amount (descending)
+    categories.sort(key=lambda x: x["spent"], reverse=True)
+    return categories
+
+
+@dashboard_section("trends")
+def trends_section(context):
+    """Monthly spending trend of the last 6 months"""
+    monthly_trends = {}
+    trend_rows = sorted(context.monthly_spending.items(), key=lambda item: item[0][:2])
+    for (year, month, category, _), amount in trend_rows:
+        month_key = f"{int(year)}-{int(month):02d}"
+        if month_key not in monthly_trends:
+            monthly_trends[month_key] = {
+                "month": datetime(int(year), int(month), 1).strftime("%b %Y"),
+                "total": 0,
+                "categories": {},
+            }
+
+        monthly_trends[month_key]["total"] += amount
+
+        # Track spending by category
+        categories_spent = monthly_trends[month_key]["categories"]
+        categories_spent[category] = categories_spent.get(category, 0) + amount
+
+    # Convert to list and sort by date
+    return list(monthly_trends.values())
+
+
+@dashboard_section("transaction_counts")
+def transaction_counts_section(context):
+    """Impulse vs. reasonable transactions this month"""
+    impulse_count = len([t for t in context.current_transactions if t.is_impulse])
+    return {
+        "impulse": impulse_count,
+        "reasonable": len(context.current_transactions) - impulse_count,
+        "total": len(context.current_transactions),
+    }
+
+
+@dashboard_section("portfolio")
+def portfolio_section(context):
+    """Investment accounts"""
+    # In a real app, this would come from actual investment accounts
+    return {
+        "total": DEMO_PORTFOLIO_BALANCE,
+        "allocation": DEMO_ALLOCATION,
+    }
+
+
+@dashboard_section("activity")
+def activity_section(context):
+    return build_activity(context)
+
+
+@dashboard_section("goals")
+def goals_section(context):
+    return context.goals
+
+
+@dashboard_section("alerts")
+def alerts_section(context):
+    return context.alerts
+
+
+@dashboard_section("insights", "categories")
+def insights_section(context, categories):
+    """Insights, naming the over-budget category with the most spending"""
+    over_budget = [c["name"] for c in categories if c["status"] == "over"]
+    return financial_insights(context, over_budget[0] if over_budget else None)
+
+
+@dashboard_section("financial_health", "summary", "categories")
+def financial_health_section(context, summary, categories):
+    """Financial health indicators"""
+    impulse_spending_pct = summary["impulse_spending_pct"]
+    return {
+        "budget_adherence": "good"
+        if summary["total_spent"] <= summary["total_budget"]
+        else "warning",
+        "impulse_control": "good"
+        if impulse_spending_pct < 20
+        else ("warning" if impulse_spending_pct < 40 else "poor"),
+        "savings_rate": "good" if summary["total_saved"] > 0 else "warning",
+        "budget_coverage": "good"
+        if len(categories) > 0 and all(c["budget"] > 0 for c in categories)
+        else "warning",
+    }
+
+
+@dashboard_section("recommendations", "summary", "categories")
+def recommendations_section(context, summary, categories):
+    """Recommendations based on spending patterns"""
+    recommendations = []
+
+    # Check for over-budget categories
+    over_budget_categories = [c for c in categories if c["status"] == "over"]
+    if over_budget_categories:
+        top_over = over_budget_categories[0]["name"]
+        recommendations.append(
+            f"Your {top_over} spending is over budget. Consider adjusting your budget or reducing spending in this category."
+        )
+
+    # Check for high impulse spending
+    impulse_spending_pct = summary["impulse_spending_pct"]
+    if impulse_spending_pct > 30:
+        recommendations.append(
+            f"Your impulse spending is {impulse_spending_pct}% of your total spending. Try using the 24-hour rule before making non-essential purchases."
+        )
+
+    # Check for missing budget categories
+    missing_budget = [c["name"] for c in categories if c["budget"] == 0]
+    if missing_budget:
+        recommendations.append(
+            f"Consider setting a budget for these categories: {', '.join(missing_budget[:3])}."
+        )
+
+    # Check for potential savings
+    if summary["total_saved"] < 100:
+        recommendations.append(
+            "Try redirecting more impulse purchases to savings to build your investment portfolio."
+        )
+
+    return recommendations
+
+
+@dashboard_section("recent_transactions")
+def recent_transactions_section(context):
+    """Last 5 transactions of the month"""
+    recent = sorted(context.current_transactions, key=lambda t: t.date, reverse=True)[:5]
+    return [t.to_dict() for t in recent]
+
+
+@dashboard_section("recent_impulses")
+def recent_impulses_section(context):
+    """Last 5 saved impulses"""
+    recent = sorted(context.impulses, key=lambda i: i.date, reverse=True)[:5]
+    return [i.to_dict() for i in recent]
+
+
+def build_dashboard(context, sections=None):
+    """
+    Comprehensive dashboard data: budget tracking, spending analysis,
+    investment projections and impulse purchase redirection metrics
+
+    Only the requested sections and the sections they read are built, and
+    data is only queried when a built section uses it.
+
+    Args:
+        context (DashboardContext): Data of the user
+        sections (list): Names of the sections to return, defaults to all
+
+    Returns:
+        dict: Requested sections by name, plus a meta entry listing them
+              with the build time of every section built, in milliseconds
+
+    Raises:
+        ValueError: If a section is unknown
+    """
+    requested = list(SECTIONS) if sections is None else list(dict.fromkeys(sections))
+
+    results, timings = {}, {}
+    for name in resolve_sections(requested):
+        builder, requires = SECTIONS[name]
+        start = time.perf_counter()
+        results[name] = builder(context, *(results[r] for r in requires))
+        timings[name] = round((time.perf_counter() - start) * 1000, 3)
+
+    dashboard = {name: results[name] for name in requested}
+    dashboard["meta"] = {"sections": requested, "timings_ms": timings}
+    return dashboard
+
+
+def build_goals(context):
+    """Financial goals of the user"""
+    return context.goals
+
+
+def build_portfolio(context):
+    """Portfolio overview of the user"""
+    total_saved = context.total_saved
+
+    # In a production app, this would come from actual investment accounts
+    # For demo purposes, we'll create mock data based on total_saved
+    return {
+        "total": max(DEMO_PORTFOLIO_BALANCE, total_saved * 1.5),
+        "allocation": DEMO_ALLOCATION,
+        "performance": {"ytd": 5.2, "oneYear": 8.7, "threeYears": 24.3},
+    }
+
+
+def build_activity(context):
+    """First page of the activity feed"""
+    activity, _ = context.activity
+    return activity
+
+
+def build_insights(context):
+    """Financial insights, naming the category furthest over budget"""
+    over_budget_categories = []
+    for category, amount in context.spending_by_category.items():
+        budget_item = next((b for b in context.budgets if b.category == category), None)
+        if budget_item and amount > budget_item.planned_amount:
+            over_budget_categories.append(
+                {
+                    "name": category,
+                    "amount": amount,
+                    "budget": budget_item.planned_amount,
+                    "overage": amount - budget_item.planned_amount,
+                }
+            )
+
+    # Sort by overage amount
+    over_budget_categories.sort(key=lambda x: x["overage"], reverse=True)
+    return financial_insights(
+        context, over_budget_categories[0]["name"] if over_budget_categories else None
+    )
+
+
+# Resources the bootstrap endpoint can return, by name
+RESOURCE_BUILDERS = {
+    "dashboard": build_dashboard,
+    "goals": build_goals,
+    "portfolio": build_portfolio,
+    "activity": build_activity,
+    "insights": build_insights,
+}
+
+
+def build_resources(db_session, user_id, currency, names):
+    """
+    Build several dashboard resources from one snapshot
+
+    Args:
+        db_session (Session): SQLAlchemy database session
+        user_id (int): ID of the user
+        currency (str): Currency of the amounts
+        names (list): Resource names from RESOURCE_BUILDERS
+
+    Returns:
+        dict: Resource name -> response body of its endpoint
+
+    Raises:
+        ValueError: If a resource name is unknown
+    """
+    unknown = [name for name in names if name not in RESOURCE_BUILDERS]
+    if unknown:
+        raise ValueError(f"Unknown resources: {', '.join(unknown)}")
+
+    begin_transaction(db_session)
+    context = DashboardContext(db_session, user_id, currency)
+    return {name: RESOURCE_BUILDERS[name](context) for name in names}
@@ -0,0 +1,293 @@
+"""
+Change events pushed to connected clients for MindfulWealth application
+
+Clients open a server-sent event stream instead of polling the dashboard.
+Writes to transactions, budgets and saved impulses are collected while they
+are flushed and published to the user's open streams once the transaction
+commits, followed by the recomputed summary figures of the dashboard. Only
+the summary section is built, and nothing is built for users without an
+open stream. A rolled back transaction publishes nothing.
+
+The pub/sub is in-process: every app process pushes the writes it commits
+to the streams it holds. A client that reconnects, or falls too far behind,
+catches up through /api/sync from the version it last saw.
+
+Browsers' EventSource cannot send headers, so streams are opened with a
+short-lived, single-use ticket in the URL rather than the access token,
+which would end up in proxy, server and browser history logs.
+"""
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy.orm import Session
+
+from models import Budget, SavedImpulse, Transaction
+from services.dashboard_service import DashboardContext, build_dashboard
+from services.flush_tracking import listen_once
+
+logger = logging.getLogger(__name__)
+
+# Event type prefix of each model's changes
+EVENT_TYPES = {
+    Transaction: "transaction",
+    Budget: "budget",
+    SavedImpulse: "saved_impulse",
+}
+
+# Events buffered for a client before it is asked to resync instead
+STREAM_QUEUE_SIZE = int(os.getenv("EVENT_STREAM_QUEUE_SIZE", 100))
+
+# Seconds between comments keeping idle connections open through proxies
+HEARTBEAT_SECONDS = 15
+
+# Milliseconds browsers wait before reconnecting a dropped stream
+RETRY_MS = 5000
+
+# Seconds a stream ticket can be used within
+TICKET_SECONDS = 30
+
+# Session info key of the events waiting for the commit
+PENDING_EVENTS_KEY = "pending_change_events"
+
+
+class Subscription:
+    """Events waiting to be sent on one client's stream"""
+
+    def __init__(self, user_id, currency, queue_size=STREAM_QUEUE_SIZE):
+        self.user_id = user_id
+        self.currency = currency
+        self.messages = queue.Queue(queue_size)
+
+    def put(self, message):
+        """Queue an event, replacing the backlog with a resync when full"""
+        try:
+            self.messages.put_nowait(message)
+        except queue.Full:
+            with self.messages.mutex:
+                self.messages.queue.clear()
+            self.messages.put_nowait({"type": "resync"})
+
+    def get(self, timeout):
+        """Next event, None if none arrived within the timeout"""
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBroker:
+    """In-process fan-out of events to the open streams of each user"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+        self.delivered = 0
+
+    def subscribe(self, user_id, currency):
+        with self.lock:
+            subscription = Subscription(user_id, currency)
+            self.subscriptions.setdefault(user_id, []).append(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        """Remove a stream, closing an already closed one does nothing"""
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.user_id, [])
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+            if not subscriptions:
+                self.subscriptions.pop(subscription.user_id, None)
+
+    def has_subscribers(self, user_id):
+        return user_id in self.subscriptions
+
+    def currencies(self, user_id):
+        """Currencies the user's streams show amounts in"""
+        with self.lock:
+            return {s.currency for s in self.subscriptions.get(user_id, ())}
+
+    def publish(self, user_id, messages, currency=None):
+        """
+        Send events to a user's streams
+
+        Args:
+            user_id (int): ID of the user
+            messages (list): Event dicts
+            currency (str): Only send to streams in this currency
+        """
+        with self.lock:
+            for subscription in self.subscriptions.get(user_id, ()):
+                if currency is None or subscription.currency == currency:
+                    for message in messages:
+                        subscription.put(message)
+                        self.delivered += 1
+
+    def metrics(self):
+        with self.lock:
+            return {
+                "users": len(self.subscriptions),
+                "streams": sum(map(len, self.subscriptions.values())),
+                "delivered": self.delivered,
+            }
+
+
+class StreamTickets:
+    """
+    Signed tickets opening one event stream each
+
+    Any app process accepts a ticket until it expires, and remembers the
+    tickets it accepted so none opens a second stream there.
+    """
+
+    def __init__(self, secret, ttl=TICKET_SECONDS):
+        self.serializer = URLSafeTimedSerializer(secret, salt="event-stream")
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.used = {}
+
+    def issue(self, user_id):
+        return self.serializer.dumps({"user_id": user_id, "nonce": secrets.token_urlsafe(16)})
+
+    def redeem(self, ticket):
+        """
+        Use a ticket
+
+        Returns:
+            int: ID of the user the ticket was issued to, None if it is
+                 invalid, expired or already used
+        """
+        try:
+            data = self.serializer.loads(ticket, max_age=self.ttl)
+        except BadSignature:
+            return None
+
+        now = time.time()
+        with self.lock:
+            self.used = {nonce: expiry for nonce, expiry in self.used.items() if expiry > now}
+            if data["nonce"] in self.used:
+                return None
+            self.used[data["nonce"]] = now + self.ttl
+        return data["user_id"]
+
+
+def format_event(message):
+    """Server-sent event frame of an event dict"""
+    return f"data: {json.dumps(message, separators=(',', ':'))}\n\n"
+
+
+def stream_events(subscription, first=None, heartbeat=HEARTBEAT_SECONDS):
+    """
+    Server-sent event frames of a stream, until the client disconnects
+
+    Args:
+        subscription (Subscription): Stream of the client
+        first (dict): Event sent when the stream opens
+        heartbeat (float): Seconds without events before a keep-alive comment
+    """
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        if first is not None:
+            yield format_event(first)
+        while True:
+            message = subscription.get(heartbeat)
+            yield format_event(message) if message is not None else ": keep-alive\n\n"
+    finally:
+        event_broker.unsubscribe(subscription)
+
+
+def record_event(session, user_id, message):
+    """
+    Publish an event when the session commits
+
+    Used for changes written with Core statements, which the flush hooks
+    do not see.
+    """
+    if event_broker.has_subscribers(user_id):
+        session.info.setdefault(PENDING_EVENTS_KEY, {}).setdefault(user_id, []).append(message)
+
+
+def change_event(record, action):
+    """Event of a created, updated or deleted record"""
+    message = {"type": f"{EVENT_TYPES[type(record)]}.{action}", "id": record.id}
+    if action != "deleted":
+        message["record"] = record.to_dict()
+    return message
+
+
+def _collect_events(session, flush_context):
+    """after_flush hook turning written records into events, ids are assigned"""
+    for records, action in (
+        (session.new, "created"),
+        (session.dirty, "updated"),
+        (session.deleted, "deleted"),
+    ):
+        for record in records:
+            if type(record) not in EVENT_TYPES:
+                continue
+            if action == "updated" and not session.is_modified(record):
+                continue
+            record_event(session, record.user_id, change_event(record, action))
+
+
+def _summary_events(bind, user_ids):
+    """
+    Summary figures of users with events, in each currency they stream
+
+    Built on a session of its own once the write committed, so the database
+    lock is not held while they are computed.
+    """
+    messages = []
+    session = Session(bind=bind)
+    try:
+        for user_id in user_ids:
+            for currency in event_broker.currencies(user_id):
+                try:
+                    context = DashboardContext(session, user_id, currency)
+                    summary = build_dashboard(context, ["summary"])["summary"]
+                except Exception as e:
+                    # A failed push must not fail the write
+                    logger.warning(f"Error computing summary event: {str(e)}")
+                    continue
+                messages.append((user_id, currency, {"type": "summary", "summary": summary}))
+    finally:
+        session.close()
+    return messages
+
+
+def _publish_events(session):
+    """after_commit hook sending the collected events, then the new summaries"""
+    pending = session.info.pop(PENDING_EVENTS_KEY, {})
+    if not pending:
+        return
+    for user_id, messages in pending.items():
+        event_broker.publish(user_id, messages)
+    for user_id, currency, message in _summary_events(session.get_bind(), pending):
+        event_broker.publish(user_id, [message], currency)
+
+
+def _discard_events(session, *args):
+    """after_rollback hook, nothing was written"""
+    session.info.pop(PENDING_EVENTS_KEY, None)
+
+
+def track_change_events(target):
+    """
+    Publish committed changes to the users' event streams
+
+    Args:
+        target: sessionmaker, Session class or session instance
+    """
+    listen_once(
+        target,
+        ("after_flush", _collect_events),
+        ("after_commit", _publish_events),
+        ("after_soft_rollback", _discard_events),
+    )
+
+
+event_broker = EventBroker()
@@ -0,0 +1,83 @@
+"""
+Helpers for before_flush hooks maintaining derived tables
+
+Used by the services that keep goal progress, monthly totals and category
+statistics up to date as records are written, by their rebuilds, and by
+readers that need one consistent snapshot.
+
+Hooks write derived values as SQL expressions (column + delta, INSERT ...
+ON CONFLICT) instead of values computed in Python, so requests flushing at
+the same time both count. Each derived table also has a rebuild from the raw
+records, run at startup for databases created before the table existed and
+nightly to repair drift.
+"""
+import weakref
+from sqlalchemy import event, inspect
+
+# Hooks installed per sessionmaker, Session class or session
+_installed_hooks = weakref.WeakKeyDictionary()
+
+
+def stored_values(session, record, attributes):
+    """
+    Values of attributes as stored in the database
+
+    Attribute history does not keep the old value of an expired attribute
+    (e.g. edited after a commit), so the stored row is read back instead.
+
+    Returns:
+        Row: One value per attribute
+    """
+    model = type(record)
+    with session.no_autoflush:
+        return (
+            session.query(*(getattr(model, a) for a in attributes))
+            .filter(model.id == record.id)
+            .one()
+        )
+
+
+def has_changes(record, attributes):
+    """Check whether any of the attributes of a pending record was modified"""
+    state = inspect(record)
+    return any(state.attrs[a].history.has_changes() for a in attributes)
+
+
+def begin_transaction(db_session, mode=""):
+    """
+    Start a transaction on the session's connection
+
+    pysqlite only sends BEGIN before the first write, so separate SELECTs
+    each see the latest committed data. A plain BEGIN gives reads one
+    snapshot, ended when the session is closed or rolled back. Rebuilds pass
+    "IMMEDIATE" to take the write lock before reading the raw records:
+    otherwise a request could commit between their SELECTs and DELETE, and
+    the increment its hooks made would be overwritten by the rebuilt rows.
+
+    Args:
+        db_session (Session): SQLAlchemy database session
+        mode (str): SQLite transaction mode, e.g. "IMMEDIATE"
+    """
+    connection = db_session.connection()
+    dbapi_connection = connection.connection.dbapi_connection
+    if connection.dialect.name == "sqlite" and not dbapi_connection.in_transaction:
+        connection.exec_driver_sql(f"BEGIN {mode}".strip())
+
+
+def listen_once(target, *hooks):
+    """
+    Install session event hooks on a target unless they already are
+
+    Listening twice on a sessionmaker runs the hook twice. event.contains is
+    no guard: it is keyed by id(target) and keeps sessionmakers that were
+    garbage collected, so a new one reusing the address would get no hooks.
+
+    Args:
+        target: sessionmaker, Session class or session instance
+        *hooks: (event name, function) pairs
+    """
+    installed = _installed_hooks.setdefault(target, set())
+    for name, hook in hooks:
+        if (name, hook) not in installed:
+            event.listen(target, name, hook)
+            installed.add((name, hook))
@@ -5,9 +5,15 @@ Gemini API integration for MindfulWealth chatbot
 import json
 import re
 import logging
+from datetime import timedelta
 from typing import Dict, Any, Optional, Union
 import os
 
+from services.response_catalog import get_response_catalog
+from projections import future_value
+from services.prompt_templates import prompt_library
+from single_flight import flight_key, single_flight
+
 try:
     import google.generativeai as genai
 
@@ -22,12 +28,19 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# The API rejects cached contents below a minimum size, which depends on the
+# model. Smaller prompts are given as the model's system instruction.
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CACHE_MIN_TOKENS", 4096))
+CONTEXT_CACHE_TTL = timedelta(seconds=int(os.getenv("GEMINI_CACHE_TTL_SECONDS", 3600)))
+
 
 class GeminiService:
     """Service for interacting with Google's Gemini API"""
 
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, backend=None):
         self.api_key = api_key or os.environ.get("GEMINI_API_KEY")
+        # Stand-in for the google.generativeai module, see model_backends
+        self.backend = backend
         self.genai = None
         self.model = None
         self.client = None
@@ -35,6 +48,7 @@ class GeminiService:
         self.preferred_currency = "EUR"
         self.language = "fr"
         self.personality_mode = "nice"
+        self.responses = get_response_catalog()
         self.category_translations = {
             "en": {
                 "savings": "savings",
@@ -170,51 +184,21 @@ class GeminiService:
             ],
         }
 
-        self.system_instruction = """
-You are MindfulBot, a financial assistant focused on helping users manage their spending and investments wisely. Your primary goals are:
-
-1. IMPULSE PURCHASE LIMITATION: Help users identify impulse purchases and redirect that money toward investments.
-2. INVESTMENT FOCUS: Encourage users to invest money they would have spent on impulse purchases.
-3. BUDGET TRACKING EMPHASIS: Help users track reasonable spending and stay within budget.
-
-When responding to users, follow these guidelines:
-
-FOR IMPULSE PURCHASES (non-essential, emotionally-driven purchases):
-- Acknowledge the emotional appeal of the purchase
-- Gently suggest redirecting the money to investments instead
-- Calculate potential growth at 8% annual return (1 year and 5 years)
-- Offer a specific investment alternative
-- Use a supportive tone that doesn't make users feel judged
-
-FOR REASONABLE SPENDING (essentials, planned purchases):
-- Affirm the user's good decision
-- Suggest budget categories if appropriate
-- Provide relevant financial tips for that category
-- Encourage tracking the expense
-
-RESPONSE STYLE:
-- Be friendly and engaging
-- Use emojis occasionally to add personality
-- Personalize responses based on user history when possible
-- Keep responses concise but informative
-- Adapt your tone based on the user's personality preference:
-  * NICE: Supportive, encouraging, and gentle
-  * FUNNY: Light-hearted with appropriate humor
-  * IRONIC: Slightly sarcastic but still helpful
-
-Always remember that your goal is to help users build wealth through mindful spending and consistent investing.
-"""
+        self.prompts = prompt_library
+        # (model, how it holds the system instruction) per compiled prompt
+        self.template_models = {}
 
         self.initialize()
 
     def initialize(self):
         """Initialize the Gemini API client"""
-        if not self.api_key:
+        self.template_models = {}
+        if not self.api_key and self.backend is None:
             logger.warning("No Gemini API key provided. Using mock responses.")
             return
 
         try:
-            self.genai = genai
+            self.genai = self.backend or genai
             self.genai.configure(api_key=self.api_key)
 
             # Define a list of models to try in order of preference
@@ -270,6 +254,14 @@ Always remember that your goal is to help users build wealth through mindful spe
             logger.error(f"Failed to initialize Gemini API: {str(e)}")
             self.model = None
 
+    def set_personality_mode(self, mode):
+        """Set the personality of the prompts sent without an explicit one"""
+        self.personality_mode = mode
+
+    def set_preferred_currency(self, currency):
+        """Set the currency amounts are given in"""
+        self.preferred_currency = currency
+
     def _translate_category(self, category, language="en"):
         """Translate category between languages"""
         if language == "en":
@@ -372,7 +364,7 @@ Always remember that your goal is to help users build wealth through mindful spe
 
     def _calculate_investment_growth(self, amount, years=1):
         """Calculate potential investment growth at 8% annual return"""
-        return round(amount * (1.08**years), 2)
+        return future_value(amount, years)
 
     def _format_investment_advice(self, amount, language="en"):
         """Format investment advice based on amount and language"""
@@ -394,6 +386,8 @@ Always remember that your goal is to help users build wealth through mindful spe
         conversation_history: list = None,
         context_data: dict = None,
         language: str = "fr",
+        user_id: int = None,
+        personality: str = None,
     ) -> str:
         """Get a response from the Gemini model
 
@@ -403,6 +397,10 @@ Always remember that your goal is to help users build wealth through mindful spe
             conversation_history: List of previous messages in the conversation
             context_data: Additional context about the conversation
             language: The language to respond in (default: "fr")
+            user_id: ID of the user asking, identical prompts of one user
+                sent concurrently share one API call
+            personality: Personality of the compiled prompt, defaults to the
+                service's personality mode
 
         Returns:
             The model's response
@@ -416,52 +414,30 @@ Always remember that your goal is to help users build wealth through mindful spe
             logger.info(f"Using language: {language}")
 
             # Special handling for luxury purchases like Gucci shoes
-            message_lower = message.lower()
-            if (
-                "gucci" in message_lower
-                or "luxe" in message_lower
-                or "luxury" in message_lower
-            ) and (
-                "chaussure" in message_lower
-                or "shoe" in message_lower
-                or "acheter" in message_lower
-                or "buy" in message_lower
-            ):
+            topics = self.responses.match(message)
+            if "luxury" in topics and "purchase" in topics:
                 logger.info(
                     "Detected luxury purchase request, using specialized response"
                 )
-                if language == "fr":
-                    return "Je vois que vous êtes intéressé par des chaussures Gucci. C'est une marque de luxe avec des prix élevés. Avant de faire cet achat, avez-vous considéré l'impact sur vos finances?\n\nUne paire de chaussures Gucci coûte généralement entre 500€ et 1500€. Si vous investissiez cette somme au lieu de l'utiliser pour un achat impulsif, elle pourrait valoir entre 540€ et 1620€ dans un an, et entre 735€ et 2205€ dans cinq ans (avec un rendement annuel de 8%).\n\nVoici quelques alternatives à considérer:\n- Investir dans un ETF qui suit le marché global\n- Ajouter à votre épargne d'urgence\n- Chercher des chaussures de qualité à un prix plus abordable\n\nQue pensez-vous de ces options?"
-                else:
-                    return "I see you're interested in Gucci shoes. This is a luxury brand with high prices. Before making this purchase, have you considered the impact on your finances?\n\nA pair of Gucci shoes typically costs between $500 and $1,500. If you invested this money instead of using it for an impulse purchase, it could be worth between $540 and $1,620 in one year, and between $735 and $2,205 in five years (with an 8% annual return).\n\nHere are some alternatives to consider:\n- Invest in an ETF that tracks the global market\n- Add to your emergency savings\n- Look for quality shoes at a more affordable price\n\nWhat do you think about these options?"
+                return self.responses.get("luxury_shoes", language)
 
             # Check if model is available
             if not self.model:
                 logger.warning("Gemini model not available, using rule-based response")
-                # For impulse purchases like shoes, provide a specific response
-                if "chaussure" in message_lower or "shoe" in message_lower:
-                    if language == "fr":
-                        return "Je vois que vous êtes intéressé par des chaussures. Avant de faire cet achat, avez-vous considéré s'il s'agit d'un besoin ou d'un désir? Si c'est un achat impulsif, pensez à l'impact sur vos finances à long terme. Investir cet argent pourrait vous rapporter bien plus dans le futur."
-                    else:
-                        return "I see you're interested in shoes. Before making this purchase, have you considered whether this is a need or a want? If it's an impulse purchase, think about the impact on your long-term finances. Investing this money could bring you much more in the future."
-                else:
-                    # Generic fallback response
-                    if language == "fr":
-                        return "Désolé, le service IA n'est pas disponible actuellement. Je peux quand même vous aider avec des conseils financiers de base. Que voulez-vous savoir?"
-                    else:
-                        return "Sorry, the AI service is currently unavailable. I can still help you with basic financial advice. What would you like to know?"
+                return self._fallback_response(topics, language, "ai_unavailable")
 
             # Try to get a response from the model
             try:
                 # Prepare the prompt with system instructions
-                prompt = system_prompt or self.system_instruction
-                prompt += f"\n\nUser message: {message}"
+                model, scope, prompt = self._prepare(
+                    message, system_prompt, conversation_history, context_data, language, personality
+                )
 
                 # Log the request
                 logger.info(f"Sending request to Gemini API with model: {self.model}")
 
                 # Generate content
-                response = self.model.generate_content(prompt)
+                response = self._generate(model, prompt, user_id, scope)
 
                 # Check if response has text
                 if hasattr(response, "text") and response.text:
@@ -469,17 +445,7 @@ Always remember that your goal is to help users build wealth through mindful spe
                     return response.text
                 else:
                     logger.error("Empty response from Gemini API")
-                    # Fallback for empty response
-                    if "chaussure" in message_lower or "shoe" in message_lower:
-                        if language == "fr":
-                            return "Je vois que vous êtes intéressé par des chaussures. Avant de faire cet achat, avez-vous considéré s'il s'agit d'un besoin ou d'un désir? Si c'est un achat impulsif, pensez à l'impact sur vos finances à long terme. Investir cet argent pourrait vous rapporter bien plus dans le futur."
-                        else:
-                            return "I see you're interested in shoes. Before making this purchase, have you considered whether this is a need or a want? If it's an impulse purchase, think about the impact on your long-term finances. Investing this money could bring you much more in the future."
-                    else:
-                        if language == "fr":
-                            return "Je n'ai pas pu générer une réponse spécifique à votre question. Pourriez-vous reformuler ou me donner plus de détails sur ce que vous cherchez à savoir?"
-                        else:
-                            return "I couldn't generate a specific response to your question. Could you rephrase or give me more details about what you're looking to know?"
+                    return self._fallback_response(topics, language, "empty_response")
 
             except Exception as api_error:
                 logger.error(f"Error in Gemini API call: {str(api_error)}")
@@ -491,7 +457,10 @@ Always remember that your goal is to help users build wealth through mindful spe
                 if self.model:
                     try:
                         logger.info("Retrying with reinitialized model")
-                        response = self.model.generate_content(prompt)
+                        model, scope, prompt = self._prepare(
+                            message, system_prompt, conversation_history, context_data, language, personality
+                        )
+                        response = self._generate(model, prompt, user_id, scope)
                         if hasattr(response, "text") and response.text:
                             logger.info(
                                 "Successfully received response after reinitialization"
@@ -501,61 +470,121 @@ Always remember that your goal is to help users build wealth through mindful spe
                             logger.error(
                                 "Empty response from Gemini API after reinitialization"
                             )
-                            # Fallback for empty response after retry
-                            if "chaussure" in message_lower or "shoe" in message_lower:
-                                if language == "fr":
-                                    return "Je vois que vous êtes intéressé par des chaussures. Avant de faire cet achat, avez-vous considéré s'il s'agit d'un besoin ou d'un désir? Si c'est un achat impulsif, pensez à l'impact sur vos finances à long terme. Investir cet argent pourrait vous rapporter bien plus dans le futur."
-                                else:
-                                    return "I see you're interested in shoes. Before making this purchase, have you considered whether this is a need or a want? If it's an impulse purchase, think about the impact on your long-term finances. Investing this money could bring you much more in the future."
-                            else:
-                                if language == "fr":
-                                    return "Je n'ai pas pu générer une réponse spécifique à votre question. Pourriez-vous reformuler ou me donner plus de détails sur ce que vous cherchez à savoir?"
-                                else:
-                                    return "I couldn't generate a specific response to your question. Could you rephrase or give me more details about what you're looking to know?"
+                            return self._fallback_response(
+                                topics, language, "empty_response"
+                            )
                     except Exception as retry_error:
                         logger.error(f"Retry also failed: {str(retry_error)}")
-                        # Fallback for retry failure
-                        if "chaussure" in message_lower or "shoe" in message_lower:
-                            if language == "fr":
-                                return "Je vois que vous êtes intéressé par des chaussures. Avant de faire cet achat, avez-vous considéré s'il s'agit d'un besoin ou d'un désir? Si c'est un achat impulsif, pensez à l'impact sur vos finances à long terme. Investir cet argent pourrait vous rapporter bien plus dans le futur."
-                            else:
-                                return "I see you're interested in shoes. Before making this purchase, have you considered whether this is a need or a want? If it's an impulse purchase, think about the impact on your long-term finances. Investing this money could bring you much more in the future."
-                        else:
-                            if language == "fr":
-                                return "Désolé, je n'ai pas pu générer une réponse. Veuillez réessayer avec une question différente."
-                            else:
-                                return "Sorry, I couldn't generate a response. Please try again with a different question."
+                        return self._fallback_response(
+                            topics, language, "generation_failed"
+                        )
                 else:
                     logger.error(
                         "Reinitialization failed. Falling back to rule-based response"
                     )
-                    # Fallback for reinitialization failure
-                    if "chaussure" in message_lower or "shoe" in message_lower:
-                        if language == "fr":
-                            return "Je vois que vous êtes intéressé par des chaussures. Avant de faire cet achat, avez-vous considéré s'il s'agit d'un besoin ou d'un désir? Si c'est un achat impulsif, pensez à l'impact sur vos finances à long terme. Investir cet argent pourrait vous rapporter bien plus dans le futur."
-                        else:
-                            return "I see you're interested in shoes. Before making this purchase, have you considered whether this is a need or a want? If it's an impulse purchase, think about the impact on your long-term finances. Investing this money could bring you much more in the future."
-                    else:
-                        if language == "fr":
-                            return "Désolé, je n'ai pas pu générer une réponse. Veuillez réessayer avec une question différente."
-                        else:
-                            return "Sorry, I couldn't generate a response. Please try again with a different question."
+                    return self._fallback_response(topics, language, "generation_failed")
 
         except Exception as e:
             logger.error(f"Error getting response from Gemini: {str(e)}")
 
             # Final fallback responses based on message content
-            message_lower = message.lower()
-            if "chaussure" in message_lower or "shoe" in message_lower:
-                if language == "fr":
-                    return "Je vois que vous êtes intéressé par des chaussures. Avant de faire cet achat, avez-vous considéré s'il s'agit d'un besoin ou d'un désir? Si c'est un achat impulsif, pensez à l'impact sur vos finances à long terme. Investir cet argent pourrait vous rapporter bien plus dans le futur."
-                else:
-                    return "I see you're interested in shoes. Before making this purchase, have you considered whether this is a need or a want? If it's an impulse purchase, think about the impact on your long-term finances. Investing this money could bring you much more in the future."
-            else:
-                if language == "fr":
-                    return "Désolé, je n'ai pas pu traiter votre demande. Veuillez réessayer avec une question différente."
-                else:
-                    return "Sorry, I couldn't process your request. Please try again with a different question."
+            return self._fallback_response(
+                self.responses.match(message), language, "request_failed"
+            )
+
+    def _prepare(self, message, system_prompt, conversation_history, context_data, language, personality):
+        """Choose the model and build the prompt of a request
+
+        Args:
+            message: The user's message
+            system_prompt: Explicit instructions, sent inline instead of the
+                compiled prompt
+            conversation_history: Previous messages as role/content dicts
+            context_data: Additional context about the conversation
+            language: The language to respond in
+            personality: Personality of the compiled prompt
+
+        Returns:
+            Tuple of the model, the compiled prompt's key (None for explicit
+            instructions) and the text to send
+        """
+        if system_prompt:
+            return self.model, None, f"{system_prompt}\n\nUser message: {message}"
+
+        template = self.prompts.get(language, personality or self.personality_mode)
+        model, system = self._template_model(template)
+        if model is None:
+            model = self.model
+            prompt = template.inline(message, context_data, conversation_history)
+        else:
+            prompt = template.render(message, context_data, conversation_history)
+        self.prompts.record(template, prompt, system)
+        return model, template.key, prompt
+
+    def _template_model(self, template):
+        """Model holding a compiled prompt's system instruction, made once
+
+        Returns:
+            Tuple of the model and "cached" or "instruction", or (None,
+            "inline") when the prompt must carry the instruction itself
+        """
+        handle = self.template_models.get(template.key)
+        if handle is None:
+            handle = self.template_models[template.key] = self._create_template_model(template)
+        return handle
+
+    def _create_template_model(self, template):
+        """Store a compiled prompt as cached content, or as a system instruction"""
+        name = getattr(self.model, "model_name", None)
+        if self.genai is None or not isinstance(name, str):
+            return None, "inline"
+
+        caching = getattr(self.genai, "caching", None)
+        if caching is not None and template.system_tokens >= CONTEXT_CACHE_MIN_TOKENS:
+            try:
+                cached = caching.CachedContent.create(
+                    model=name, system_instruction=template.system, ttl=CONTEXT_CACHE_TTL
+                )
+                return self.genai.GenerativeModel.from_cached_content(cached_content=cached), "cached"
+            except Exception as e:
+                logger.warning(f"Could not cache the {'/'.join(template.key)} prompt: {str(e)}")
+
+        try:
+            return self.genai.GenerativeModel(name, system_instruction=template.system), "instruction"
+        except Exception as e:
+            logger.warning(f"Could not create the {'/'.join(template.key)} model: {str(e)}")
+            return None, "inline"
+
+    def _generate(self, model, prompt, user_id=None, scope=None):
+        """Call the model, sharing the call of an identical prompt in flight
+
+        Args:
+            model: Model to call
+            prompt: Text sent to the model
+            user_id: ID of the user the prompt is for
+            scope: Key of the compiled prompt the model holds
+
+        Returns:
+            The model's response object
+        """
+        key = flight_key(user_id, getattr(self.model, "model_name", None), scope, prompt)
+        return single_flight.do("gemini", key, lambda: model.generate_content(prompt))
+
+    def _fallback_response(self, topics, language, key):
+        """Pick a canned response when the model cannot answer
+
+        Args:
+            topics: Topics matched in the user's message by the response catalog
+            language: The language to respond in
+            key: Catalog key of the generic fallback for this failure
+
+        Returns:
+            The shoe purchase advice if the message is about shoes, otherwise
+            the generic fallback
+        """
+        if "shoes" in topics:
+            return self.responses.get("shoe_purchase", language)
+        return self.responses.get(key, language)
 
     def _translate_category(self, category: str, language: str) -> str:
         """Translate a category name to the specified language
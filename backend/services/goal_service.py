@@ -0,0 +1,144 @@
+"""
+Goal progress tracking for MindfulWealth application
+
+Goal progress is stored on the goals table and updated whenever saved
+impulses or transactions are flushed, so reading goals is a single indexed
+lookup instead of a scan of the user's history.
+"""
+from collections import defaultdict
+from sqlalchemy import func
+
+from models import Goal, SavedImpulse, Transaction
+from services.flush_tracking import has_changes, listen_once, stored_values
+from services.currency_service import (
+    DEFAULT_CURRENCY,
+    get_rate_table,
+    to_default_currency,
+)
+
+# Attributes that decide how much a record contributes to a goal
+TRACKED_ATTRIBUTES = ("user_id", "category", "amount", "currency", "date")
+
+
+def counts_towards(goal_categories, record_type, category):
+    """
+    Check whether a record contributes to a goal
+
+    Saved impulses count towards goals without linked categories and towards
+    goals linked to their category. Transactions only count towards goals
+    linked to their category (e.g. transfers categorised as "Savings").
+
+    Args:
+        goal_categories (list): Lowercased linked categories of the goal
+        record_type (type): SavedImpulse or Transaction
+        category (str): Category of the record
+
+    Returns:
+        bool: True if the record's amount is part of the goal's progress
+    """
+    if record_type is SavedImpulse and not goal_categories:
+        return True
+    return bool(category) and category.lower() in goal_categories
+
+
+def compute_goal_progress(db_session, user_id, categories=None):
+    """
+    Compute a goal's progress from the user's full history
+
+    Only used to backfill a new goal; afterwards progress is maintained
+    incrementally by track_goal_progress.
+
+    Args:
+        db_session (Session): SQLAlchemy database session
+        user_id (int): Owner of the goal
+        categories (list): Linked categories
+
+    Returns:
+        float: Amount saved towards the goal, in DEFAULT_CURRENCY
+    """
+    categories = [c.lower() for c in categories or []]
+    rates = get_rate_table()
+
+    # Subtotals per currency and rate snapshot, converted like the
+    # incremental updates which use the rates of each record's date
+    rows = []
+    for model in (SavedImpulse, Transaction):
+        if model is Transaction and not categories:
+            continue
+        snapshot = rates.snapshot_expression(model.date).label("snapshot")
+        query = (
+            db_session.query(snapshot, model.currency, func.sum(model.amount))
+            .filter(model.user_id == user_id)
+            .group_by(snapshot, model.currency)
+        )
+        if categories:
+            query = query.filter(func.lower(model.category).in_(categories))
+        rows.extend(query.all())
+
+    return rates.convert_totals(rows, DEFAULT_CURRENCY, by_snapshot=True).get(None, 0.0)
+
+
+def _pending_changes(session):
+    """
+    Collect the amounts added and removed by a flush
+
+    Returns:
+        list: (user_id, record type, category, signed amount in
+              DEFAULT_CURRENCY) tuples
+    """
+    changes = []
+
+    def add(record, values, sign):
+        user_id, category, amount, currency, date = values
+        amount = to_default_currency(amount, currency, date)
+        changes.append((user_id, type(record), category, sign * amount))
+
+    tracked = (SavedImpulse, Transaction)
+    for record in session.new:
+        if isinstance(record, tracked):
+            add(record, [getattr(record, a) for a in TRACKED_ATTRIBUTES], 1)
+
+    for record in session.deleted:
+        if isinstance(record, tracked):
+            add(record, stored_values(session, record, TRACKED_ATTRIBUTES), -1)
+
+    for record in session.dirty:
+        if isinstance(record, tracked) and has_changes(record, TRACKED_ATTRIBUTES):
+            add(record, stored_values(session, record, TRACKED_ATTRIBUTES), -1)
+            add(record, [getattr(record, a) for a in TRACKED_ATTRIBUTES], 1)
+
+    return changes
+
+
+def _update_goal_progress(session, flush_context, instances):
+    """before_flush hook applying pending impulse/transaction changes to goals"""
+    changes = _pending_changes(session)
+    if not changes:
+        return
+
+    user_ids = {user_id for user_id, _, _, _ in changes}
+    with session.no_autoflush:
+        goals = session.query(Goal).filter(Goal.user_id.in_(user_ids)).all()
+
+    deltas = defaultdict(float)
+    for goal in goals:
+        goal_categories = goal.category_list
+        for user_id, record_type, category, amount in changes:
+            if user_id == goal.user_id and counts_towards(
+                goal_categories, record_type, category
+            ):
+                deltas[goal] += amount
+
+    for goal, delta in deltas.items():
+        if delta:
+            goal.current_amount = Goal.current_amount + delta
+
+
+def track_goal_progress(target):
+    """
+    Keep goal progress up to date on every flush of a session
+
+    Args:
+        target: sessionmaker, Session class or session instance
+    """
+    listen_once(target, ("before_flush", _update_goal_progress))
@@ -0,0 +1,376 @@
+"""
+Local intent router for MindfulWealth chatbot
+
+Answers questions about the user's own data (spending, budgets, savings)
+directly from the database so they never reach the Gemini API.
+"""
+import re
+import logging
+from datetime import datetime
+from sqlalchemy import func
+
+from models import Transaction, Budget, SavedImpulse
+from services.response_catalog import get_response_catalog
+from services.currency_service import get_rate_table
+
+logger = logging.getLogger(__name__)
+
+CURRENCY_SYMBOLS = {"EUR": "€", "USD": "$", "GBP": "£", "JPY": "¥"}
+
+# Question patterns, checked in order. All patterns run on the lowercased message.
+QUESTION_PATTERNS = [
+    (
+        "total_saved",
+        re.compile(
+            r"how much (?:have i|did i|i(?:'ve)?) (?:saved|save)"
+            r"|combien (?:ai-je|ai je|j'ai) (?:économisé|épargné|mis de côté)"
+        ),
+    ),
+    (
+        "over_budget",
+        re.compile(
+            r"\b(?:over|above|within|under) (?:my |the )?budget"
+            r"|dépass\w* (?:mon |le |du )?budget"
+            r"|(?:au-dessus|en dessous|au dessus) (?:de mon|du) budget"
+        ),
+    ),
+    (
+        "budget_remaining",
+        re.compile(
+            r"(?:budget|money) (?:is |do i have )?left|left (?:in|of|on) my budget"
+            r"|remaining budget|budget remaining"
+            r"|reste[- ]t[- ]il|il me reste|budget restant|reste (?:de|dans) mon budget"
+        ),
+    ),
+    (
+        "spent",
+        re.compile(
+            r"how much (?:did|have|do) i (?:spend|spent)|what did i spend|my spending"
+            r"|combien (?:ai-je|ai je|j'ai) dépensé|mes dépenses"
+        ),
+    ),
+]
+
+PREVIOUS_MONTH_PATTERN = re.compile(r"last month|previous month|mois dernier|mois précédent")
+
+
+def month_bounds(year, month):
+    """
+    Get the [start, end) datetime range of a calendar month
+
+    Args:
+        year (int): Year
+        month (int): Month (1-12)
+
+    Returns:
+        tuple: (start, end) datetimes
+    """
+    start = datetime(year, month, 1)
+    if month == 12:
+        end = datetime(year + 1, 1, 1)
+    else:
+        end = datetime(year, month + 1, 1)
+    return start, end
+
+
+def previous_month(year, month):
+    """Get the (year, month) preceding the given month"""
+    if month == 1:
+        return year - 1, 12
+    return year, month - 1
+
+
+class LocalIntentRouter:
+    """Router answering data questions from Transaction/Budget aggregates"""
+
+    def __init__(self, db_session, category_translations=None, catalog=None):
+        """
+        Initialize the router
+
+        Args:
+            db_session (Session): SQLAlchemy database session
+            category_translations (dict): language -> {english name: translated name},
+                used to recognise and display categories in the user's language
+            catalog (ResponseCatalog): Templates, defaults to the shared catalog
+        """
+        self.db_session = db_session
+        self.catalog = catalog or get_response_catalog()
+        self.category_translations = category_translations or {}
+
+        # Every known alias (English names and translations) -> English name
+        self.category_aliases = {}
+        for translations in self.category_translations.values():
+            for english, translated in translations.items():
+                self.category_aliases[english.lower()] = english
+                self.category_aliases[translated.lower()] = english
+
+    def classify(self, message):
+        """
+        Classify a message as a data question
+
+        Args:
+            message (str): The user's message
+
+        Returns:
+            tuple: (intent, params) or (None, None) for open-ended messages
+        """
+        if not message:
+            return None, None
+
+        message_lower = message.lower()
+        for intent, pattern in QUESTION_PATTERNS:
+            if pattern.search(message_lower):
+                params = {
+                    "previous_month": bool(PREVIOUS_MONTH_PATTERN.search(message_lower))
+                }
+                return intent, params
+
+        return None, None
+
+    def answer(self, user_id, message, language="fr", currency="EUR", now=None):
+        """
+        Answer a data question from the database
+
+        Args:
+            user_id (int): ID of the user asking
+            message (str): The user's message
+            language (str): Language to answer in
+            currency (str): Currency code used to format amounts
+            now (datetime): Reference time, defaults to the current time
+
+        Returns:
+            str: The answer, or None if the message should go to the AI service
+        """
+        if user_id is None:
+            return None
+
+        intent, params = self.classify(message)
+        if intent is None:
+            return None
+
+        now = now or datetime.now()
+        year, month = now.year, now.month
+        period = self.catalog.get("local_period_current", language)
+        if params["previous_month"]:
+            year, month = previous_month(year, month)
+            period = self.catalog.get("local_period_previous", language)
+
+        handler = getattr(self, f"_answer_{intent}")
+        response = handler(
+            user_id, message.lower(), year, month, period, language, currency
+        )
+        if response is not None:
+            logger.info(f"Answered '{intent}' question locally for user {user_id}")
+        return response
+
+    def _format_amount(self, amount, currency, language):
+        """Format a monetary amount for display"""
+        symbol = CURRENCY_SYMBOLS.get(currency, currency)
+        if language == "fr":
+            return f"{amount:.2f} {symbol}"
+        return f"{symbol}{amount:.2f}"
+
+    def _template(self, key, language, **values):
+        """Fill a catalog template"""
+        return self.catalog.get(key, language).format(**values)
+
+    def _display_category(self, category, language):
+        """Translate an English category name for display"""
+        return self.category_translations.get(language, {}).get(
+            category.lower(), category
+        )
+
+    def _find_category(self, user_id, message_lower):
+        """
+        Find the category a message is about
+
+        Looks for the user's own category names first, then known aliases.
+
+        Returns:
+            str: Category name as stored on transactions, or None
+        """
+        user_categories = [
+            row.category
+            for row in self.db_session.query(Transaction.category)
+            .filter(Transaction.user_id == user_id)
+            .distinct()
+        ]
+
+        candidates = {c.lower(): c for c in user_categories}
+        for alias, english in self.category_aliases.items():
+            candidates.setdefault(alias, candidates.get(english.lower(), english))
+
+        # Longest names first so "personal care" beats "personal"
+        for alias in sorted(candidates, key=len, reverse=True):
+            if re.search(rf"\b{re.escape(alias)}", message_lower):
+                return candidates[alias]
+        return None
+
+    def _spending_for_month(self, user_id, year, month, currency, category=None):
+        """Sum (converted to `currency`) and count a user's transactions for a month"""
+        start, end = month_bounds(year, month)
+        query = (
+            self.db_session.query(
+                Transaction.currency,
+                func.count(Transaction.id),
+                func.sum(Transaction.amount),
+            )
+            .filter(
+                Transaction.user_id == user_id,
+                Transaction.date >= start,
+                Transaction.date < end,
+            )
+            .group_by(Transaction.currency)
+        )
+        if category is not None:
+            query = query.filter(func.lower(Transaction.category) == category.lower())
+
+        rows = query.all()
+        count = sum(row[1] for row in rows)
+        total = get_rate_table().convert_totals(
+            [(row[0], row[2]) for row in rows], currency
+        ).get(None, 0.0)
+        return total, count
+
+    def _budget_status(self, user_id, year, month, currency):
+        """
+        Compare planned budgets with spending (converted to `currency`) for a month
+
+        Returns:
+            tuple: (total planned, total spent, list of (category, spent, planned)
+                   for over-budget categories)
+        """
+        budgets = dict(
+            self.db_session.query(Budget.category, Budget.planned_amount)
+            .filter(
+                Budget.user_id == user_id, Budget.month == month, Budget.year == year
+            )
+            .all()
+        )
+
+        start, end = month_bounds(year, month)
+        spending = get_rate_table().convert_totals(
+            self.db_session.query(
+                Transaction.category, Transaction.currency, func.sum(Transaction.amount)
+            )
+            .filter(
+                Transaction.user_id == user_id,
+                Transaction.date >= start,
+                Transaction.date < end,
+            )
+            .group_by(Transaction.category, Transaction.currency),
+            currency,
+        )
+
+        over = [
+            (category, spending[category], planned)
+            for category, planned in budgets.items()
+            if spending.get(category, 0) > planned
+        ]
+        over.sort(key=lambda item: item[1] - item[2], reverse=True)
+
+        return sum(budgets.values()), sum(spending.values()), over
+
+    def _answer_spent(
+        self, user_id, message_lower, year, month, period, language, currency
+    ):
+        category = self._find_category(user_id, message_lower)
+        total, count = self._spending_for_month(
+            user_id, year, month, currency, category
+        )
+        amount = self._format_amount(total, currency, language)
+
+        if category is None:
+            return self._template(
+                "local_spent_total", language, amount=amount, count=count, period=period
+            )
+        return self._template(
+            "local_spent_category",
+            language,
+            amount=amount,
+            count=count,
+            period=period,
+            category=self._display_category(category, language),
+        )
+
+    def _answer_over_budget(
+        self, user_id, message_lower, year, month, period, language, currency
+    ):
+        planned, spent, over = self._budget_status(user_id, year, month, currency)
+        if not planned:
+            return self.catalog.get("local_no_budget", language)
+
+        budget = self._format_amount(planned, currency, language)
+        if over:
+            categories = ", ".join(
+                self._display_category(category, language) for category, _, _ in over
+            )
+            return self._template(
+                "local_over_budget",
+                language,
+                categories=categories,
+                spent=self._format_amount(spent, currency, language),
+                budget=budget,
+            )
+        if spent > planned:
+            return self._template(
+                "local_budget_exceeded",
+                language,
+                budget=budget,
+                overage=self._format_amount(spent - planned, currency, language),
+            )
+        return self._template(
+            "local_within_budget",
+            language,
+            spent=self._format_amount(spent, currency, language),
+            budget=budget,
+        )
+
+    def _answer_budget_remaining(
+        self, user_id, message_lower, year, month, period, language, currency
+    ):
+        planned, spent, _ = self._budget_status(user_id, year, month, currency)
+        if not planned:
+            return self.catalog.get("local_no_budget", language)
+
+        budget = self._format_amount(planned, currency, language)
+        if spent > planned:
+            return self._template(
+                "local_budget_exceeded",
+                language,
+                budget=budget,
+                overage=self._format_amount(spent - planned, currency, language),
+            )
+        return self._template(
+            "local_budget_remaining",
+            language,
+            budget=budget,
+            remaining=self._format_amount(planned - spent, currency, language),
+        )
+
+    def _answer_total_saved(
+        self, user_id, message_lower, year, month, period, language, currency
+    ):
+        rows = (
+            self.db_session.query(
+                SavedImpulse.currency,
+                func.count(SavedImpulse.id),
+                func.sum(SavedImpulse.amount),
+            )
+            .filter(SavedImpulse.user_id == user_id)
+            .group_by(SavedImpulse.currency)
+            .all()
+        )
+        count = sum(row[1] for row in rows)
+        if not count:
+            return self.catalog.get("local_nothing_saved", language)
+
+        total = get_rate_table().convert_totals(
+            [(row[0], row[2]) for row in rows], currency
+        ).get(None, 0.0)
+        return self._template(
+            "local_total_saved",
+            language,
+            amount=self._format_amount(total, currency, language),
+            count=count,
+        )
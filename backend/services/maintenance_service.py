@@ -0,0 +1,106 @@
+"""
+Maintenance jobs for MindfulWealth application
+
+Handlers run by the background job queue off the request path: rebuilding
+the tables derived from raw transactions, which the dashboard insights are
+computed from, and removing expired demo accounts.
+"""
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import func
+
+from models import (
+    Budget,
+    Goal,
+    Income,
+    MonthlySummary,
+    RecurringSeries,
+    SavedImpulse,
+    SpendingAlert,
+    SpendingStats,
+    Tombstone,
+    Transaction,
+    User,
+    UserCategory,
+)
+from services.anomaly_service import rebuild_spending_stats
+from services.cashflow_service import rebuild_monthly_summaries
+from services.category_service import category_index, rebuild_user_categories
+from services.recurring_service import rebuild_recurring_series
+from simulations import simulation_cache
+
+# Hours after their last login that demo accounts are deleted
+DEMO_USER_TTL_HOURS = int(os.getenv("DEMO_USER_TTL_HOURS", 24))
+
+# Tables holding a user's rows, referencing tables first
+USER_TABLES = (
+    Tombstone,
+    SpendingAlert,
+    SpendingStats,
+    RecurringSeries,
+    UserCategory,
+    MonthlySummary,
+    SavedImpulse,
+    Transaction,
+    Budget,
+    Goal,
+    Income,
+)
+
+# Users deleted per statement, below SQLite's bound parameter limit
+DELETE_BATCH = 500
+
+
+def refresh_derived_data(db_session, user_id=None):
+    """
+    Rebuild the rollups, category dictionary, recurring payments and
+    spending statistics from raw records
+
+    They are kept up to date as records are written, the rebuild repairs
+    drift from changes made outside the application.
+
+    Args:
+        db_session (Session): SQLAlchemy database session
+        user_id (int): Only rebuild this user's data, defaults to everyone
+    """
+    rebuild_monthly_summaries(db_session, user_id)
+    rebuild_user_categories(db_session, user_id)
+    category_index.invalidate(user_id)
+    rebuild_recurring_series(db_session, user_id)
+    rebuild_spending_stats(db_session, user_id)
+
+
+def cleanup_demo_users(db_session, max_age_hours=DEMO_USER_TTL_HOURS, now=None):
+    """
+    Delete demo users who have not logged in recently, with all their data
+
+    Args:
+        db_session (Session): SQLAlchemy database session
+        max_age_hours (int): Hours since the last login before deletion
+        now (datetime): Reference time, defaults to the current time
+
+    Returns:
+        int: Number of users deleted
+    """
+    cutoff = (now or datetime.now()) - timedelta(hours=max_age_hours)
+    user_ids = [
+        user_id
+        for (user_id,) in db_session.query(User.id).filter(
+            User.is_demo.is_(True),
+            func.coalesce(User.last_login, User.created_at) < cutoff,
+        )
+    ]
+
+    for start in range(0, len(user_ids), DELETE_BATCH):
+        batch = user_ids[start:start + DELETE_BATCH]
+        for model in USER_TABLES:
+            db_session.query(model).filter(model.user_id.in_(batch)).delete(
+                synchronize_session=False
+            )
+        db_session.query(User).filter(User.id.in_(batch)).delete(synchronize_session=False)
+    db_session.commit()
+
+    for user_id in user_ids:
+        category_index.invalidate(user_id)
+        simulation_cache.invalidate_user(user_id)
+    return len(user_ids)
@@ -0,0 +1,357 @@
+"""
+Model backends for the MindfulWealth Gemini service
+
+GeminiService talks to its backend through the subset of the
+google.generativeai module it uses: configure(api_key=...), list_models()
+returning objects with a name, and GenerativeModel(name,
+system_instruction=None) whose generate_content(prompt, stream=False)
+returns a response with a text, or an iterable of chunks with a text when
+streaming. Besides the SDK itself this module provides:
+
+- FakeGenai, an in-process stand-in answering after a latency drawn from a
+  configurable distribution, failing at a configurable rate and producing
+  text at a configurable token throughput
+- HttpGenai, a client of the Gemini REST API, pointed at the fake server in
+  benchmarks/fake_gemini.py to load test over real sockets
+
+GEMINI_BACKEND selects the backend: empty for the SDK, "fake" for FakeGenai
+configured by the FAKE_GEMINI_* variables, or the base URL of a server
+speaking the REST API. Calls can be recorded to a cassette and replayed, see
+services/cassette.py.
+"""
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+
+FAKE_MODELS = ("models/gemini-1.5-flash",)
+DEFAULT_LATENCY = "lognormal:-1.2,0.5"
+
+# Words the fake answers are made of, one token each
+FAKE_WORDS = (
+    "consider investing this amount instead of spending it today your budget "
+    "for the month still has room but a steady monthly investment at eight "
+    "percent would grow faster than you think so keep tracking every expense"
+).split()
+
+# Tokens per streamed chunk
+CHUNK_TOKENS = 8
+
+
+def parse_latency(spec):
+    """
+    Sampler of a latency distribution, in seconds
+
+    Args:
+        spec (str): "fixed:S", "uniform:LOW,HIGH", "normal:MEAN,STDDEV",
+                    "lognormal:MU,SIGMA" (of the log of the seconds) or
+                    "exponential:MEAN"
+
+    Returns:
+        callable: Takes a random.Random and returns a latency
+
+    Raises:
+        ValueError: If the specification is not understood
+    """
+    distributions = {
+        "fixed": (1, lambda rng, seconds: seconds),
+        "uniform": (2, lambda rng, low, high: rng.uniform(low, high)),
+        "normal": (2, lambda rng, mean, stddev: max(0.0, rng.gauss(mean, stddev))),
+        "lognormal": (2, lambda rng, mu, sigma: rng.lognormvariate(mu, sigma)),
+        "exponential": (1, lambda rng, mean: rng.expovariate(1 / mean) if mean > 0 else 0.0),
+    }
+    kind, _, arguments = spec.strip().partition(":")
+    if kind not in distributions:
+        raise ValueError(f"Unknown latency distribution: {spec}")
+    arity, sample = distributions[kind]
+    try:
+        values = [float(value) for value in arguments.split(",") if value.strip()]
+    except ValueError:
+        raise ValueError(f"Invalid latency parameters: {spec}")
+    if len(values) != arity or (kind != "lognormal" and min(values) < 0):
+        raise ValueError(f"Invalid latency parameters: {spec}")
+    return lambda rng: sample(rng, *values)
+
+
+class BackendError(Exception):
+    """Error answered by a model backend, with its HTTP status"""
+
+    def __init__(self, code, status, message):
+        super().__init__(f"{code} {status}: {message}")
+        self.code = code
+        self.status = status
+        self.message = message
+
+    def to_dict(self):
+        return {"error": {"code": self.code, "status": self.status, "message": self.message}}
+
+
+# Errors the fake backend fails with, as the API reports them
+FAKE_ERRORS = (
+    (429, "RESOURCE_EXHAUSTED", "Quota exceeded for requests per minute"),
+    (500, "INTERNAL", "An internal error has occurred"),
+    (503, "UNAVAILABLE", "The model is overloaded, try again later"),
+)
+
+
+class TextChunk:
+    """Response, or part of a streamed response, holding text"""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class StreamedResponse:
+    """Iterable of the chunks of a streamed response
+
+    The text of the whole response is available once the chunks were read,
+    reading it consumes the remaining ones.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.received = []
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.received.append(chunk)
+            yield chunk
+
+    @property
+    def text(self):
+        for _ in self:
+            pass
+        return "".join(chunk.text for chunk in self.received)
+
+
+class ModelInfo:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeReply:
+    """Outcome drawn for one fake request"""
+
+    def __init__(self, latency, error, tokens, seconds_per_token):
+        self.latency = latency
+        self.error = error
+        self.tokens = tokens
+        self.seconds_per_token = seconds_per_token
+
+    def chunks(self, words):
+        """Text of each chunk of the answer"""
+        answer = [words[i % len(words)] for i in range(self.tokens)]
+        return [
+            " ".join(answer[i: i + CHUNK_TOKENS]) + (" " if i + CHUNK_TOKENS < self.tokens else "")
+            for i in range(0, self.tokens, CHUNK_TOKENS)
+        ]
+
+
+class FakeGenai:
+    """In-process stand-in for the google.generativeai module
+
+    Every request waits for a latency drawn from the distribution before its
+    first token, fails with error_rate probability, then produces between
+    min_tokens and max_tokens words at tokens_per_second (0 for no limit).
+    Seeded fakes draw the same outcomes in the same order.
+    """
+
+    def __init__(self, latency=DEFAULT_LATENCY, error_rate=0.0, tokens_per_second=60.0,
+                 min_tokens=40, max_tokens=160, models=FAKE_MODELS, seed=None, sleep=time.sleep):
+        if not 0 <= error_rate <= 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        self.latency = parse_latency(latency) if isinstance(latency, str) else latency
+        self.error_rate = error_rate
+        self.tokens_per_second = tokens_per_second
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self.models = tuple(models)
+        self.sleep = sleep
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {"requests": 0, "errors": 0, "tokens": 0, "in_flight": 0, "max_in_flight": 0}
+
+    @classmethod
+    def from_env(cls):
+        """Fake configured by the FAKE_GEMINI_* environment variables"""
+        seed = os.getenv("FAKE_GEMINI_SEED")
+        return cls(
+            latency=os.getenv("FAKE_GEMINI_LATENCY", DEFAULT_LATENCY),
+            error_rate=float(os.getenv("FAKE_GEMINI_ERROR_RATE", 0)),
+            tokens_per_second=float(os.getenv("FAKE_GEMINI_TOKENS_PER_SECOND", 60)),
+            seed=int(seed) if seed else None,
+        )
+
+    def configure(self, api_key=None, **kwargs):
+        """Accept any key, as the SDK does until the first request"""
+
+    def list_models(self):
+        return [ModelInfo(name) for name in self.models]
+
+    def GenerativeModel(self, model_name, system_instruction=None, **kwargs):
+        if not model_name.startswith("models/"):
+            model_name = f"models/{model_name}"
+        if model_name not in self.models:
+            raise BackendError(404, "NOT_FOUND", f"{model_name} is not found")
+        return FakeModel(self, model_name, system_instruction)
+
+    def draw(self):
+        """Outcome of the next request"""
+        with self.lock:
+            latency = self.latency(self.random)
+            failed = self.random.random() < self.error_rate
+            error = BackendError(*self.random.choice(FAKE_ERRORS)) if failed else None
+            tokens = self.random.randint(self.min_tokens, self.max_tokens)
+            self.counters["requests"] += 1
+            if failed:
+                self.counters["errors"] += 1
+            else:
+                self.counters["tokens"] += tokens
+        per_token = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        return FakeReply(latency, error, tokens, per_token)
+
+    def replay(self, reply):
+        """Chunks of a drawn outcome, waiting as the real API would"""
+        with self.lock:
+            self.counters["in_flight"] += 1
+            self.counters["max_in_flight"] = max(self.counters["max_in_flight"], self.counters["in_flight"])
+        try:
+            self.sleep(reply.latency)
+            if reply.error is not None:
+                raise reply.error
+            for text in reply.chunks(FAKE_WORDS):
+                self.sleep(reply.seconds_per_token * len(text.split()))
+                yield text
+        finally:
+            with self.lock:
+                self.counters["in_flight"] -= 1
+
+    def metrics(self):
+        """Requests answered, failed and tokens produced, with peak concurrency"""
+        with self.lock:
+            return dict(self.counters)
+
+
+class FakeModel:
+    """Model of a FakeGenai backend"""
+
+    def __init__(self, backend, model_name, system_instruction=None):
+        self.backend = backend
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        chunks = self.backend.replay(self.backend.draw())
+        if stream:
+            return StreamedResponse(TextChunk(text) for text in chunks)
+        return TextChunk("".join(chunks))
+
+
+class HttpGenai:
+    """Client of the Gemini REST API at a base URL"""
+
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.api_key = None
+        self.http = requests.Session()
+
+    def configure(self, api_key=None, **kwargs):
+        self.api_key = api_key
+
+    def request(self, method, path, **kwargs):
+        response = self.http.request(
+            method, f"{self.base_url}/v1beta/{path}",
+            params={**kwargs.pop("params", {}), **({"key": self.api_key} if self.api_key else {})},
+            timeout=self.timeout, **kwargs,
+        )
+        if response.status_code != 200:
+            try:
+                error = response.json()["error"]
+                raise BackendError(error["code"], error.get("status", ""), error.get("message", ""))
+            except (ValueError, KeyError, TypeError):
+                raise BackendError(response.status_code, response.reason, response.text[:200])
+        return response
+
+    def list_models(self):
+        models = self.request("GET", "models").json().get("models", [])
+        return [ModelInfo(model["name"]) for model in models]
+
+    def GenerativeModel(self, model_name, system_instruction=None, **kwargs):
+        if not model_name.startswith("models/"):
+            model_name = f"models/{model_name}"
+        return HttpModel(self, model_name, system_instruction)
+
+
+def response_text(body):
+    """Text of the first candidate of a generateContent response body"""
+    candidates = body.get("candidates") or [{}]
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts)
+
+
+class HttpModel:
+    """Model of an HttpGenai backend"""
+
+    def __init__(self, backend, model_name, system_instruction=None):
+        self.backend = backend
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        body = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        if self.system_instruction:
+            body["systemInstruction"] = {"parts": [{"text": self.system_instruction}]}
+
+        if not stream:
+            response = self.backend.request("POST", f"{self.model_name}:generateContent", json=body)
+            return TextChunk(response_text(response.json()))
+
+        response = self.backend.request(
+            "POST", f"{self.model_name}:streamGenerateContent",
+            params={"alt": "sse"}, json=body, stream=True,
+        )
+
+        def chunks():
+            with response:
+                for line in response.iter_lines(decode_unicode=True):
+                    if line and line.startswith("data:"):
+                        yield TextChunk(response_text(json.loads(line[5:])))
+
+        return StreamedResponse(chunks())
+
+
+def get_backend(spec=None):
+    """
+    Backend named by a specification, GEMINI_BACKEND by default
+
+    When GEMINI_CASSETTE names a cassette the backend is wrapped to record
+    its calls to it, or replaced by the cassette's answers, see cassette.
+
+    Args:
+        spec (str): "" for the SDK, "fake" or the base URL of a REST server
+
+    Returns:
+        The backend, or None for the google.generativeai SDK
+
+    Raises:
+        ValueError: If the specification is not understood
+    """
+    spec = (os.getenv("GEMINI_BACKEND", "") if spec is None else spec).strip()
+    if spec in ("", "genai"):
+        backend = None
+    elif spec == "fake":
+        backend = FakeGenai.from_env()
+    elif spec.startswith(("http://", "https://")):
+        backend = HttpGenai(spec)
+    else:
+        raise ValueError(f"Unknown Gemini backend: {spec}")
+
+    if os.getenv("GEMINI_CASSETTE"):
+        from services.cassette import CassetteGenai
+
+        return CassetteGenai.from_env(backend)
+    return backend
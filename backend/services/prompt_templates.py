@@ -0,0 +1,198 @@
+"""
+Chat prompt assembly for MindfulWealth application
+
+The system instruction of every (language, personality) pair is compiled
+once, keeping only that personality's tone and the answer language. A
+request only renders the slots that change: the user's context, the recent
+conversation trimmed to a character budget, and the message. Where the SDK
+supports it the compiled instruction is stored once as cached content and
+requests send the slots alone, otherwise it is the model's system
+instruction.
+
+Prompt sizes are estimated at four characters per token and recorded per
+template.
+"""
+import json
+import math
+import threading
+from collections import defaultdict
+
+# Tone of each personality mode
+PERSONALITY_TONES = {
+    "nice": "Supportive, encouraging, and gentle",
+    "funny": "Light-hearted with appropriate humor",
+    "irony": "Slightly sarcastic but still helpful",
+}
+DEFAULT_PERSONALITY = "nice"
+
+LANGUAGE_NAMES = {"fr": "French", "en": "English", "es": "Spanish", "de": "German"}
+
+SYSTEM_TEMPLATE = """You are MindfulBot, a financial assistant focused on helping users manage their spending and investments wisely. Your primary goals are:
+
+1. IMPULSE PURCHASE LIMITATION: Help users identify impulse purchases and redirect that money toward investments.
+2. INVESTMENT FOCUS: Encourage users to invest money they would have spent on impulse purchases.
+3. BUDGET TRACKING EMPHASIS: Help users track reasonable spending and stay within budget.
+
+When responding to users, follow these guidelines:
+
+FOR IMPULSE PURCHASES (non-essential, emotionally-driven purchases):
+- Acknowledge the emotional appeal of the purchase
+- Gently suggest redirecting the money to investments instead
+- Calculate potential growth at 8% annual return (1 year and 5 years)
+- Offer a specific investment alternative
+- Use a supportive tone that doesn't make users feel judged
+
+FOR REASONABLE SPENDING (essentials, planned purchases):
+- Affirm the user's good decision
+- Suggest budget categories if appropriate
+- Provide relevant financial tips for that category
+- Encourage tracking the expense
+
+RESPONSE STYLE:
+- Be friendly and engaging
+- Use emojis occasionally to add personality
+- Personalize responses based on the user context and conversation when given
+- Keep responses concise but informative
+- Tone: {tone}
+- Always answer in {language}
+
+Always remember that your goal is to help users build wealth through mindful spending and consistent investing."""
+
+# Character budgets of the slots
+CONTEXT_CHARS = 800
+HISTORY_CHARS = 2000
+HISTORY_MESSAGE_CHARS = 400
+HISTORY_MESSAGES = 8
+
+
+def estimate_tokens(text):
+    """Approximate token count of a text"""
+    return math.ceil(len(text) / 4)
+
+
+def shorten(text, limit):
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def context_slot(context_data, limit=CONTEXT_CHARS):
+    """One "key: value" line per context entry, within the character budget"""
+    lines, used = [], 0
+    for key, value in (context_data or {}).items():
+        if value is None or value == "" or value == [] or value == {}:
+            continue
+        if not isinstance(value, str):
+            value = json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+        line = f"- {key}: {shorten(value, 200)}"
+        if used + len(line) > limit:
+            break
+        lines.append(line)
+        used += len(line) + 1
+    return "\n".join(lines)
+
+
+def history_slot(history, limit=HISTORY_CHARS):
+    """Most recent messages, oldest first, within the character budget"""
+    lines, used = [], 0
+    for entry in reversed((history or [])[-HISTORY_MESSAGES:]):
+        content = shorten(entry.get("content", ""), HISTORY_MESSAGE_CHARS)
+        if not content:
+            continue
+        line = f"{'User' if entry.get('role') == 'user' else 'Assistant'}: {content}"
+        if used + len(line) > limit:
+            break
+        lines.append(line)
+        used += len(line) + 1
+    return "\n".join(reversed(lines))
+
+
+class CompiledPrompt:
+    """System instruction of one language and personality, with its slots"""
+
+    def __init__(self, language, personality):
+        self.key = (language, personality)
+        self.system = SYSTEM_TEMPLATE.format(
+            tone=PERSONALITY_TONES[personality],
+            language=LANGUAGE_NAMES.get(language, language),
+        )
+        self.system_tokens = estimate_tokens(self.system)
+
+    def render(self, message, context_data=None, history=None):
+        """
+        Per-request part of the prompt
+
+        Args:
+            message (str): The user's message
+            context_data (dict): Facts about the user and the conversation
+            history (list): Previous messages as {"role", "content"} dicts
+
+        Returns:
+            str: Filled slots, the empty ones left out
+        """
+        slots = []
+        context = context_slot(context_data)
+        if context:
+            slots.append(f"User context:\n{context}")
+        conversation = history_slot(history)
+        if conversation:
+            slots.append(f"Recent conversation:\n{conversation}")
+        slots.append(f"User message: {message}")
+        return "\n\n".join(slots)
+
+    def inline(self, message, context_data=None, history=None):
+        """Whole prompt, for models without the system instruction"""
+        return f"{self.system}\n\n{self.render(message, context_data, history)}"
+
+
+class PromptLibrary:
+    """Compiled prompts by (language, personality) and the sizes sent"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.compiled = {}
+        self.sizes = defaultdict(lambda: {"requests": 0, "tokens_sent": 0, "tokens_saved": 0})
+
+    def get(self, language, personality=None):
+        """Compiled prompt of a language and personality, built on first use"""
+        if personality not in PERSONALITY_TONES:
+            personality = DEFAULT_PERSONALITY
+        key = (language, personality)
+        compiled = self.compiled.get(key)
+        if compiled is None:
+            with self.lock:
+                compiled = self.compiled.setdefault(key, CompiledPrompt(language, personality))
+        return compiled
+
+    def record(self, compiled, prompt, system):
+        """
+        Count a prompt sent with a template
+
+        Args:
+            compiled (CompiledPrompt): Template used
+            prompt (str): Text sent to the model
+            system (str): How the system instruction reached the model,
+                          "inline" in the text, "instruction" sent along by
+                          the SDK or "cached" on the server
+        """
+        with self.lock:
+            sizes = self.sizes["/".join(compiled.key)]
+            sizes["requests"] += 1
+            sizes["tokens_sent"] += estimate_tokens(prompt)
+            if system == "instruction":
+                sizes["tokens_sent"] += compiled.system_tokens
+            elif system == "cached":
+                sizes["tokens_saved"] += compiled.system_tokens
+
+    def metrics(self):
+        """Requests, estimated tokens sent and read from the cache per template"""
+        with self.lock:
+            return {
+                key: {
+                    **sizes,
+                    "avg_tokens_sent": round(sizes["tokens_sent"] / sizes["requests"], 1),
+                }
+                for key, sizes in self.sizes.items()
+            }
+
+
+prompt_library = PromptLibrary()
@@ -0,0 +1,414 @@
+"""
+Recurring payment detection for MindfulWealth application
+
+Transactions are grouped by normalized description, amount and currency.
+Within a group, consecutive charges whose gaps match a period (weekly,
+monthly or yearly) form a series. The recurring_series table keeps the
+latest run of every group and is updated as transactions are flushed:
+charges arriving in date order extend their run in place, anything else
+(edits, deletes, backdated charges) rescans the user's history in one
+sort-and-scan pass. Both drop the user's candidates that can no longer
+repeat, so the table matches a rebuild after every write.
+"""
+import re
+import calendar
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+
+from models import RecurringSeries, Transaction
+from services.flush_tracking import begin_transaction, has_changes, listen_once, stored_values
+from services.currency_service import get_rate_table
+from services.local_router import CURRENCY_SYMBOLS
+
+# Range of days between two charges of each period
+PERIODS = {"weekly": (6, 8), "monthly": (27, 33), "yearly": (358, 373)}
+
+# Charges needed before a series is reported as recurring
+MIN_OCCURRENCES = {"weekly": 3, "monthly": 3, "yearly": 2}
+
+# Days after the expected charge before a series is considered cancelled
+GRACE_DAYS = {"weekly": 3, "monthly": 7, "yearly": 30}
+
+# Share of a monthly budget taken by one charge of each period
+MONTHLY_FACTORS = {"weekly": 52 / 12, "monthly": 1.0, "yearly": 1 / 12}
+
+# Charges without a period are only kept while a repeat is still possible
+CANDIDATE_DAYS = max(high for _, high in PERIODS.values())
+
+# Attributes that decide which series a transaction belongs to
+TRACKED_ATTRIBUTES = ("user_id", "description", "amount", "currency", "date")
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+
+def normalize_description(description):
+    """
+    Grouping key of a description
+
+    Lowercased words without digits, so that reference numbers and dates in
+    bank descriptions ("NETFLIX.COM 2231 04/05") do not split a series.
+    """
+    return " ".join(WORD_PATTERN.findall((description or "").lower()))[:255]
+
+
+def series_key(description, amount, currency):
+    """(description key, amount, currency) identifying a group, None if unusable"""
+    description_key = normalize_description(description)
+    if not description_key or amount is None:
+        return None
+    return description_key, round(float(amount), 2), currency or "EUR"
+
+
+def classify_gap(days):
+    """Period whose gap range contains a number of days, or None"""
+    for period, (low, high) in PERIODS.items():
+        if low <= days <= high:
+            return period
+    return None
+
+
+def advance(series, date, description=None):
+    """
+    Extend a series with its next charge
+
+    The charge must not be older than the series' last charge. A gap that
+    matches the series' period extends the run, another periodic gap starts
+    a new run from the previous charge, any other gap starts over.
+    """
+    gap = (date.date() - series.last_date.date()).days
+    if gap == 0:
+        # Same-day duplicates do not make a payment recurring
+        return
+
+    period = classify_gap(gap)
+    if period is not None and period == series.period:
+        series.occurrences += 1
+    elif period is not None:
+        series.first_date = series.last_date
+        series.period = period
+        series.occurrences = 2
+    else:
+        series.first_date = date
+        series.period = None
+        series.occurrences = 1
+    series.last_date = date
+    if description:
+        series.description = description
+
+
+def detect_series(rows, now=None):
+    """
+    Find the latest run of every group in one sort-and-scan pass
+
+    Args:
+        rows (iterable): (user_id, description, amount, currency, date) tuples
+        now (datetime): Reference time for dropping stale candidates
+
+    Returns:
+        dict: (user_id, description key, amount, currency) -> RecurringSeries
+              (not added to any session)
+    """
+    now = now or datetime.utcnow()
+    keyed = []
+    for user_id, description, amount, currency, date in rows:
+        key = series_key(description, amount, currency)
+        if key is not None and date is not None:
+            keyed.append(((user_id, *key), date, description))
+    keyed.sort(key=lambda item: (item[0], item[1]))
+
+    detected = {}
+    for key, date, description in keyed:
+        series = detected.get(key)
+        if series is None:
+            detected[key] = RecurringSeries(
+                key[0], key[1], key[2], key[3], date, description=description
+            )
+        else:
+            advance(series, date, description)
+
+    stale = now - timedelta(days=CANDIDATE_DAYS)
+    return {
+        key: series
+        for key, series in detected.items()
+        if series.period is not None or series.last_date >= stale
+    }
+
+
+def _rows_of(records):
+    return [[getattr(r, a) for a in TRACKED_ATTRIBUTES] for r in records]
+
+
+def _existing_series(session, user_id, description_keys=None):
+    with session.no_autoflush:
+        query = session.query(RecurringSeries).filter(RecurringSeries.user_id == user_id)
+        if description_keys is not None:
+            query = query.filter(RecurringSeries.description_key.in_(description_keys))
+        return {
+            (s.user_id, s.description_key, s.amount, s.currency): s for s in query
+        }
+
+
+def _has_history(session, user_id, key, before):
+    """Whether a user has transactions of a group up to a date"""
+    amount = key[2]
+    with session.no_autoflush:
+        rows = session.query(Transaction.description, Transaction.amount, Transaction.currency).filter(
+            Transaction.user_id == user_id,
+            Transaction.amount.between(amount - 0.005, amount + 0.005),
+            Transaction.date <= before,
+        )
+        for description, row_amount, currency in rows:
+            row_key = series_key(description, row_amount, currency)
+            if row_key is not None and (user_id, *row_key) == key:
+                return True
+    return False
+
+
+def _prune(session, user_id, touched):
+    """
+    Drop the user's candidates that can no longer repeat, as detect_series
+    does, adding the new series that are kept
+    """
+    stale = datetime.utcnow() - timedelta(days=CANDIDATE_DAYS)
+    with session.no_autoflush:
+        candidates = session.query(RecurringSeries).filter(
+            RecurringSeries.user_id == user_id,
+            RecurringSeries.period.is_(None),
+            RecurringSeries.last_date < stale,
+        ).all()
+
+    for series in set(candidates) | set(touched):
+        if series.period is None and series.last_date < stale:
+            if series.id is not None:
+                session.delete(series)
+        elif series.id is None:
+            session.add(series)
+
+
+def _append(session, user_id, records):
+    """
+    Extend the user's series with new transactions in date order
+
+    Returns:
+        bool: False if a transaction is older than its series' last charge,
+              or starts a group whose earlier charges were dropped as stale
+              candidates, nothing is changed and the user must be rescanned
+    """
+    keyed = []
+    for record in records:
+        key = series_key(record.description, record.amount, record.currency)
+        if key is not None and record.date is not None:
+            keyed.append(((user_id, *key), record))
+    if not keyed:
+        return True
+
+    existing = _existing_series(session, user_id, {key[1] for key, _ in keyed})
+    for key, record in keyed:
+        series = existing.get(key)
+        if series is not None and record.date.date() < series.last_date.date():
+            return False
+
+    # A pruned candidate may still be extended by this charge
+    first_dates = {}
+    for key, record in keyed:
+        if key not in existing:
+            first_dates[key] = min(record.date, first_dates.get(key, record.date))
+    for key, date in first_dates.items():
+        if _has_history(session, user_id, key, date):
+            return False
+
+    for key, record in sorted(keyed, key=lambda item: item[1].date):
+        series = existing.get(key)
+        if series is None:
+            existing[key] = RecurringSeries(*key, record.date, description=record.description)
+        else:
+            advance(series, record.date, record.description)
+
+    _prune(session, user_id, existing.values())
+    return True
+
+
+def _rescan(session, user_id):
+    """Rebuild a user's series from their history including pending changes"""
+    with session.no_autoflush:
+        rows = {
+            row[0]: list(row[1:])
+            for row in session.query(
+                Transaction.id, *(getattr(Transaction, a) for a in TRACKED_ATTRIBUTES)
+            ).filter(Transaction.user_id == user_id)
+        }
+
+    for record in session.deleted:
+        if isinstance(record, Transaction):
+            rows.pop(record.id, None)
+    for record in session.dirty:
+        if isinstance(record, Transaction):
+            rows.pop(record.id, None)
+            if record.user_id == user_id:
+                rows[record.id] = _rows_of([record])[0]
+    for record in session.new:
+        if isinstance(record, Transaction) and record.user_id == user_id:
+            rows[id(record)] = _rows_of([record])[0]
+
+    detected = detect_series(rows.values())
+    existing = _existing_series(session, user_id)
+
+    # Rows are updated in place, deleting and re-inserting a key in the
+    # same flush would break the unique constraint
+    for key, series in detected.items():
+        current = existing.pop(key, None)
+        if current is None:
+            session.add(series)
+            continue
+        for attribute in ("description", "period", "occurrences", "first_date", "last_date"):
+            setattr(current, attribute, getattr(series, attribute))
+    for series in existing.values():
+        session.delete(series)
+
+
+def _update_recurring_series(session, flush_context, instances):
+    """before_flush hook keeping recurring_series in step with transactions"""
+    appended = defaultdict(list)
+    rescan = set()
+
+    for record in session.new:
+        if isinstance(record, Transaction):
+            appended[record.user_id].append(record)
+
+    for record in session.deleted:
+        if isinstance(record, Transaction):
+            rescan.add(stored_values(session, record, ("user_id",))[0])
+
+    for record in session.dirty:
+        if isinstance(record, Transaction) and has_changes(record, TRACKED_ATTRIBUTES):
+            rescan.add(stored_values(session, record, ("user_id",))[0])
+            rescan.add(record.user_id)
+
+    for user_id, records in appended.items():
+        if user_id not in rescan and not _append(session, user_id, records):
+            rescan.add(user_id)
+
+    for user_id in rescan:
+        _rescan(session, user_id)
+
+
+def track_recurring_series(target):
+    """
+    Keep detected recurring payments up to date on every flush of a session
+
+    Args:
+        target: sessionmaker, Session class or session instance
+    """
+    listen_once(target, ("before_flush", _update_recurring_series))
+
+
+def rebuild_recurring_series(db_session, user_id=None):
+    """
+    Recompute recurring_series from raw transactions
+
+    Args:
+        db_session (Session): SQLAlchemy database session
+        user_id (int): Only rebuild this user's series, defaults to everyone
+    """
+    begin_transaction(db_session, "IMMEDIATE")
+    query = db_session.query(*(getattr(Transaction, a) for a in TRACKED_ATTRIBUTES))
+    existing = db_session.query(RecurringSeries)
+    if user_id is not None:
+        query = query.filter(Transaction.user_id == user_id)
+        existing = existing.filter(RecurringSeries.user_id == user_id)
+
+    detected = detect_series(query.yield_per(1000))
+    existing.delete(synchronize_session=False)
+    db_session.add_all(detected.values())
+    db_session.commit()
+
+
+def _add_months(date, months, day):
+    """Same time `months` later on `day`, or the month's last day if shorter"""
+    month_index = date.month - 1 + months
+    year, month = date.year + month_index // 12, month_index % 12 + 1
+    return date.replace(
+        year=year, month=month, day=min(day, calendar.monthrange(year, month)[1])
+    )
+
+
+def next_charge_date(series):
+    """Date the next charge of a periodic series is expected"""
+    if series.period == "weekly":
+        return series.last_date + timedelta(days=7)
+    if series.period == "monthly":
+        return _add_months(series.last_date, 1, series.first_date.day)
+    return _add_months(series.last_date, 12, series.first_date.day)
+
+
+def get_recurring_payments(db_session, user_id, now=None, include_inactive=False):
+    """
+    Get a user's recurring payments, next expected charge first
+
+    Args:
+        db_session (Session): SQLAlchemy database session
+        user_id (int): ID of the user
+        now (datetime): Reference time, defaults to the current time
+        include_inactive (bool): Also return series whose charges stopped
+
+    Returns:
+        list: Series dicts with next_date, active and monthly_amount added
+    """
+    now = now or datetime.utcnow()
+    payments = []
+    for series in db_session.query(RecurringSeries).filter(
+        RecurringSeries.user_id == user_id, RecurringSeries.period.isnot(None)
+    ):
+        if series.occurrences < MIN_OCCURRENCES[series.period]:
+            continue
+
+        next_date = next_charge_date(series)
+        active = now <= next_date + timedelta(days=GRACE_DAYS[series.period])
+        if not active and not include_inactive:
+            continue
+
+        payment = series.to_dict()
+        payment["next_date"] = next_date.isoformat()
+        payment["active"] = active
+        payment["monthly_amount"] = round(
+            series.amount * MONTHLY_FACTORS[series.period], 2
+        )
+        payments.append(payment)
+
+    payments.sort(key=lambda payment: payment["next_date"])
+    return payments
+
+
+def subscription_insight(payments, currency):
+    """
+    Insight reviewing detected recurring payments
+
+    Args:
+        payments (list): Active payments from get_recurring_payments
+        currency (str): Currency of the displayed amounts
+
+    Returns:
+        dict: Insight, or None without recurring payments
+    """
+    if not payments:
+        return None
+
+    rates = get_rate_table()
+    monthly = sum(
+        rates.convert(p["monthly_amount"], p["currency"], currency) for p in payments
+    )
+    symbol = CURRENCY_SYMBOLS.get(currency, currency)
+    upcoming = payments[0]
+    next_date = datetime.fromisoformat(upcoming["next_date"])
+    return {
+        "type": "opportunity",
+        "title": "Subscription Audit",
+        "description": (
+            f"You have {len(payments)} recurring payment"
+            f"{'s' if len(payments) > 1 else ''} costing about {symbol}{monthly:.2f} "
+            f"per month. The next one is {upcoming['description']} on "
+            f"{next_date.strftime('%b %d')}. Review them and cancel the services "
+            "you no longer use."
+        ),
+    }
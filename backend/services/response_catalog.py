@@ -0,0 +1,173 @@
+"""
+Response catalog for MindfulWealth chatbot fallback responses
+"""
+import os
+import re
+import json
+import pathlib
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_PATH = pathlib.Path(__file__).parent.parent / "data" / "responses.json"
+
+# Intent returned when no intent keyword matches a message
+DEFAULT_INTENT = "default"
+
+
+class ResponseCatalog:
+    """
+    Canned responses indexed by (key, language, personality)
+
+    The catalog is loaded once from a JSON data file. Responses can be given
+    per personality or as a single string shared by every personality, and
+    new languages are added by adding entries to the data file.
+    """
+
+    def __init__(self, path=None):
+        """
+        Load the catalog
+
+        Args:
+            path (str): Path to the JSON data file, defaults to data/responses.json
+        """
+        self.path = pathlib.Path(path or DEFAULT_CATALOG_PATH)
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        self.default_language = data.get("default_language", "en")
+        self.default_personality = data.get("default_personality", "nice")
+        self.intents = list(data.get("intents", {}).keys())
+
+        # Flatten responses into a single dict for constant-time lookups
+        self._responses = {}
+        languages = set()
+        for key, by_language in data.get("responses", {}).items():
+            for language, value in by_language.items():
+                languages.add(language)
+                if isinstance(value, dict):
+                    for personality, text in value.items():
+                        self._responses[(key, language, personality)] = text
+                else:
+                    self._responses[(key, language, None)] = value
+        self.languages = sorted(languages)
+
+        self._matcher, self._groups_by_keyword = self._compile_matcher(
+            {**data.get("intents", {}), **data.get("topics", {})}
+        )
+
+    @staticmethod
+    def _compile_matcher(groups):
+        """
+        Compile every keyword of every group into a single regex
+
+        Keywords are literal text, optionally anchored to word boundaries
+        with a leading and/or trailing "\\b". A keyword shared by several
+        groups is compiled once and reported for all of them.
+
+        Returns:
+            tuple: (compiled pattern, dict mapping keyword to group names)
+        """
+        groups_by_keyword = {}
+        patterns = {}
+        for group, keywords in groups.items():
+            for keyword in keywords:
+                literal = keyword.lower()
+                leading = literal.startswith("\\b")
+                trailing = literal.endswith("\\b")
+                literal = literal[2 if leading else 0 : -2 if trailing else None]
+
+                groups_by_keyword.setdefault(literal, set()).add(group)
+                patterns[literal] = (
+                    ("\\b" if leading else "")
+                    + re.escape(literal)
+                    + ("\\b" if trailing else "")
+                )
+
+        if not patterns:
+            return None, {}
+
+        # Try longer keywords first so that "saving" wins over "save"
+        ordered = sorted(patterns, key=len, reverse=True)
+        matcher = re.compile("|".join(patterns[literal] for literal in ordered))
+        return matcher, {
+            literal: frozenset(names) for literal, names in groups_by_keyword.items()
+        }
+
+    def match(self, message):
+        """
+        Find every intent and topic mentioned in a message in one regex pass
+
+        Args:
+            message (str): The user's message
+
+        Returns:
+            set: Names of the matched intents and topics
+        """
+        matched = set()
+        if not self._matcher or not message:
+            return matched
+
+        for keyword in self._matcher.findall(message.lower()):
+            matched |= self._groups_by_keyword[keyword]
+        return matched
+
+    def detect_intent(self, message):
+        """
+        Detect the highest-priority intent of a message
+
+        Intents are ranked in the order they appear in the data file.
+
+        Args:
+            message (str): The user's message
+
+        Returns:
+            str: The intent name, or DEFAULT_INTENT if none matched
+        """
+        matched = self.match(message)
+        for intent in self.intents:
+            if intent in matched:
+                return intent
+        return DEFAULT_INTENT
+
+    def get(self, key, language=None, personality=None):
+        """
+        Get a response, falling back to the default language and personality
+
+        Args:
+            key (str): Response key (an intent or a named fallback)
+            language (str): Language code
+            personality (str): Personality mode
+
+        Returns:
+            str: The response text, or None if the key is unknown
+        """
+        responses = self._responses
+        for lang in (language, self.default_language):
+            for mode in (personality, self.default_personality, None):
+                text = responses.get((key, lang, mode))
+                if text is not None:
+                    return text
+        return None
+
+    def respond(self, message, language=None, personality=None):
+        """Detect the intent of a message and return the matching response"""
+        return self.get(self.detect_intent(message), language, personality)
+
+
+@lru_cache(maxsize=None)
+def get_response_catalog(path=None):
+    """
+    Get the shared response catalog, loading it on first use
+
+    The data file can be overridden with the RESPONSE_CATALOG_PATH
+    environment variable.
+    """
+    path = path or os.getenv("RESPONSE_CATALOG_PATH") or DEFAULT_CATALOG_PATH
+    catalog = ResponseCatalog(path)
+    logger.info(
+        f"Loaded response catalog from {catalog.path} "
+        f"(languages: {', '.join(catalog.languages)})"
+    )
+    return catalog
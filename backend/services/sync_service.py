@@ -0,0 +1,186 @@
+"""
+Delta sync for MindfulWealth application
+
+Every write to a user's transactions, budgets or saved impulses takes the
+next value of the user's change version (users.change_version) and stores
+it on the written rows, deletions leave a tombstone carrying it. Clients
+keep the highest version they have seen and ask for the rows and tombstones
+above it, so a refresh costs what changed rather than the whole lists.
+
+ORM writes are versioned by a before_flush hook, Core statements writing
+synced tables take a version with next_change_version themselves.
+"""
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import func, update
+
+from models import Budget, SavedImpulse, Tombstone, Transaction, User
+from services.flush_tracking import begin_transaction, has_changes, listen_once, stored_values
+
+# Synced models, by the name clients receive their rows under
+SYNCED_MODELS = {
+    "transactions": Transaction,
+    "budgets": Budget,
+    "saved_impulses": SavedImpulse,
+}
+RECORD_TYPES = {model: name for name, model in SYNCED_MODELS.items()}
+
+# Days tombstones are kept, clients last synced before that get everything
+TOMBSTONE_TTL_DAYS = int(os.getenv("TOMBSTONE_TTL_DAYS", 30))
+
+users = User.__table__
+
+
+def next_change_version(db_session, user_id):
+    """
+    Take the next change version of a user
+
+    The increment holds the lock on the user's row until the transaction
+    ends, so concurrent writers take versions in the order they commit and
+    a client never skips a version committed after it synced.
+
+    Returns:
+        int: Version to store on the rows written
+    """
+    return db_session.execute(
+        update(users)
+        .where(users.c.id == user_id)
+        .values(change_version=users.c.change_version + 1)
+        .returning(users.c.change_version)
+    ).scalar_one()
+
+
+def _version_changes(session, flush_context, instances):
+    """before_flush hook versioning written synced records and recording deletions"""
+    written = defaultdict(list)
+    deleted = defaultdict(list)
+
+    for record in session.new:
+        if type(record) in RECORD_TYPES:
+            written[record.user_id].append(record)
+
+    for record in session.dirty:
+        if type(record) in RECORD_TYPES and session.is_modified(record):
+            written[record.user_id].append(record)
+            if record.id is not None and has_changes(record, ("user_id",)):
+                # Moved to another user, gone for the previous one
+                deleted[stored_values(session, record, ("user_id",)).user_id].append(record)
+
+    removed_users = set()
+    for record in session.deleted:
+        if isinstance(record, User):
+            removed_users.add(record.id)
+        elif type(record) in RECORD_TYPES and record.id is not None:
+            deleted[record.user_id].append(record)
+
+    now = datetime.now()
+    for user_id in sorted((written.keys() | deleted.keys()) - removed_users - {None}):
+        version = next_change_version(session, user_id)
+        for record in written[user_id]:
+            record.version = version
+            record.updated_at = now
+        for record in deleted[user_id]:
+            session.add(Tombstone(user_id, RECORD_TYPES[type(record)], record.id, version))
+
+
+def track_changes(target):
+    """
+    Version writes to synced records and keep tombstones of deleted ones
+
+    Args:
+        target: sessionmaker, Session class or session instance
+    """
+    listen_once(target, ("before_flush", _version_changes))
+
+
+def sync_dict(record):
+    """Record dict with the version and time of its last write"""
+    item = record.to_dict()
+    item["version"] = record.version
+    item["updated_at"] = record.updated_at.isoformat() if record.updated_at else None
+    return item
+
+
+def get_changes(db_session, user_id, since=0):
+    """
+    Get a user's synced records changed after a version
+
+    Clients apply the deletions, then upsert the changed rows by id, and
+    send the returned version with their next request. When "full" is set
+    the changes are every row and replace the client's lists: for a first
+    sync, or a version older than the kept tombstones.
+
+    Args:
+        db_session (Session): SQLAlchemy database session
+        user_id (int): ID of the user
+        since (int): Version returned by the client's previous sync, 0 for everything
+
+    Returns:
+        dict: version, full, changed row dicts and deleted ids per record type
+    """
+    begin_transaction(db_session)
+    version, floor = (
+        db_session.query(User.change_version, User.sync_floor)
+        .filter(User.id == user_id)
+        .one()
+    )
+    # A version above the current one was issued by another database
+    full = since <= 0 or since < floor or since > version
+
+    changes = {}
+    for name, model in SYNCED_MODELS.items():
+        query = db_session.query(model).filter(model.user_id == user_id)
+        if not full:
+            query = query.filter(model.version > since)
+        changes[name] = [sync_dict(r) for r in query.order_by(model.version, model.id)]
+
+    deleted = {name: [] for name in SYNCED_MODELS}
+    if not full:
+        tombstones = (
+            db_session.query(Tombstone.record_type, Tombstone.record_id)
+            .filter(Tombstone.user_id == user_id, Tombstone.version > since)
+            .order_by(Tombstone.version, Tombstone.id)
+        )
+        for record_type, record_id in tombstones:
+            deleted[record_type].append(record_id)
+        # SQLite can give a new row the id of a deleted one
+        for name, ids in deleted.items():
+            current = {item["id"] for item in changes[name]}
+            deleted[name] = [i for i in dict.fromkeys(ids) if i not in current]
+
+    return {"version": version, "full": full, "changes": changes, "deleted": deleted}
+
+
+def purge_tombstones(db_session, older_than_days=TOMBSTONE_TTL_DAYS, now=None):
+    """
+    Delete old tombstones
+
+    Each user's sync floor is raised to the newest version purged, clients
+    syncing from an older version then receive everything.
+
+    Args:
+        db_session (Session): SQLAlchemy database session
+        older_than_days (int): Age in days of the tombstones deleted
+        now (datetime): Current time, for tests
+
+    Returns:
+        int: Number of tombstones deleted
+    """
+    cutoff = (now or datetime.now()) - timedelta(days=older_than_days)
+    expired = db_session.query(Tombstone).filter(Tombstone.deleted_at < cutoff)
+    floors = (
+        db_session.query(Tombstone.user_id, func.max(Tombstone.version))
+        .filter(Tombstone.deleted_at < cutoff)
+        .group_by(Tombstone.user_id)
+        .all()
+    )
+    for user_id, version in floors:
+        db_session.execute(
+            update(users)
+            .where(users.c.id == user_id)
+            .values(sync_floor=func.max(users.c.sync_floor, version))
+        )
+    purged = expired.delete(synchronize_session=False)
+    db_session.commit()
+    return purged
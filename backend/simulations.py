@@ -0,0 +1,237 @@
+"""
+Monte Carlo goal simulations for MindfulWealth application
+
+Estimates the probability of reaching a savings target by simulating many
+random monthly return paths. Large simulations are split into chunks and
+run on a process pool, and results are cached per (user, parameters).
+"""
+import os
+import time
+import atexit
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from projections import DEFAULT_ANNUAL_RETURN
+
+# Default annual volatility of returns for a diversified portfolio
+DEFAULT_VOLATILITY = 0.15
+
+# Percentiles reported in the result bands
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Simulations with fewer paths than this run in the calling process
+PARALLEL_MIN_PATHS = 20000
+
+# Paths simulated per process pool task
+CHUNK_PATHS = 10000
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Get the shared process pool, starting it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = int(os.getenv("SIMULATION_WORKERS", os.cpu_count() or 1))
+            _pool = ProcessPoolExecutor(max_workers=max(1, workers))
+            atexit.register(shutdown_pool)
+        return _pool
+
+
+def shutdown_pool():
+    """Stop the shared process pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def curve_points(months, step):
+    """Months at which curve values are reported, always including the last"""
+    points = list(range(0, months + 1, step))
+    if points[-1] != months:
+        points.append(months)
+    return points
+
+
+def _simulate_chunk(
+    seed,
+    paths,
+    start_value,
+    monthly_contribution,
+    target,
+    months,
+    mean,
+    volatility,
+    step,
+):
+    """
+    Simulate one chunk of return paths
+
+    Monthly log returns are normally distributed so that the expected
+    annual return equals `mean`.
+
+    Returns:
+        tuple: (reached flags of shape (paths,),
+                values at every `step` months of shape (paths, points))
+    """
+    rng = np.random.default_rng(seed)
+
+    sigma = volatility / np.sqrt(12.0)
+    mu = np.log1p(mean) / 12.0 - sigma**2 / 2.0
+
+    points = curve_points(months, step)
+
+    values = np.full(paths, float(start_value))
+    reached = values >= target
+    samples = np.empty((paths, len(points)))
+    samples[:, 0] = values
+
+    sample_index = 1
+    for month in range(1, months + 1):
+        values *= np.exp(rng.normal(mu, sigma, paths))
+        values += monthly_contribution
+        reached |= values >= target
+
+        if sample_index < len(points) and points[sample_index] == month:
+            samples[:, sample_index] = values
+            sample_index += 1
+
+    return reached, samples
+
+
+def simulate_goal(
+    start_value,
+    target,
+    months,
+    monthly_contribution=0.0,
+    mean=DEFAULT_ANNUAL_RETURN,
+    volatility=DEFAULT_VOLATILITY,
+    paths=50000,
+    step=12,
+    seed=None,
+    parallel=None,
+):
+    """
+    Estimate the probability of reaching a target within a number of months
+
+    Args:
+        start_value (float): Value invested today
+        target (float): Goal amount
+        months (int): Months until the goal deadline
+        monthly_contribution (float): Amount added at the end of every month
+        mean (float): Expected annual return
+        volatility (float): Annual volatility of returns
+        paths (int): Number of simulated paths
+        step (int): Months between points of the percentile bands
+        seed (int): Seed for reproducible results
+        parallel (bool): Force or disable the process pool, by default it is
+            used for simulations of at least PARALLEL_MIN_PATHS paths
+
+    Returns:
+        dict: Probability of reaching the target, final value statistics and
+              percentile bands over time
+    """
+    months = max(1, int(months))
+    step = max(1, min(int(step), months))
+    if parallel is None:
+        parallel = paths >= PARALLEL_MIN_PATHS
+
+    chunk_sizes = [CHUNK_PATHS] * (paths // CHUNK_PATHS)
+    if paths % CHUNK_PATHS:
+        chunk_sizes.append(paths % CHUNK_PATHS)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+
+    args = [
+        (
+            chunk_seed,
+            size,
+            start_value,
+            monthly_contribution,
+            target,
+            months,
+            mean,
+            volatility,
+            step,
+        )
+        for chunk_seed, size in zip(seeds, chunk_sizes)
+    ]
+
+    if parallel and len(args) > 1:
+        pool = get_pool()
+        results = list(pool.map(_simulate_chunk, *zip(*args)))
+    else:
+        results = [_simulate_chunk(*a) for a in args]
+
+    reached = np.concatenate([r[0] for r in results])
+    samples = np.concatenate([r[1] for r in results])
+
+    points = curve_points(months, step)
+    bands = np.percentile(samples, PERCENTILES, axis=0)
+    final = samples[:, -1]
+
+    return {
+        "probability": round(float(reached.mean()), 4),
+        "probability_at_deadline": round(float((final >= target).mean()), 4),
+        "paths": int(paths),
+        "months": points,
+        "bands": {
+            f"p{p}": np.round(band, 2).tolist() for p, band in zip(PERCENTILES, bands)
+        },
+        "final_value": {
+            "mean": round(float(final.mean()), 2),
+            "median": round(float(np.median(final)), 2),
+        },
+    }
+
+
+class SimulationCache:
+    """Thread-safe LRU cache of simulation results with a time to live"""
+
+    def __init__(self, max_entries=256, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Get a cached result, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        """Store a result, evicting the least recently used entries"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        """Drop every cached result of a user"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+
+
+simulation_cache = SimulationCache()
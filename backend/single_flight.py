@@ -0,0 +1,119 @@
+"""
+Coalescing of duplicate concurrent work for MindfulWealth application
+
+A double-clicked button or a re-rendering page sends the same request twice
+in a row, and both would run the whole computation. Work run through
+SingleFlight.do is keyed: while a call for a key is running, further calls
+with the same key wait for it and receive its result, or its exception,
+instead of running again. Nothing is cached, a call made after the first
+one finished runs again.
+"""
+import json
+import threading
+from collections import defaultdict
+
+
+def flight_key(*parts):
+    """
+    Key of a call from its parts
+
+    Dicts are compared regardless of key order and strings regardless of
+    surrounding and repeated whitespace.
+    """
+    def normalize(value):
+        if isinstance(value, str):
+            return " ".join(value.split())
+        if isinstance(value, dict):
+            return {str(k): normalize(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [normalize(v) for v in value]
+        return value
+
+    return json.dumps(normalize(parts), sort_keys=True, default=str)
+
+
+class Flight:
+    """A running call and the outcome its waiters receive"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs one call per key at a time, sharing its outcome with duplicates"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights = {}
+        self.counters = defaultdict(lambda: {"calls": 0, "executions": 0, "shared": 0, "errors": 0})
+
+    def do(self, name, key, fn):
+        """
+        Run fn, or wait for the identical call already running
+
+        Args:
+            name (str): Kind of work, calls of different kinds never share
+            key: Hashable key of the call, see flight_key
+            fn (callable): Work to run without arguments
+
+        Returns:
+            The result of fn, from this call or the one it waited for
+
+        Raises:
+            Exception: Raised by fn, in every caller that waited for it
+        """
+        flight_id = (name, key)
+        with self.lock:
+            counters = self.counters[name]
+            counters["calls"] += 1
+            flight = self.flights.get(flight_id)
+            leader = flight is None
+            if leader:
+                flight = self.flights[flight_id] = Flight()
+                counters["executions"] += 1
+            else:
+                counters["shared"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except Exception as e:
+            flight.error = e
+            with self.lock:
+                counters["errors"] += 1
+            raise
+        finally:
+            with self.lock:
+                del self.flights[flight_id]
+            flight.done.set()
+        return flight.result
+
+    def metrics(self):
+        """
+        Calls of each kind since the start: executed, shared with a running
+        call, failed, share of calls collapsed and calls running now
+        """
+        with self.lock:
+            running = defaultdict(int)
+            for name, _ in self.flights:
+                running[name] += 1
+            return {
+                name: {
+                    **counts,
+                    "collapsed_pct": round(100 * counts["shared"] / counts["calls"], 1)
+                    if counts["calls"] else 0.0,
+                    "in_flight": running[name],
+                }
+                for name, counts in self.counters.items()
+            }
+
+
+# Shared by the dashboard endpoints and the Gemini service
+single_flight = SingleFlight()
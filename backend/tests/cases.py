@@ -0,0 +1,90 @@
+"""
+Shared test case bases
+
+APITestCase calls the endpoints with a real token against an in-memory
+database holding one user. TwoSessionTestCase gives two sessions on separate
+engines sharing a database file, for writes racing each other.
+
+Subclasses list the flush hooks their tests need in trackers, and add their
+own records after calling setUp.
+"""
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from flask_jwt_extended import create_access_token
+
+import app
+from models import Base, User
+
+
+def add_user(session):
+    """Add the test user and return its ID"""
+    user = User(name="Test User", email="test@example.com")
+    session.add(user)
+    session.commit()
+    return user.id
+
+
+class APITestCase(unittest.TestCase):
+    """Endpoint tests on an in-memory database"""
+
+    # Functions installing flush hooks on the session, e.g. track_goal_progress
+    trackers = ()
+
+    def setUp(self):
+        """Use an in-memory database and a real token"""
+        self.engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        for track in self.trackers:
+            track(self.session)
+        self.user_id = add_user(self.session)
+
+        with app.app.app_context():
+            self.token = create_access_token(identity=str(self.user_id))
+        self.headers = {"Authorization": f"Bearer {self.token}"}
+
+        self.db_session_patcher = patch('app.db_session', self.session)
+        self.db_session_patcher.start()
+        self.client = app.app.test_client()
+
+    def tearDown(self):
+        """Restore the database session"""
+        self.db_session_patcher.stop()
+        self.session.close()
+
+
+class TwoSessionTestCase(unittest.TestCase):
+    """Tests of two requests writing the same database at once"""
+
+    # Functions installing flush hooks on both sessions
+    trackers = ()
+
+    def setUp(self):
+        """Use a temporary database file shared by two engines"""
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.engines = [create_engine(f"sqlite:///{self.path}") for _ in range(2)]
+        Base.metadata.create_all(self.engines[0])
+        self.sessions = []
+        for engine in self.engines:
+            Session = sessionmaker(bind=engine)
+            for track in self.trackers:
+                track(Session)
+            self.sessions.append(Session())
+        self.user_id = add_user(self.sessions[0])
+
+    def tearDown(self):
+        for session in self.sessions:
+            session.close()
+        for engine in self.engines:
+            engine.dispose()
+        os.remove(self.path)
@@ -0,0 +1,105 @@
+import unittest
+import os
+import sys
+import json
+from datetime import datetime, timedelta
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from cases import APITestCase
+from models import Base, User, Transaction, SavedImpulse, Income
+from services.activity_feed import get_activity_page
+
+class TestActivityFeed(unittest.TestCase):
+    """Test cases for the merged activity feed"""
+
+    def setUp(self):
+        """Use an in-memory database with activity spread over two years"""
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        self.session = sessionmaker(bind=engine)()
+
+        user = User(name="Test User", email="test@example.com")
+        other = User(name="Other", email="other@example.com")
+        self.session.add_all([user, other])
+        self.session.commit()
+        self.user_id = user.id
+
+        start = datetime(2023, 12, 30, 9, 0)
+        tie = datetime(2024, 1, 5, 12, 0)
+        for day in range(10):
+            self.session.add(Transaction(user.id, 10.0 + day, "food", start + timedelta(days=day)))
+            impulse = SavedImpulse(user.id, f"Gadget {day}", "electronics", 5.0 + day)
+            impulse.date = start + timedelta(days=day, hours=1)
+            self.session.add(impulse)
+        self.session.add(Income(user.id, 2000.0, "salary", tie))
+        self.session.add(Transaction(user.id, 99.0, "rent", tie))
+        self.session.add(Transaction(other.id, 1.0, "food", tie))
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+
+    def all_pages(self, limit):
+        items, cursor = get_activity_page(self.session, self.user_id, limit=limit)
+        pages = [items]
+        while cursor:
+            items, cursor = get_activity_page(self.session, self.user_id, limit=limit, cursor=cursor)
+            pages.append(items)
+        return pages
+
+    def test_feed_is_merged_newest_first(self):
+        """Test that all sources are merged in timestamp order across years"""
+        items, cursor = get_activity_page(self.session, self.user_id, limit=50)
+        self.assertIsNone(cursor)
+        self.assertEqual(len(items), 22)
+
+        timestamps = [item['timestamp'] for item in items]
+        self.assertEqual(timestamps, sorted(timestamps, reverse=True))
+        self.assertEqual(items[-1]['timestamp'], '2023-12-30T09:00:00')
+        self.assertEqual({item['type'] for item in items}, {'withdrawal', 'savings', 'deposit'})
+
+        impulse = next(item for item in items if item['type'] == 'savings')
+        self.assertTrue(impulse['id'].startswith('impulse_'))
+        self.assertTrue(impulse['title'].startswith('Saved Gadget'))
+
+    def test_keyset_pages_cover_feed_once(self):
+        """Test that pages, including ties on date, neither skip nor repeat items"""
+        full, _ = get_activity_page(self.session, self.user_id, limit=50)
+        for limit in (1, 3, 7):
+            pages = self.all_pages(limit)
+            self.assertTrue(all(len(page) <= limit for page in pages))
+            self.assertEqual([item for page in pages for item in page], full)
+
+    def test_invalid_cursor(self):
+        """Test that malformed cursors are rejected"""
+        self.assertRaises(ValueError, get_activity_page, self.session, self.user_id, cursor="nope")
+
+class TestActivityAPI(APITestCase):
+    """Test cases for the /api/activity endpoint"""
+
+    def setUp(self):
+        super().setUp()
+        for day in range(15):
+            self.session.add(Transaction(self.user_id, 1.0, "food", datetime(2024, 1, 1) + timedelta(days=day)))
+        self.session.commit()
+
+    def test_pagination_headers(self):
+        """Test that the next page is linked by the X-Next-Cursor header"""
+        response = self.client.get('/api/activity', headers=self.headers)
+        self.assertEqual(len(json.loads(response.data)), 10)
+        cursor = response.headers['X-Next-Cursor']
+
+        response = self.client.get(f'/api/activity?cursor={cursor}', headers=self.headers)
+        self.assertEqual(len(json.loads(response.data)), 5)
+        self.assertNotIn('X-Next-Cursor', response.headers)
+
+        response = self.client.get('/api/activity?cursor=bad', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
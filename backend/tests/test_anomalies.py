@@ -0,0 +1,189 @@
+import unittest
+import os
+import sys
+import json
+import statistics
+from datetime import datetime, timedelta
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from cases import APITestCase, TwoSessionTestCase
+from models import Base, User, Transaction, SpendingStats, SpendingAlert
+from services.anomaly_service import (
+    add_amount,
+    remove_amount,
+    anomaly_score,
+    get_alerts,
+    rebuild_spending_stats,
+    track_spending_anomalies,
+)
+
+class TestRunningStatistics(unittest.TestCase):
+    """Test cases for the O(1) running statistics"""
+
+    def test_welford_matches_batch_statistics(self):
+        """Test that adding and removing amounts keeps exact mean and variance"""
+        amounts = [12.5, 40.0, 7.25, 19.0, 33.3, 25.0]
+        stats = SpendingStats(1, "food")
+        for amount in amounts:
+            add_amount(stats, amount)
+
+        self.assertAlmostEqual(stats.mean, statistics.mean(amounts))
+        self.assertAlmostEqual(stats.variance, statistics.variance(amounts))
+
+        remove_amount(stats, 40.0)
+        rest = [a for a in amounts if a != 40.0]
+        self.assertEqual(stats.count, 5)
+        self.assertAlmostEqual(stats.mean, statistics.mean(rest))
+        self.assertAlmostEqual(stats.variance, statistics.variance(rest))
+
+    def test_score_needs_history_and_a_jump(self):
+        """Test that scores need enough samples and an amount above the recent level"""
+        stats = SpendingStats(1, "rent")
+        for _ in range(4):
+            add_amount(stats, 900.0)
+        self.assertIsNone(anomaly_score(stats, 5000.0))
+
+        add_amount(stats, 900.0)
+        self.assertGreater(anomaly_score(stats, 5000.0), 3)
+        self.assertIsNone(anomaly_score(stats, 905.0))
+
+class TestAnomalyDetection(unittest.TestCase):
+    """Test cases for scoring transactions as they are written"""
+
+    def setUp(self):
+        """Use an in-memory database with anomaly tracking"""
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        track_spending_anomalies(Session)
+        self.session = Session()
+
+        user = User(name="Test User", email="test@example.com")
+        self.session.add(user)
+        self.session.commit()
+        self.user_id = user.id
+
+        start = datetime(2024, 1, 1)
+        for day, amount in enumerate([42.0, 55.0, 38.5, 61.0, 47.0, 50.0, 44.0, 58.0]):
+            self.session.add(Transaction(user.id, amount, "Groceries", start + timedelta(days=day)))
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_outlier_raises_alert(self):
+        """Test that an unusually large transaction is flagged at write time"""
+        self.session.add(Transaction(self.user_id, 52.0, "groceries", datetime(2024, 1, 10)))
+        outlier = Transaction(self.user_id, 480.0, "Groceries", datetime(2024, 1, 11), description="Party supplies")
+        self.session.add(outlier)
+        self.session.commit()
+
+        alerts = get_alerts(self.session, self.user_id)
+        self.assertEqual(len(alerts), 1)
+        self.assertEqual(alerts[0]['transaction_id'], outlier.id)
+        self.assertEqual(alerts[0]['description'], "Party supplies")
+        self.assertGreaterEqual(alerts[0]['score'], 3)
+
+    def test_stats_match_rebuild_after_edits_and_deletes(self):
+        """Test that incremental statistics equal a full recompute"""
+        transactions = self.session.query(Transaction).order_by(Transaction.id).all()
+        transactions[0].amount = 70.0
+        transactions[1].category = "dining"
+        self.session.delete(transactions[2])
+        self.session.commit()
+
+        def snapshot():
+            self.session.expire_all()
+            return {
+                s.category: (s.count, round(s.mean, 6), round(s.m2, 6))
+                for s in self.session.query(SpendingStats)
+                if s.count
+            }
+
+        incremental = snapshot()
+        rebuild_spending_stats(self.session)
+        self.assertEqual(snapshot(), incremental)
+
+    def test_deleting_a_transaction_removes_its_alert(self):
+        """Test that alerts do not outlive their transaction"""
+        outlier = Transaction(self.user_id, 900.0, "groceries", datetime(2024, 1, 12))
+        self.session.add(outlier)
+        self.session.commit()
+        self.assertEqual(self.session.query(SpendingAlert).count(), 1)
+
+        self.session.delete(outlier)
+        self.session.commit()
+        self.assertEqual(self.session.query(SpendingAlert).count(), 0)
+
+class TestConcurrentStatistics(TwoSessionTestCase):
+    """Test cases for statistics written by two sessions at once"""
+
+    trackers = (track_spending_anomalies,)
+
+    def test_no_update_is_lost(self):
+        """Test that a write committed while another flush reads the statistics is kept"""
+        first, second = self.sessions
+        first.add(Transaction(self.user_id, 40.0, "Groceries", datetime(2024, 1, 1)))
+        first.commit()
+
+        def interleave(conn, cursor, statement, *args):
+            # The other request commits after this one read the statistics,
+            # before its first write
+            if "FROM spending_stats" in statement:
+                read.append(True)
+            elif read and not interleaved and not statement.lstrip().startswith("SELECT"):
+                interleaved.append(True)
+                second.add(Transaction(self.user_id, 60.0, "Groceries", datetime(2024, 1, 2)))
+                second.commit()
+
+        read, interleaved = [], []
+        event.listen(self.engines[0], "before_cursor_execute", interleave)
+        try:
+            first.add(Transaction(self.user_id, 20.0, "Groceries", datetime(2024, 1, 3)))
+            first.commit()
+        finally:
+            event.remove(self.engines[0], "before_cursor_execute", interleave)
+
+        expected = SpendingStats(self.user_id, "groceries")
+        for amount in (40.0, 60.0, 20.0):
+            add_amount(expected, amount)
+        stats = first.query(SpendingStats).one()
+        self.assertEqual(interleaved, [True])
+        self.assertEqual(stats.count, 3)
+        self.assertAlmostEqual(stats.mean, expected.mean)
+        self.assertAlmostEqual(stats.m2, expected.m2)
+        self.assertAlmostEqual(stats.ewma, expected.ewma)
+        self.assertAlmostEqual(stats.ewm_variance, expected.ewm_variance)
+
+class TestAlertsAPI(APITestCase):
+    """Test cases for the alerts endpoints"""
+
+    trackers = (track_spending_anomalies,)
+
+    def setUp(self):
+        super().setUp()
+        for amount in (20.0, 22.0, 19.0, 21.0, 20.0, 400.0):
+            self.session.add(Transaction(self.user_id, amount, "dining"))
+            self.session.commit()
+
+    def test_list_and_dismiss(self):
+        """Test that alerts are listed until dismissed"""
+        response = self.client.get('/api/alerts', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        alerts = json.loads(response.data)
+        self.assertEqual([a['category'] for a in alerts], ['dining'])
+
+        response = self.client.post(f"/api/alerts/{alerts[0]['id']}/dismiss", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(self.client.get('/api/alerts', headers=self.headers).data), [])
+
+        response = self.client.post('/api/alerts/999/dismiss', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import os
+import sys
+import json
+from datetime import datetime, timedelta
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+
+from cases import APITestCase
+from models import Transaction, Budget, SavedImpulse, Goal, Income
+from services.anomaly_service import track_spending_anomalies
+from services.cashflow_service import track_monthly_summaries
+from services.flush_tracking import begin_transaction
+from services.goal_service import track_goal_progress
+
+RESOURCES = ['dashboard', 'goals', 'portfolio', 'activity', 'insights']
+
+class TestBootstrapAPI(APITestCase):
+    """Test cases for the batched dashboard bootstrap endpoint"""
+
+    trackers = (track_goal_progress, track_monthly_summaries, track_spending_anomalies)
+
+    def setUp(self):
+        """Use an in-memory database with a month of activity"""
+        super().setUp()
+        now = datetime.now()
+        for day in range(20):
+            self.session.add(Transaction(self.user_id, 20.0 + day, "food" if day % 2 else "fun", now - timedelta(days=day), is_impulse=day % 3 == 0))
+        self.session.add(Budget(self.user_id, "food", 100.0, now.month, now.year))
+        self.session.add(Goal(self.user_id, "Trip", 1000.0))
+        self.session.add(Income(self.user_id, 2500.0, "salary", now))
+        self.session.add(SavedImpulse(self.user_id, "Headphones", "electronics", 80.0, currency="USD"))
+        self.session.commit()
+
+        self.statements = 0
+        event.listen(self.engine, "before_cursor_execute", self.count_statement)
+
+    def count_statement(self, *args):
+        self.statements += 1
+
+    def test_matches_separate_endpoints(self):
+        """Test that each resource equals its own endpoint's body with fewer queries"""
+        separate = {}
+        for name in RESOURCES:
+            response = self.client.get(f'/api/{name}', headers=self.headers)
+            self.assertEqual(response.status_code, 200)
+            separate[name] = json.loads(response.data)
+        separate_statements, self.statements = self.statements, 0
+
+        response = self.client.get('/api/bootstrap', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        resources = json.loads(response.data)['resources']
+        # Section build times differ between the two calls
+        for body in (resources, separate):
+            del body['dashboard']['meta']
+        self.assertEqual(resources, separate)
+        self.assertLess(self.statements, separate_statements * 0.6)
+
+    def test_selected_resources(self):
+        """Test that only the requested resources are built"""
+        response = self.client.get('/api/bootstrap?resources=goals,portfolio', headers=self.headers)
+        resources = json.loads(response.data)['resources']
+        self.assertEqual(list(resources), ['goals', 'portfolio'])
+        self.assertEqual(resources['goals'][0]['name'], 'Trip')
+
+        response = self.client.get('/api/bootstrap?resources=goals,budgets', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_read_snapshot(self):
+        """Test that the queries run inside one transaction"""
+        begin_transaction(self.session)
+        self.assertTrue(self.session.connection().connection.dbapi_connection.in_transaction)
+        begin_transaction(self.session)
+        self.session.rollback()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import os
+import sys
+import json
+from datetime import datetime
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from cases import APITestCase
+from models import Base, User, Budget, Transaction, UserCategory
+from services.budget_service import next_month, roll_forward_budgets, upsert_budget
+from services.category_service import rebuild_user_categories, track_category_usage
+
+class TestBudgetWrites(unittest.TestCase):
+    """Test cases for budget upserts and month roll-forward"""
+
+    def setUp(self):
+        """Use an in-memory database with category tracking"""
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        track_category_usage(Session)
+        self.session = Session()
+
+        user = User(name="Test User", email="test@example.com")
+        self.session.add(user)
+        self.session.commit()
+        self.user_id = user.id
+
+    def tearDown(self):
+        self.session.close()
+
+    def budgets(self, month, year):
+        return {
+            b.category: b.planned_amount
+            for b in self.session.query(Budget).filter_by(user_id=self.user_id, month=month, year=year)
+        }
+
+    def usage(self):
+        self.session.expire_all()
+        return {c.name: c.usage_count for c in self.session.query(UserCategory)}
+
+    def test_upsert(self):
+        """Test that the second write to a category and month replaces the amount"""
+        budget, created = upsert_budget(self.session, self.user_id, "rent", 900.0, 3, 2024)
+        self.assertTrue(created)
+        again, created = upsert_budget(self.session, self.user_id, "rent", 950.0, 3, 2024)
+        self.assertFalse(created)
+        self.assertEqual(again['id'], budget['id'])
+        self.assertEqual(self.budgets(3, 2024), {"rent": 950.0})
+        self.assertEqual(self.usage(), {"rent": 1})
+
+    def test_roll_forward(self):
+        """Test copying, scaling and keeping or replacing existing budgets"""
+        upsert_budget(self.session, self.user_id, "rent", 900.0, 12, 2024)
+        upsert_budget(self.session, self.user_id, "food", 300.0, 12, 2024)
+        upsert_budget(self.session, self.user_id, "food", 250.0, 1, 2025)
+
+        written = roll_forward_budgets(self.session, self.user_id, 12, 2024, scale=1.1)
+        self.assertEqual([b['category'] for b in written], ["rent"])
+        self.assertEqual(self.budgets(1, 2025), {"food": 250.0, "rent": 990.0})
+
+        roll_forward_budgets(self.session, self.user_id, 12, 2024, overwrite=True)
+        self.assertEqual(self.budgets(1, 2025), {"food": 300.0, "rent": 900.0})
+        self.assertEqual(roll_forward_budgets(self.session, self.user_id, 6, 2024), [])
+
+        incremental = self.usage()
+        rebuild_user_categories(self.session)
+        self.assertEqual(self.usage(), incremental)
+        self.assertEqual(incremental, {"rent": 2, "food": 2})
+
+    def test_next_month(self):
+        """Test that December rolls into January of the next year"""
+        self.assertEqual(next_month(12, 2024), (1, 2025))
+        self.assertEqual(next_month(5, 2024), (6, 2024))
+
+class TestBudgetAPI(APITestCase):
+    """Test cases for the budget endpoints"""
+
+    trackers = (track_category_usage,)
+
+    def test_create_then_update(self):
+        """Test that posting the same category and month updates it"""
+        body = {'category': 'rent', 'planned_amount': 900, 'month': 3, 'year': 2024}
+        first = json.loads(self.client.post('/api/budgets', json=body, headers=self.headers).data)
+        body['planned_amount'] = 950
+        second = json.loads(self.client.post('/api/budgets', json=body, headers=self.headers).data)
+
+        self.assertEqual(first['message'], 'Budget created successfully')
+        self.assertEqual(second['message'], 'Budget updated successfully')
+        self.assertEqual(second['budget']['planned_amount'], 950)
+        self.assertEqual(self.session.query(Budget).count(), 1)
+
+        body['month'] = 13
+        response = self.client.post('/api/budgets', json=body, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_legacy_budget_endpoint(self):
+        """Test that the legacy endpoint writes and reports spending"""
+        now = datetime.now()
+        body = {'category': 'food', 'planned_amount': 300, 'month': now.month, 'year': now.year}
+        response = self.client.post('/api/budget', json=body, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+
+        self.session.add(Transaction(self.user_id, 42.0, 'food', now))
+        self.session.commit()
+        data = json.loads(self.client.get('/api/budget', headers=self.headers).data)
+        self.assertEqual((data['total'], data['spent']), (300, 42.0))
+        self.assertEqual(data['categories'], [{'name': 'food', 'planned': 300, 'actual': 42.0}])
+
+    def test_roll_forward(self):
+        """Test the bulk copy into the next month"""
+        for category, amount in (('rent', 900), ('food', 300)):
+            body = {'category': category, 'planned_amount': amount, 'month': 12, 'year': 2024}
+            self.client.post('/api/budgets', json=body, headers=self.headers)
+
+        response = self.client.post('/api/budgets/roll-forward', json={'month': 12, 'year': 2024, 'scale': 0.5}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual((data['month'], data['year']), (1, 2025))
+        self.assertEqual([(b['category'], b['planned_amount']) for b in data['budgets']], [('food', 150), ('rent', 450)])
+
+        for body in ({'year': 2024}, {'month': 12, 'year': 2024, 'to_month': 12, 'to_year': 2024}):
+            response = self.client.post('/api/budgets/roll-forward', json=body, headers=self.headers)
+            self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
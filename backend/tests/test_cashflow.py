@@ -0,0 +1,162 @@
+import unittest
+import os
+import sys
+import json
+from datetime import datetime
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from cases import APITestCase, TwoSessionTestCase
+from models import Base, User, Transaction, Income, MonthlySummary
+from services.cashflow_service import (
+    get_savings_overview,
+    rebuild_monthly_summaries,
+    track_monthly_summaries,
+)
+
+NOW = datetime(2024, 3, 15)
+
+class TestMonthlySummaries(unittest.TestCase):
+    """Test cases for the monthly income/spending rollup"""
+
+    def setUp(self):
+        """Use an in-memory database with rollup tracking"""
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        track_monthly_summaries(Session)
+        self.session = Session()
+
+        user = User(name="Test User", email="test@example.com")
+        self.session.add(user)
+        self.session.commit()
+        self.user_id = user.id
+
+    def tearDown(self):
+        self.session.close()
+
+    def add_month(self, month, income, expenses):
+        self.session.add(Income(self.user_id, income, "salary", datetime(2024, month, 1)))
+        for amount in expenses:
+            self.session.add(Transaction(self.user_id, amount, "groceries", datetime(2024, month, 10)))
+        self.session.commit()
+
+    def summaries(self):
+        self.session.expire_all()
+        return {
+            s.month: (s.income, s.expenses)
+            for s in self.session.query(MonthlySummary).filter_by(user_id=self.user_id)
+        }
+
+    def test_savings_rate_and_change(self):
+        """Test the savings rate and its month-over-month change"""
+        self.add_month(2, 4000, [2000, 1000])
+        self.add_month(3, 5000, [2500, 500])
+
+        overview = get_savings_overview(self.session, self.user_id, now=NOW)
+        self.assertEqual(overview['income'], 5000)
+        self.assertEqual(overview['expenses'], 3000)
+        self.assertEqual(overview['savings_rate'], 40.0)
+        self.assertEqual(overview['previous_savings_rate'], 25.0)
+        self.assertEqual(overview['savings_rate_change'], 15.0)
+
+    def test_no_income(self):
+        """Test that months without income have no rate and no change"""
+        self.add_month(3, 1000, [200])
+        self.session.query(Income).delete()
+        rebuild_monthly_summaries(self.session, self.user_id)
+
+        overview = get_savings_overview(self.session, self.user_id, now=NOW)
+        self.assertEqual(overview['savings_rate'], 0.0)
+        self.assertEqual(overview['savings_rate_change'], 0.0)
+
+    def test_edits_move_amounts_between_months(self):
+        """Test that updates and deletes keep the rollup in sync"""
+        self.add_month(2, 4000, [100])
+        transaction = self.session.query(Transaction).one()
+
+        transaction.amount = 150.0
+        transaction.date = datetime(2024, 3, 2)
+        self.session.commit()
+        self.assertEqual(self.summaries(), {2: (4000.0, 0.0), 3: (0.0, 150.0)})
+
+        self.session.delete(self.session.query(Income).one())
+        self.session.commit()
+        self.assertEqual(self.summaries(), {2: (0.0, 0.0), 3: (0.0, 150.0)})
+
+    def test_rebuild_matches_incremental_rollup(self):
+        """Test that a full rebuild gives the same totals"""
+        self.add_month(1, 3000, [10, 20.5])
+        self.add_month(2, 3200, [400])
+        incremental = self.summaries()
+
+        rebuild_monthly_summaries(self.session)
+        self.assertEqual(self.summaries(), incremental)
+
+class TestConcurrentRollup(TwoSessionTestCase):
+    """Test cases for the first writes of a month from two sessions at once"""
+
+    trackers = (track_monthly_summaries,)
+
+    def test_racing_first_writes_of_a_month(self):
+        """Test that a month created by another request meanwhile is added to"""
+        first, second = self.sessions
+
+        def interleave(conn, cursor, statement, *args):
+            # The other request creates the month just before this one writes
+            if not interleaved and not statement.lstrip().startswith("SELECT"):
+                interleaved.append(True)
+                second.add(Transaction(self.user_id, 30.0, "food", NOW))
+                second.commit()
+
+        interleaved = []
+        event.listen(self.engines[0], "before_cursor_execute", interleave)
+        try:
+            first.add(Transaction(self.user_id, 12.0, "food", NOW))
+            first.commit()
+        finally:
+            event.remove(self.engines[0], "before_cursor_execute", interleave)
+
+        self.assertEqual(interleaved, [True])
+        summary = first.query(MonthlySummary).one()
+        self.assertEqual((summary.year, summary.month, summary.expenses), (2024, 3, 42.0))
+
+class TestIncomeAPI(APITestCase):
+    """Test cases for the /api/income endpoints"""
+
+    trackers = (track_monthly_summaries,)
+
+    def setUp(self):
+        super().setUp()
+        self.session.add(Transaction(self.user_id, 600.0, "groceries", datetime.now()))
+        self.session.commit()
+
+    def test_add_and_list_income(self):
+        """Test that recorded income feeds the savings rate"""
+        response = self.client.post('/api/income', json={'amount': 2000, 'source': 'salary'}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        income_id = json.loads(response.data)['income']['id']
+
+        data = json.loads(self.client.get('/api/income', headers=self.headers).data)
+        self.assertEqual(len(data['income']), 1)
+        self.assertEqual(data['summary']['income'], 2000)
+        self.assertEqual(data['summary']['savings_rate'], 70.0)
+
+        response = self.client.delete(f'/api/income/{income_id}', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(self.client.get('/api/income', headers=self.headers).data)
+        self.assertEqual(data['summary']['income'], 0)
+
+    def test_invalid_income(self):
+        """Test income validation"""
+        response = self.client.post('/api/income', json={'amount': 10}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/income', json={'amount': 'x', 'source': 'salary'}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
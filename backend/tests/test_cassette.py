@@ -0,0 +1,92 @@
+import unittest
+import os
+import sys
+import gzip
+import json
+import tempfile
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.cassette import Cassette, CassetteGenai
+from services.gemini_service import GeminiService
+from services.model_backends import BackendError, FakeGenai
+
+class TestCassette(unittest.TestCase):
+    """Test cases for recording and replaying model calls"""
+
+    def setUp(self):
+        """Record to a cassette in a temporary directory"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "chat.jsonl.gz")
+        self.fake = FakeGenai(latency="fixed:0", tokens_per_second=0, seed=3)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def recorder(self):
+        return CassetteGenai(Cassette(self.path), self.fake, mode="record")
+
+    def player(self):
+        self.slept = []
+        return CassetteGenai(Cassette(self.path), sleep=self.slept.append)
+
+    def test_replay_answers_in_recorded_order(self):
+        """Test that a replayed call returns the recorded answers without the backend"""
+        model = self.recorder().GenerativeModel("gemini-1.5-flash", system_instruction="Be brief")
+        answers = [model.generate_content("Hello").text for _ in range(2)]
+        other = model.generate_content("Bye").text
+
+        with gzip.open(self.path, "rt") as file:
+            lines = [json.loads(line) for line in file]
+        self.assertEqual(lines[0], {"version": 1})
+        self.assertEqual([line["prompt"] for line in lines[1:]], ["Hello", "Hello", "Bye"])
+
+        backend = self.player()
+        self.assertEqual([m.name for m in backend.list_models()], ["models/gemini-1.5-flash"])
+        model = backend.GenerativeModel("gemini-1.5-flash", system_instruction="Be brief")
+        replayed = [model.generate_content("Hello").text for _ in range(3)]
+        self.assertEqual(replayed, answers + answers[:1])
+        self.assertEqual(model.generate_content("Bye").text, other)
+
+        # Another system instruction is another call
+        with self.assertRaises(BackendError):
+            backend.GenerativeModel("gemini-1.5-flash").generate_content("Hello")
+        self.assertEqual(backend.metrics(), {"recorded": 0, "replayed": 4, "missed": 1, "entries": 3})
+
+    def test_streamed_timings(self):
+        """Test that chunks are replayed after their recorded offsets"""
+        model = self.recorder().GenerativeModel("gemini-1.5-flash")
+        chunks = [chunk.text for chunk in model.generate_content("Hello", stream=True)]
+
+        backend = self.player()
+        replayed = backend.GenerativeModel("gemini-1.5-flash").generate_content("Hello", stream=True)
+        self.assertEqual([chunk.text for chunk in replayed], chunks)
+        self.assertEqual(len(self.slept), len(chunks))
+
+        entry = next(iter(Cassette(self.path).entries.values()))[0]
+        self.assertAlmostEqual(sum(self.slept), entry["offsets_ms"][-1] / 1000)
+
+    def test_recorded_errors(self):
+        """Test that failures are replayed with their status"""
+        self.fake.error_rate = 1.0
+        model = self.recorder().GenerativeModel("gemini-1.5-flash")
+        with self.assertRaises(BackendError) as recorded:
+            model.generate_content("Hello")
+
+        model = self.player().GenerativeModel("gemini-1.5-flash")
+        with self.assertRaises(BackendError) as replayed:
+            model.generate_content("Hello")
+        self.assertEqual(replayed.exception.code, recorded.exception.code)
+        self.assertEqual(replayed.exception.message, recorded.exception.message)
+
+    def test_gemini_service_replay(self):
+        """Test that a chat answer recorded once is replayed offline"""
+        service = GeminiService(api_key=None, backend=self.recorder())
+        answer = service.get_response("Should I save more?", language="en", personality="funny")
+
+        service = GeminiService(api_key=None, backend=self.player())
+        self.assertEqual(service.get_response("Should I save more?", language="en", personality="funny"), answer)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+import unittest
+import os
+import sys
+import json
+from datetime import datetime
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from cases import APITestCase, TwoSessionTestCase
+from models import Base, User, Transaction, Budget, UserCategory
+from services.category_service import (
+    DEFAULT_CATEGORIES,
+    CategoryIndex,
+    category_index,
+    rebuild_user_categories,
+    track_category_usage,
+)
+
+class TestCategoryUsage(unittest.TestCase):
+    """Test cases for the per-user category dictionary"""
+
+    def setUp(self):
+        """Use an in-memory database with category tracking"""
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        track_category_usage(Session)
+        self.session = Session()
+
+        user = User(name="Test User", email="test@example.com")
+        self.session.add(user)
+        self.session.commit()
+        self.user_id = user.id
+
+    def tearDown(self):
+        self.session.close()
+
+    def usage(self):
+        self.session.expire_all()
+        return {
+            row.name: row.usage_count
+            for row in self.session.query(UserCategory).filter_by(user_id=self.user_id)
+        }
+
+    def test_writes_update_usage_counts(self):
+        """Test that new, edited and deleted records adjust usage counts"""
+        coffee = Transaction(self.user_id, 4.0, "coffee", datetime(2024, 3, 1))
+        self.session.add_all([
+            coffee,
+            Transaction(self.user_id, 5.0, "coffee", datetime(2024, 3, 5)),
+            Budget(self.user_id, "rent", 900.0, 3, 2024),
+        ])
+        self.session.commit()
+        self.assertEqual(self.usage(), {"coffee": 2, "rent": 1})
+
+        coffee.category = "cafe"
+        self.session.commit()
+        self.assertEqual(self.usage(), {"coffee": 1, "cafe": 1, "rent": 1})
+
+        self.session.delete(coffee)
+        self.session.commit()
+        self.assertEqual(self.usage(), {"coffee": 1, "cafe": 0, "rent": 1})
+
+        last_used = self.session.query(UserCategory.last_used).filter_by(name="coffee").scalar()
+        self.assertEqual(last_used, datetime(2024, 3, 5))
+
+    def test_incremental_usage_matches_rebuild(self):
+        """Test that the maintained table equals a full recompute"""
+        transactions = [Transaction(self.user_id, 10.0, c) for c in ("food", "food", "fuel", "gym")]
+        self.session.add_all(transactions)
+        self.session.commit()
+        transactions[2].category = "food"
+        self.session.delete(transactions[3])
+        self.session.commit()
+
+        incremental = {name: count for name, count in self.usage().items() if count}
+        rebuild_user_categories(self.session)
+        self.assertEqual(self.usage(), incremental)
+        self.assertEqual(incremental, {"food": 3})
+
+class TestConcurrentUsage(TwoSessionTestCase):
+    """Test cases for category usage written by two sessions at once"""
+
+    trackers = (track_category_usage,)
+
+    def test_racing_first_uses_of_a_category(self):
+        """Test that a category created by another request meanwhile is added to"""
+        first, second = self.sessions
+        newer = datetime(2024, 5, 2)
+
+        def interleave(conn, cursor, statement, *args):
+            # The other request uses the category later, just before this one writes
+            if not interleaved and not statement.lstrip().startswith("SELECT"):
+                interleaved.append(True)
+                second.add(Transaction(self.user_id, 30.0, "Hobbies", newer))
+                second.commit()
+
+        interleaved = []
+        event.listen(self.engines[0], "before_cursor_execute", interleave)
+        try:
+            first.add(Transaction(self.user_id, 12.0, "Hobbies", datetime(2024, 5, 1)))
+            first.commit()
+        finally:
+            event.remove(self.engines[0], "before_cursor_execute", interleave)
+
+        self.assertEqual(interleaved, [True])
+        row = first.query(UserCategory).one()
+        self.assertEqual((row.usage_count, row.last_used), (2, newer))
+
+class TestCategoryIndex(unittest.TestCase):
+    """Test cases for ranked prefix autocomplete"""
+
+    def setUp(self):
+        """Use an in-memory database with a few used categories"""
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        track_category_usage(Session)
+        self.session = Session()
+
+        user = User(name="Test User", email="test@example.com")
+        self.session.add(user)
+        self.session.commit()
+        self.user_id = user.id
+
+        for category, count in (("gym", 3), ("groceries", 5), ("green energy", 1)):
+            self.session.add_all(Transaction(user.id, 1.0, category) for _ in range(count))
+        self.session.commit()
+        self.index = CategoryIndex()
+
+    def tearDown(self):
+        self.session.close()
+
+    def names(self, prefix, limit=10):
+        return [s["name"] for s in self.index.complete(self.session, self.user_id, prefix, limit)]
+
+    def test_prefix_ranking(self):
+        """Test that name prefixes rank before word prefixes, then by usage"""
+        self.assertEqual(self.names("g"), ["groceries", "gym", "green energy", "gifts"])
+        self.assertEqual(self.names("GR ", limit=1), ["groceries"])
+        self.assertEqual(self.names("ener"), ["green energy"])
+        self.assertEqual(self.names("ca"), ["personal care"])
+        self.assertEqual(self.names("zz"), [])
+
+    def test_names_include_defaults(self):
+        """Test that the full list merges used and default categories"""
+        names = self.index.names(self.session, self.user_id)
+        self.assertEqual(names, sorted(set(DEFAULT_CATEGORIES) | {"gym", "green energy"}))
+
+    def test_commits_invalidate_the_shared_index(self):
+        """Test that a committed write drops the user's cached index"""
+        category_index.invalidate()
+        category_index.complete(self.session, self.user_id, "y")
+        self.session.add(Transaction(self.user_id, 1.0, "yoga"))
+        self.session.commit()
+
+        suggestions = category_index.complete(self.session, self.user_id, "y")
+        self.assertEqual([s["name"] for s in suggestions], ["yoga"])
+        self.assertEqual(suggestions[0]["usage_count"], 1)
+
+class TestCategoriesAPI(APITestCase):
+    """Test cases for the category endpoints"""
+
+    trackers = (track_category_usage,)
+
+    def setUp(self):
+        super().setUp()
+        self.session.add_all([Transaction(self.user_id, 1.0, "pets"), Transaction(self.user_id, 1.0, "pets")])
+        self.session.commit()
+        category_index.invalidate()
+
+    def tearDown(self):
+        super().tearDown()
+        category_index.invalidate()
+
+    def test_list_categories(self):
+        """Test that the category list keeps its alphabetical shape"""
+        response = self.client.get('/api/categories', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        categories = json.loads(response.data)['categories']
+        self.assertIn('pets', categories)
+        self.assertEqual(categories, sorted(categories))
+
+    def test_autocomplete(self):
+        """Test ranked suggestions with usage statistics"""
+        response = self.client.get('/api/categories/autocomplete?q=p&limit=2', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        suggestions = json.loads(response.data)['suggestions']
+        self.assertEqual([s['name'] for s in suggestions], ['pets', 'personal care'])
+        self.assertEqual(suggestions[0]['usage_count'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
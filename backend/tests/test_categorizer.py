@@ -0,0 +1,167 @@
+import unittest
+import os
+import sys
+import json
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from cases import APITestCase
+import app
+from models import Base, User, Transaction
+from benchmarks.categorizer import run_benchmark
+from services.categorizer import (
+    TransactionCategorizer,
+    categorizer,
+    tokenize,
+    track_categorizer_updates,
+    train_from_database,
+)
+
+TRAINING = [
+    (1, "CARREFOUR MARKET PARIS 11", "groceries"),
+    (1, "Lidl 2231 card payment", "groceries"),
+    (1, "NETFLIX.COM monthly", "subscriptions"),
+    (1, "Spotify premium", "subscriptions"),
+    (2, "UBER EATS pizza", "dining"),
+    (2, "Uber trip help.uber.com", "transportation"),
+    (3, "UBER *TRIP 8822", "transportation"),
+    (3, "Uber ride airport", "transportation"),
+]
+
+class TestTransactionCategorizer(unittest.TestCase):
+    """Test cases for the hashed-token Naive Bayes categorizer"""
+
+    def setUp(self):
+        self.model = TransactionCategorizer(n_features=2**12)
+        self.model.train(TRAINING)
+
+    def test_tokenize(self):
+        """Test that numbers and single letters are dropped and pairs added"""
+        self.assertEqual(tokenize("UBER *TRIP 8822 x"), ["uber", "trip", "uber trip"])
+        self.assertEqual(tokenize(None), [])
+
+    def test_suggest(self):
+        """Test ranked suggestions for a single description"""
+        suggestions = self.model.suggest(1, "carrefour city")
+        self.assertEqual(suggestions[0]['name'], 'groceries')
+        self.assertGreater(suggestions[0]['confidence'], 0.5)
+        self.assertLessEqual(len(self.model.suggest(1, "carrefour", limit=2)), 2)
+        self.assertEqual(self.model.suggest(1, "12 34"), [])
+        self.assertEqual(TransactionCategorizer().suggest(1, "carrefour"), [])
+
+    def test_user_history_outweighs_everyone(self):
+        """Test that a user's own labels decide ambiguous merchants"""
+        self.assertEqual(self.model.suggest(2, "uber eats")[0]['name'], 'dining')
+        self.assertEqual(self.model.suggest(3, "uber")[0]['name'], 'transportation')
+
+    def test_incremental_learning(self):
+        """Test that learning and unlearning update suggestions"""
+        self.model.learn(1, "Vet clinic Dr Martin", "Pets")
+        self.assertEqual(self.model.suggest(1, "vet martin")[0]['name'], 'pets')
+
+        self.model.learn(1, "Vet clinic Dr Martin", "Pets", weight=-1)
+        names = [s['name'] for s in self.model.suggest(1, "vet martin")]
+        self.assertNotIn('pets', names)
+
+    def test_batch_matches_single(self):
+        """Test that batch labels equal the top single suggestion"""
+        descriptions = ["netflix", "", "lidl card", "uber eats"]
+        labels = self.model.predict_many(2, descriptions)
+
+        self.assertEqual(labels[1], (None, 0.0))
+        for description, (category, confidence) in zip(descriptions, labels):
+            if description:
+                best = self.model.suggest(2, description, limit=1)[0]
+                self.assertEqual(category, best['name'])
+                self.assertAlmostEqual(confidence, best['confidence'], places=3)
+
+    def test_synthetic_benchmark(self):
+        """Test accuracy and speed on the synthetic corpus"""
+        result = run_benchmark(transactions=5000, users=10, repeat=50)
+        self.assertGreater(result['accuracy'], 0.85)
+        self.assertLess(result['suggest_us'], 5000)
+
+class TestCategorizerUpdates(unittest.TestCase):
+    """Test cases for keeping the shared categorizer in step with commits"""
+
+    def setUp(self):
+        """Use an in-memory database with categorizer tracking"""
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        track_categorizer_updates(Session)
+        self.session = Session()
+
+        user = User(name="Test User", email="test@example.com")
+        self.session.add(user)
+        self.session.commit()
+        self.user_id = user.id
+
+        self.session.add(Transaction(user.id, 9.99, "subscriptions", description="Netflix"))
+        self.session.commit()
+        train_from_database(self.session)
+
+    def tearDown(self):
+        self.session.close()
+        categorizer.reset()
+
+    def test_commits_update_the_model(self):
+        """Test that committed transactions are learned and rollbacks are not"""
+        self.session.add(Transaction(self.user_id, 30.0, "pets", description="Vet visit"))
+        self.session.commit()
+        self.assertEqual(categorizer.suggest(self.user_id, "vet")[0]['name'], 'pets')
+
+        self.session.add(Transaction(self.user_id, 5.0, "gifts", description="Flowers"))
+        self.session.flush()
+        self.session.rollback()
+        self.assertNotIn('gifts', categorizer.classes)
+
+    def test_edits_relabel(self):
+        """Test that changing a category moves the description to it"""
+        transaction = self.session.query(Transaction).one()
+        transaction.category = "entertainment"
+        self.session.commit()
+
+        names = [s['name'] for s in categorizer.suggest(self.user_id, "netflix")]
+        self.assertEqual(names, ['entertainment'])
+
+class TestCategorizeAPI(APITestCase):
+    """Test cases for the categorize endpoint"""
+
+    def setUp(self):
+        super().setUp()
+        self.session.add_all(
+            Transaction(self.user_id, 10.0, category, description=description)
+            for _, description, category in TRAINING
+        )
+        self.session.commit()
+        categorizer.reset()
+
+    def tearDown(self):
+        super().tearDown()
+        categorizer.reset()
+
+    def test_single_and_batch(self):
+        """Test suggestions for one description and labels for a batch"""
+        response = self.client.post('/api/transactions/categorize', json={'description': 'Spotify'}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['suggestions'][0]['name'], 'subscriptions')
+
+        body = {'descriptions': ['LIDL 12', 'netflix']}
+        response = self.client.post('/api/transactions/categorize', json=body, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        labels = [item['category'] for item in json.loads(response.data)['categories']]
+        self.assertEqual(labels, ['groceries', 'subscriptions'])
+
+    def test_invalid_requests(self):
+        """Test that missing or malformed descriptions are rejected"""
+        for body in ({}, {'descriptions': 'netflix'}, {'descriptions': ['x'] * (app.MAX_CATEGORIZE_BATCH + 1)}):
+            response = self.client.post('/api/transactions/categorize', json=body, headers=self.headers)
+            self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
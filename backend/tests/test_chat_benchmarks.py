@@ -0,0 +1,56 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.corpus import CHAT_CORPUS
+from benchmarks.chat_hot_path import (
+    run_benchmarks,
+    load_thresholds,
+    find_regressions,
+)
+
+# Timings depend on the machine, so the regression check only runs when asked
+RUN_BENCHMARKS = os.getenv("MW_RUN_BENCHMARKS", "").lower() in ("1", "true", "yes")
+
+class TestChatHotPathBenchmarks(unittest.TestCase):
+    """Performance regression tests for the chat pre-processing hot path"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Run the benchmarks once for all tests"""
+        cls.results = run_benchmarks(repeat=50 if RUN_BENCHMARKS else 1)
+        cls.thresholds = load_thresholds()
+
+    def test_corpus_covers_languages_and_intents(self):
+        """Test that the corpus exercises every language and intent"""
+        languages = {entry['language'] for entry in CHAT_CORPUS}
+        intents = {entry['intent'] for entry in CHAT_CORPUS}
+
+        self.assertEqual(languages, {'en', 'fr'})
+        self.assertTrue({'greeting', 'budget', 'saving', 'impulse', 'other'} <= intents)
+
+    def test_every_benchmark_has_a_threshold(self):
+        """Test that no benchmark runs without a stored baseline"""
+        self.assertEqual(set(self.results), set(self.thresholds))
+
+    @unittest.skipUnless(RUN_BENCHMARKS, "set MW_RUN_BENCHMARKS=1 to check timings")
+    def test_no_regressions(self):
+        """Test that time and allocations per call stay within the baseline"""
+        regressions = find_regressions(self.results, self.thresholds)
+        self.assertEqual(regressions, [], "\n".join(regressions))
+
+    def test_find_regressions_flags_slow_function(self):
+        """Test that a measurement over the threshold is reported"""
+        results = {'extract_amount': {'time_us': 100.0, 'alloc_bytes': 10}}
+        thresholds = {'extract_amount': {'time_us': 10.0, 'alloc_bytes': 100}}
+
+        regressions = find_regressions(results, thresholds, tolerance=2.0)
+
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('time_us', regressions[0])
+
+if __name__ == '__main__':
+    unittest.main()
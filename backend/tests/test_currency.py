@@ -0,0 +1,206 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+from datetime import date, datetime
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from cases import APITestCase
+import app
+from models import Base, User, Transaction, Income, SavedImpulse, MonthlySummary, Budget
+from services.currency_service import RateTable, get_rate_table
+from services.cashflow_service import rebuild_monthly_summaries, track_monthly_summaries
+from services.local_router import LocalIntentRouter
+
+RATES = {
+    "base": "USD",
+    "snapshots": [
+        {"date": "2024-02-01", "rates": {"USD": 1.0, "EUR": 0.5, "GBP": 0.25}},
+        {"date": "2024-01-01", "rates": {"USD": 1.0, "EUR": 0.8, "GBP": 0.5}},
+    ],
+}
+
+class TestRateTable(unittest.TestCase):
+    """Test cases for the currency rate table"""
+
+    def setUp(self):
+        """Write a small rates file"""
+        handle, self.path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(handle, 'w') as f:
+            json.dump(RATES, f)
+        self.rates = RateTable(self.path)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_dated_snapshots(self):
+        """Test that conversions use the snapshot in effect on the date"""
+        self.assertEqual(self.rates.convert(100, 'USD', 'EUR'), 50.0)
+        self.assertEqual(self.rates.convert(100, 'USD', 'EUR', on=date(2024, 1, 15)), 80.0)
+        self.assertEqual(self.rates.convert(100, 'USD', 'EUR', on=datetime(2023, 6, 1)), 80.0)
+        self.assertEqual(self.rates.convert(10, 'GBP', 'EUR'), 20.0)
+        self.assertRaises(ValueError, self.rates.convert, 1, 'XYZ', 'EUR')
+
+    def test_bulk_conversion(self):
+        """Test vectorized conversion of many amounts"""
+        converted = self.rates.convert_many([100, 10, 5], ['USD', 'GBP', 'EUR'], 'EUR')
+        np.testing.assert_allclose(converted, [50.0, 20.0, 5.0])
+
+        by_snapshot = self.rates.convert_many([100, 100], ['USD', 'USD'], 'EUR', snapshots=[0, 1])
+        np.testing.assert_allclose(by_snapshot, [80.0, 50.0])
+
+    def test_convert_totals(self):
+        """Test combining per-currency subtotals into totals per key"""
+        rows = [('food', 'USD', 100.0), ('food', 'EUR', 10.0), ('rent', 'GBP', 25.0)]
+        self.assertEqual(self.rates.convert_totals(rows, 'EUR'), {'food': 60.0, 'rent': 50.0})
+        self.assertEqual(self.rates.convert_totals([('USD', 10.0)], 'EUR'), {None: 5.0})
+        self.assertEqual(self.rates.convert_totals([], 'EUR'), {})
+
+    def test_snapshot_expression_matches_python(self):
+        """Test that grouped SQL subtotals convert like rows at their own date"""
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+
+        amounts = [(100.0, datetime(2023, 12, 31)), (40.0, datetime(2024, 1, 31, 23)), (60.0, datetime(2024, 2, 1))]
+        for amount, when in amounts:
+            session.add(Transaction(1, amount, 'food', when, currency='USD'))
+        session.commit()
+
+        snapshot = self.rates.snapshot_expression(Transaction.date).label('snapshot')
+        rows = (
+            session.query(snapshot, Transaction.currency, func.sum(Transaction.amount))
+            .group_by(snapshot, Transaction.currency)
+            .all()
+        )
+        expected = sum(self.rates.convert(a, 'USD', 'EUR', on=d) for a, d in amounts)
+        self.assertAlmostEqual(self.rates.convert_totals(rows, 'EUR', by_snapshot=True)[None], expected)
+        session.close()
+
+class TestMultiCurrencyTotals(unittest.TestCase):
+    """Test cases for totals over records in several currencies"""
+
+    def setUp(self):
+        """Use an in-memory database with rollup tracking"""
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        self.session = sessionmaker(bind=engine)()
+        track_monthly_summaries(self.session)
+
+        user = User(name="Test User", email="test@example.com")
+        self.session.add(user)
+        self.session.commit()
+        self.user_id = user.id
+
+        now = datetime.now()
+        self.session.add_all([
+            Transaction(user.id, 100.0, "Food", now, currency="USD"),
+            Transaction(user.id, 15.0, "Food", now, currency="EUR"),
+            Income(user.id, 1000.0, "salary", now, currency="GBP"),
+            SavedImpulse(user.id, "Shoes", "clothing", 75.0, currency="GBP"),
+        ])
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_rollup_is_kept_in_euros(self):
+        """Test that the rollup converts each record to EUR"""
+        rates = get_rate_table()
+        summary = self.session.query(MonthlySummary).one()
+        self.assertAlmostEqual(summary.income, rates.convert(1000, 'GBP', 'EUR', on=datetime.now()))
+        self.assertAlmostEqual(summary.expenses, rates.convert(100, 'USD', 'EUR', on=datetime.now()) + 15)
+
+        incremental = (summary.income, summary.expenses)
+        rebuild_monthly_summaries(self.session)
+        summary = self.session.query(MonthlySummary).one()
+        self.assertAlmostEqual(summary.income, incremental[0])
+        self.assertAlmostEqual(summary.expenses, incremental[1])
+
+    def test_local_answers_convert_to_display_currency(self):
+        """Test that chat totals add up amounts in different currencies"""
+        router = LocalIntentRouter(self.session)
+        expected = get_rate_table().convert(100, 'USD', 'EUR') + 15
+        answer = router.answer(self.user_id, "How much did I spend this month?", "en", "EUR")
+        self.assertIn(f"{expected:.2f}", answer)
+
+        answer = router.answer(self.user_id, "How much have I saved?", "en", "GBP")
+        self.assertIn("£75.00", answer)
+
+class TestCurrencyAPI(APITestCase):
+    """Test cases for currencies on API requests"""
+
+    def test_transactions_store_currency(self):
+        """Test that transactions keep their currency and reject unknown ones"""
+        body = {'amount': 20, 'category': 'food', 'date': '2024-01-10T12:00:00', 'currency': 'usd'}
+        response = self.client.post('/api/transactions', json=body, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.session.query(Transaction.currency).scalar(), 'USD')
+
+        body['currency'] = 'XYZ'
+        response = self.client.post('/api/transactions', json=body, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_dashboard_totals_in_preferred_currency(self):
+        """Test that dashboard totals convert per-currency subtotals"""
+        now = datetime.now()
+        self.session.add_all([
+            Transaction(1, 100.0, "food", now, currency="USD"),
+            Transaction(1, 10.0, "food", now, currency="EUR", is_impulse=True),
+        ])
+        self.session.commit()
+
+        response = self.client.get('/api/dashboard', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+
+        expected = get_rate_table().convert(100, 'USD', app.preferred_currency) + get_rate_table().convert(10, 'EUR', app.preferred_currency)
+        self.assertAlmostEqual(data['summary']['total_spent'], expected)
+        self.assertAlmostEqual(data['categories'][0]['spent'], expected)
+        self.assertAlmostEqual(data['trends'][-1]['total'], expected)
+
+    def test_budget_and_impulse_totals_in_preferred_currency(self):
+        """Test that budget spending and saved impulse totals are converted"""
+        now = datetime.now()
+        rates = get_rate_table()
+        self.session.add_all([
+            Transaction(1, 100.0, "food", now, currency="USD"),
+            Transaction(1, 10.0, "food", now, currency="EUR"),
+            Budget(1, "food", 200.0, now.month, now.year),
+            SavedImpulse(1, "Shoes", "clothing", 75.0, currency="GBP"),
+            SavedImpulse(1, "Game", "fun", 20.0, currency="EUR"),
+        ])
+        self.session.commit()
+
+        response = self.client.get('/api/budget', headers=self.headers)
+        data = json.loads(response.data)
+        expected = rates.convert(100, 'USD', app.preferred_currency) + rates.convert(10, 'EUR', app.preferred_currency)
+        self.assertAlmostEqual(data['spent'], expected)
+        self.assertAlmostEqual(data['categories'][0]['actual'], expected)
+
+        response = self.client.get('/api/budgets', headers=self.headers)
+        budget = json.loads(response.data)['budgets'][0]
+        self.assertAlmostEqual(budget['spent'], expected)
+        self.assertAlmostEqual(budget['remaining'], 200 - expected)
+
+        response = self.client.get('/api/impulses', headers=self.headers)
+        summary = json.loads(response.data)['summary']
+        impulses = self.session.query(SavedImpulse).all()
+        saved = sum(rates.convert(i.amount, i.currency, app.preferred_currency) for i in impulses)
+        growth_5yr = sum(rates.convert(i.projected_value_5yr, i.currency, app.preferred_currency) for i in impulses) - saved
+        self.assertAlmostEqual(summary['total_saved'], saved)
+        self.assertAlmostEqual(summary['total_growth_5yr'], growth_5yr)
+
+        response = self.client.get('/api/dashboard?sections=summary', headers=self.headers)
+        data = json.loads(response.data)
+        self.assertAlmostEqual(data['summary']['potential_growth_5yr'], growth_5yr + saved)
+
+if __name__ == '__main__':
+    unittest.main()
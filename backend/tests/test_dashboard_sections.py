@@ -0,0 +1,117 @@
+import unittest
+import os
+import sys
+import json
+from datetime import datetime
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from cases import APITestCase
+from models import Base, User, Transaction, Budget, SavedImpulse
+from services.currency_service import get_rate_table
+from services.dashboard_service import (
+    SECTIONS,
+    DashboardContext,
+    build_dashboard,
+    build_portfolio,
+    resolve_sections,
+)
+
+class TestDashboardSections(unittest.TestCase):
+    """Test cases for lazily built dashboard sections"""
+
+    def setUp(self):
+        """Use an in-memory database with this month's spending"""
+        self.engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+
+        user = User(name="Test User", email="test@example.com")
+        self.session.add(user)
+        self.session.commit()
+        self.user_id = user.id
+
+        now = datetime.now()
+        self.session.add_all([
+            Transaction(user.id, 150.0, "food", now),
+            Transaction(user.id, 40.0, "fun", now, is_impulse=True),
+            Budget(user.id, "food", 100.0, now.month, now.year),
+        ])
+        self.session.commit()
+
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self.record_statement)
+
+    def tearDown(self):
+        self.session.close()
+
+    def record_statement(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def build(self, sections=None):
+        context = DashboardContext(self.session, self.user_id, "EUR")
+        return build_dashboard(context, sections)
+
+    def test_resolve_prerequisites_first(self):
+        """Test that sections come after the sections they read"""
+        order = resolve_sections(["recommendations", "categories"])
+        self.assertEqual(order, ["summary", "categories", "recommendations"])
+        with self.assertRaises(ValueError):
+            resolve_sections(["summary", "budgets"])
+
+    def test_only_requested_sections_are_returned(self):
+        """Test that prerequisites are built and timed but not returned"""
+        dashboard = self.build(["financial_health"])
+        self.assertEqual(set(dashboard), {"financial_health", "meta"})
+        self.assertEqual(dashboard["financial_health"]["budget_adherence"], "warning")
+        self.assertEqual(set(dashboard["meta"]["timings_ms"]), {"financial_health", "summary", "categories"})
+
+    def test_unused_data_is_not_queried(self):
+        """Test that categories alone never reach the feed, alerts or goals"""
+        dashboard = self.build(["categories"])
+        self.assertEqual(dashboard["categories"][0]["status"], "over")
+
+        queried = " ".join(self.statements)
+        for table in ("spending_alerts", "goals", "saved_impulses", "incomes"):
+            self.assertNotIn(table, queried)
+        self.assertEqual(len(self.statements), 2)
+
+    def test_full_dashboard(self):
+        """Test that every section is built by default"""
+        dashboard = self.build()
+        self.assertEqual(set(dashboard) - {"meta"}, set(SECTIONS))
+        self.assertEqual(dashboard["transaction_counts"], {"impulse": 1, "reasonable": 1, "total": 2})
+
+    def test_portfolio_uses_converted_total_saved(self):
+        """Test that the portfolio reads the shared total instead of every impulse row"""
+        self.session.add(SavedImpulse(self.user_id, "Car", "transport", 20000.0, currency="GBP"))
+        self.session.commit()
+        context = DashboardContext(self.session, self.user_id, "EUR")
+        self.statements.clear()
+
+        portfolio = build_portfolio(context)
+        self.assertAlmostEqual(portfolio["total"], context.total_saved * 1.5)
+        self.assertAlmostEqual(context.total_saved, get_rate_table().convert(20000, "GBP", "EUR"))
+        self.assertNotIn("impulses", context.__dict__)
+        self.assertEqual(len(self.statements), 1)
+
+class TestDashboardSectionsAPI(APITestCase):
+    """Test cases for the sections parameter of the dashboard endpoint"""
+
+    def test_sections_parameter(self):
+        """Test selected sections and unknown section names"""
+        response = self.client.get('/api/dashboard?sections=summary,goals', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(set(data), {'summary', 'goals', 'meta'})
+        self.assertEqual(data['meta']['sections'], ['summary', 'goals'])
+
+        response = self.client.get('/api/dashboard?sections=summary,forecast', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,234 @@
+import unittest
+import os
+import sys
+import json
+import time
+import sqlite3
+import tempfile
+from datetime import datetime
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from cases import APITestCase
+from models import Base, User, Transaction, Budget
+from services.budget_service import upsert_budget
+from services.event_service import (
+    PENDING_EVENTS_KEY,
+    EventBroker,
+    StreamTickets,
+    Subscription,
+    event_broker,
+    format_event,
+    track_change_events,
+)
+from services.sync_service import track_changes
+
+def drain(subscription):
+    messages = []
+    while True:
+        message = subscription.get(0)
+        if message is None:
+            return messages
+        messages.append(message)
+
+class TestEventBroker(unittest.TestCase):
+    """Test cases for the in-process pub/sub"""
+
+    def test_fan_out(self):
+        """Test that events reach every stream of the user in its currency"""
+        broker = EventBroker()
+        euros, dollars = broker.subscribe(1, "EUR"), broker.subscribe(1, "USD")
+        other = broker.subscribe(2, "EUR")
+
+        broker.publish(1, [{"type": "transaction.created"}])
+        broker.publish(1, [{"type": "summary"}], currency="USD")
+        self.assertEqual([m["type"] for m in drain(euros)], ["transaction.created"])
+        self.assertEqual([m["type"] for m in drain(dollars)], ["transaction.created", "summary"])
+        self.assertEqual(drain(other), [])
+
+        broker.unsubscribe(euros)
+        broker.unsubscribe(euros)
+        self.assertEqual(broker.currencies(1), {"USD"})
+        self.assertEqual(broker.metrics(), {"users": 2, "streams": 2, "delivered": 3})
+
+    def test_overflow_resync(self):
+        """Test that a client falling behind is asked to resync"""
+        subscription = Subscription(1, "EUR", queue_size=2)
+        for i in range(3):
+            subscription.put({"type": "transaction.created", "id": i})
+        self.assertEqual(drain(subscription), [{"type": "resync"}])
+
+    def test_format(self):
+        self.assertEqual(format_event({"type": "resync"}), 'data: {"type":"resync"}\n\n')
+
+class TestChangeEvents(unittest.TestCase):
+    """Test cases for the events published on commit"""
+
+    def setUp(self):
+        """Use an in-memory database with change events"""
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        track_changes(Session)
+        track_change_events(Session)
+        self.session = Session()
+
+        user = User(name="Test User", email="test@example.com")
+        self.session.add(user)
+        self.session.commit()
+        self.user_id = user.id
+        self.subscription = event_broker.subscribe(self.user_id, "EUR")
+
+    def tearDown(self):
+        event_broker.unsubscribe(self.subscription)
+        self.session.close()
+
+    def test_published_on_commit(self):
+        """Test that writes are published with the summary once committed"""
+        transaction = Transaction(self.user_id, 42.0, "food", datetime.now())
+        self.session.add(transaction)
+        self.session.flush()
+        self.assertEqual(drain(self.subscription), [])
+        self.session.commit()
+
+        created, summary = drain(self.subscription)
+        self.assertEqual((created["type"], created["id"]), ("transaction.created", transaction.id))
+        self.assertEqual(created["record"]["amount"], 42.0)
+        self.assertEqual(summary["type"], "summary")
+        self.assertEqual(summary["summary"]["total_spent"], 42.0)
+
+        self.session.delete(transaction)
+        self.session.commit()
+        deleted, summary = drain(self.subscription)
+        self.assertEqual(deleted, {"type": "transaction.deleted", "id": transaction.id})
+        self.assertEqual(summary["summary"]["total_spent"], 0)
+
+    def test_rollback_publishes_nothing(self):
+        self.session.add(Transaction(self.user_id, 42.0, "food", datetime.now()))
+        self.session.flush()
+        self.session.rollback()
+        self.session.commit()
+        self.assertEqual(drain(self.subscription), [])
+
+    def test_core_budget_writes(self):
+        """Test that the budget upsert reports creation then update"""
+        upsert_budget(self.session, self.user_id, "rent", 900.0, 3, 2024)
+        upsert_budget(self.session, self.user_id, "rent", 950.0, 3, 2024)
+        events = [m for m in drain(self.subscription) if m["type"] != "summary"]
+        self.assertEqual([m["type"] for m in events], ["budget.created", "budget.updated"])
+        self.assertEqual(events[1]["record"]["planned_amount"], 950.0)
+
+    def test_nothing_queued_without_streams(self):
+        event_broker.unsubscribe(self.subscription)
+        self.session.add(Budget(self.user_id, "rent", 900.0, 3, 2024))
+        self.session.flush()
+        self.assertNotIn(PENDING_EVENTS_KEY, self.session.info)
+        self.session.commit()
+
+class TestSummaryAfterCommit(unittest.TestCase):
+    """Test cases for the summary figures pushed after a write"""
+
+    def setUp(self):
+        """Use a temporary database file another connection can write to"""
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.engine = create_engine(f"sqlite:///{self.path}")
+        Base.metadata.create_all(self.engine)
+        Session = sessionmaker(bind=self.engine)
+        track_change_events(Session)
+        self.session = Session()
+
+        user = User(name="Test User", email="test@example.com")
+        self.session.add(user)
+        self.session.commit()
+        self.user_id = user.id
+        self.subscription = event_broker.subscribe(self.user_id, "EUR")
+
+    def tearDown(self):
+        event_broker.unsubscribe(self.subscription)
+        self.session.close()
+        self.engine.dispose()
+        os.remove(self.path)
+
+    def test_summary_built_without_the_write_lock(self):
+        """Test that other writers are not blocked while the summary is built"""
+        written = []
+
+        def build(context, sections):
+            other = sqlite3.connect(self.path, timeout=0)
+            try:
+                other.execute("UPDATE users SET name = 'Other'")
+                other.commit()
+            finally:
+                other.close()
+            written.append(True)
+            return {"summary": {"total_spent": 42.0}}
+
+        with patch('services.event_service.build_dashboard', build):
+            self.session.add(Transaction(self.user_id, 42.0, "food", datetime.now()))
+            self.session.commit()
+
+        self.assertEqual(written, [True])
+        created, summary = drain(self.subscription)
+        self.assertEqual(created["type"], "transaction.created")
+        self.assertEqual(summary, {"type": "summary", "summary": {"total_spent": 42.0}})
+
+class TestEventsAPI(APITestCase):
+    """Test cases for the event stream endpoint"""
+
+    trackers = (track_changes, track_change_events)
+
+    def ticket(self):
+        response = self.client.post('/api/events/ticket', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data)['ticket']
+
+    def test_stream(self):
+        """Test that a write through the API is pushed to the open stream"""
+        response = self.client.get(f'/api/events?ticket={self.ticket()}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        frames = (frame.decode() for frame in response.response)
+        self.assertEqual(next(frames), 'retry: 5000\n\n')
+        self.assertEqual(json.loads(next(frames)[6:]), {"type": "connected", "version": 0})
+
+        self.client.post('/api/saved-impulses', json={'description': 'Shoes', 'amount': 60, 'category': 'clothes'}, headers=self.headers)
+        saved = json.loads(next(frames)[6:])
+        self.assertEqual((saved['type'], saved['record']['description']), ('saved_impulse.created', 'Shoes'))
+        self.assertEqual(json.loads(next(frames)[6:])['summary']['total_saved'], 60)
+
+        response.close()
+        self.assertFalse(event_broker.has_subscribers(self.user_id))
+
+    def test_invalid_currency(self):
+        response = self.client.get(f'/api/events?currency=XYZ&ticket={self.ticket()}')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(event_broker.has_subscribers(self.user_id))
+
+    def test_stream_needs_a_single_use_ticket(self):
+        """Test that access tokens are refused and tickets open one stream"""
+        for query in (f'jwt={self.token}', 'ticket=forged', ''):
+            response = self.client.get(f'/api/events?{query}', headers=self.headers)
+            self.assertEqual(response.status_code, 401)
+
+        ticket = self.ticket()
+        response = self.client.get(f'/api/events?ticket={ticket}')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        self.assertEqual(self.client.get(f'/api/events?ticket={ticket}').status_code, 401)
+
+    def test_tickets_expire(self):
+        tickets = StreamTickets("secret", ttl=30)
+        ticket = tickets.issue(self.user_id)
+        with patch('itsdangerous.timed.time.time', return_value=time.time() + 31):
+            self.assertIsNone(tickets.redeem(ticket))
+        self.assertIsNone(StreamTickets("other secret").redeem(ticket))
+        self.assertEqual(tickets.redeem(ticket), self.user_id)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import unittest
+import os
+import sys
+import gc
+import json
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from cases import APITestCase
+from models import Base, User, Transaction, SavedImpulse, Goal
+from services.goal_service import compute_goal_progress, track_goal_progress
+
+class TestGoalProgress(unittest.TestCase):
+    """Test cases for incrementally maintained goal progress"""
+
+    def setUp(self):
+        """Use an in-memory database with goal tracking"""
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        track_goal_progress(Session)
+        self.session = Session()
+
+        user = User(name="Test User", email="test@example.com")
+        self.session.add(user)
+        self.session.commit()
+        self.user_id = user.id
+
+        self.all_impulses = Goal(user.id, "Emergency Fund", 1000.0)
+        self.vacation = Goal(user.id, "Vacation", 500.0, categories=["Travel", "Savings"])
+        self.session.add_all([self.all_impulses, self.vacation])
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+
+    def progress(self):
+        self.session.expire_all()
+        return self.all_impulses.current_amount, self.vacation.current_amount
+
+    def test_new_records_update_matching_goals(self):
+        """Test that impulses and linked transactions are added to goals"""
+        self.session.add(SavedImpulse(self.user_id, "Shoes", "clothing", 100.0))
+        self.session.add(SavedImpulse(self.user_id, "Flight", "travel", 50.0))
+        self.session.add(Transaction(self.user_id, 30.0, "savings"))
+        self.session.add(Transaction(self.user_id, 80.0, "groceries"))
+        self.session.commit()
+
+        self.assertEqual(self.progress(), (150.0, 80.0))
+
+    def test_updates_and_deletes_adjust_progress(self):
+        """Test that edits replace the old amount and deletes remove it"""
+        transaction = Transaction(self.user_id, 30.0, "savings")
+        impulse = SavedImpulse(self.user_id, "Flight", "travel", 50.0)
+        self.session.add_all([transaction, impulse])
+        self.session.commit()
+
+        transaction.amount = 45.0
+        self.session.commit()
+        self.assertEqual(self.progress(), (50.0, 95.0))
+
+        transaction.category = "groceries"
+        self.session.commit()
+        self.assertEqual(self.progress(), (50.0, 50.0))
+
+        self.session.delete(impulse)
+        self.session.commit()
+        self.assertEqual(self.progress(), (0.0, 0.0))
+
+    def test_incremental_progress_matches_full_recompute(self):
+        """Test that maintained progress equals a recompute from history"""
+        for amount, category in [(20, "travel"), (35, "food"), (12.5, "Savings")]:
+            self.session.add(SavedImpulse(self.user_id, "Item", category, amount))
+            self.session.add(Transaction(self.user_id, amount, category))
+        self.session.commit()
+
+        self.assertEqual(self.progress(), (
+            compute_goal_progress(self.session, self.user_id),
+            compute_goal_progress(self.session, self.user_id, ["travel", "savings"]),
+        ))
+
+    def test_other_users_are_not_affected(self):
+        """Test that records only update their owner's goals"""
+        other = User(name="Other", email="other@example.com")
+        self.session.add(other)
+        self.session.commit()
+
+        self.session.add(SavedImpulse(other.id, "Shoes", "clothing", 100.0))
+        self.session.commit()
+        self.assertEqual(self.progress(), (0.0, 0.0))
+
+    def test_tracking_is_installed_once_per_sessionmaker(self):
+        """Test that every new sessionmaker gets the hook, and only once"""
+        for _ in range(20):
+            Session = sessionmaker(bind=self.session.get_bind())
+            track_goal_progress(Session)
+            track_goal_progress(Session)
+            session = Session()
+            session.add(SavedImpulse(self.user_id, "Item", "food", 1.0))
+            session.commit()
+            session.close()
+            # Lets the next sessionmaker reuse the address of this one
+            del session, Session
+            gc.collect()
+        self.assertEqual(self.progress(), (20.0, 0.0))
+
+class TestGoalsAPI(APITestCase):
+    """Test cases for the /api/goals endpoints"""
+
+    trackers = (track_goal_progress,)
+
+    def setUp(self):
+        super().setUp()
+        self.session.add(SavedImpulse(self.user_id, "Shoes", "clothing", 100.0))
+        self.session.add(SavedImpulse(self.user_id, "Flight", "travel", 40.0))
+        self.session.commit()
+
+    def test_create_and_list_goals(self):
+        """Test that new goals are backfilled and then kept up to date"""
+        response = self.client.post('/api/goals', json={'name': 'Trip', 'target': 200, 'categories': ['Travel']}, headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.data)['goal']['current'], 40.0)
+
+        self.session.add(SavedImpulse(self.user_id, "Hotel", "travel", 60.0))
+        self.session.commit()
+
+        response = self.client.get('/api/goals', headers=self.headers)
+        goals = json.loads(response.data)
+        self.assertEqual(len(goals), 1)
+        self.assertEqual(goals[0]['current'], 100.0)
+        self.assertEqual(goals[0]['progress'], 50)
+        self.assertEqual(goals[0]['categories'], ['Travel'])
+
+    def test_delete_goal(self):
+        """Test that goals can be deleted"""
+        response = self.client.post('/api/goals', json={'name': 'Fund', 'target': 1000}, headers=self.headers)
+        goal_id = json.loads(response.data)['goal']['id']
+
+        response = self.client.delete(f'/api/goals/{goal_id}', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(self.client.get('/api/goals', headers=self.headers).data), [])
+
+    def test_invalid_goal(self):
+        """Test goal validation"""
+        response = self.client.post('/api/goals', json={'name': 'Fund'}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/goals', json={'name': 'Fund', 'target': -5}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,303 @@
+import unittest
+import os
+import sys
+import json
+import time
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import app
+from jobs import CronSchedule, JobQueue, RECOVER_EVERY_TICKS, STALE_AFTER, retry_delay
+from models import Base, Job, User, Transaction, Goal, UserCategory
+from services.anomaly_service import rebuild_spending_stats
+from services.cashflow_service import rebuild_monthly_summaries
+from services.category_service import rebuild_user_categories, track_category_usage
+from services.maintenance_service import cleanup_demo_users
+from services.recurring_service import rebuild_recurring_series
+
+NOW = datetime(2024, 6, 20, 10, 30)
+
+class TestCronSchedule(unittest.TestCase):
+    """Test cases for cron expression parsing"""
+
+    def test_next_after(self):
+        """Test steps, ranges and lists"""
+        self.assertEqual(CronSchedule("0 3 * * *").next_after(NOW), datetime(2024, 6, 21, 3, 0))
+        self.assertEqual(CronSchedule("*/15 * * * *").next_after(NOW), datetime(2024, 6, 20, 10, 45))
+        self.assertEqual(CronSchedule("0 9-17/4 * * *").next_after(NOW), datetime(2024, 6, 20, 13, 0))
+        self.assertEqual(CronSchedule("0 0 1,15 * *").next_after(NOW), datetime(2024, 7, 1))
+        self.assertEqual(CronSchedule("0 0 29 2 *").next_after(NOW), datetime(2028, 2, 29))
+
+    def test_weekdays(self):
+        """Test that 0 and 7 are Sunday and restricted days match either field"""
+        # June 20 2024 is a Thursday
+        self.assertEqual(CronSchedule("0 8 * * 0").next_after(NOW), datetime(2024, 6, 23, 8, 0))
+        self.assertEqual(CronSchedule("0 8 * * 7").next_after(NOW), datetime(2024, 6, 23, 8, 0))
+        self.assertEqual(CronSchedule("0 8 25 * 6").next_after(NOW), datetime(2024, 6, 22, 8, 0))
+
+    def test_invalid(self):
+        """Test that malformed expressions are rejected"""
+        for expression in ("* * * *", "60 * * * *", "*/0 * * * *", "5-1 * * * *"):
+            with self.assertRaises(ValueError):
+                CronSchedule(expression)
+
+class TestJobQueue(unittest.TestCase):
+    """Test cases for running, retrying and scheduling jobs"""
+
+    def setUp(self):
+        """Use a temporary database file shared by worker threads"""
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        engine = create_engine(f"sqlite:///{self.path}")
+        Base.metadata.create_all(engine)
+        self.engine = engine
+        self.Session = sessionmaker(bind=engine)
+        self.queue = JobQueue(self.Session, poll_seconds=0.05)
+
+        self.calls = []
+        self.failures = 0
+        self.queue.register("record", lambda session, value=None: self.calls.append(value))
+        self.queue.register("flaky", self.flaky)
+
+    def tearDown(self):
+        self.queue.stop()
+        self.engine.dispose()
+        os.remove(self.path)
+
+    def flaky(self, session):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("temporary outage")
+
+    def job(self, job_id):
+        session = self.Session()
+        try:
+            return session.get(Job, job_id)
+        finally:
+            session.close()
+
+    def test_run_pending(self):
+        """Test that due jobs run with their payload and later ones wait"""
+        done = self.queue.enqueue("record", {"value": 1})
+        later = self.queue.enqueue("record", {"value": 2}, run_at=datetime.now() + timedelta(hours=1))
+
+        self.assertEqual(self.queue.run_pending(), 1)
+        self.assertEqual(self.calls, [1])
+        self.assertEqual((self.job(done).status, self.job(done).attempts), ("done", 1))
+        self.assertEqual(self.job(later).status, "pending")
+
+        with self.assertRaises(ValueError):
+            self.queue.enqueue("unknown")
+
+    def test_retry_with_backoff(self):
+        """Test that failures are retried later until max_attempts"""
+        self.failures = 1
+        job_id = self.queue.enqueue("flaky")
+        self.queue.run_pending()
+
+        job = self.job(job_id)
+        self.assertEqual((job.status, job.attempts), ("pending", 1))
+        self.assertIn("temporary outage", job.last_error)
+        self.assertGreater(job.run_at, datetime.now() + timedelta(seconds=retry_delay(1) - 5))
+        self.assertEqual(self.queue.run_pending(), 0)
+
+        self.failures = 5
+        session = self.Session()
+        session.get(Job, job_id).run_at = datetime.now()
+        session.commit()
+        session.close()
+        with patch("jobs.retry_delay", return_value=0):
+            self.queue.run_pending()
+            self.queue.run_pending()
+        self.assertEqual((self.job(job_id).status, self.job(job_id).attempts), ("failed", 3))
+        self.assertEqual(retry_delay(3), 4 * retry_delay(1))
+
+    def test_claim_is_exclusive(self):
+        """Test that a job claimed by one worker is not claimed again"""
+        self.queue.enqueue("record")
+        first, second = self.Session(), self.Session()
+        self.assertIsNotNone(self.queue.claim(first, "a"))
+        self.assertIsNone(self.queue.claim(second, "b"))
+        first.close()
+        second.close()
+
+    def test_schedule_dedupes_runs(self):
+        """Test that a due schedule is enqueued once across queues"""
+        other = JobQueue(self.Session)
+        other.register("record", lambda session: None)
+        for queue in (self.queue, other):
+            queue.schedule("record", "0 3 * * *")
+            queue.tick(NOW)
+            queue.tick(datetime(2024, 6, 21, 3, 0, 20))
+
+        session = self.Session()
+        jobs = session.query(Job).all()
+        self.assertEqual([(job.name, job.run_at) for job in jobs], [("record", datetime(2024, 6, 21, 3, 0))])
+        self.assertEqual(self.queue.schedules[0]["next_run"], datetime(2024, 6, 22, 3, 0))
+        session.close()
+
+    def test_recover_stale_jobs(self):
+        """Test that jobs left running by a stopped process are requeued"""
+        job_id = self.queue.enqueue("record")
+        session = self.Session()
+        self.queue.claim(session, "gone")
+        session.close()
+
+        self.assertEqual(self.queue.recover(), 0)
+        self.assertEqual(self.queue.recover(datetime.now() + STALE_AFTER * 2), 1)
+        self.assertEqual(self.job(job_id).status, "pending")
+
+    def test_scheduler_recovers_periodically(self):
+        """Test that the scheduler keeps looking for stale jobs after startup"""
+        ticks = []
+
+        def tick():
+            ticks.append(1)
+            if len(ticks) == RECOVER_EVERY_TICKS * 2:
+                self.queue._stop.set()
+
+        self.queue.poll_seconds = 0
+        with patch.object(self.queue, 'tick', side_effect=tick), \
+                patch.object(self.queue, 'recover') as recover:
+            self.queue._schedule_loop()
+        self.assertEqual(recover.call_count, 2)
+
+    def test_workers_and_metrics(self):
+        """Test that started workers drain the queue and report latency"""
+        self.queue.start(workers=2)
+        ids = [self.queue.enqueue("record", {"value": i}) for i in range(10)]
+
+        deadline = time.time() + 10
+        while time.time() < deadline and any(self.job(i).status != "done" for i in ids):
+            time.sleep(0.05)
+
+        self.assertEqual(sorted(self.calls), list(range(10)))
+        metrics = self.queue.metrics()
+        self.assertEqual(metrics["workers"], 3)
+        self.assertEqual(metrics["queue"]["done"], 10)
+        self.assertEqual(metrics["due"], 0)
+        self.assertEqual(metrics["outcomes"], {"done": 10})
+        self.assertIsNotNone(metrics["wait_seconds"]["p95"])
+
+        self.queue.stop()
+        self.assertFalse(self.queue.running)
+
+    def test_purge(self):
+        """Test that old finished jobs are deleted"""
+        self.queue.enqueue("record")
+        self.queue.run_pending()
+        session = self.Session()
+        self.assertEqual(self.queue.purge(session), 0)
+        self.assertEqual(self.queue.purge(session, now=datetime.now() + timedelta(days=8)), 1)
+        session.close()
+
+class TestDemoCleanup(unittest.TestCase):
+    """Test cases for deleting expired demo users"""
+
+    def setUp(self):
+        """Use an in-memory database"""
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        self.session = sessionmaker(bind=engine)()
+        track_category_usage(self.session)
+
+    def tearDown(self):
+        self.session.close()
+
+    def add_user(self, is_demo, last_login):
+        user = User(name="User", is_demo=is_demo, last_login=last_login)
+        self.session.add(user)
+        self.session.commit()
+        self.session.add(Transaction(user.id, 10.0, "groceries"))
+        self.session.add(Goal(user.id, "Trip", 1000.0))
+        self.session.commit()
+        return user.id
+
+    def test_cleanup(self):
+        """Test that only expired demo users and their data are removed"""
+        expired = self.add_user(True, NOW - timedelta(days=2))
+        recent = self.add_user(True, NOW - timedelta(hours=1))
+        regular = self.add_user(False, NOW - timedelta(days=30))
+
+        self.assertEqual(cleanup_demo_users(self.session, max_age_hours=24, now=NOW), 1)
+        self.assertEqual(sorted(u.id for u in self.session.query(User)), [recent, regular])
+        for model in (Transaction, Goal, UserCategory):
+            self.assertNotIn(expired, {row.user_id for row in self.session.query(model)})
+
+class TestDerivedDataRefresh(unittest.TestCase):
+    """Test cases for rebuilding the derived tables next to live writes"""
+
+    def setUp(self):
+        """Use a temporary database file another connection can write to"""
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.engine = create_engine(f"sqlite:///{self.path}")
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        user = User(name="User")
+        self.session.add(user)
+        self.session.commit()
+        self.session.add(Transaction(user.id, 10.0, "groceries"))
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+        os.remove(self.path)
+
+    def test_rebuilds_hold_the_write_lock_while_reading(self):
+        """Test that no request can commit between a rebuild's reads and its writes"""
+        blocked = []
+
+        def try_write(conn, cursor, statement, parameters, context, executemany):
+            # Another connection writes when the rebuild reads for the first time
+            if statement.lstrip().upper().startswith("SELECT") and not blocked:
+                other = sqlite3.connect(self.path, timeout=0)
+                try:
+                    other.execute("UPDATE users SET name = 'Other'")
+                    other.commit()
+                    blocked.append(False)
+                except sqlite3.OperationalError:
+                    blocked.append(True)
+                finally:
+                    other.close()
+
+        event.listen(self.engine, "before_cursor_execute", try_write)
+        try:
+            for rebuild in (rebuild_monthly_summaries, rebuild_user_categories,
+                            rebuild_recurring_series, rebuild_spending_stats):
+                blocked.clear()
+                rebuild(self.session)
+                self.assertEqual(blocked, [True], rebuild.__name__)
+        finally:
+            event.remove(self.engine, "before_cursor_execute", try_write)
+
+    def test_background_services_start_from_entry_point(self):
+        """Test that importing the app starts no workers and leaves the tables alone"""
+        self.assertFalse(app.job_queue.running)
+        with patch('app.Session', sessionmaker(bind=self.engine)):
+            app.start_background_services(workers=0)
+        self.assertFalse(app.job_queue.running)
+        self.assertEqual(self.session.query(UserCategory.name).all(), [("groceries",)])
+
+class TestJobMetricsAPI(unittest.TestCase):
+    """Test cases for the job metrics endpoint"""
+
+    def test_metrics(self):
+        """Test that queue depth is reported per status"""
+        client = app.app.test_client()
+        response = client.get('/api/jobs/metrics')
+        self.assertEqual(response.status_code, 200)
+        metrics = json.loads(response.data)['metrics']
+        self.assertEqual(set(metrics['queue']), {'pending', 'running', 'done', 'failed'})
+
+if __name__ == '__main__':
+    unittest.main()
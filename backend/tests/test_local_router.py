@@ -0,0 +1,101 @@
+import unittest
+import os
+import sys
+from datetime import datetime
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, User, Transaction, Budget, SavedImpulse
+from services.local_router import LocalIntentRouter, month_bounds, previous_month
+
+class TestLocalIntentRouter(unittest.TestCase):
+    """Test cases for the LocalIntentRouter class"""
+
+    def setUp(self):
+        """Create an in-memory database with one month of data"""
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        self.session = sessionmaker(bind=engine)()
+
+        self.user = User(name="Test User", email="test@example.com")
+        self.session.add(self.user)
+        self.session.commit()
+
+        self.now = datetime(2024, 3, 15, 12, 0)
+        uid = self.user.id
+        self.session.add_all([
+            Transaction(uid, 40.0, "dining", date=datetime(2024, 3, 2)),
+            Transaction(uid, 60.0, "dining", date=datetime(2024, 3, 10)),
+            Transaction(uid, 150.0, "groceries", date=datetime(2024, 3, 5)),
+            Transaction(uid, 90.0, "dining", date=datetime(2024, 2, 20)),
+            Budget(uid, "dining", 80.0, 3, 2024),
+            Budget(uid, "groceries", 300.0, 3, 2024),
+            SavedImpulse(uid, "Sneakers", "clothing", 120.0),
+        ])
+        self.session.commit()
+
+        self.router = LocalIntentRouter(
+            self.session, {"fr": {"dining": "restauration", "groceries": "courses"}}
+        )
+
+    def tearDown(self):
+        """Close the session"""
+        self.session.close()
+
+    def ask(self, message, language="en"):
+        return self.router.answer(self.user.id, message, language, "EUR", now=self.now)
+
+    def test_classify(self):
+        """Test classification of data questions and open-ended messages"""
+        self.assertEqual(self.router.classify("How much did I spend on dining?")[0], "spent")
+        self.assertEqual(self.router.classify("Am I over budget?")[0], "over_budget")
+        self.assertEqual(self.router.classify("Combien ai-je économisé ?")[0], "total_saved")
+        self.assertEqual(self.router.classify("Combien reste-t-il dans mon budget ?")[0], "budget_remaining")
+        self.assertTrue(self.router.classify("How much did I spend last month?")[1]["previous_month"])
+        self.assertEqual(self.router.classify("Should I invest in ETFs?"), (None, None))
+
+    def test_spending_by_category(self):
+        """Test spending questions for a category this month and last month"""
+        self.assertIn("€100.00 on dining", self.ask("How much did I spend on dining this month?"))
+        self.assertIn("€90.00 on dining last month", self.ask("How much did I spend on dining last month?"))
+
+    def test_spending_total_in_french(self):
+        """Test a French total spending question"""
+        response = self.ask("Combien ai-je dépensé ce mois-ci ?", "fr")
+        self.assertIn("250.00 €", response)
+        self.assertIn("3 transaction", response)
+
+    def test_category_alias_in_french(self):
+        """Test that translated category names are recognised"""
+        response = self.ask("Combien ai-je dépensé en restauration ?", "fr")
+        self.assertIn("100.00 € en restauration", response)
+
+    def test_over_budget(self):
+        """Test the budget status answer"""
+        response = self.ask("Am I over budget?")
+        self.assertTrue(response.startswith("Yes"))
+        self.assertIn("dining", response)
+
+    def test_budget_remaining(self):
+        """Test the remaining budget answer"""
+        self.assertIn("€130.00 left of your €380.00", self.ask("How much budget is left?"))
+
+    def test_total_saved(self):
+        """Test the saved impulses answer"""
+        self.assertIn("€120.00", self.ask("How much have I saved?"))
+
+    def test_open_ended_messages_fall_through(self):
+        """Test that open-ended and anonymous messages are not answered locally"""
+        self.assertIsNone(self.ask("What do you think about index funds?"))
+        self.assertIsNone(self.router.answer(None, "Am I over budget?"))
+
+    def test_month_helpers(self):
+        """Test month range helpers across year boundaries"""
+        self.assertEqual(month_bounds(2023, 12), (datetime(2023, 12, 1), datetime(2024, 1, 1)))
+        self.assertEqual(previous_month(2024, 1), (2023, 12))
+
+if __name__ == '__main__':
+    unittest.main()
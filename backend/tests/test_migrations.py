@@ -0,0 +1,165 @@
+import unittest
+import os
+import sys
+import sqlite3
+import tempfile
+import pathlib
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import migrate_db
+from migrations import Migration, MigrationRunner
+
+LEGACY_IMPULSES_SQL = """
+CREATE TABLE saved_impulses (
+    id INTEGER PRIMARY KEY, user_id INTEGER, item TEXT, amount FLOAT, category TEXT,
+    date TIMESTAMP, potential_value FLOAT
+)
+"""
+
+class Crash(Exception):
+    pass
+
+class TestMigrationRunner(unittest.TestCase):
+    """Test cases for versioned and online migrations"""
+
+    def setUp(self):
+        """Use a database file in a temporary directory"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "test.db")
+        self.reported = []
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def runner(self, migrations, **options):
+        options.setdefault("progress", lambda table, copied, total: self.reported.append((copied, total)))
+        runner = MigrationRunner(self.path, migrations, pause_ms=0, **options)
+        self.addCleanup(runner.close)
+        return runner
+
+    def query(self, sql, *parameters):
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute(sql, parameters).fetchall()
+        finally:
+            conn.close()
+
+    def test_versions_applied_once(self):
+        """Test that applied versions are recorded and failed ones rolled back"""
+        calls = []
+
+        def create(conn):
+            calls.append(1)
+            conn.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY)")
+
+        def fail(conn):
+            conn.execute("CREATE TABLE drafts (id INTEGER PRIMARY KEY)")
+            raise Crash()
+
+        migrations = [Migration(2, "drafts", fail), Migration(1, "notes", create)]
+        with self.assertRaises(Crash):
+            self.runner(migrations).run()
+        self.assertEqual(self.query("SELECT version FROM schema_migrations"), [(1,)])
+        self.assertEqual(self.query("SELECT name FROM sqlite_master WHERE name = 'drafts'"), [])
+
+        self.assertEqual(self.runner(migrations[1:]).run(), [])
+        self.assertEqual(len(calls), 1)
+
+    def legacy_impulses(self, rows):
+        conn = sqlite3.connect(self.path)
+        conn.execute(LEGACY_IMPULSES_SQL)
+        conn.executemany(
+            "INSERT INTO saved_impulses (id, user_id, item, amount, category, potential_value) "
+            "VALUES (?, 1, ?, ?, 'shopping', ?)",
+            [(i, f"item {i}", float(i), i * 1.08) for i in range(1, rows + 1)],
+        )
+        conn.commit()
+        conn.close()
+
+    def test_rebuild_in_batches(self):
+        """Test that rows are copied with the new column names over several batches"""
+        self.legacy_impulses(500)
+        migration = Migration(1, "impulses", migrate_db.migrate_saved_impulses_table, online=True)
+        runner = self.runner([migration], batch_size=50, max_lock_ms=10000)
+        runner.run()
+
+        self.assertEqual(self.query("SELECT COUNT(*) FROM saved_impulses")[0][0], 500)
+        description, value_1yr, value_5yr = self.query(
+            "SELECT description, projected_value_1yr, projected_value_5yr FROM saved_impulses WHERE id = 10"
+        )[0]
+        self.assertEqual((description, value_1yr), ("item 10", 10.8))
+        self.assertAlmostEqual(value_5yr, 10.8 * 1.07 ** 5)
+
+        self.assertEqual(self.reported[-1], (500, 500))
+        self.assertGreater(runner.stats["batches"], 3)
+        self.assertEqual(self.query("SELECT * FROM migration_progress"), [])
+        self.assertEqual(self.query("SELECT name FROM sqlite_master WHERE type = 'trigger'"), [])
+
+    def test_resume_after_crash(self):
+        """Test that a stopped copy resumes and keeps the writes made meanwhile"""
+        self.legacy_impulses(300)
+        migration = Migration(1, "impulses", migrate_db.migrate_saved_impulses_table, online=True)
+
+        def crash(table, copied, total):
+            if copied >= 100:
+                raise Crash()
+
+        with self.assertRaises(Crash):
+            self.runner([migration], batch_size=50, max_lock_ms=10000, progress=crash).run()
+        # Fast batches grew from 50 to 100 rows
+        self.assertEqual(self.query("SELECT copied, total FROM migration_progress"), [(150, 300)])
+
+        # The application keeps writing to the old table
+        conn = sqlite3.connect(self.path)
+        conn.execute("INSERT INTO saved_impulses (id, user_id, item, amount, potential_value) VALUES (301, 2, 'new', 5, 5.4)")
+        conn.execute("UPDATE saved_impulses SET item = 'renamed' WHERE id IN (10, 250)")
+        conn.execute("DELETE FROM saved_impulses WHERE id IN (20, 260)")
+        conn.commit()
+        conn.close()
+
+        runner = self.runner([migration], batch_size=50, max_lock_ms=10000)
+        runner.run()
+        # Rows 151 to 300 but the deleted one and the one mirrored on update
+        self.assertEqual(runner.stats["rows"], 148)
+        self.assertEqual(self.query("SELECT COUNT(*) FROM saved_impulses")[0][0], 299)
+        self.assertEqual(
+            self.query("SELECT id, description FROM saved_impulses WHERE id IN (10, 20, 250, 260, 301) ORDER BY id"),
+            [(10, "renamed"), (250, "renamed"), (301, "new")],
+        )
+        self.assertEqual(self.query("SELECT version FROM schema_migrations"), [(1,)])
+
+    def test_batches_shrink_to_lock_bound(self):
+        runner = self.runner([], batch_size=1000, max_lock_ms=100)
+        runner.last_lock_ms = 250
+        self.assertEqual(runner.next_batch_size(1000), 500)
+        runner.last_lock_ms = 10
+        self.assertEqual(runner.next_batch_size(500), 1000)
+        runner.last_lock_ms = 60
+        self.assertEqual(runner.next_batch_size(500), 500)
+
+    def test_migrate_legacy_database(self):
+        """Test that the script brings an old users table to the current schema once"""
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT NOT NULL, theme_preference TEXT)")
+        conn.executemany("INSERT INTO users (name, theme_preference) VALUES (?, 'light')", [("Ann",), ("Bob",)])
+        conn.commit()
+        conn.close()
+
+        with patch('migrate_db.get_db_path', return_value=pathlib.Path(self.path)):
+            migrate_db.migrate_database(pause_ms=0, progress=None)
+            self.assertEqual(
+                self.query("SELECT name, theme_preference, personality_preference, change_version FROM users"),
+                [("Ann", "light", "nice", 0), ("Bob", "light", "nice", 0)],
+            )
+            versions = [row[0] for row in self.query("SELECT version FROM schema_migrations")]
+            self.assertEqual(versions, [m.version for m in migrate_db.MIGRATIONS])
+
+            runner = MigrationRunner(self.path, migrate_db.MIGRATIONS)
+            self.addCleanup(runner.close)
+            self.assertEqual(runner.pending(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+import os
+import sys
+import random
+import threading
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fake_gemini import create_server
+from services.gemini_service import GeminiService
+from services.model_backends import (
+    BackendError,
+    FakeGenai,
+    HttpGenai,
+    get_backend,
+    parse_latency,
+)
+
+class TestFakeBackend(unittest.TestCase):
+    """Test cases for the in-process Gemini stand-in"""
+
+    def fake(self, **kwargs):
+        self.slept = []
+        return FakeGenai(seed=7, sleep=self.slept.append, **kwargs)
+
+    def test_parse_latency(self):
+        rng = random.Random(1)
+        self.assertEqual(parse_latency("fixed:0.25")(rng), 0.25)
+        self.assertTrue(0.1 <= parse_latency("uniform:0.1,0.3")(rng) <= 0.3)
+        self.assertGreaterEqual(parse_latency("normal:0.0,1")(rng), 0.0)
+        self.assertGreater(parse_latency("lognormal:-1,0.5")(rng), 0)
+        for spec in ("pareto:1", "fixed:", "uniform:1", "fixed:-1", "normal:a,b"):
+            with self.assertRaises(ValueError):
+                parse_latency(spec)
+
+    def test_latency_and_throughput(self):
+        """Test that an answer waits for the first token then for each chunk"""
+        model = self.fake(latency="fixed:0.5", tokens_per_second=100, min_tokens=20, max_tokens=20)
+        model = model.GenerativeModel("gemini-1.5-flash")
+        self.assertEqual(model.model_name, "models/gemini-1.5-flash")
+
+        response = model.generate_content("Hello")
+        self.assertEqual(len(response.text.split()), 20)
+        self.assertEqual(self.slept[0], 0.5)
+        self.assertAlmostEqual(sum(self.slept[1:]), 0.2)
+
+    def test_streaming(self):
+        model = self.fake(latency="fixed:0", min_tokens=20, max_tokens=20).GenerativeModel("gemini-1.5-flash")
+        response = model.generate_content("Hello", stream=True)
+        chunks = [chunk.text for chunk in response]
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(response.text, "".join(chunks))
+
+    def test_error_rate(self):
+        """Test that seeded fakes fail the same requests at about the given rate"""
+        def failures():
+            backend = self.fake(latency="fixed:0", error_rate=0.3)
+            model = backend.GenerativeModel("gemini-1.5-flash")
+            failed = []
+            for i in range(200):
+                try:
+                    model.generate_content("Hello")
+                except BackendError as e:
+                    self.assertIn(e.code, (429, 500, 503))
+                    failed.append(i)
+            self.assertEqual(backend.metrics()["errors"], len(failed))
+            return failed
+
+        failed = failures()
+        self.assertTrue(40 <= len(failed) <= 80)
+        self.assertEqual(failures(), failed)
+
+    def test_unknown_model(self):
+        with self.assertRaises(BackendError):
+            self.fake().GenerativeModel("gemini-ultra")
+
+    def test_get_backend(self):
+        self.assertIsNone(get_backend(""))
+        self.assertIsInstance(get_backend("fake"), FakeGenai)
+        self.assertIsInstance(get_backend("http://127.0.0.1:8765"), HttpGenai)
+        with self.assertRaises(ValueError):
+            get_backend("grpc://localhost")
+
+class TestFakeServer(unittest.TestCase):
+    """Test cases for the fake server over HTTP"""
+
+    def setUp(self):
+        """Serve a fast fake on a free port"""
+        self.fake = FakeGenai(latency="fixed:0", tokens_per_second=0, min_tokens=20, max_tokens=20)
+        self.server = create_server(self.fake, port=0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.backend = HttpGenai(f"http://127.0.0.1:{self.server.server_port}")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_generate_and_stream(self):
+        self.assertEqual([m.name for m in self.backend.list_models()], ["models/gemini-1.5-flash"])
+        model = self.backend.GenerativeModel("models/gemini-1.5-flash", system_instruction="Be brief")
+        self.assertEqual(len(model.generate_content("Hello").text.split()), 20)
+
+        chunks = [chunk.text for chunk in model.generate_content("Hello", stream=True)]
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(len("".join(chunks).split()), 20)
+
+    def test_errors(self):
+        """Test that failures keep the status the fake drew"""
+        self.fake.error_rate = 1.0
+        model = self.backend.GenerativeModel("gemini-1.5-flash")
+        with self.assertRaises(BackendError) as raised:
+            model.generate_content("Hello")
+        self.assertIn(raised.exception.code, (429, 500, 503))
+
+        with self.assertRaises(BackendError) as raised:
+            self.backend.GenerativeModel("gemini-ultra").generate_content("Hello")
+        self.assertEqual(raised.exception.code, 404)
+
+class TestGeminiServiceBackend(unittest.TestCase):
+    """Test cases for GeminiService on a stand-in backend"""
+
+    def test_answers_without_api_key(self):
+        backend = FakeGenai(latency="fixed:0", tokens_per_second=0, seed=1)
+        service = GeminiService(api_key=None, backend=backend)
+        self.assertEqual(service.model.model_name, "models/gemini-1.5-flash")
+        self.assertTrue(service.get_response("Should I save more?", language="en").startswith("consider"))
+
+    def test_failing_backend_falls_back(self):
+        backend = FakeGenai(latency="fixed:0", error_rate=1.0)
+        service = GeminiService(api_key=None, backend=backend)
+        answer = service.get_response("Should I save more?", language="en")
+        self.assertTrue(answer)
+        self.assertEqual(backend.metrics()["requests"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import os
+import sys
+import json
+from datetime import datetime, timedelta
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from cases import APITestCase
+from models import SavedImpulse
+from projections import future_value, growth, project_curves
+from benchmarks.projections import run_benchmark
+
+# Minimum throughput for yearly 10-year curves (override on slow machines)
+MIN_ITEMS_PER_MS = float(os.getenv("MW_MIN_PROJECTION_ITEMS_PER_MS", "1000"))
+
+class TestProjections(unittest.TestCase):
+    """Test cases for the projection engine"""
+
+    def test_future_value_matches_model_projection(self):
+        """Test that models and helpers share the same assumptions"""
+        impulse = SavedImpulse(1, "Shoes", "clothing", 100.0)
+
+        self.assertEqual(future_value(100, 1), 108.0)
+        self.assertEqual(future_value(100, 5), 146.93)
+        self.assertEqual(impulse.projected_value_5yr, future_value(100, 5))
+        self.assertEqual(growth(100, 5), 46.93)
+
+    def test_curves_compound_yearly_values(self):
+        """Test that monthly compounding lands on the annual figures"""
+        months, values = project_curves([100, 200], 0.08, horizon_months=60, step_months=12)
+
+        np.testing.assert_array_equal(months, [0, 12, 24, 36, 48, 60])
+        np.testing.assert_allclose(values[0, [1, 5]], [108.0, 146.9328], rtol=1e-5)
+        np.testing.assert_allclose(values[1], values[0] * 2)
+
+    def test_contributions_inflation_and_elapsed_time(self):
+        """Test contributions, zero rates, inflation and already elapsed months"""
+        _, flat = project_curves([100], 0.0, horizon_months=12, monthly_contributions=10)
+        self.assertAlmostEqual(flat[0, -1], 220.0)
+
+        _, real = project_curves([100], 0.0, horizon_months=12, inflation=0.1, step_months=12)
+        self.assertAlmostEqual(real[0, -1], 100 / 1.1)
+
+        _, aged = project_curves([100, 100], 0.08, horizon_months=12, elapsed_months=[0, 12], step_months=12)
+        self.assertAlmostEqual(aged[1, 0], 108.0)
+        self.assertAlmostEqual(aged[1, 1], 116.64)
+
+    def test_per_item_rates(self):
+        """Test that each item can have its own rate"""
+        _, values = project_curves([100, 100], [0.0, 0.1], horizon_months=12, step_months=12)
+        np.testing.assert_allclose(values[:, 1], [100.0, 110.0])
+
+    def test_throughput(self):
+        """Test that thousands of curves are projected per millisecond"""
+        result = run_benchmark(items=10000, years=10, step=12, repeat=5)
+        self.assertGreaterEqual(result['items_per_ms'], MIN_ITEMS_PER_MS, result)
+
+class TestProjectionsAPI(APITestCase):
+    """Test cases for the /api/projections endpoint"""
+
+    def setUp(self):
+        super().setUp()
+        first = SavedImpulse(self.user_id, "Shoes", "clothing", 100.0)
+        first.date = datetime.now() - timedelta(days=365)
+        second = SavedImpulse(self.user_id, "Headphones", "electronics", 50.0)
+        second.date = datetime.now()
+        self.session.add_all([first, second])
+        self.session.commit()
+
+    def test_projection_curves(self):
+        """Test curves for the whole impulse history"""
+        response = self.client.get('/api/projections?years=5&monthly_contribution=10', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+
+        data = json.loads(response.data)
+        self.assertEqual(data['months'], [0, 12, 24, 36, 48, 60])
+        self.assertEqual(len(data['impulses']), 2)
+
+        # The older impulse has already grown for a year
+        self.assertAlmostEqual(data['impulses'][0]['values'][0], 108.0, delta=0.5)
+        self.assertEqual(data['impulses'][1]['values'][0], 50.0)
+
+        total = sum(i['values'][-1] for i in data['impulses']) + data['contributions'][-1]
+        self.assertAlmostEqual(data['total'][-1], total, delta=0.05)
+
+    def test_invalid_parameters(self):
+        """Test parameter validation"""
+        response = self.client.get('/api/projections?years=500', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.gemini_service import GeminiService
+from services.prompt_templates import PromptLibrary, history_slot, context_slot
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class FakeModel:
+    """Stand-in for genai.GenerativeModel recording the prompts it gets"""
+
+    def __init__(self, model_name, system_instruction=None, cached_content=None):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.cached_content = cached_content
+        self.prompts = []
+
+    @classmethod
+    def from_cached_content(cls, cached_content):
+        return cls(cached_content["model"], cached_content=cached_content)
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        return FakeResponse("Invest it instead!")
+
+class FakeCachedContent:
+    created = []
+
+    @classmethod
+    def create(cls, model, system_instruction, ttl):
+        content = {"model": model, "system_instruction": system_instruction}
+        cls.created.append(content)
+        return content
+
+class FakeGenai:
+    GenerativeModel = FakeModel
+    caching = type("caching", (), {"CachedContent": FakeCachedContent})
+
+class TestPromptLibrary(unittest.TestCase):
+    """Test cases for compiled prompts"""
+
+    def test_compiled_once_per_language_and_personality(self):
+        library = PromptLibrary()
+        french = library.get("fr", "funny")
+        self.assertIs(library.get("fr", "funny"), french)
+        self.assertIsNot(library.get("en", "funny"), french)
+        self.assertIs(library.get("fr", "unknown"), library.get("fr", "nice"))
+
+        self.assertIn("Light-hearted", french.system)
+        self.assertNotIn("sarcastic", french.system)
+        self.assertIn("Always answer in French", french.system)
+
+    def test_render_slots(self):
+        """Test that only filled slots are rendered, after the system text when inline"""
+        compiled = PromptLibrary().get("en", "nice")
+        self.assertEqual(compiled.render("Hi"), "User message: Hi")
+
+        prompt = compiled.render(
+            "Should I buy it?",
+            {"budget_left": 120, "goal": None},
+            [{"role": "user", "content": "I saw shoes"}, {"role": "assistant", "content": "Nice!"}],
+        )
+        self.assertEqual(
+            prompt,
+            "User context:\n- budget_left: 120\n\n"
+            "Recent conversation:\nUser: I saw shoes\nAssistant: Nice!\n\n"
+            "User message: Should I buy it?",
+        )
+        self.assertTrue(compiled.inline("Hi").startswith(compiled.system))
+
+    def test_trimmed_history(self):
+        """Test that the newest messages are kept within the budget"""
+        history = [{"role": "user", "content": f"message {i} " + "x" * 300} for i in range(20)]
+        slot = history_slot(history)
+        self.assertLessEqual(len(slot), 2000)
+        self.assertIn("message 19", slot)
+        self.assertNotIn("message 12 ", slot)
+        self.assertEqual(context_slot({"notes": "y" * 5000}, limit=100), "")
+
+    def test_metrics(self):
+        library = PromptLibrary()
+        compiled = library.get("en", "nice")
+        library.record(compiled, "x" * 400, "cached")
+        library.record(compiled, "x" * 400, "instruction")
+        metrics = library.metrics()["en/nice"]
+        self.assertEqual(metrics["requests"], 2)
+        self.assertEqual(metrics["tokens_saved"], compiled.system_tokens)
+        self.assertEqual(metrics["tokens_sent"], 200 + compiled.system_tokens)
+
+class TestGeminiPrompts(unittest.TestCase):
+    """Test cases for the prompts GeminiService sends"""
+
+    def setUp(self):
+        """Use a service on the stubbed SDK"""
+        with patch.object(GeminiService, 'initialize'):
+            self.service = GeminiService(api_key="test-key")
+        self.service.genai = FakeGenai
+        self.service.model = FakeModel("models/gemini-test")
+        self.service.prompts = PromptLibrary()
+        FakeCachedContent.created = []
+
+    def ask(self, message, **kwargs):
+        return self.service.get_response(message, language="en", **kwargs)
+
+    @patch('services.gemini_service.CONTEXT_CACHE_MIN_TOKENS', 0)
+    def test_cached_system_instruction(self):
+        """Test that the compiled prompt is cached once and requests send the slots"""
+        for message in ("Hello", "Should I buy shoes?"):
+            self.assertEqual(self.ask(message, user_id=1, personality="irony"), "Invest it instead!")
+
+        self.assertEqual(len(FakeCachedContent.created), 1)
+        self.assertIn("sarcastic", FakeCachedContent.created[0]["system_instruction"])
+        model, system = self.service.template_models[("en", "irony")]
+        self.assertEqual(system, "cached")
+        self.assertEqual(model.prompts[0], "User message: Hello")
+        self.assertEqual(self.service.prompts.metrics()["en/irony"]["requests"], 2)
+
+    def test_small_prompt_as_system_instruction(self):
+        """Test that prompts below the cache minimum become the system instruction"""
+        self.ask("Hello", user_id=1)
+        model, system = self.service.template_models[("en", "nice")]
+        self.assertEqual(system, "instruction")
+        self.assertIn("Supportive", model.system_instruction)
+        self.assertEqual(FakeCachedContent.created, [])
+
+    def test_inline_without_sdk_models(self):
+        """Test that a model not created by the SDK gets the whole prompt"""
+        self.service.genai = None
+        self.ask("Hello", user_id=1)
+        self.assertTrue(self.service.model.prompts[0].startswith("You are MindfulBot"))
+        self.assertTrue(self.service.model.prompts[0].endswith("User message: Hello"))
+
+    def test_explicit_system_prompt(self):
+        self.ask("Hello", system_prompt="Answer briefly.")
+        self.assertEqual(self.service.model.prompts, ["Answer briefly.\n\nUser message: Hello"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+from cases import APITestCase
+import app
+from rate_limit import MemoryBucketStore, RateLimiter, SQLiteBucketStore, parse_rate
+
+class TestTokenBuckets(unittest.TestCase):
+    """Test cases for the token bucket limits"""
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate("10/minute"), (10, 10 / 60))
+        self.assertEqual(parse_rate("100/5 seconds"), (100, 20.0))
+        self.assertIsNone(parse_rate(""))
+        for rate in ("10 per minute", "10/fortnight", "0/second"):
+            with self.assertRaises(ValueError):
+                parse_rate(rate)
+
+    def test_burst_then_refill(self):
+        """Test that a full bucket allows a burst then the refill rate"""
+        limiter = RateLimiter()
+        limiter.configure("chat", "3/minute")
+        waits = [limiter.check("chat", "user:1", now=1000) for _ in range(4)]
+        self.assertEqual(waits[:3], [0, 0, 0])
+        self.assertAlmostEqual(waits[3], 20.0)
+
+        self.assertAlmostEqual(limiter.check("chat", "user:1", now=1010), 10.0)
+        self.assertEqual(limiter.check("chat", "user:1", now=1020), 0)
+        self.assertEqual(limiter.check("chat", "user:2", now=1020), 0)
+        self.assertEqual(limiter.metrics(), {"chat": {"allowed": 5, "throttled": 2}})
+
+    def test_global_bucket(self):
+        """Test that a request refused globally takes no token from the caller"""
+        limiter = RateLimiter()
+        limiter.configure("chat", "2/minute", "3/minute")
+        for caller in ("user:1", "user:2", "user:3"):
+            self.assertEqual(limiter.check("chat", caller, now=0), 0)
+        self.assertGreater(limiter.check("chat", "user:1", now=0), 0)
+
+        # The global bucket refilled, user 1 still has its second token
+        self.assertEqual(limiter.check("chat", "user:1", now=20), 0)
+
+    def test_unconfigured_rule(self):
+        limiter = RateLimiter(MemoryBucketStore())
+        limiter.configure("writes", per_user=None)
+        self.assertEqual(limiter.check("writes", "user:1"), 0)
+        self.assertEqual(limiter.check("other", "user:1"), 0)
+
+    def test_shared_sqlite_store(self):
+        """Test that processes using the same file share the buckets"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "limits.db")
+            first, second = RateLimiter(SQLiteBucketStore(path)), RateLimiter(SQLiteBucketStore(path))
+            for limiter in (first, second):
+                limiter.configure("chat", "2/minute")
+
+            self.assertEqual(first.check("chat", "user:1", now=0), 0)
+            self.assertEqual(second.check("chat", "user:1", now=0), 0)
+            self.assertAlmostEqual(first.check("chat", "user:1", now=0), 30.0)
+            self.assertEqual(second.check("chat", "user:1", now=30), 0)
+
+class TestRateLimitedAPI(APITestCase):
+    """Test cases for limited endpoints"""
+
+    def setUp(self):
+        """Use an in-memory database, a real token and a fresh limit"""
+        super().setUp()
+        self.patchers = [
+            patch.object(app.rate_limiter, 'store', MemoryBucketStore()),
+            patch.dict(app.rate_limiter.rules, {"writes": (parse_rate("2/minute"), None)}),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        """Restore the database session and limits"""
+        for patcher in self.patchers:
+            patcher.stop()
+        super().tearDown()
+
+    def test_too_many_writes(self):
+        """Test that writes over the limit get 429 and reads are not limited"""
+        body = {'category': 'rent', 'planned_amount': 900, 'month': 3, 'year': 2024}
+        for _ in range(2):
+            response = self.client.post('/api/budgets', json=body, headers=self.headers)
+            self.assertEqual(response.status_code, 200)
+
+        response = self.client.post('/api/budgets', json=body, headers=self.headers)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers['Retry-After'], '30')
+        self.assertEqual(json.loads(response.data)['retry_after'], 30)
+
+        response = self.client.get('/api/transactions', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+
+        metrics = json.loads(self.client.get('/api/rate-limits/metrics').data)['metrics']
+        self.assertGreaterEqual(metrics['writes']['throttled'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
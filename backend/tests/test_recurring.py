@@ -0,0 +1,210 @@
+import unittest
+import os
+import sys
+import json
+from datetime import datetime, timedelta
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from cases import APITestCase
+from models import Base, User, Transaction, RecurringSeries
+from services.recurring_service import (
+    detect_series,
+    get_recurring_payments,
+    next_charge_date,
+    normalize_description,
+    rebuild_recurring_series,
+    subscription_insight,
+    track_recurring_series,
+)
+
+NOW = datetime(2024, 6, 20)
+
+def monthly(start, count, day=None):
+    """Charge dates one month apart"""
+    dates = []
+    year, month = start.year, start.month
+    for _ in range(count):
+        dates.append(start.replace(year=year, month=month, day=day or start.day))
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return dates
+
+class TestDetection(unittest.TestCase):
+    """Test cases for grouping and period detection"""
+
+    def test_normalize_description(self):
+        """Test that reference numbers and punctuation are ignored"""
+        self.assertEqual(normalize_description("NETFLIX.COM 2231 04/05"), "netflix com")
+        self.assertEqual(normalize_description("1234"), "")
+
+    def test_periods(self):
+        """Test weekly, monthly and yearly series in one pass"""
+        rows = [(1, "Spotify", 9.99, "EUR", d) for d in monthly(datetime(2024, 1, 3), 5)]
+        rows += [(1, "Gym class", 12.0, "EUR", datetime(2024, 5, 1) + timedelta(weeks=w)) for w in range(4)]
+        rows += [(1, "Domain renewal", 15.0, "USD", datetime(2022, 3, 1)), (1, "Domain renewal", 15.0, "USD", datetime(2023, 3, 2))]
+        rows += [(1, "Bakery", 3.5, "EUR", datetime(2024, 6, 1)), (1, "Bakery", 3.5, "EUR", datetime(2024, 6, 13))]
+
+        detected = {key[1]: series for key, series in detect_series(reversed(rows), now=NOW).items()}
+
+        self.assertEqual((detected["spotify"].period, detected["spotify"].occurrences), ("monthly", 5))
+        self.assertEqual((detected["gym class"].period, detected["gym class"].occurrences), ("weekly", 4))
+        self.assertEqual(detected["domain renewal"].period, "yearly")
+        self.assertIsNone(detected["bakery"].period)
+
+    def test_broken_series_restarts(self):
+        """Test that a missed month starts a new run from the next charge"""
+        dates = monthly(datetime(2023, 1, 10), 3) + monthly(datetime(2023, 9, 10), 2)
+        series = next(iter(detect_series([(1, "Gym", 30.0, "EUR", d) for d in dates], now=NOW).values()))
+        self.assertEqual((series.period, series.occurrences), ("monthly", 2))
+        self.assertEqual(series.first_date, datetime(2023, 9, 10))
+
+    def test_next_charge_date(self):
+        """Test that monthly charges keep their day, clamped to short months"""
+        series = RecurringSeries(1, "rent", 900.0, "EUR", datetime(2024, 1, 31), period="monthly", last_date=datetime(2024, 1, 31))
+        self.assertEqual(next_charge_date(series), datetime(2024, 2, 29))
+        series.last_date = datetime(2024, 2, 29)
+        self.assertEqual(next_charge_date(series), datetime(2024, 3, 31))
+
+class TestIncrementalDetection(unittest.TestCase):
+    """Test cases for maintaining recurring_series as transactions are written"""
+
+    def setUp(self):
+        """Use an in-memory database with recurring payment tracking"""
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        track_recurring_series(Session)
+        self.session = Session()
+
+        user = User(name="Test User", email="test@example.com")
+        self.session.add(user)
+        self.session.commit()
+        self.user_id = user.id
+
+    def tearDown(self):
+        self.session.close()
+
+    def add(self, description, amount, date):
+        transaction = Transaction(self.user_id, amount, "subscriptions", date, description=description)
+        self.session.add(transaction)
+        self.session.commit()
+        return transaction
+
+    def snapshot(self):
+        self.session.expire_all()
+        return sorted(
+            (s.description_key, s.amount, s.period, s.occurrences, s.first_date, s.last_date)
+            for s in self.session.query(RecurringSeries)
+        )
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        rebuild_recurring_series(self.session)
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_charges_extend_series(self):
+        """Test that monthly charges arriving in order are detected"""
+        for date in monthly(datetime(2024, 3, 5), 4):
+            self.add("NETFLIX.COM", 15.49, date)
+
+        payments = get_recurring_payments(self.session, self.user_id, now=NOW)
+        self.assertEqual(len(payments), 1)
+        self.assertEqual(payments[0]['period'], 'monthly')
+        self.assertEqual(payments[0]['next_date'], datetime(2024, 7, 5).isoformat())
+        self.assertMatchesRebuild()
+
+    def test_backdated_edits_and_deletes_rescan(self):
+        """Test that out-of-order changes give the same result as a rebuild"""
+        dates = monthly(datetime(2024, 1, 15), 5)
+        for date in dates[2:]:
+            self.add("Disney Plus", 8.99, date)
+        self.add("Disney Plus", 8.99, dates[0])
+        self.assertMatchesRebuild()
+
+        middle = self.add("Disney Plus", 8.99, dates[1])
+        self.assertEqual(self.snapshot()[0][3], 5)
+
+        middle.amount = 10.99
+        self.session.commit()
+        self.assertMatchesRebuild()
+
+        self.session.delete(middle)
+        self.session.commit()
+        self.assertMatchesRebuild()
+
+    def test_mixed_writes_match_rebuild(self):
+        """Test that stale candidates are dropped on writes as the rebuild drops them"""
+        now = datetime.utcnow().replace(microsecond=0)
+        # A candidate written long ago that went stale since, hooks bypassed
+        self.session.execute(Transaction.__table__.insert().values(
+            user_id=self.user_id, amount=5.0, category="subscriptions",
+            date=now - timedelta(days=400), description="Magazine", currency="EUR",
+        ))
+        self.session.add(RecurringSeries(self.user_id, "magazine", 5.0, "EUR", now - timedelta(days=400)))
+        self.session.commit()
+
+        self.add("Coffee shop", 4.2, now - timedelta(days=500))
+        self.add("Concert", 60.0, now - timedelta(days=200))
+        # A year after the dropped coffee candidate
+        self.add("Coffee shop", 4.2, now - timedelta(days=136))
+        for days in (100, 70, 5):
+            self.add("Gym", 30.0, now - timedelta(days=days))
+        self.add("Old book", 12.0, now - timedelta(days=600))
+        self.add("Old book", 12.0, now - timedelta(days=450))
+
+        keys = [series[0] for series in self.snapshot()]
+        self.assertEqual(keys, ["coffee shop", "concert", "gym"])
+        self.assertMatchesRebuild()
+
+    def test_inactive_series(self):
+        """Test that series without a recent charge are hidden by default"""
+        for date in monthly(datetime(2023, 1, 1), 3):
+            self.add("Old magazine", 5.0, date)
+
+        self.assertEqual(get_recurring_payments(self.session, self.user_id, now=NOW), [])
+        payments = get_recurring_payments(self.session, self.user_id, now=NOW, include_inactive=True)
+        self.assertFalse(payments[0]['active'])
+
+    def test_subscription_insight(self):
+        """Test that the audit insight totals the monthly cost"""
+        for date in monthly(datetime(2024, 3, 5), 4):
+            self.add("Spotify", 10.0, date)
+        for week in range(3):
+            self.add("Climbing gym", 6.0, datetime(2024, 6, 1) + timedelta(weeks=week))
+
+        payments = get_recurring_payments(self.session, self.user_id, now=NOW)
+        insight = subscription_insight(payments, "EUR")
+        self.assertIn("2 recurring payments", insight['description'])
+        self.assertIn(f"€{10 + 6 * 52 / 12:.2f}", insight['description'])
+        self.assertIsNone(subscription_insight([], "EUR"))
+
+class TestSubscriptionsAPI(APITestCase):
+    """Test cases for the subscriptions endpoint"""
+
+    trackers = (track_recurring_series,)
+
+    def setUp(self):
+        super().setUp()
+        today = datetime.utcnow()
+        self.session.add_all(
+            Transaction(self.user_id, 11.99, "subscriptions", today - timedelta(days=30 * i), description="Spotify AB")
+            for i in range(3)
+        )
+        self.session.commit()
+
+    def test_list_subscriptions(self):
+        """Test that detected payments are listed with their next charge"""
+        response = self.client.get('/api/subscriptions', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        payments = json.loads(response.data)
+        self.assertEqual([p['description'] for p in payments], ['Spotify AB'])
+        self.assertIn('next_date', payments[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.response_catalog import ResponseCatalog, DEFAULT_INTENT
+
+class TestResponseCatalog(unittest.TestCase):
+    """Test cases for the ResponseCatalog class"""
+
+    def setUp(self):
+        """Load the shipped catalog"""
+        self.catalog = ResponseCatalog()
+
+    def test_detect_intent(self):
+        """Test intent detection in both languages"""
+        self.assertEqual(self.catalog.detect_intent("Hello there"), "greeting")
+        self.assertEqual(self.catalog.detect_intent("Bonjour !"), "greeting")
+        self.assertEqual(self.catalog.detect_intent("Help me with my budget"), "budget")
+        self.assertEqual(self.catalog.detect_intent("Comment économiser ?"), "saving")
+        self.assertEqual(self.catalog.detect_intent("Tell me about bonds"), DEFAULT_INTENT)
+
+    def test_detect_intent_respects_priority(self):
+        """Test that greetings win over budget and saving intents"""
+        self.assertEqual(self.catalog.detect_intent("Hi, I want to save on my budget"), "greeting")
+        self.assertEqual(self.catalog.detect_intent("Budget or savings?"), "budget")
+
+    def test_greeting_requires_whole_word(self):
+        """Test that 'hi' inside another word is not a greeting"""
+        self.assertEqual(self.catalog.detect_intent("What do you think?"), DEFAULT_INTENT)
+
+    def test_match_reports_shared_keywords_for_every_topic(self):
+        """Test that a keyword listed under several topics matches all of them"""
+        topics = self.catalog.match("Des chaussures Gucci")
+        self.assertIn("shoes", topics)
+        self.assertIn("purchase", topics)
+        self.assertIn("luxury", topics)
+
+    def test_get_by_language_and_personality(self):
+        """Test response lookups with fallbacks"""
+        french = self.catalog.get("budget", "fr", "funny")
+        english = self.catalog.get("budget", "en", "irony")
+
+        self.assertIn("budget", french.lower())
+        self.assertTrue(english.startswith("Budgeting"))
+
+        # Unknown language and personality fall back to the defaults
+        self.assertEqual(self.catalog.get("budget", "de", "grumpy"), self.catalog.get("budget", "en", "nice"))
+
+        # Responses shared by every personality
+        self.assertEqual(self.catalog.get("chat_error", "fr", "irony"), self.catalog.get("chat_error", "fr"))
+
+        self.assertIsNone(self.catalog.get("unknown_key", "fr"))
+
+    def test_every_intent_has_responses(self):
+        """Test that every intent and the default have a response in each language"""
+        for intent in self.catalog.intents + [DEFAULT_INTENT]:
+            for language in self.catalog.languages:
+                for personality in ("nice", "funny", "irony"):
+                    self.assertIsNotNone(self.catalog.get(intent, language, personality))
+
+    def test_new_language_from_data_file(self):
+        """Test that a language can be added without code changes"""
+        data = {
+            "default_language": "en",
+            "intents": {"greeting": ["hola"]},
+            "responses": {
+                "greeting": {"en": "Hello!", "es": {"nice": "¡Hola!"}},
+                "default": {"en": "Tell me more.", "es": "Cuéntame más."},
+            },
+        }
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as f:
+            json.dump(data, f)
+        self.addCleanup(os.remove, f.name)
+
+        catalog = ResponseCatalog(f.name)
+
+        self.assertEqual(catalog.languages, ["en", "es"])
+        self.assertEqual(catalog.respond("Hola amigo", "es", "nice"), "¡Hola!")
+        self.assertEqual(catalog.respond("Qué tal", "es", "funny"), "Cuéntame más.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import os
+import sys
+import json
+from datetime import datetime
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+from cases import APITestCase
+from models import SavedImpulse
+from simulations import SimulationCache, simulate_goal, simulation_cache, shutdown_pool
+
+class TestSimulations(unittest.TestCase):
+    """Test cases for the Monte Carlo goal simulator"""
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the worker processes started by the tests"""
+        shutdown_pool()
+
+    def test_zero_volatility_is_deterministic(self):
+        """Test that without volatility every path follows the expected return"""
+        reached = simulate_goal(1000, 1080, 12, mean=0.081, volatility=0.0, paths=1000)
+        missed = simulate_goal(1000, 1090, 12, mean=0.081, volatility=0.0, paths=1000)
+
+        self.assertEqual(reached['probability'], 1.0)
+        self.assertEqual(missed['probability'], 0.0)
+        self.assertEqual(reached['bands']['p5'], reached['bands']['p95'])
+
+    def test_contributions_reach_target(self):
+        """Test that monthly contributions are added to every path"""
+        result = simulate_goal(0, 120, 12, monthly_contribution=10, mean=0.0, volatility=0.0, paths=1000)
+        self.assertEqual(result['probability'], 1.0)
+        self.assertEqual(result['final_value']['median'], 120.0)
+
+    def test_seed_is_reproducible(self):
+        """Test that the same seed gives the same result"""
+        first = simulate_goal(1000, 1500, 60, volatility=0.2, paths=5000, seed=42)
+        second = simulate_goal(1000, 1500, 60, volatility=0.2, paths=5000, seed=42)
+
+        self.assertEqual(first, second)
+        self.assertGreater(first['probability'], 0.0)
+        self.assertLess(first['probability'], 1.0)
+        self.assertEqual(first['months'], [0, 12, 24, 36, 48, 60])
+
+    def test_process_pool_matches_serial_run(self):
+        """Test that chunks give the same result in workers and in process"""
+        parallel = simulate_goal(1000, 1500, 24, paths=25000, seed=7, parallel=True)
+        serial = simulate_goal(1000, 1500, 24, paths=25000, seed=7, parallel=False)
+        self.assertEqual(parallel, serial)
+
+    def test_probability_reached_before_deadline(self):
+        """Test that touching the target counts even if the final value is lower"""
+        result = simulate_goal(1000, 1100, 60, volatility=0.3, paths=5000, seed=1)
+        self.assertGreaterEqual(result['probability'], result['probability_at_deadline'])
+
+    def test_cache(self):
+        """Test cache hits, expiry, eviction and per-user invalidation"""
+        cache = SimulationCache(max_entries=2)
+        cache.set((1, 'a'), 'first')
+        cache.set((2, 'a'), 'second')
+
+        self.assertEqual(cache.get((1, 'a')), 'first')
+        cache.set((1, 'b'), 'third')
+        self.assertIsNone(cache.get((2, 'a')))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        cache.invalidate_user(1)
+        self.assertIsNone(cache.get((1, 'a')))
+        self.assertIsNone(cache.get((1, 'b')))
+
+        expired = SimulationCache(ttl_seconds=0)
+        expired.set((1, 'a'), 'value')
+        with patch('simulations.time.monotonic', return_value=10 ** 9):
+            self.assertIsNone(expired.get((1, 'a')))
+
+class TestSimulationsAPI(APITestCase):
+    """Test cases for the /api/goals/simulate endpoint"""
+
+    def setUp(self):
+        super().setUp()
+        impulse = SavedImpulse(self.user_id, "Shoes", "clothing", 100.0)
+        impulse.date = datetime.now()
+        self.session.add(impulse)
+        self.session.commit()
+
+        simulation_cache.clear()
+
+    def tearDown(self):
+        super().tearDown()
+        simulation_cache.clear()
+
+    def simulate(self, **body):
+        response = self.client.post('/api/goals/simulate', json=body, headers=self.headers)
+        return response.status_code, json.loads(response.data)
+
+    def test_simulate_goal(self):
+        """Test a deterministic simulation from the impulse history"""
+        status, data = self.simulate(target=220, years=1, volatility=0, mean=0, monthly_contribution=10, paths=1000)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(data['start_value'], 100.0)
+        self.assertEqual(data['probability'], 1.0)
+        self.assertEqual(data['final_value']['median'], 220.0)
+        self.assertFalse(data['cached'])
+
+    def test_results_are_cached_until_history_changes(self):
+        """Test that repeated requests hit the cache and new impulses miss it"""
+        body = dict(target=500, years=2, paths=1000)
+        self.assertFalse(self.simulate(**body)[1]['cached'])
+        self.assertTrue(self.simulate(**body)[1]['cached'])
+
+        self.session.add(SavedImpulse(self.user_id, "Watch", "accessories", 50.0))
+        self.session.commit()
+
+        status, data = self.simulate(**body)
+        self.assertEqual(status, 200)
+        self.assertFalse(data['cached'])
+        self.assertEqual(data['start_value'], 150.0)
+
+    def test_invalid_parameters(self):
+        """Test parameter validation"""
+        self.assertEqual(self.simulate(years=1)[0], 400)
+        self.assertEqual(self.simulate(target=100, years=100)[0], 400)
+        self.assertEqual(self.simulate(target=100, paths=10 ** 7)[0], 400)
+        self.assertEqual(self.simulate(target="lots")[0], 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from single_flight import SingleFlight, flight_key
+from services.gemini_service import GeminiService
+
+class SlowModel:
+    """Model answering after a delay, counting its calls"""
+
+    model_name = "models/slow"
+
+    def __init__(self, delay=0.2, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return type("Response", (), {"text": f"answer to {prompt[-5:]}"})()
+
+def run_together(targets):
+    results = [None] * len(targets)
+
+    def run(i):
+        try:
+            results[i] = targets[i]()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(targets))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+class TestSingleFlight(unittest.TestCase):
+    """Test cases for duplicate call coalescing"""
+
+    def test_concurrent_duplicates_share(self):
+        """Test that concurrent calls with one key run the work once"""
+        flight = SingleFlight()
+        runs = []
+
+        def work():
+            runs.append(1)
+            time.sleep(0.2)
+            return {"total": 42}
+
+        results = run_together([lambda: flight.do("dashboard", "user:1", work)] * 5)
+        self.assertEqual(len(runs), 1)
+        self.assertTrue(all(r == {"total": 42} for r in results))
+
+        metrics = flight.metrics()["dashboard"]
+        self.assertEqual((metrics["calls"], metrics["executions"], metrics["shared"]), (5, 1, 4))
+        self.assertEqual((metrics["collapsed_pct"], metrics["in_flight"]), (80.0, 0))
+
+        # Finished calls are not cached
+        flight.do("dashboard", "user:1", work)
+        self.assertEqual(len(runs), 2)
+
+    def test_errors_reach_every_waiter(self):
+        flight = SingleFlight()
+
+        def fail():
+            time.sleep(0.2)
+            raise ValueError("Unknown section")
+
+        results = run_together([lambda: flight.do("dashboard", "user:1", fail)] * 3)
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+        self.assertEqual(flight.metrics()["dashboard"]["errors"], 1)
+
+    def test_flight_key(self):
+        """Test that keys ignore dict order and whitespace only"""
+        self.assertEqual(flight_key(1, {"a": 1, "b": " x  y"}), flight_key(1, {"b": "x y", "a": 1}))
+        self.assertNotEqual(flight_key(1, "Hello"), flight_key(2, "Hello"))
+        self.assertNotEqual(flight_key(1, "Hello"), flight_key(1, "hello"))
+
+class TestGeminiCoalescing(unittest.TestCase):
+    """Test cases for shared Gemini API calls"""
+
+    def setUp(self):
+        """Use a service whose model is set by each test"""
+        with patch.object(GeminiService, 'initialize'):
+            self.service = GeminiService(api_key="test-key")
+
+    def test_identical_prompts_share_a_call(self):
+        """Test that one user's duplicate messages make one API call"""
+        self.service.model = model = SlowModel()
+        ask = lambda user_id: lambda: self.service.get_response("How do I save money?", user_id=user_id)
+
+        results = run_together([ask(1)] * 4)
+        self.assertEqual(model.calls, 1)
+        self.assertEqual(len(set(results)), 1)
+
+        # Other users' prompts are not shared
+        run_together([ask(1), ask(2), ask(2)])
+        self.assertEqual(model.calls, 3)
+
+    def test_shared_failure_falls_back(self):
+        """Test that waiters of a failed call each answer from the catalog"""
+        self.service.model = SlowModel(error=RuntimeError("quota exceeded"))
+        with patch.object(self.service, 'initialize'):
+            results = run_together([lambda: self.service.get_response("Hello", user_id=1)] * 3)
+        self.assertTrue(all(isinstance(r, str) and r for r in results))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+import os
+import sys
+import json
+from datetime import datetime, timedelta
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from cases import APITestCase
+from models import Base, User, Transaction, SavedImpulse, Tombstone
+from services.budget_service import roll_forward_budgets, upsert_budget
+from services.sync_service import get_changes, purge_tombstones, track_changes
+
+class TestChangeTracking(unittest.TestCase):
+    """Test cases for change versions and tombstones"""
+
+    def setUp(self):
+        """Use an in-memory database with change tracking"""
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        track_changes(Session)
+        self.session = Session()
+
+        user = User(name="Test User", email="test@example.com")
+        other = User(name="Other User", email="other@example.com")
+        self.session.add_all([user, other])
+        self.session.commit()
+        self.user_id, self.other_id = user.id, other.id
+
+    def tearDown(self):
+        self.session.close()
+
+    def add_transaction(self, amount, category="food"):
+        transaction = Transaction(self.user_id, amount, category, datetime.now())
+        self.session.add(transaction)
+        self.session.commit()
+        return transaction
+
+    def test_versions_and_deltas(self):
+        """Test that a sync returns only what changed after the version"""
+        first = self.add_transaction(10.0)
+        second = self.add_transaction(20.0)
+        self.assertEqual((first.version, second.version), (1, 2))
+
+        since = get_changes(self.session, self.user_id)['version']
+        first.amount = 15.0
+        self.session.delete(second)
+        self.session.add(SavedImpulse(self.user_id, "Headphones", "electronics", 80.0))
+        self.session.commit()
+        upsert_budget(self.session, self.user_id, "food", 300.0, 3, 2024)
+
+        delta = get_changes(self.session, self.user_id, since)
+        self.assertFalse(delta['full'])
+        self.assertEqual(delta['version'], 4)
+        self.assertEqual([(t['id'], t['amount'], t['version']) for t in delta['changes']['transactions']], [(first.id, 15.0, 3)])
+        self.assertEqual(delta['deleted']['transactions'], [second.id])
+        self.assertEqual([i['description'] for i in delta['changes']['saved_impulses']], ["Headphones"])
+        self.assertEqual([b['planned_amount'] for b in delta['changes']['budgets']], [300.0])
+
+        unchanged = get_changes(self.session, self.user_id, delta['version'])
+        self.assertEqual(sum(map(len, unchanged['changes'].values())), 0)
+        self.assertEqual(sum(map(len, unchanged['deleted'].values())), 0)
+
+    def test_versions_are_per_user(self):
+        """Test that another user's writes do not appear or advance the version"""
+        self.add_transaction(10.0)
+        self.session.add(Transaction(self.other_id, 99.0, "fun", datetime.now()))
+        self.session.commit()
+
+        changes = get_changes(self.session, self.user_id)
+        self.assertEqual(changes['version'], 1)
+        self.assertEqual(len(changes['changes']['transactions']), 1)
+
+    def test_core_budget_writes(self):
+        """Test that the budget upserts and roll-forward take versions"""
+        upsert_budget(self.session, self.user_id, "rent", 900.0, 12, 2024)
+        since = get_changes(self.session, self.user_id)['version']
+        roll_forward_budgets(self.session, self.user_id, 12, 2024)
+
+        delta = get_changes(self.session, self.user_id, since)
+        self.assertEqual([(b['month'], b['year']) for b in delta['changes']['budgets']], [(1, 2025)])
+
+    def test_full_sync(self):
+        """Test the cases returning every row without deletions"""
+        transaction = self.add_transaction(10.0)
+        self.session.delete(transaction)
+        self.session.commit()
+        self.add_transaction(20.0)
+
+        for since in (0, 99):
+            changes = get_changes(self.session, self.user_id, since)
+            self.assertTrue(changes['full'])
+            self.assertEqual([t['amount'] for t in changes['changes']['transactions']], [20.0])
+            self.assertEqual(changes['deleted']['transactions'], [])
+
+    def test_purge_tombstones(self):
+        """Test that clients older than the purged tombstones resync everything"""
+        transaction = self.add_transaction(10.0)
+        self.session.delete(transaction)
+        self.session.commit()
+        self.add_transaction(20.0)
+
+        self.assertEqual(purge_tombstones(self.session, now=datetime.now() + timedelta(days=60)), 1)
+        self.assertEqual(self.session.query(Tombstone).count(), 0)
+        self.assertTrue(get_changes(self.session, self.user_id, 1)['full'])
+        self.assertFalse(get_changes(self.session, self.user_id, 2)['full'])
+
+class TestSyncAPI(APITestCase):
+    """Test cases for the sync endpoint"""
+
+    trackers = (track_changes,)
+
+    def test_sync_after_writes(self):
+        """Test that writes through the endpoints show up in the next sync"""
+        data = json.loads(self.client.get('/api/sync', headers=self.headers).data)
+        self.assertEqual((data['version'], data['full']), (0, True))
+
+        self.client.post('/api/saved-impulses', json={'description': 'Shoes', 'amount': 60, 'category': 'clothes'}, headers=self.headers)
+        body = {'category': 'rent', 'planned_amount': 900, 'month': 3, 'year': 2024}
+        self.client.post('/api/budgets', json=body, headers=self.headers)
+
+        data = json.loads(self.client.get(f"/api/sync?since={data['version']}", headers=self.headers).data)
+        self.assertEqual(data['version'], 2)
+        self.assertEqual(len(data['changes']['saved_impulses']), 1)
+        self.assertEqual(len(data['changes']['budgets']), 1)
+
+        response = self.client.get('/api/sync?since=abc', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,5 @@
 import React from 'react';
+import api from '../services/api';
 import { useLanguage } from '../context/LanguageContext';
 import { useTheme } from '../context/ThemeContext';
 import {
@@ -40,12 +41,14 @@ const StatCard = ({ title, value, icon, change, changeType }) => {
 };
 
 const ActivityItem = ({ title, time, amount, type }) => {
+  // Income and saved impulses add to the balance, transactions take from it
+  const incoming = type !== 'withdrawal';
   return (
     <div className="flex items-center justify-between py-3 border-b border-gray-200 dark:border-gray-700 last:border-0">
       <div className="flex items-center">
-        <div className={`p-2 rounded-full ${type === 'deposit' ? 'bg-green-100 dark:bg-green-900' : 'bg-red-100 dark:bg-red-900'
+        <div className={`p-2 rounded-full ${incoming ? 'bg-green-100 dark:bg-green-900' : 'bg-red-100 dark:bg-red-900'
           }`}>
-          {type === 'deposit' ? (
+          {incoming ? (
             <ArrowTrendingUpIcon className="w-4 h-4 text-green-500 dark:text-green-400" />
           ) : (
             <ArrowTrendingDownIcon className="w-4 h-4 text-red-500 dark:text-red-400" />
@@ -58,53 +61,118 @@ const ActivityItem = ({ title, time, amount, type }) => {
           </p>
         </div>
       </div>
-      <div className={`font-medium ${type === 'deposit' ? 'text-green-500 dark:text-green-400' : 'text-red-500 dark:text-red-400'
+      <div className={`font-medium ${incoming ? 'text-green-500 dark:text-green-400' : 'text-red-500 dark:text-red-400'
         }`}>
-        {type === 'deposit' ? '+' : '-'}{amount}
+        {incoming ? '+' : '-'}{amount}
       </div>
     </div>
   );
 };
 
+// Resources reloaded when records change, the summary arrives with the event
+const CHANGED_RESOURCES = ['goals', 'portfolio', 'activity', 'insights'];
+
+// Milliseconds to wait for more change events before reloading
+const RELOAD_DELAY = 1000;
+
+const INSIGHT_STYLES = {
+  positive: ['bg-green-50 dark:bg-green-900/20', 'text-green-800 dark:text-green-400', 'text-green-700 dark:text-green-300'],
+  suggestion: ['bg-yellow-50 dark:bg-yellow-900/20', 'text-yellow-800 dark:text-yellow-400', 'text-yellow-700 dark:text-yellow-300'],
+};
+const DEFAULT_INSIGHT_STYLE = ['bg-blue-50 dark:bg-blue-900/20', 'text-blue-800 dark:text-blue-400', 'text-blue-700 dark:text-blue-300'];
+
+const formatAmount = (value) => {
+  if (value === undefined || value === null) {
+    return '-';
+  }
+  return `€${Number(value).toLocaleString('en-US', { minimumFractionDigits: 2, maximumFractionDigits: 2 })}`;
+};
+
+const formatPercent = (value) => (value === undefined ? '-' : `${value}%`);
+
+const formatChange = (value) => {
+  if (!value) {
+    return {};
+  }
+  return { change: `${Math.abs(value)}%`, changeType: value > 0 ? 'up' : 'down' };
+};
+
 const Dashboard = () => {
   const { t } = useLanguage();
   const { theme } = useTheme();
+  const [summary, setSummary] = React.useState({});
+  const [resources, setResources] = React.useState({});
 
   // Scroll to top when component mounts
   React.useEffect(() => {
     window.scrollTo({ top: 0, behavior: 'smooth' });
   }, []);
 
+  // Load every section in one request, then follow changes on the stream
+  React.useEffect(() => {
+    let active = true;
+    let reloadTimer = null;
+
+    const load = (names) => {
+      api.getBootstrap(names).then(response => {
+        const loaded = response.data.resources || {};
+        if (!active) {
+          return;
+        }
+        if (loaded.dashboard) {
+          setSummary(loaded.dashboard.summary || {});
+        }
+        setResources(previous => ({ ...previous, ...loaded }));
+      }).catch(error => {
+        console.log('Error loading dashboard:', error.message);
+      });
+    };
+
+    load();
+    const stream = api.subscribeToChanges((event) => {
+      if (event.type === 'summary') {
+        setSummary(event.summary);
+      } else if (event.type === 'resync') {
+        load();
+      } else {
+        clearTimeout(reloadTimer);
+        reloadTimer = setTimeout(() => load(CHANGED_RESOURCES), RELOAD_DELAY);
+      }
+    });
+
+    return () => {
+      active = false;
+      clearTimeout(reloadTimer);
+      stream.close();
+    };
+  }, []);
+
+  const allocation = resources.portfolio?.allocation || {};
+
   return (
     <div className="space-y-6">
       <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-6">
         <StatCard
           title={t('totalBalance')}
-          value="€24,563.00"
+          value={formatAmount(summary.total_balance)}
           icon={<BanknotesIcon className="w-6 h-6 text-primary" />}
-          change="2.5%"
-          changeType="up"
         />
         <StatCard
           title={t('monthlyIncome')}
-          value="€8,350.00"
+          value={formatAmount(summary.monthly_income)}
           icon={<ArrowTrendingUpIcon className="w-6 h-6 text-primary" />}
-          change="1.8%"
-          changeType="up"
         />
         <StatCard
           title={t('monthlyExpenses')}
-          value="€5,240.00"
+          value={formatAmount(summary.monthly_expenses)}
           icon={<ArrowTrendingDownIcon className="w-6 h-6 text-primary" />}
-          change="0.5%"
-          changeType="down"
+          {...formatChange(summary.spending_change_pct)}
         />
         <StatCard
           title={t('savingsRate')}
-          value="37.2%"
+          value={formatPercent(summary.savingsRate)}
           icon={<ChartBarIcon className="w-6 h-6 text-primary" />}
-          change="3.1%"
-          changeType="up"
+          {...formatChange(summary.savingsRate_change_pct)}
         />
       </div>
 
@@ -117,15 +185,15 @@ const Dashboard = () => {
           <div className="grid grid-cols-3 gap-4 mt-6">
             <div className="text-center">
               <p className="text-sm text-gray-500 dark:text-gray-400">{t('stocks')}</p>
-              <p className="text-lg font-bold mt-1">45%</p>
+              <p className="text-lg font-bold mt-1">{formatPercent(allocation.stocks)}</p>
             </div>
             <div className="text-center">
               <p className="text-sm text-gray-500 dark:text-gray-400">{t('bonds')}</p>
-              <p className="text-lg font-bold mt-1">30%</p>
+              <p className="text-lg font-bold mt-1">{formatPercent(allocation.bonds)}</p>
             </div>
             <div className="text-center">
               <p className="text-sm text-gray-500 dark:text-gray-400">{t('cash')}</p>
-              <p className="text-lg font-bold mt-1">25%</p>
+              <p className="text-lg font-bold mt-1">{formatPercent(allocation.cash)}</p>
             </div>
           </div>
         </div>
@@ -133,30 +201,15 @@ const Dashboard = () => {
         <div className="bg-white dark:bg-dark-300 rounded-lg shadow-sm p-6">
           <h2 className="text-xl font-semibold mb-4">{t('recentActivity')}</h2>
           <div className="space-y-0">
-            <ActivityItem
-              title={t('salaryDeposit')}
-              time={t('today')}
-              amount="€3,500.00"
-              type="deposit"
-            />
-            <ActivityItem
-              title={t('rentPayment')}
-              time={t('yesterday')}
-              amount="€1,200.00"
-              type="withdrawal"
-            />
-            <ActivityItem
-              title={t('investmentReturn')}
-              time="Mar 15, 9:45 AM"
-              amount="€450.00"
-              type="deposit"
-            />
-            <ActivityItem
-              title={t('groceryShopping')}
-              time="Mar 14, 6:30 PM"
-              amount="€85.75"
-              type="withdrawal"
-            />
+            {(resources.activity || []).slice(0, 4).map(item => (
+              <ActivityItem
+                key={item.id}
+                title={item.title}
+                time={item.time}
+                amount={formatAmount(item.amount)}
+                type={item.type}
+              />
+            ))}
           </div>
           <button className="w-full mt-4 py-2 text-center text-primary hover:text-primary-dark font-medium">
             {t('viewAllTransactions')}
@@ -168,57 +221,34 @@ const Dashboard = () => {
         <div className="bg-white dark:bg-dark-300 rounded-lg shadow-sm p-6">
           <h2 className="text-xl font-semibold mb-4">{t('financialGoals')}</h2>
           <div className="space-y-4">
-            <div>
-              <div className="flex justify-between mb-1">
-                <span className="font-medium">{t('emergencyFund')}</span>
-                <span>75%</span>
+            {(resources.goals || []).map(goal => (
+              <div key={goal.id || goal.name}>
+                <div className="flex justify-between mb-1">
+                  <span className="font-medium">{goal.name}</span>
+                  <span>{goal.progress}%</span>
+                </div>
+                <div className="w-full bg-gray-200 dark:bg-gray-700 rounded-full h-2.5">
+                  <div className="bg-primary h-2.5 rounded-full" style={{ width: `${goal.progress}%` }}></div>
+                </div>
               </div>
-              <div className="w-full bg-gray-200 dark:bg-gray-700 rounded-full h-2.5">
-                <div className="bg-primary h-2.5 rounded-full" style={{ width: '75%' }}></div>
-              </div>
-            </div>
-            <div>
-              <div className="flex justify-between mb-1">
-                <span className="font-medium">{t('vacationSavings')}</span>
-                <span>45%</span>
-              </div>
-              <div className="w-full bg-gray-200 dark:bg-gray-700 rounded-full h-2.5">
-                <div className="bg-primary h-2.5 rounded-full" style={{ width: '45%' }}></div>
-              </div>
-            </div>
-            <div>
-              <div className="flex justify-between mb-1">
-                <span className="font-medium">{t('homeDownPayment')}</span>
-                <span>30%</span>
-              </div>
-              <div className="w-full bg-gray-200 dark:bg-gray-700 rounded-full h-2.5">
-                <div className="bg-primary h-2.5 rounded-full" style={{ width: '30%' }}></div>
-              </div>
-            </div>
+            ))}
           </div>
         </div>
 
         <div className="bg-white dark:bg-dark-300 rounded-lg shadow-sm p-6">
           <h2 className="text-xl font-semibold mb-4">{t('financialInsights')}</h2>
           <div className="space-y-4">
-            <div className="p-4 bg-green-50 dark:bg-green-900/20 rounded-lg">
-              <h3 className="font-medium text-green-800 dark:text-green-400">{t('positiveTrend')}</h3>
-              <p className="text-sm text-green-700 dark:text-green-300 mt-1">
-                {t('positiveTrendDescription')}
-              </p>
-            </div>
-            <div className="p-4 bg-yellow-50 dark:bg-yellow-900/20 rounded-lg">
-              <h3 className="font-medium text-yellow-800 dark:text-yellow-400">{t('suggestion')}</h3>
-              <p className="text-sm text-yellow-700 dark:text-yellow-300 mt-1">
-                {t('suggestionDescription')}
-              </p>
-            </div>
-            <div className="p-4 bg-blue-50 dark:bg-blue-900/20 rounded-lg">
-              <h3 className="font-medium text-blue-800 dark:text-blue-400">{t('opportunity')}</h3>
-              <p className="text-sm text-blue-700 dark:text-blue-300 mt-1">
-                {t('opportunityDescription')}
-              </p>
-            </div>
+            {(resources.insights || []).map(insight => {
+              const [background, heading, text] = INSIGHT_STYLES[insight.type] || DEFAULT_INSIGHT_STYLE;
+              return (
+                <div key={insight.title} className={`p-4 rounded-lg ${background}`}>
+                  <h3 className={`font-medium ${heading}`}>{insight.title}</h3>
+                  <p className={`text-sm mt-1 ${text}`}>
+                    {insight.description}
+                  </p>
+                </div>
+              );
+            })}
           </div>
         </div>
       </div>
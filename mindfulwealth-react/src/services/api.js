@@ -408,6 +408,73 @@ const api = {
       }
       throw error;
     });
+  },
+
+  // Several dashboard resources (dashboard, goals, portfolio, activity,
+  // insights) in one request, keyed by name in data.resources
+  getBootstrap: (resources = ['dashboard', 'goals', 'portfolio', 'activity', 'insights']) => {
+    return apiClient.get('/bootstrap', { params: { resources: resources.join(',') } }).catch(error => {
+      console.log('Error getting bootstrap data:', error.message);
+      throw error;
+    });
+  },
+
+  // Transactions, budgets and saved impulses changed since the version of
+  // the previous sync: data.changes, data.deleted and the next data.version
+  getChanges: (since = 0) => {
+    return apiClient.get('/sync', { params: { since } }).catch(error => {
+      console.log('Error syncing changes:', error.message);
+      throw error;
+    });
+  },
+
+  // Server-sent change events (transaction.created, budget.updated,
+  // summary, ...) of the current user, call close() on the result to stop.
+  // Each connection is opened with a single-use ticket, so a dropped stream
+  // is reopened with a new one rather than by the browser.
+  subscribeToChanges: (onEvent, currency = null) => {
+    let source = null;
+    let retry = null;
+    let closed = false;
+
+    const reconnect = () => {
+      if (!closed) {
+        retry = setTimeout(connect, 5000);
+      }
+    };
+
+    const connect = () => {
+      apiClient.post('/events/ticket').then(response => {
+        if (closed || !response.data.ticket) {
+          return reconnect();
+        }
+        const params = new URLSearchParams({ ticket: response.data.ticket });
+        if (currency) {
+          params.set('currency', currency);
+        }
+        source = new EventSource(`${API_URL}/events?${params}`);
+        source.onmessage = (message) => onEvent(JSON.parse(message.data));
+        source.onerror = () => {
+          console.log('Change stream disconnected, reconnecting');
+          source.close();
+          reconnect();
+        };
+      }).catch(error => {
+        console.log('Error opening change stream:', error.message);
+        reconnect();
+      });
+    };
+
+    connect();
+    return {
+      close: () => {
+        closed = true;
+        clearTimeout(retry);
+        if (source) {
+          source.close();
+        }
+      }
+    };
   }
 };
 
@@ -1,5 +1,5 @@
 import React from 'react';
-import { render, screen, waitFor } from '@testing-library/react';
+import { render, screen, waitFor, act } from '@testing-library/react';
 import '@testing-library/jest-dom';
 import Dashboard from '../components/Dashboard';
 import api from '../services/api';
@@ -45,6 +45,7 @@ jest.mock('@heroicons/react/24/outline', () => ({
   ArrowTrendingUpIcon: () => <div data-testid="mock-arrow-trending-up-icon">ArrowTrendingUpIcon</div>,
   ArrowTrendingDownIcon: () => <div data-testid="mock-arrow-trending-down-icon">ArrowTrendingDownIcon</div>,
   ChartBarIcon: () => <div data-testid="mock-chart-bar-icon">ChartBarIcon</div>,
+  ClockIcon: () => <div data-testid="mock-clock-icon">ClockIcon</div>,
   CurrencyDollarIcon: () => <div data-testid="mock-currency-dollar-icon">CurrencyDollarIcon</div>,
 }));
 
@@ -122,8 +123,12 @@ describe('Dashboard Component', () => {
     // Reset all mocks
     jest.clearAllMocks();
     
-    // Mock the API calls
-    api.getDashboard.mockResolvedValue({ data: mockDashboardData });
+    // Mock the API calls: every section comes from one bootstrap request
+    const { summary, ...resources } = mockDashboardData;
+    api.getBootstrap.mockResolvedValue({
+      data: { success: true, resources: { dashboard: { summary }, ...resources } }
+    });
+    api.subscribeToChanges.mockReturnValue({ close: jest.fn() });
   });
 
   test('renders dashboard with all sections', async () => {
@@ -137,7 +142,7 @@ describe('Dashboard Component', () => {
 
     // Wait for the API call to resolve
     await waitFor(() => {
-      expect(api.getDashboard).toHaveBeenCalledTimes(1);
+      expect(api.getBootstrap).toHaveBeenCalledTimes(1);
     });
 
     // Check that all sections are rendered
@@ -176,7 +181,7 @@ describe('Dashboard Component', () => {
 
     // Wait for the API call to resolve
     await waitFor(() => {
-      expect(api.getDashboard).toHaveBeenCalledTimes(1);
+      expect(api.getBootstrap).toHaveBeenCalledTimes(1);
     });
 
     // Check that the financial values are displayed correctly
@@ -188,7 +193,7 @@ describe('Dashboard Component', () => {
 
   test('handles API error gracefully', async () => {
     // Mock API error
-    api.getDashboard.mockRejectedValue(new Error('Failed to fetch dashboard data'));
+    api.getBootstrap.mockRejectedValue(new Error('Failed to fetch dashboard data'));
 
     render(
       <ThemeProvider>
@@ -200,10 +205,33 @@ describe('Dashboard Component', () => {
 
     // Wait for the API call to resolve
     await waitFor(() => {
-      expect(api.getDashboard).toHaveBeenCalledTimes(1);
+      expect(api.getBootstrap).toHaveBeenCalledTimes(1);
     });
 
     // The component should still render without crashing
     expect(screen.getByText('totalBalance')).toBeInTheDocument();
   });
-}); 
\ No newline at end of file
+
+  test('updates the summary from change events', async () => {
+    render(
+      <ThemeProvider>
+        <LanguageProvider>
+          <Dashboard />
+        </LanguageProvider>
+      </ThemeProvider>
+    );
+
+    await waitFor(() => {
+      expect(screen.getByText('€5,240.00')).toBeInTheDocument();
+    });
+
+    // The stream pushes the new summary after a transaction is saved
+    const onEvent = api.subscribeToChanges.mock.calls[0][0];
+    act(() => {
+      onEvent({ type: 'summary', summary: { ...mockDashboardData.summary, monthly_expenses: 5300 } });
+    });
+
+    expect(screen.getByText('€5,300.00')).toBeInTheDocument();
+    expect(api.getBootstrap).toHaveBeenCalledTimes(1);
+  });
+}); 